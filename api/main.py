@@ -23,27 +23,42 @@ if os.path.exists(os.path.join(PROJECT_ROOT, "local.env")):
 else:
     load_dotenv(os.path.join(PROJECT_ROOT, ".env"))
 
-from app.tasks import update_active_tickers_prices
+from app.tasks import (
+    refresh_tracked_prices, refresh_open_markets, refresh_after_close,
+    SESSION_REFRESH_MINUTES, AFTER_CLOSE_DELAY_MINUTES,
+)
+from app.market_hours import EXCHANGES
 from app.cache import close_valkey_pool
 from app.email_service import run_daily_job
 
 async def take_nightly_net_worth_snapshots():
     from app.database import async_session
-    from sqlalchemy import select
-    from app.models import User
-    from api.routes.finance import capture_user_net_worth_snapshot
+    from app.snapshots import take_net_worth_snapshots
     from datetime import datetime, timezone
-    
+
+    try:
+        report = await take_net_worth_snapshots(async_session, datetime.now(timezone.utc))
+    except Exception as e:
+        print(f"Nightly net worth snapshots failed: {e}")
+        return
+    print(
+        f"Nightly net worth snapshots for {report['date']}: {report['snapshots']}/{report['users']} users "
+        f"({report['households']} households, {report['tickers']} tickers) in {report['duration_seconds']}s"
+    )
+    for user_id, error in report["failed"].items():
+        print(f"Failed to capture snapshot for user {user_id}: {error}")
+
+async def reconcile_ledger_balances():
+    from app.database import async_session
+    from api.routes.finance import reconcile_account_balances
+
     async with async_session() as db:
-        result = await db.execute(select(User.id))
-        user_ids = [r[0] for r in result.all()]
-        
-        now = datetime.now(timezone.utc)
-        for user_id in user_ids:
-            try:
-                await capture_user_net_worth_snapshot(db, user_id, now)
-            except Exception as e:
-                print(f"Failed to capture snapshot for user {user_id}: {e}")
+        try:
+            corrected = await reconcile_account_balances(db)
+            if corrected:
+                print(f"Ledger reconciliation corrected {len(corrected)} account balances: {corrected}")
+        except Exception as e:
+            print(f"Ledger reconciliation failed: {e}")
 
 async def run_monthly_summary_cron_job():
     from app.database import async_session
@@ -61,6 +76,51 @@ async def run_monthly_summary_cron_job():
             except Exception as e:
                 print(f"Failed to run monthly summary job for user {user_id}: {e}")
 
+# Idempotent upgrades for databases created before these columns/indexes existed.
+# Each group runs in its own transaction so one failure does not roll back the rest.
+SCHEMA_UPGRADES = [
+    ("account opening balance", [
+        "ALTER TABLE accounts ADD COLUMN IF NOT EXISTS opening_balance FLOAT;",
+        "UPDATE accounts a SET opening_balance = a.balance - COALESCE("
+        "(SELECT SUM(t.amount) FROM account_transactions t WHERE t.account_id = a.id), 0) "
+        "WHERE a.opening_balance IS NULL;",
+    ]),
+    ("pagination indexes", [
+        "CREATE INDEX IF NOT EXISTS idx_expense_owner_date_id ON expenses (owner_id, date, id);",
+        "CREATE INDEX IF NOT EXISTS idx_txn_portfolio_executed_id ON transactions (portfolio_id, executed_at, id);",
+    ]),
+    ("expense content hash", [
+        "ALTER TABLE expenses ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64);",
+        "CREATE INDEX IF NOT EXISTS idx_expense_owner_hash ON expenses (owner_id, content_hash);",
+    ]),
+    ("date range indexes", [
+        "CREATE INDEX IF NOT EXISTS idx_income_owner_date ON income (owner_id, date);",
+        "CREATE INDEX IF NOT EXISTS idx_account_txn_account_date_id ON account_transactions (account_id, date, id);",
+    ]),
+    ("unique daily net worth snapshots", [
+        "DELETE FROM net_worth_snapshots a USING net_worth_snapshots b "
+        "WHERE a.owner_id = b.owner_id AND a.date = b.date AND a.id < b.id;",
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_snapshot_owner_date ON net_worth_snapshots (owner_id, date);",
+        "DROP INDEX IF EXISTS idx_snapshot_owner_date;",
+    ]),
+    # portfolio_positions itself comes from create_all; existing portfolios replay on their next import
+    ("incremental holdings watermark", [
+        "ALTER TABLE portfolios ADD COLUMN IF NOT EXISTS holdings_applied_at TIMESTAMPTZ;",
+        "ALTER TABLE portfolios ADD COLUMN IF NOT EXISTS holdings_applied_id INTEGER;",
+    ]),
+    # Aggregate-only rows for portfolios imported before positions existed come from
+    # scripts/migrate_position_aggregates.py, which is run once
+    ("position aggregates", [
+        "ALTER TABLE portfolio_positions "
+        "ADD COLUMN IF NOT EXISTS sell_proceeds FLOAT NOT NULL DEFAULT 0, "
+        "ADD COLUMN IF NOT EXISTS sell_result FLOAT NOT NULL DEFAULT 0, "
+        "ADD COLUMN IF NOT EXISTS shares_sold FLOAT NOT NULL DEFAULT 0, "
+        "ADD COLUMN IF NOT EXISTS num_sells INTEGER NOT NULL DEFAULT 0, "
+        "ADD COLUMN IF NOT EXISTS dividend_income FLOAT NOT NULL DEFAULT 0, "
+        "ADD COLUMN IF NOT EXISTS num_dividends INTEGER NOT NULL DEFAULT 0;",
+    ]),
+]
+
 # ── App Setup ──────────────────────────────────────────────
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -77,9 +137,16 @@ async def lifespan(app: FastAPI):
                 pass # Column might already exist
     except Exception as e:
         print(f"Database initialization failed: {e}")
-
-    # Startup: Kick off lightweight background data refresh for recently active tickers
-    asyncio.create_task(update_active_tickers_prices())
+    for name, statements in SCHEMA_UPGRADES:
+        try:
+            async with engine.begin() as conn:
+                for statement in statements:
+                    await conn.execute(text(statement))
+        except Exception as e:
+            print(f"Schema upgrade '{name}' failed: {e}")
+
+    # Startup: Catch up stored prices for every tracked ticker
+    asyncio.create_task(refresh_tracked_prices())
     
     # Initialize APScheduler for daily email job
     from apscheduler.schedulers.asyncio import AsyncIOScheduler
@@ -88,6 +155,18 @@ async def lifespan(app: FastAPI):
     scheduler.add_job(run_daily_job, 'cron', hour=8, minute=0)
     scheduler.add_job(take_nightly_net_worth_snapshots, 'cron', hour=23, minute=59)
     scheduler.add_job(run_monthly_summary_cron_job, 'cron', day=1, hour=9, minute=0)
+    scheduler.add_job(reconcile_ledger_balances, 'cron', hour=3, minute=30)
+
+    # Prices: frequent refreshes while an exchange is in session, then one after each close
+    scheduler.add_job(refresh_open_markets, 'interval', minutes=SESSION_REFRESH_MINUTES)
+    for exchange, calendar in EXCHANGES.items():
+        close_hour, close_minute = divmod(
+            calendar["close"].hour * 60 + calendar["close"].minute + AFTER_CLOSE_DELAY_MINUTES, 60
+        )
+        scheduler.add_job(
+            refresh_after_close, 'cron', args=[exchange], day_of_week='mon-fri',
+            hour=close_hour, minute=close_minute, timezone=calendar["tz"]
+        )
     scheduler.start()
     
     yield
@@ -105,16 +184,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count"],
 )
 
 # ── Router Registrations ──────────────────────────────────
-from api.routes import auth, finance, agent, market, portfolio
+from api.routes import auth, finance, agent, market, portfolio, imports
 
 app.include_router(auth.router)
 app.include_router(finance.router)
 app.include_router(agent.router)
 app.include_router(market.router)
 app.include_router(portfolio.router)
+app.include_router(imports.router)
 
 # Static files (vanilla HTML fallback)
 static_dir = os.path.join(os.path.dirname(__file__), "static")
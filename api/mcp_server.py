@@ -14,6 +14,7 @@ from mcp.server.fastmcp import FastMCP
 
 # Import DB and auth helpers to generate token
 from app.database import async_session
+from app.household import invalidate_household
 from app.models import User
 from app.auth import create_access_token
 
@@ -42,6 +43,7 @@ async def get_default_owner_id() -> int:
             session.add(default_user)
             await session.commit()
             await session.refresh(default_user)
+            await invalidate_household(default_user.id)
             return default_user.id
 
 async def get_auth_headers() -> dict:
@@ -6,6 +6,8 @@ from typing import Annotated
 
 from app.database import get_db_session
 from app.models import User, LinkedAccount
+from app.valuation import invalidate_household_valuation
+from app.household import get_household, invalidate_household
 from app.auth import get_password_hash, verify_password, create_access_token, decode_access_token
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 
@@ -51,6 +53,13 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db: As
         raise credentials_exception
     return user
 
+async def get_current_household(
+    current_user: Annotated[User, Depends(get_current_user)],
+    db: AsyncSession = Depends(get_db_session)
+) -> dict:
+    """The current user's household (member ids and display names), from the household cache."""
+    return await get_household(db, current_user.id)
+
 @router.post("/register", response_model=UserResponse)
 async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db_session)):
     # Check if email exists
@@ -63,6 +72,8 @@ async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db_sess
     db.add(new_user)
     await db.commit()
     await db.refresh(new_user)
+    # Ids come back after a table reset; never serve a household cached for an earlier user
+    await invalidate_household(new_user.id)
     return new_user
 
 @router.post("/login")
@@ -117,6 +128,10 @@ async def link_account(
     db.add(link1)
     db.add(link2)
     await db.commit()
+    # Membership first: valuation invalidation resolves the households it clears
+    await invalidate_household(current_user.id, target_user.id)
+    await invalidate_household_valuation(db, current_user.id)
+    await invalidate_household_valuation(db, target_user.id)
     
     return {"status": "success", "message": f"Successfully linked with {target_user.email}"}
 
@@ -1,18 +1,31 @@
+import asyncio
+import calendar
 import csv
+import hashlib
+import itertools
 import json
 import re
 from datetime import datetime, timezone
-import io
 from dateutil import parser
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Response
 from pydantic import BaseModel
-from sqlalchemy import select, func, and_
+from sqlalchemy import select, insert, update, func, and_, or_, not_, tuple_, text
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Annotated
-
-from app.database import get_db_session
-from app.models import User, Expense, Income, ManualAsset, Account, NetWorthSnapshot, Portfolio, PortfolioHolding, LinkedAccount, ExpenseCategoryRule, RawExpense, FinancialGoal, GoalContribution, AccountTransaction
-from api.routes.auth import get_current_user
+from typing import Annotated, Iterator
+
+from app.database import get_db_session, async_session
+from app.cache import get_cache, set_cache
+from app.pagination import encode_cursor, decode_cursor
+from app.categorization import get_category_matcher, apply_rule_retroactively, apply_all_rules
+from app.expense_classifier import get_expense_classifier
+from app.expense_summary import month_range, month_of, add_months, get_expense_summary, invalidate_expense_summaries
+from app.import_jobs import IMPORT_CHUNK_ROWS, ImportProgress, spool_upload, open_spooled_text, start_import_job
+from app.exports import export_response
+from app.csv_formats import (
+    FORMAT_SAMPLE_SIZE, sample_values, sniff_date_format, sniff_decimal_separator, parse_date_column, parse_number_column
+)
+from app.models import User, Expense, Income, ManualAsset, Account, NetWorthSnapshot, Portfolio, ExpenseCategoryRule, RawExpense, FinancialGoal, GoalContribution, AccountTransaction
+from api.routes.auth import get_current_user, get_current_household
 
 router = APIRouter(prefix="/api/finance", tags=["finance"])
 
@@ -75,35 +88,58 @@ class TransferCreate(BaseModel):
 
 # --- Expenses ---
 
+EXPENSE_COUNT_CACHE_TTL = 60
+
 @router.get("/expenses")
 async def get_expenses(
     current_user: Annotated[User, Depends(get_current_user)],
+    household: Annotated[dict, Depends(get_current_household)],
+    response: Response,
     month: str | None = None, # format: YYYY-MM
+    limit: int | None = Query(None, ge=1, le=500),
+    cursor: str | None = None,
     db: AsyncSession = Depends(get_db_session)
 ):
-    # Fetch linked user IDs
-    links = await db.execute(select(LinkedAccount.linked_user_id).where(LinkedAccount.user_id == current_user.id))
-    linked_ids = [r[0] for r in links.all()]
-    
+    """
+    Household expenses, newest first. Pass `limit` to page through them with keyset
+    pagination: the next page's cursor comes back in X-Next-Cursor and a cached total
+    (refreshed every minute) in X-Total-Count.
+    """
     # We want expenses owned by either current_user or any of their linked user accounts
-    allowed_owner_ids = [current_user.id] + linked_ids
+    allowed_owner_ids = household["member_ids"]
     query = select(Expense).where(Expense.owner_id.in_(allowed_owner_ids))
     
     if month:
         try:
-            year, m = month.split('-')
-            # Extract year/month from datetime in postgres
-            query = query.where(
-                and_(
-                    func.extract('year', Expense.date) == int(year),
-                    func.extract('month', Expense.date) == int(m)
-                )
-            )
+            start, end = month_range(month)
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid month format, expected YYYY-MM")
-            
-    result = await db.execute(query.order_by(Expense.date.desc()))
+        query = query.where(and_(Expense.date >= start, Expense.date < end))
+
+    if limit:
+        count_key = f"expense_count:{','.join(map(str, sorted(allowed_owner_ids)))}:{month or 'all'}"
+        total = await get_cache(count_key)
+        if total is None:
+            total = await db.scalar(select(func.count()).select_from(query.subquery()))
+            await set_cache(count_key, total, EXPENSE_COUNT_CACHE_TTL)
+        response.headers["X-Total-Count"] = str(total)
+
+    if cursor:
+        try:
+            cursor_date, cursor_id = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        query = query.where(tuple_(Expense.date, Expense.id) < tuple_(cursor_date, cursor_id))
+
+    query = query.order_by(Expense.date.desc(), Expense.id.desc())
+    if limit:
+        query = query.limit(limit + 1)
+
+    result = await db.execute(query)
     expenses = result.scalars().all()
+    if limit and len(expenses) > limit:
+        expenses = expenses[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(expenses[-1].date, expenses[-1].id)
 
     # Fetch uploader/payer info from RawExpense
     expense_ids = [e.id for e in expenses]
@@ -132,6 +168,62 @@ async def get_expenses(
         })
     return response
 
+EXPENSE_EXPORT_COLUMNS = [
+    ("id", Expense.id),
+    ("owner_id", Expense.owner_id),
+    ("date", Expense.date),
+    ("category", Expense.category),
+    ("amount", Expense.amount),
+    ("description", Expense.description),
+    ("is_joint", Expense.is_joint),
+    ("created_at", Expense.created_at),
+]
+
+@router.get("/expenses/export")
+async def export_expenses(
+    current_user: Annotated[User, Depends(get_current_user)],
+    household: Annotated[dict, Depends(get_current_household)],
+    format: str = Query("csv", description="csv or parquet"),
+    month: str | None = None, # format: YYYY-MM
+):
+    """Download household expenses, oldest first, streamed as CSV or Parquet."""
+    filters = [Expense.owner_id.in_(household["member_ids"])]
+    if month:
+        try:
+            start, end = month_range(month)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid month format, expected YYYY-MM")
+        filters.extend([Expense.date >= start, Expense.date < end])
+    return export_response(
+        EXPENSE_EXPORT_COLUMNS, filters, [Expense.date, Expense.id], format, f"expenses-{month or 'all'}"
+    )
+
+@router.get("/expenses/summary")
+async def get_expenses_summary(
+    current_user: Annotated[User, Depends(get_current_user)],
+    household: Annotated[dict, Depends(get_current_household)],
+    start_month: str | None = None, # format: YYYY-MM, defaults to 11 months before end_month
+    end_month: str | None = None, # format: YYYY-MM, defaults to the current month
+    db: AsyncSession = Depends(get_db_session)
+):
+    """
+    Household expense rollups computed in Postgres: totals per category, day and
+    payer, joint vs personal, the split/settle-up breakdowns, and month-over-month
+    changes for each month in the range.
+    """
+    for value in (start_month, end_month):
+        if value is not None and not re.match(r"^\d{4}-\d{2}$", value):
+            raise HTTPException(status_code=400, detail="Invalid month format, expected YYYY-MM")
+
+    allowed_owner_ids = household["member_ids"]
+
+    end_month = end_month or month_of(datetime.now(timezone.utc))
+    try:
+        start_month = start_month or add_months(end_month, -11)
+        return await get_expense_summary(db, allowed_owner_ids, start_month, end_month)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.post("/expenses")
 async def create_expense(
     expense_in: ExpenseCreate,
@@ -144,7 +236,8 @@ async def create_expense(
         category=expense_in.category,
         amount=expense_in.amount,
         description=expense_in.description,
-        is_joint=1 if expense_in.is_joint else 0
+        is_joint=1 if expense_in.is_joint else 0,
+        content_hash=expense_content_hash(expense_in.date, expense_in.amount, expense_in.description)
     )
     db.add(expense)
     await db.commit()
@@ -158,6 +251,7 @@ async def create_expense(
     )
     db.add(raw)
     await db.commit()
+    await invalidate_expense_summaries([(current_user.id, expense.date)])
     
     return {
         "id": expense.id,
@@ -176,12 +270,11 @@ async def update_expense(
     expense_id: int,
     expense_in: ExpenseUpdate,
     current_user: Annotated[User, Depends(get_current_user)],
+    household: Annotated[dict, Depends(get_current_household)],
     db: AsyncSession = Depends(get_db_session)
 ):
-    # Fetch linked user IDs to permit linked account edits
-    links = await db.execute(select(LinkedAccount.linked_user_id).where(LinkedAccount.user_id == current_user.id))
-    linked_ids = [r[0] for r in links.all()]
-    allowed_owner_ids = [current_user.id] + linked_ids
+    # Linked partners may edit household expenses
+    allowed_owner_ids = household["member_ids"]
 
     result = await db.execute(
         select(Expense).where(
@@ -194,6 +287,7 @@ async def update_expense(
     expense = result.scalar_one_or_none()
     if not expense:
         raise HTTPException(status_code=404, detail="Expense not found")
+    previous_bucket = (expense.owner_id, expense.date)
         
     if expense_in.category is not None:
         expense.category = expense_in.category
@@ -203,12 +297,15 @@ async def update_expense(
         expense.amount = expense_in.amount
     if expense_in.description is not None:
         expense.description = expense_in.description
+    if expense_in.date is not None or expense_in.amount is not None or expense_in.description is not None:
+        expense.content_hash = expense_content_hash(expense.date, expense.amount, expense.description)
         
     if expense_in.ownership_type is not None:
         if expense_in.ownership_type == "my-personal":
             expense.is_joint = 0
             expense.owner_id = current_user.id
         elif expense_in.ownership_type == "linked-personal":
+            linked_ids = household["member_ids"][1:]
             if not linked_ids:
                 raise HTTPException(status_code=400, detail="No linked partner found to assign this expense to")
             expense.is_joint = 0
@@ -220,6 +317,7 @@ async def update_expense(
         
     await db.commit()
     await db.refresh(expense)
+    await invalidate_expense_summaries([previous_bucket, (expense.owner_id, expense.date)])
 
     # Check if a RawExpense exists, if not, insert a stub
     raw_res = await db.execute(select(RawExpense).where(RawExpense.expense_id == expense.id))
@@ -252,12 +350,11 @@ async def update_expense(
 async def delete_expense(
     expense_id: int,
     current_user: Annotated[User, Depends(get_current_user)],
+    household: Annotated[dict, Depends(get_current_household)],
     db: AsyncSession = Depends(get_db_session)
 ):
-    # Fetch linked user IDs to permit linked account deletes
-    links = await db.execute(select(LinkedAccount.linked_user_id).where(LinkedAccount.user_id == current_user.id))
-    linked_ids = [r[0] for r in links.all()]
-    allowed_owner_ids = [current_user.id] + linked_ids
+    # Linked partners may delete household expenses
+    allowed_owner_ids = household["member_ids"]
 
     result = await db.execute(
         select(Expense).where(
@@ -270,11 +367,26 @@ async def delete_expense(
     expense = result.scalar_one_or_none()
     if not expense:
         raise HTTPException(status_code=404, detail="Expense not found")
+    bucket = (expense.owner_id, expense.date)
         
     await db.delete(expense)
     await db.commit()
+    await invalidate_expense_summaries([bucket])
     return {"status": "success"}
 
+# Candidate formats for sniffing an expense file's date column, day-first before
+# month-first as parse_date prefers for UK/European statements
+EXPENSE_DATE_FORMATS = [
+    '%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%d-%m-%Y', '%d.%m.%Y', '%Y/%m/%d',
+    '%d %b %Y', '%d-%b-%Y', '%d %B %Y', '%d/%m/%y', '%m/%d/%y',
+    '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%d/%m/%Y %H:%M', '%d/%m/%Y %H:%M:%S',
+]
+# Before formats were sniffed every date went through parse_date, which reads
+# "03/04/2024" day-first. When a file sniffs month-first, such ambiguous dates are
+# also matched against this day-first reading so re-uploading an already-imported
+# file does not duplicate its rows under the new date.
+DAY_FIRST_READINGS = {'%m/%d/%Y': '%d/%m/%Y', '%m/%d/%y': '%d/%m/%y'}
+
 def parse_date(date_str: str) -> datetime:
     date_str = date_str.strip()
     if not date_str:
@@ -293,6 +405,13 @@ def parse_amount(amount_str: str) -> float:
     cleaned = amount_str.replace('$', '').replace('€', '').replace('£', '').replace(',', '').strip()
     return float(cleaned)
 
+def expense_content_hash(date: datetime, amount: float, description: str | None) -> str:
+    """Stable sha256 of an expense's (date, amount, description), used to detect re-imported rows."""
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    key = f"{date.astimezone(timezone.utc).isoformat()}|{float(amount)!r}|{description or ''}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
 def detect_csv_columns(first_row: list[str]) -> dict[str, int] | None:
     # Try to identify Date, Description, Amount columns
     col_mapping = {}
@@ -328,240 +447,423 @@ def detect_csv_columns(first_row: list[str]) -> dict[str, int] | None:
             
     return None
 
-@router.post("/expenses/upload")
-async def upload_expenses_csv(
-    current_user: Annotated[User, Depends(get_current_user)],
-    file: UploadFile = File(...),
-    default_category: str | None = None,
-    default_is_joint: bool | None = None,
-    default_period: str | None = None,
-    db: AsyncSession = Depends(get_db_session)
-):
-    if not file.filename.endswith('.csv'):
-        raise HTTPException(status_code=400, detail="Only CSV files are allowed")
-        
-    content = await file.read()
-    try:
-        decoded = content.decode('utf-8')
-    except UnicodeDecodeError:
-        try:
-            decoded = content.decode('latin-1')
-        except UnicodeDecodeError:
-            raise HTTPException(status_code=400, detail="Unable to decode file encoding. Please upload a UTF-8 or Latin-1 CSV file.")
+UPLOAD_INSERT_CHUNK_SIZE = 1000
 
-    csv_data = list(csv.reader(io.StringIO(decoded)))
-    if not csv_data:
-        return {"status": "success", "added": 0, "uncategorized": 0}
-        
-    first_row = csv_data[0]
+async def _insert_expense_rows(db: AsyncSession, owner_id: int, rows: list[tuple[dict, str]]) -> int:
+    """Insert (expense values, raw row JSON) pairs with one INSERT ... RETURNING and one raw INSERT."""
+    result = await db.execute(
+        insert(Expense).returning(Expense.id, sort_by_parameter_order=True),
+        [values for values, _ in rows]
+    )
+    expense_ids = result.scalars().all()
+    await db.execute(
+        insert(RawExpense),
+        [
+            {"owner_id": owner_id, "expense_id": expense_id, "raw_data": raw_data}
+            for expense_id, (_, raw_data) in zip(expense_ids, rows)
+        ]
+    )
+    return len(expense_ids)
+
+def _iter_expense_source_rows(reader) -> Iterator[dict]:
+    """
+    Normalize rows of an expense CSV to date/amount/description/category/is_joint
+    strings plus the raw row. The first row is either a header or, when it already
+    looks like data, the first of a headerless export.
+    """
+    first_row = next(reader, None)
+    if first_row is None:
+        return
     col_mapping = detect_csv_columns(first_row)
-    is_headerless = col_mapping is not None
-    
-    rows_to_process = []
-    if is_headerless:
-        for r in csv_data:
+
+    if col_mapping is not None:
+        for r in itertools.chain([first_row], reader):
             if len(r) <= max(col_mapping.values()):
                 continue
-            rows_to_process.append({
+            yield {
                 'date': r[col_mapping['date']],
                 'amount': r[col_mapping['amount']],
                 'description': r[col_mapping['description']],
                 'category': 'Uncategorized',
                 'is_joint': 'false',
                 'raw_source': r
-            })
-    else:
-        headers = [h.strip().lower() for h in first_row]
-        for r in csv_data[1:]:
-            if len(r) < len(headers):
-                continue
-            row_dict = dict(zip(headers, r))
-            
-            # Find the best header match for 'date', 'amount', 'description', 'category', 'is_joint'
-            date_key = next((h for h in headers if 'date' in h), 'date')
-            amount_key = next((h for h in headers if 'amount' in h or 'value' in h), 'amount')
-            desc_key = next((h for h in headers if 'desc' in h or 'title' in h or 'memo' in h or 'payee' in h), 'description')
-            cat_key = next((h for h in headers if 'cat' in h), 'category')
-            joint_key = next((h for h in headers if 'joint' in h), 'is_joint')
-            
-            rows_to_process.append({
-                'date': row_dict.get(date_key, ''),
-                'amount': row_dict.get(amount_key, '0'),
-                'description': row_dict.get(desc_key, ''),
-                'category': row_dict.get(cat_key, 'Uncategorized'),
-                'is_joint': row_dict.get(joint_key) or row_dict.get('isjoint') or 'false',
-                'raw_source': r
-            })
-            
-    # Check if there are any negative amounts to distinguish bank statements
-    has_negative_amounts = False
-    for r in rows_to_process:
-        try:
-            amt = parse_amount(r['amount'])
-            if amt < 0:
-                has_negative_amounts = True
-                break
-        except ValueError:
+            }
+        return
+
+    headers = [h.strip().lower() for h in first_row]
+    # Find the best header match for 'date', 'amount', 'description', 'category', 'is_joint'
+    date_key = next((h for h in headers if 'date' in h), 'date')
+    amount_key = next((h for h in headers if 'amount' in h or 'value' in h), 'amount')
+    desc_key = next((h for h in headers if 'desc' in h or 'title' in h or 'memo' in h or 'payee' in h), 'description')
+    cat_key = next((h for h in headers if 'cat' in h), 'category')
+    joint_key = next((h for h in headers if 'joint' in h), 'is_joint')
+    for r in reader:
+        if len(r) < len(headers):
             continue
-
-    rules_res = await db.execute(select(ExpenseCategoryRule).where(ExpenseCategoryRule.owner_id == current_user.id))
-    rules = rules_res.scalars().all()
-    
-    # 1. Parse and validate all rows first, so we don't insert partial results
-    # and can query DB counts before we start modifying database session state.
-    parsed_rows = []
-    failed_count = 0
-    for r in rows_to_process:
-        try:
-            date_str = r['date'].strip()
+        row_dict = dict(zip(headers, r))
+        yield {
+            'date': row_dict.get(date_key, ''),
+            'amount': row_dict.get(amount_key, '0'),
+            'description': row_dict.get(desc_key, ''),
+            'category': row_dict.get(cat_key, 'Uncategorized'),
+            'is_joint': row_dict.get(joint_key) or row_dict.get('isjoint') or 'false',
+            'raw_source': r
+        }
+
+def _expense_row_date(date_str: str, parsed_date: datetime | None, default_period: str | None) -> datetime:
+    """The row's UTC date, moved into default_period when one is given."""
+    try:
+        date_obj = parsed_date or parse_date(date_str)
+        if date_obj.tzinfo is None:
+            date_obj = date_obj.replace(tzinfo=timezone.utc)
+        if default_period:
             try:
-                date_obj = parse_date(date_str)
-                if date_obj.tzinfo is None:
-                    date_obj = date_obj.replace(tzinfo=timezone.utc)
-                if default_period:
-                    try:
-                        py, pm = map(int, default_period.split('-'))
-                        import calendar
-                        max_day = calendar.monthrange(py, pm)[1]
-                        new_day = min(date_obj.day, max_day)
-                        date_obj = date_obj.replace(year=py, month=pm, day=new_day)
-                    except Exception:
-                        pass
+                py, pm = map(int, default_period.split('-'))
+                max_day = calendar.monthrange(py, pm)[1]
+                new_day = min(date_obj.day, max_day)
+                date_obj = date_obj.replace(year=py, month=pm, day=new_day)
             except Exception:
-                if default_period:
-                    try:
-                        py, pm = map(int, default_period.split('-'))
-                        date_obj = datetime(py, pm, 1, tzinfo=timezone.utc)
-                    except Exception:
-                        raise
-                else:
-                    raise
-            
-            amount = parse_amount(r['amount'])
-            
-            if has_negative_amounts:
-                if amount >= 0:
-                    amount = -abs(amount)
-                else:
-                    amount = abs(amount)
-            else:
-                amount = abs(amount)
-
-            description = r['description'].strip()
-            if default_is_joint is not None:
-                is_joint = 1 if default_is_joint else 0
-            else:
-                is_joint_val = r['is_joint']
-                is_joint = 1 if str(is_joint_val).lower().strip() in ['true', '1', 'yes', 'y'] else 0
-
-            parsed_rows.append({
-                'date': date_obj,
-                'amount': amount,
-                'description': description,
-                'is_joint': is_joint,
-                'category': r.get('category', 'Uncategorized'),
-                'raw_source': r['raw_source']
-            })
-        except Exception:
-            failed_count += 1
-            continue
-
-    # 2. Query DB counts of all unique signatures in the CSV before inserting
-    unique_signatures = set()
-    for row in parsed_rows:
-        unique_signatures.add((row['date'], row['amount'], row['description']))
+                pass
+    except Exception:
+        if default_period:
+            py, pm = map(int, default_period.split('-'))
+            date_obj = datetime(py, pm, 1, tzinfo=timezone.utc)
+        else:
+            raise
+    return date_obj
+
+def _parse_expense_row(
+    r: dict,
+    parsed_date: datetime | None,
+    parsed_amount: float | None,
+    has_negative_amounts: bool,
+    default_period: str | None,
+    default_is_joint: bool | None,
+) -> dict:
+    """
+    Parse one normalized source row, given its column-parsed date and amount (None
+    where the file's sniffed formats missed). Raises when either is unusable.
+    """
+    date_obj = _expense_row_date(r['date'].strip(), parsed_date, default_period)
 
-    db_counts = {}
-    for date_obj, amount, description in unique_signatures:
-        count_res = await db.execute(
-            select(func.count(Expense.id)).where(
-                and_(
-                    Expense.owner_id == current_user.id,
-                    Expense.date == date_obj,
-                    Expense.amount == amount,
-                    Expense.description == description
-                )
-            )
-        )
-        db_counts[(date_obj, amount, description)] = count_res.scalar() or 0
+    amount = parsed_amount if parsed_amount is not None else parse_amount(r['amount'])
 
-    # 3. Process the rows and perform duplicate prevention
-    session_imported_counts = {}
-    added_count = 0
-    duplicate_count = 0
-    uncategorized_count = 0
+    # Bank statements carry signed amounts; flip them so spending is positive
+    if has_negative_amounts:
+        if amount >= 0:
+            amount = -abs(amount)
+        else:
+            amount = abs(amount)
+    else:
+        amount = abs(amount)
 
-    for row in parsed_rows:
-        date_obj = row['date']
-        amount = row['amount']
-        description = row['description']
-        sig = (date_obj, amount, description)
+    description = r['description'].strip()
+    if default_is_joint is not None:
+        is_joint = 1 if default_is_joint else 0
+    else:
+        is_joint_val = r['is_joint']
+        is_joint = 1 if str(is_joint_val).lower().strip() in ['true', '1', 'yes', 'y'] else 0
 
-        db_cnt = db_counts.get(sig, 0)
-        session_cnt = session_imported_counts.get(sig, 0)
+    return {
+        'date': date_obj,
+        'amount': amount,
+        'description': description,
+        'is_joint': is_joint,
+        'category': r.get('category', 'Uncategorized'),
+        'raw_source': r['raw_source']
+    }
 
-        if session_cnt < db_cnt:
-            # This occurrence of the transaction already exists in the database
-            session_imported_counts[sig] = session_cnt + 1
-            duplicate_count += 1
-            continue
+def _scan_expense_file(spool, encoding: str) -> dict:
+    """
+    First pass over the spooled upload: sniff the date format and decimal separator
+    from the leading rows, and find whether any row carries a negative amount.
+    """
+    text = open_spooled_text(spool, encoding)
+    try:
+        source_rows = _iter_expense_source_rows(csv.reader(text))
+        head = list(itertools.islice(source_rows, FORMAT_SAMPLE_SIZE))
+        formats = {
+            "date_format": sniff_date_format(sample_values([r['date'] for r in head]), EXPENSE_DATE_FORMATS),
+            "decimal": sniff_decimal_separator(sample_values([r['amount'] for r in head])),
+            "has_negative_amounts": False,
+        }
+        rows = itertools.chain(head, source_rows)
+        while batch := list(itertools.islice(rows, IMPORT_CHUNK_ROWS)):
+            amounts = parse_number_column([r['amount'] for r in batch], formats["decimal"])
+            if any(a is not None and a < 0 for a in amounts):
+                formats["has_negative_amounts"] = True
+                break
+        return formats
+    finally:
+        text.detach()
+
+async def _run_expense_import(
+    db: AsyncSession,
+    owner_id: int,
+    spool,
+    encoding: str,
+    default_category: str | None,
+    default_is_joint: bool | None,
+    default_period: str | None,
+    progress: ImportProgress,
+) -> dict:
+    """
+    Import a spooled expense CSV for the user in IMPORT_CHUNK_ROWS chunks: categorize
+    each chunk, skip rows already stored and bulk insert the rest. Everything is
+    committed together at the end.
+    """
+    # Formats are sniffed and a signed-amount statement is recognised (any negative
+    # amount in the file) in a pass of their own before rows can be normalized
+    formats = await asyncio.to_thread(_scan_expense_file, spool, encoding)
 
-        session_imported_counts[sig] = session_cnt + 1
+    matcher = await get_category_matcher(db, owner_id)
+    classifier = await get_expense_classifier(db, owner_id)
 
-        category = "Uncategorized"
-        if amount >= 0:
-            for rule in rules:
-                if description and re.search(rule.regex_pattern, description, re.IGNORECASE):
-                    category = rule.category_name
-                    break
-                    
-            if category == "Uncategorized":
-                csv_cat = row['category']
-                if csv_cat and csv_cat.strip():
-                    category = csv_cat.strip()
-                
-            if category == "Uncategorized" and default_category:
-                category = default_category.strip()
+    # Pre-import counts of each content hash, fetched once per hash as chunks first meet it
+    db_counts = {}
+    session_imported_counts = {}
+    queried_hashes = set()
+    rows_parsed = 0
+    failed_count = 0
+    duplicate_count = 0
+    uncategorized_count = 0
+    predicted_count = 0
+    added_count = 0
+    touched = set()
 
-        if category == "Uncategorized":
-            uncategorized_count += 1
-        
-        try:
-            async with db.begin_nested():
-                expense = Expense(
-                    owner_id=current_user.id,
-                    date=date_obj,
-                    category=category,
-                    amount=amount,
-                    description=description,
-                    is_joint=row['is_joint']
+    text = open_spooled_text(spool, encoding)
+    try:
+        source_rows = _iter_expense_source_rows(csv.reader(text))
+        while chunk := await asyncio.to_thread(lambda: list(itertools.islice(source_rows, IMPORT_CHUNK_ROWS))):
+            rows_parsed += len(chunk)
+
+            # 1. Parse and validate the chunk, dates and amounts as whole columns
+            raw_dates = [r['date'] for r in chunk]
+            dates = parse_date_column(raw_dates, formats["date_format"])
+            legacy_dates = parse_date_column(raw_dates, DAY_FIRST_READINGS.get(formats["date_format"]))
+            amounts = parse_number_column([r['amount'] for r in chunk], formats["decimal"])
+            parsed_rows = []
+            for r, parsed_date, legacy_date, parsed_amount in zip(chunk, dates, legacy_dates, amounts):
+                try:
+                    row = _parse_expense_row(
+                        r, parsed_date, parsed_amount,
+                        formats["has_negative_amounts"], default_period, default_is_joint
+                    )
+                except Exception:
+                    failed_count += 1
+                    continue
+                row['legacy_date'] = None
+                if parsed_date is not None and legacy_date is not None:
+                    legacy_date = _expense_row_date(r['date'].strip(), legacy_date, default_period)
+                    if legacy_date != row['date']:
+                        row['legacy_date'] = legacy_date
+                parsed_rows.append(row)
+
+            # 2. Count existing occurrences of every new content hash in a single query.
+            # Rows written before content_hash existed have it NULL, so those inside the
+            # chunk's date range are fetched in the same query and hashed here. Hashes
+            # seen by an earlier chunk are skipped, as this import's own rows now match them.
+            # Ambiguous dates are looked up under their day-first reading as well.
+            for row in parsed_rows:
+                row['content_hash'] = expense_content_hash(row['date'], row['amount'], row['description'])
+                row['legacy_hash'] = row['legacy_date'] and expense_content_hash(
+                    row['legacy_date'], row['amount'], row['description']
                 )
-                db.add(expense)
-                await db.flush() # Needed to get expense.id
-                
-                raw = RawExpense(
-                    owner_id=current_user.id,
-                    expense_id=expense.id,
-                    raw_data=json.dumps(row['raw_source'])
+            lookups = {row['content_hash']: row['date'] for row in parsed_rows}
+            lookups.update((row['legacy_hash'], row['legacy_date']) for row in parsed_rows if row['legacy_hash'])
+            new_hashes = lookups.keys() - queried_hashes - session_imported_counts.keys()
+            queried_hashes.update(new_hashes)
+            if new_hashes:
+                new_dates = [lookups[h] for h in new_hashes]
+                existing_res = await db.execute(
+                    select(Expense.content_hash, Expense.date, Expense.amount, Expense.description).where(
+                        and_(
+                            Expense.owner_id == owner_id,
+                            or_(
+                                Expense.content_hash.in_(new_hashes),
+                                and_(
+                                    Expense.content_hash.is_(None),
+                                    Expense.date >= min(new_dates),
+                                    Expense.date <= max(new_dates)
+                                )
+                            )
+                        )
+                    )
                 )
-                db.add(raw)
-            added_count += 1
-        except Exception:
-            # Skip invalid rows and rollback subtransaction automatically via begin_nested()
-            failed_count += 1
-            continue
-            
+                for content_hash, date_obj, amount, description in existing_res.all():
+                    key = content_hash or expense_content_hash(date_obj, amount, description)
+                    if key in new_hashes:
+                        db_counts[key] = db_counts.get(key, 0) + 1
+
+            # Categorize every row against the user's rules in one batch
+            rule_categories = matcher.match_many([row['description'] for row in parsed_rows])
+
+            # Rows no rule claims fall back to the user's own classifier when it is confident
+            predicted_categories = classifier.categorize([
+                row['description'] if rule_category is None else None
+                for row, rule_category in zip(parsed_rows, rule_categories)
+            ])
+
+            # 3. Process the rows and perform duplicate prevention
+            pending = []
+            for row, rule_category, predicted_category in zip(parsed_rows, rule_categories, predicted_categories):
+                amount = row['amount']
+                description = row['description']
+                sig = row['content_hash']
+
+                db_cnt = db_counts.get(sig, 0)
+                session_cnt = session_imported_counts.get(sig, 0)
+
+                if session_cnt < db_cnt:
+                    # This occurrence of the transaction already exists in the database
+                    session_imported_counts[sig] = session_cnt + 1
+                    duplicate_count += 1
+                    continue
+
+                legacy_sig = row['legacy_hash']
+                if legacy_sig and session_imported_counts.get(legacy_sig, 0) < db_counts.get(legacy_sig, 0):
+                    # Stored by an earlier import that read the date day-first
+                    session_imported_counts[legacy_sig] = session_imported_counts.get(legacy_sig, 0) + 1
+                    duplicate_count += 1
+                    continue
+
+                session_imported_counts[sig] = session_cnt + 1
+
+                category = "Uncategorized"
+                is_predicted = False
+                if amount >= 0:
+                    if rule_category:
+                        category = rule_category
+
+                    if category == "Uncategorized":
+                        csv_cat = row['category']
+                        if csv_cat and csv_cat.strip():
+                            category = csv_cat.strip()
+
+                    if category == "Uncategorized" and predicted_category:
+                        category = predicted_category
+                        is_predicted = True
+
+                    if category == "Uncategorized" and default_category:
+                        category = default_category.strip()
+
+                # Rows the columns cannot hold would fail the whole chunk; reject them up front
+                if len(description) > 255 or len(category) > 100:
+                    failed_count += 1
+                    continue
+
+                if category == "Uncategorized":
+                    uncategorized_count += 1
+                if is_predicted:
+                    predicted_count += 1
+
+                pending.append((
+                    {
+                        "owner_id": owner_id,
+                        "date": row['date'],
+                        "category": category,
+                        "amount": amount,
+                        "description": description,
+                        "is_joint": row['is_joint'],
+                        "content_hash": sig,
+                    },
+                    json.dumps(row['raw_source'])
+                ))
+
+            # 4. Bulk insert expenses and their raw rows in chunks
+            for start in range(0, len(pending), UPLOAD_INSERT_CHUNK_SIZE):
+                batch = pending[start:start + UPLOAD_INSERT_CHUNK_SIZE]
+                try:
+                    async with db.begin_nested():
+                        added_count += await _insert_expense_rows(db, owner_id, batch)
+                    touched.update(values["date"] for values, _ in batch)
+                except Exception:
+                    # Fall back to row-by-row savepoints so one bad row does not sink the batch
+                    for item in batch:
+                        try:
+                            async with db.begin_nested():
+                                added_count += await _insert_expense_rows(db, owner_id, [item])
+                            touched.add(item[0]["date"])
+                        except Exception:
+                            failed_count += 1
+
+            await progress.report(
+                rows_parsed=rows_parsed, inserted=added_count, duplicates=duplicate_count, failed=failed_count
+            )
+    finally:
+        text.detach()
+
+    if rows_parsed == 0:
+        return {"status": "success", "added": 0, "uncategorized": 0}
+
     if added_count > 0:
         await db.commit()
-        
+        await invalidate_expense_summaries((owner_id, d) for d in touched)
+
     return {
         "status": "success", 
         "added": added_count, 
         "duplicates": duplicate_count, 
         "failed": failed_count, 
-        "uncategorized": uncategorized_count
+        "uncategorized": uncategorized_count,
+        "predicted": predicted_count
     }
 
+async def _spool_expense_csv(file: UploadFile):
+    """Spool the upload, returning (spool, encoding); raises 400 for unusable files."""
+    if not file.filename.endswith('.csv'):
+        raise HTTPException(status_code=400, detail="Only CSV files are allowed")
+    spool, encoding = await spool_upload(file, ("utf-8", "latin-1"))
+    if encoding is None:
+        spool.close()
+        raise HTTPException(status_code=400, detail="Unable to decode file encoding. Please upload a UTF-8 or Latin-1 CSV file.")
+    return spool, encoding
+
+@router.post("/expenses/upload")
+async def upload_expenses_csv(
+    current_user: Annotated[User, Depends(get_current_user)],
+    file: UploadFile = File(...),
+    default_category: str | None = None,
+    default_is_joint: bool | None = None,
+    default_period: str | None = None,
+    db: AsyncSession = Depends(get_db_session)
+):
+    """Import an expense CSV within the request; large files should use /expenses/upload/jobs."""
+    spool, encoding = await _spool_expense_csv(file)
+    try:
+        return await _run_expense_import(
+            db, current_user.id, spool, encoding,
+            default_category, default_is_joint, default_period, ImportProgress()
+        )
+    finally:
+        spool.close()
+
+@router.post("/expenses/upload/jobs")
+async def start_expense_upload_job(
+    current_user: Annotated[User, Depends(get_current_user)],
+    file: UploadFile = File(...),
+    default_category: str | None = None,
+    default_is_joint: bool | None = None,
+    default_period: str | None = None,
+):
+    """
+    Queue an expense CSV import as a background job and return its id immediately.
+    Follow progress at /api/import-jobs/{job_id} or its /events stream; the finished
+    job's result matches the response of /expenses/upload.
+    """
+    spool, encoding = await _spool_expense_csv(file)
+    owner_id = current_user.id
+
+    async def work(progress: ImportProgress) -> dict:
+        async with async_session() as db:
+            return await _run_expense_import(
+                db, owner_id, spool, encoding,
+                default_category, default_is_joint, default_period, progress
+            )
+
+    job_id = await start_import_job("expense_csv", spool, work)
+    return {"job_id": job_id, "status": "queued"}
+
 class CategoryRuleCreate(BaseModel):
     regex_pattern: str
     category_name: str
@@ -573,7 +875,7 @@ async def create_category_rule(
     db: AsyncSession = Depends(get_db_session)
 ):
     try:
-        re.compile(rule_in.regex_pattern)
+        re.compile(rule_in.regex_pattern, re.IGNORECASE)
     except re.error:
         raise HTTPException(status_code=400, detail="Invalid regex pattern")
 
@@ -589,26 +891,35 @@ async def create_category_rule(
     )
     db.add(rule)
     
-    # Apply retroactively
-    expenses_res = await db.execute(
-        select(Expense).where(
-            and_(
-                Expense.owner_id == current_user.id,
-                Expense.category == "Uncategorized"
-            )
-        )
+    # Apply retroactively, set-based in Postgres where the pattern allows it
+    changed_months = set()
+    updated_count = await apply_rule_retroactively(
+        db, current_user.id, rule.regex_pattern, rule.category_name, changed_months
     )
-    expenses = expenses_res.scalars().all()
-    
-    updated_count = 0
-    for exp in expenses:
-        if exp.description and re.search(rule.regex_pattern, exp.description, re.IGNORECASE):
-            exp.category = rule.category_name
-            updated_count += 1
             
     await db.commit()
+    await invalidate_expense_summaries((current_user.id, month) for month in changed_months)
     return {"status": "success", "rule_id": rule.id, "updated_expenses": updated_count}
 
+@router.post("/category-rules/apply")
+async def apply_category_rules(
+    current_user: Annotated[User, Depends(get_current_user)],
+):
+    """
+    Queue a background job that re-runs all of the user's rules, in order, over their
+    Uncategorized expenses, and return its id immediately. Follow it at
+    /api/import-jobs/{job_id}; the finished job's result carries updated_expenses.
+    """
+    owner_id = current_user.id
+
+    async def work(progress: ImportProgress) -> dict:
+        async with async_session() as db:
+            updated_count = await apply_all_rules(db, owner_id, progress)
+        return {"status": "success", "updated_expenses": updated_count}
+
+    job_id = await start_import_job("category_rules", None, work)
+    return {"job_id": job_id, "status": "queued"}
+
 @router.get("/expenses/uncategorized")
 async def get_uncategorized_expenses(
     current_user: Annotated[User, Depends(get_current_user)],
@@ -675,6 +986,7 @@ async def add_manual_asset(
     )
     db.add(asset)
     await db.commit()
+    await invalidate_household_valuation(db, current_user.id)
     await db.refresh(asset)
     return asset
 
@@ -698,82 +1010,16 @@ async def delete_manual_asset(
         
     await db.delete(asset)
     await db.commit()
+    await invalidate_household_valuation(db, current_user.id)
     return {"status": "success"}
 
 # --- Accounts ---
 
-import asyncio
-import concurrent.futures
-from app.cache import get_cache, set_cache, get_live_price
-
-async def convert_currency(amount: float, from_curr: str, to_curr: str) -> float:
-    from_curr = from_curr.upper().strip()
-    to_curr = to_curr.upper().strip()
-    if from_curr == to_curr or amount == 0.0:
-        return amount
-        
-    cache_key = f"fx_rate:{from_curr}:{to_curr}"
-    try:
-        cached_rate = await get_cache(cache_key)
-        if cached_rate is not None:
-            return amount * float(cached_rate)
-    except Exception:
-        pass
-
-    to_usd_rates = {
-        "USD": 1.0,
-        "GBP": 1.27,
-        "EUR": 1.08,
-        "INR": 0.012,
-    }
-    
-    rate = None
-    
-    def fetch_rate(ticker_symbol):
-        import yfinance as yf
-        ticker = yf.Ticker(ticker_symbol)
-        info = ticker.info
-        val = info.get("regularMarketPrice") or info.get("previousClose") or info.get("currentPrice")
-        if not val:
-            hist = ticker.history(period="1d")
-            if not hist.empty:
-                val = float(hist["Close"].iloc[-1])
-        return val
-
-    # 1. Try to fetch from yfinance
-    try:
-        loop = asyncio.get_running_loop()
-        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
-            rate = await loop.run_in_executor(pool, fetch_rate, f"{from_curr}{to_curr}=X")
-    except Exception:
-        pass
-
-    if not rate:
-        # 2. Try inverse ticker
-        try:
-            loop = asyncio.get_running_loop()
-            with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
-                inv_rate = await loop.run_in_executor(pool, fetch_rate, f"{to_curr}{from_curr}=X")
-            if inv_rate:
-                rate = 1.0 / inv_rate
-        except Exception:
-            pass
-
-    if not rate:
-        # 3. Static fallback rates
-        if from_curr in to_usd_rates and to_curr in to_usd_rates:
-            rate = to_usd_rates[from_curr] / to_usd_rates[to_curr]
-
-    if not rate:
-        rate = 1.0
-
-    # Cache rate for 1 hour
-    try:
-        await set_cache(cache_key, str(rate), 3600)
-    except Exception:
-        pass
-
-    return amount * rate
+from app.cache import convert_currency
+from app.valuation import (
+    get_household_valuation, get_household_unified_portfolio, invalidate_household_valuation,
+    linked_goal_asset_value, user_net_worth_totals,
+)
 
 @router.get("/exchange-rates")
 async def get_exchange_rates():
@@ -791,46 +1037,8 @@ async def get_accounts(
     current_user: Annotated[User, Depends(get_current_user)],
     db: AsyncSession = Depends(get_db_session)
 ):
-    result = await db.execute(select(Account).where(Account.owner_id == current_user.id))
-    accounts = result.scalars().all()
-    response = []
-    for a in accounts:
-        balance = a.balance
-        usd_value = None
-        if a.account_class == "portfolio":
-            port_res = await db.execute(select(Portfolio).where(Portfolio.account_id == a.id))
-            portfolios = port_res.scalars().all()
-            if portfolios:
-                port_ids = [p.id for p in portfolios]
-                holdings_res = await db.execute(select(PortfolioHolding).where(PortfolioHolding.portfolio_id.in_(port_ids)))
-                holdings = holdings_res.scalars().all()
-                portfolio_val_usd = 0.0
-                for h in holdings:
-                    price = await get_live_price(h.ticker, fallback=h.avg_cost_basis)
-                    ticker_currency = (await get_cache(f"currency:{h.ticker}")) or "USD"
-                    price_usd = await convert_currency(price, ticker_currency, "USD")
-                    portfolio_val_usd += h.shares * price_usd
-                
-                balance = await convert_currency(portfolio_val_usd, "USD", a.currency)
-                a.balance = balance
-                usd_value = portfolio_val_usd
-
-        if usd_value is None:
-            usd_value = await convert_currency(balance, a.currency, "USD")
-        response.append({
-            "id": a.id,
-            "owner_id": a.owner_id,
-            "name": a.name,
-            "classification": a.classification,
-            "account_class": a.account_class,
-            "balance": balance,
-            "currency": a.currency,
-            "description": a.description,
-            "balance_usd": usd_value,
-            "created_at": a.created_at,
-            "updated_at": a.updated_at
-        })
-    return response
+    valuation = await get_household_valuation(db, current_user.id)
+    return [a for a in valuation["accounts"] if a["owner_id"] == current_user.id]
 
 @router.post("/accounts")
 async def add_account(
@@ -844,6 +1052,7 @@ async def add_account(
         classification=account_in.classification.lower().strip(),
         account_class=account_in.account_class.lower().strip(),
         balance=account_in.balance,
+        opening_balance=account_in.balance,
         currency=account_in.currency.upper().strip(),
         description=account_in.description
     )
@@ -860,6 +1069,8 @@ async def add_account(
         db.add(portfolio)
         await db.commit()
 
+    await invalidate_household_valuation(db, current_user.id)
+
     usd_value = await convert_currency(account.balance, account.currency, "USD")
     return {
         "id": account.id,
@@ -901,13 +1112,20 @@ async def update_account(
     if account_in.account_class is not None:
         account.account_class = account_in.account_class.lower().strip()
     if account_in.balance is not None:
+        # A manual balance edit re-bases the opening balance so the ledger still reconciles
+        ledger_total = await db.scalar(
+            select(func.coalesce(func.sum(AccountTransaction.amount), 0.0))
+            .where(AccountTransaction.account_id == account.id)
+        )
         account.balance = account_in.balance
+        account.opening_balance = account_in.balance - ledger_total
     if account_in.currency is not None:
         account.currency = account_in.currency.upper().strip()
     if account_in.description is not None:
         account.description = account_in.description
         
     await db.commit()
+    await invalidate_household_valuation(db, current_user.id)
     await db.refresh(account)
     
     usd_value = await convert_currency(account.balance, account.currency, "USD")
@@ -945,16 +1163,73 @@ async def delete_account(
         
     await db.delete(account)
     await db.commit()
+    await invalidate_household_valuation(db, current_user.id)
     return {"status": "success"}
 
 # --- Account Transactions & Transfers ---
 
+async def _apply_balance_deltas(db: AsyncSession, deltas: dict[int, float]) -> None:
+    """
+    Atomically add each delta to its account balance with `balance = balance + :delta`.
+    Rows are always updated in ascending account id order so concurrent transfers in
+    opposite directions take their row locks in the same order and cannot deadlock.
+    """
+    for acc_id in sorted(deltas):
+        if deltas[acc_id] == 0:
+            continue
+        await db.execute(
+            update(Account)
+            .where(Account.id == acc_id)
+            .values(balance=Account.balance + deltas[acc_id])
+            .execution_options(synchronize_session=False)
+        )
+
+async def _lock_transaction_pair(db: AsyncSession, account_id: int, transaction_id: int):
+    """
+    Load a transaction and its transfer counterpart (if any) with SELECT ... FOR UPDATE,
+    locking both rows in ascending id order. Returns (tx, linked_tx); tx is None if missing.
+    """
+    tx_res = await db.execute(
+        select(AccountTransaction).where(
+            and_(
+                AccountTransaction.id == transaction_id,
+                AccountTransaction.account_id == account_id
+            )
+        )
+    )
+    tx = tx_res.scalar_one_or_none()
+    if not tx:
+        return None, None
+
+    ids = [tx.id] + ([tx.transfer_linked_transaction_id] if tx.transfer_linked_transaction_id else [])
+    locked_res = await db.execute(
+        select(AccountTransaction)
+        .where(AccountTransaction.id.in_(ids))
+        .order_by(AccountTransaction.id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    locked = {t.id: t for t in locked_res.scalars().all()}
+    if tx.id not in locked:
+        return None, None
+    return locked[tx.id], locked.get(tx.transfer_linked_transaction_id)
+
 @router.get("/accounts/{account_id}/transactions")
 async def get_account_transactions(
     account_id: int,
     current_user: Annotated[User, Depends(get_current_user)],
+    response: Response,
+    limit: int | None = Query(None, ge=1, le=500),
+    cursor: str | None = None,
+    start_date: datetime | None = None,
+    end_date: datetime | None = None,
     db: AsyncSession = Depends(get_db_session)
 ):
+    """
+    Ledger for an account, newest first, with the balance after each transaction.
+    Pass `limit` to page through it; the next page's cursor is returned in the
+    X-Next-Cursor header. `start_date`/`end_date` restrict to a half-open date range.
+    """
     # Verify account ownership
     res = await db.execute(
         select(Account).where(
@@ -968,13 +1243,103 @@ async def get_account_transactions(
     if not account:
         raise HTTPException(status_code=404, detail="Account not found")
 
-    result = await db.execute(
-        select(AccountTransaction)
-        .where(AccountTransaction.account_id == account_id)
-        .order_by(AccountTransaction.date.desc())
+    # Rows newer than the page start (previous pages or after end_date)
+    upper_bounds = []
+    if cursor:
+        try:
+            cursor_date, cursor_id = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        upper_bounds.append(tuple_(AccountTransaction.date, AccountTransaction.id) < tuple_(cursor_date, cursor_id))
+    if end_date:
+        upper_bounds.append(AccountTransaction.date < end_date)
+
+    # The running balance of the first row on the page is the current balance minus
+    # everything newer than it, so sum those rows once instead of shipping them.
+    newer_total = 0.0
+    if upper_bounds:
+        newer_total = await db.scalar(
+            select(func.coalesce(func.sum(AccountTransaction.amount), 0.0))
+            .where(
+                AccountTransaction.account_id == account_id,
+                not_(and_(*upper_bounds))
+            )
+        )
+
+    filters = [AccountTransaction.account_id == account_id, *upper_bounds]
+    if start_date:
+        filters.append(AccountTransaction.date >= start_date)
+
+    newest_first = (AccountTransaction.date.desc(), AccountTransaction.id.desc())
+    cumulative = func.sum(AccountTransaction.amount).over(order_by=newest_first).label("cumulative")
+    query = select(AccountTransaction, cumulative).where(*filters).order_by(*newest_first)
+    if limit:
+        query = query.limit(limit + 1)
+
+    rows = (await db.execute(query)).all()
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        last_tx = rows[-1][0]
+        response.headers["X-Next-Cursor"] = encode_cursor(last_tx.date, last_tx.id)
+
+    return [
+        {
+            "id": tx.id,
+            "account_id": tx.account_id,
+            "amount": tx.amount,
+            "transaction_type": tx.transaction_type,
+            "category": tx.category,
+            "description": tx.description,
+            "date": tx.date,
+            "transfer_linked_transaction_id": tx.transfer_linked_transaction_id,
+            "created_at": tx.created_at,
+            "running_balance": account.balance - newer_total - (cumulative_amount - tx.amount),
+        }
+        for tx, cumulative_amount in rows
+    ]
+
+ACCOUNT_TRANSACTION_EXPORT_COLUMNS = [
+    ("id", AccountTransaction.id),
+    ("date", AccountTransaction.date),
+    ("amount", AccountTransaction.amount),
+    ("transaction_type", AccountTransaction.transaction_type),
+    ("category", AccountTransaction.category),
+    ("description", AccountTransaction.description),
+    ("transfer_linked_transaction_id", AccountTransaction.transfer_linked_transaction_id),
+    ("created_at", AccountTransaction.created_at),
+]
+
+@router.get("/accounts/{account_id}/transactions/export")
+async def export_account_transactions(
+    account_id: int,
+    current_user: Annotated[User, Depends(get_current_user)],
+    format: str = Query("csv", description="csv or parquet"),
+    start_date: datetime | None = None,
+    end_date: datetime | None = None,
+    db: AsyncSession = Depends(get_db_session)
+):
+    """
+    Download an account's ledger, oldest first, streamed as CSV or Parquet.
+    `start_date`/`end_date` restrict it to a half-open date range.
+    """
+    account = await db.scalar(
+        select(Account).where(Account.id == account_id, Account.owner_id == current_user.id)
+    )
+    if not account:
+        raise HTTPException(status_code=404, detail="Account not found")
+
+    filters = [AccountTransaction.account_id == account_id]
+    if start_date:
+        filters.append(AccountTransaction.date >= start_date)
+    if end_date:
+        filters.append(AccountTransaction.date < end_date)
+    return export_response(
+        ACCOUNT_TRANSACTION_EXPORT_COLUMNS,
+        filters,
+        [AccountTransaction.date, AccountTransaction.id],
+        format,
+        f"account-{account_id}-transactions",
     )
-    txs = result.scalars().all()
-    return txs
 
 @router.post("/accounts/{account_id}/transactions")
 async def add_account_transaction(
@@ -1005,8 +1370,9 @@ async def add_account_transaction(
         date=tx_in.date
     )
     db.add(tx)
-    account.balance += tx.amount
+    await _apply_balance_deltas(db, {account.id: tx.amount})
     await db.commit()
+    await invalidate_household_valuation(db, current_user.id)
     await db.refresh(tx)
     return tx
 
@@ -1031,36 +1397,23 @@ async def update_account_transaction(
     if not account:
         raise HTTPException(status_code=404, detail="Account not found")
 
-    # Fetch transaction
-    tx_res = await db.execute(
-        select(AccountTransaction).where(
-            and_(
-                AccountTransaction.id == transaction_id,
-                AccountTransaction.account_id == account_id
-            )
-        )
-    )
-    tx = tx_res.scalar_one_or_none()
+    # Fetch and lock the transaction so concurrent edits see each other's amounts
+    tx, linked_tx = await _lock_transaction_pair(db, account_id, transaction_id)
     if not tx:
         raise HTTPException(status_code=404, detail="Transaction not found")
 
     # Update balance and fields
     if tx_in.amount is not None:
-        diff = tx_in.amount - tx.amount
-        account.balance += diff
+        deltas = {account.id: tx_in.amount - tx.amount}
         tx.amount = tx_in.amount
 
         # Update linked transaction if it exists
-        if tx.transfer_linked_transaction_id:
-            linked_res = await db.execute(select(AccountTransaction).where(AccountTransaction.id == tx.transfer_linked_transaction_id))
-            linked_tx = linked_res.scalar_one_or_none()
-            if linked_tx:
-                linked_acc_res = await db.execute(select(Account).where(Account.id == linked_tx.account_id))
-                linked_acc = linked_acc_res.scalar_one_or_none()
-                if linked_acc:
-                    linked_diff = (-tx_in.amount) - linked_tx.amount
-                    linked_acc.balance += linked_diff
-                linked_tx.amount = -tx_in.amount
+        if linked_tx:
+            linked_diff = (-tx_in.amount) - linked_tx.amount
+            deltas[linked_tx.account_id] = deltas.get(linked_tx.account_id, 0.0) + linked_diff
+            linked_tx.amount = -tx_in.amount
+
+        await _apply_balance_deltas(db, deltas)
 
     if tx_in.transaction_type is not None:
         tx.transaction_type = tx_in.transaction_type
@@ -1068,20 +1421,15 @@ async def update_account_transaction(
         tx.category = tx_in.category
     if tx_in.description is not None:
         tx.description = tx_in.description
-        if tx.transfer_linked_transaction_id:
-            linked_res = await db.execute(select(AccountTransaction).where(AccountTransaction.id == tx.transfer_linked_transaction_id))
-            linked_tx = linked_res.scalar_one_or_none()
-            if linked_tx:
-                linked_tx.description = tx_in.description
+        if linked_tx:
+            linked_tx.description = tx_in.description
     if tx_in.date is not None:
         tx.date = tx_in.date
-        if tx.transfer_linked_transaction_id:
-            linked_res = await db.execute(select(AccountTransaction).where(AccountTransaction.id == tx.transfer_linked_transaction_id))
-            linked_tx = linked_res.scalar_one_or_none()
-            if linked_tx:
-                linked_tx.date = tx_in.date
+        if linked_tx:
+            linked_tx.date = tx_in.date
 
     await db.commit()
+    await invalidate_household_valuation(db, current_user.id)
     await db.refresh(tx)
     return tx
 
@@ -1105,35 +1453,23 @@ async def delete_account_transaction(
     if not account:
         raise HTTPException(status_code=404, detail="Account not found")
 
-    # Fetch transaction
-    tx_res = await db.execute(
-        select(AccountTransaction).where(
-            and_(
-                AccountTransaction.id == transaction_id,
-                AccountTransaction.account_id == account_id
-            )
-        )
-    )
-    tx = tx_res.scalar_one_or_none()
+    # Fetch and lock the transaction so a concurrent delete cannot reverse it twice
+    tx, linked_tx = await _lock_transaction_pair(db, account_id, transaction_id)
     if not tx:
         raise HTTPException(status_code=404, detail="Transaction not found")
 
     # Subtract from balance and delete
-    account.balance -= tx.amount
+    deltas = {account.id: -tx.amount}
 
     # Delete linked transaction if it exists
-    if tx.transfer_linked_transaction_id:
-        linked_res = await db.execute(select(AccountTransaction).where(AccountTransaction.id == tx.transfer_linked_transaction_id))
-        linked_tx = linked_res.scalar_one_or_none()
-        if linked_tx:
-            linked_acc_res = await db.execute(select(Account).where(Account.id == linked_tx.account_id))
-            linked_acc = linked_acc_res.scalar_one_or_none()
-            if linked_acc:
-                linked_acc.balance -= linked_tx.amount
-            await db.delete(linked_tx)
+    if linked_tx:
+        deltas[linked_tx.account_id] = deltas.get(linked_tx.account_id, 0.0) - linked_tx.amount
+        await db.delete(linked_tx)
 
+    await _apply_balance_deltas(db, deltas)
     await db.delete(tx)
     await db.commit()
+    await invalidate_household_valuation(db, current_user.id)
     return {"status": "success"}
 
 @router.post("/accounts/transfer")
@@ -1191,74 +1527,56 @@ async def transfer_funds(
 
     tx_out.transfer_linked_transaction_id = tx_in.id
 
-    from_account.balance -= transfer_in.amount
-    to_account.balance += transfer_in.amount
+    deltas = {from_account.id: -transfer_in.amount}
+    deltas[to_account.id] = deltas.get(to_account.id, 0.0) + transfer_in.amount
+    await _apply_balance_deltas(db, deltas)
 
     await db.commit()
+    await invalidate_household_valuation(db, current_user.id)
     return {"status": "success", "from_transaction_id": tx_out.id, "to_transaction_id": tx_in.id}
 
-# --- Net Worth ---
+async def reconcile_account_balances(db: AsyncSession) -> list[int]:
+    """
+    Recompute every ledger-backed account balance as opening_balance + SUM(transactions)
+    in a single set-based UPDATE, correcting any drift. Portfolio accounts are valued
+    from their holdings and are skipped. Returns the ids of the accounts that changed.
+    """
+    result = await db.execute(text("""
+        WITH ledger AS (
+            SELECT a.id, a.opening_balance + COALESCE(SUM(t.amount), 0) AS expected
+            FROM accounts a
+            LEFT JOIN account_transactions t ON t.account_id = a.id
+            WHERE a.opening_balance IS NOT NULL AND a.account_class <> 'portfolio'
+            GROUP BY a.id, a.opening_balance
+        )
+        UPDATE accounts
+        SET balance = ledger.expected, updated_at = now()
+        FROM ledger
+        WHERE accounts.id = ledger.id AND abs(accounts.balance - ledger.expected) > 1e-6
+        RETURNING accounts.id, accounts.owner_id
+    """))
+    corrected = result.all()
+    await db.commit()
 
-async def capture_user_net_worth_snapshot(db: AsyncSession, user_id: int, target_date: datetime) -> NetWorthSnapshot:
-    # 1. Manual Assets
-    asset_res = await db.execute(select(func.sum(ManualAsset.value)).where(ManualAsset.owner_id == user_id))
-    manual_total = asset_res.scalar() or 0.0
+    for owner_id in {r.owner_id for r in corrected}:
+        await invalidate_household_valuation(db, owner_id)
+    return [r.id for r in corrected]
 
-    # 2. Portfolio Value (only non-account portfolios)
-    port_res = await db.execute(
-        select(Portfolio.id).where(
-            and_(
-                Portfolio.owner_id == user_id,
-                Portfolio.account_id == None
-            )
-        )
-    )
-    port_ids = [p[0] for p in port_res.all()]
-    
-    portfolio_total = 0.0
-    if port_ids:
-        holdings_res = await db.execute(
-            select(PortfolioHolding.shares, PortfolioHolding.avg_cost_basis)
-            .where(PortfolioHolding.portfolio_id.in_(port_ids))
-        )
-        for h in holdings_res.all():
-            portfolio_total += h.shares * h.avg_cost_basis
+# --- Net Worth ---
 
-    # 3. Account Balances (asset vs liability)
-    accounts_res = await db.execute(select(Account).where(Account.owner_id == user_id))
-    accounts = accounts_res.scalars().all()
-    
-    accounts_assets = 0.0
-    accounts_liabilities = 0.0
-    for a in accounts:
-        balance = a.balance
-        usd_bal = None
-        if a.account_class == "portfolio":
-            # calculate portfolio balance dynamically
-            port_res_acc = await db.execute(select(Portfolio).where(Portfolio.account_id == a.id))
-            portfolios_acc = port_res_acc.scalars().all()
-            if portfolios_acc:
-                port_ids = [p.id for p in portfolios_acc]
-                holdings_res = await db.execute(select(PortfolioHolding).where(PortfolioHolding.portfolio_id.in_(port_ids)))
-                holdings = holdings_res.scalars().all()
-                portfolio_val_usd = 0.0
-                for h in holdings:
-                    price = await get_live_price(h.ticker, fallback=h.avg_cost_basis)
-                    ticker_currency = (await get_cache(f"currency:{h.ticker}")) or "USD"
-                    price_usd = await convert_currency(price, ticker_currency, "USD")
-                    portfolio_val_usd += h.shares * price_usd
-                balance = await convert_currency(portfolio_val_usd, "USD", a.currency)
-                usd_bal = portfolio_val_usd
-
-        if usd_bal is None:
-            usd_bal = await convert_currency(balance, a.currency, "USD")
-        if a.classification == "liability":
-            accounts_liabilities += usd_bal
-        else:
-            accounts_assets += usd_bal
+async def get_live_net_worth(db: AsyncSession, user_id: int) -> dict:
+    """
+    Current net worth from the cached household valuation, which has a short TTL and
+    is invalidated by account, ledger, holding and manual-asset mutations. Never writes.
+    """
+    valuation = await get_household_valuation(db, user_id)
+    return user_net_worth_totals(valuation, user_id)
 
-    total_assets = manual_total + portfolio_total + accounts_assets
-    total_liabilities = accounts_liabilities
+async def capture_user_net_worth_snapshot(db: AsyncSession, user_id: int, target_date: datetime) -> NetWorthSnapshot:
+    """Persist (or overwrite) the user's snapshot for target_date's day. Used by scheduled jobs."""
+    totals = await get_live_net_worth(db, user_id)
+    total_assets = totals["total_assets"]
+    total_liabilities = totals["total_liabilities"]
 
     start_of_day = datetime(target_date.year, target_date.month, target_date.day, tzinfo=timezone.utc)
     
@@ -1297,108 +1615,69 @@ async def get_net_worth_history(
 ):
     """
     Combines historical net worth snapshots with current live calculated net worth.
-    Supports resolution="daily" or "monthly".
+    Supports resolution="daily" or "monthly". Snapshots are only written by the
+    nightly job; today's (or, monthly, this month's) entry is the live figure.
     """
     today = datetime.now(timezone.utc)
-    
-    # Lazy log/update today's snapshot
-    await capture_user_net_worth_snapshot(db, current_user.id, today)
-    
-    # Fetch all snapshots
-    result = await db.execute(
-        select(NetWorthSnapshot)
-        .where(NetWorthSnapshot.owner_id == current_user.id)
-        .order_by(NetWorthSnapshot.date)
-    )
-    snapshots = result.scalars().all()
-    
+    live = await get_live_net_worth(db, current_user.id)
+
     if resolution.lower().strip() == "monthly":
-        monthly_snapshots = {}
-        for s in snapshots:
-            month_key = s.date.strftime("%Y-%m")
-            # Since snapshots are ordered by date ascending, the last one seen per month key will be the latest for that month
-            monthly_snapshots[month_key] = s
-        snapshots_to_return = list(monthly_snapshots.values())
+        # Latest snapshot of each closed month, picked in SQL with DISTINCT ON
+        month_bucket = func.date_trunc('month', func.timezone('UTC', NetWorthSnapshot.date))
+        query = (
+            select(NetWorthSnapshot.date, NetWorthSnapshot.total_assets, NetWorthSnapshot.total_liabilities)
+            .where(
+                and_(
+                    NetWorthSnapshot.owner_id == current_user.id,
+                    NetWorthSnapshot.date < datetime(today.year, today.month, 1, tzinfo=timezone.utc)
+                )
+            )
+            .distinct(month_bucket)
+            .order_by(month_bucket, NetWorthSnapshot.date.desc())
+        )
     else:
-        snapshots_to_return = snapshots
+        query = (
+            select(NetWorthSnapshot.date, NetWorthSnapshot.total_assets, NetWorthSnapshot.total_liabilities)
+            .where(
+                and_(
+                    NetWorthSnapshot.owner_id == current_user.id,
+                    NetWorthSnapshot.date < datetime(today.year, today.month, today.day, tzinfo=timezone.utc)
+                )
+            )
+            .order_by(NetWorthSnapshot.date)
+        )
+    result = await db.execute(query)
 
     data = []
-    today_str = today.strftime("%Y-%m-%d")
-    for s in snapshots_to_return:
-        s_date_str = s.date.strftime("%Y-%m-%d")
+    for date, total_assets, total_liabilities in result.all():
         data.append({
-            "date": s_date_str,
-            "net_worth": s.total_assets - s.total_liabilities,
-            "total_assets": s.total_assets,
-            "total_liabilities": s.total_liabilities,
-            "is_live": s_date_str == today_str
+            "date": date.strftime("%Y-%m-%d"),
+            "net_worth": total_assets - total_liabilities,
+            "total_assets": total_assets,
+            "total_liabilities": total_liabilities,
+            "is_live": False
         })
+    data.append({
+        "date": today.strftime("%Y-%m-%d"),
+        "net_worth": live["total_assets"] - live["total_liabilities"],
+        "total_assets": live["total_assets"],
+        "total_liabilities": live["total_liabilities"],
+        "is_live": True
+    })
     
     return data
 
 @router.get("/unified-portfolio")
 async def get_unified_portfolio(
     current_user: Annotated[User, Depends(get_current_user)],
+    household: Annotated[dict, Depends(get_current_household)],
     db: AsyncSession = Depends(get_db_session)
 ):
     """
-    Returns a combined view of the current user's portfolio and any linked accounts' portfolios.
-    For simplicity, we return the aggregated holdings.
+    Combined holdings of the current user's and their linked accounts' portfolios,
+    one row per ticker, live priced in USD. Cached per household for a minute.
     """
-    # 1. Get user and linked user IDs
-    user_ids = [current_user.id]
-    links = await db.execute(select(LinkedAccount.linked_user_id).where(LinkedAccount.user_id == current_user.id))
-    user_ids.extend([r[0] for r in links.all()])
-    
-    # 2. Get portfolios
-    port_res = await db.execute(select(Portfolio.id).where(Portfolio.owner_id.in_(user_ids)))
-    port_ids = [p[0] for p in port_res.all()]
-    
-    if not port_ids:
-        return {"holdings": [], "total_value": 0, "total_cost": 0, "total_pnl": 0}
-        
-    # 3. Get holdings and aggregate by ticker
-    holdings_res = await db.execute(
-        select(PortfolioHolding)
-        .where(PortfolioHolding.portfolio_id.in_(port_ids))
-    )
-    all_holdings = holdings_res.scalars().all()
-    
-    aggregated = {}
-    for h in all_holdings:
-        if h.ticker not in aggregated:
-            aggregated[h.ticker] = {"shares": 0.0, "total_cost": 0.0}
-        aggregated[h.ticker]["shares"] += h.shares
-        aggregated[h.ticker]["total_cost"] += (h.shares * h.avg_cost_basis)
-        
-    # Real implementation would call yfinance here like in get_portfolio
-    result = []
-    total_value = 0.0
-    total_cost = 0.0
-    
-    for ticker, data in aggregated.items():
-        if data["shares"] > 0:
-            avg_cost = data["total_cost"] / data["shares"]
-            # Mock current price with cost basis for this simple aggregation
-            current_price = avg_cost 
-            current_value = data["shares"] * current_price
-            total_value += current_value
-            total_cost += data["total_cost"]
-            result.append({
-                "ticker": ticker,
-                "shares": data["shares"],
-                "avg_cost_basis": avg_cost,
-                "current_price": current_price,
-                "current_value": current_value,
-                "unrealized_pnl": current_value - data["total_cost"]
-            })
-            
-    return {
-        "holdings": result,
-        "total_value": total_value,
-        "total_cost": total_cost,
-        "total_pnl": total_value - total_cost
-    }
+    return await get_household_unified_portfolio(db, current_user.id, household["member_ids"])
 
 # --- Financial Goals ---
 
@@ -1430,34 +1709,38 @@ class GoalContributionCreate(BaseModel):
 @router.get("/goals")
 async def get_goals(
     current_user: Annotated[User, Depends(get_current_user)],
+    household: Annotated[dict, Depends(get_current_household)],
     db: AsyncSession = Depends(get_db_session)
 ):
-    # 1. Fetch user and linked partner IDs
-    links = await db.execute(select(LinkedAccount.linked_user_id).where(LinkedAccount.user_id == current_user.id))
-    linked_ids = [r[0] for r in links.all()]
-    all_user_ids = [current_user.id] + linked_ids
-    
-    # 2. Get user names for formatting
-    users_res = await db.execute(select(User).where(User.id.in_(all_user_ids)))
-    user_map = {u.id: (u.name or u.email.split('@')[0]) for u in users_res.scalars().all()}
+    # 1. Household member IDs and display names (cached)
+    all_user_ids = household["member_ids"]
+    user_map = household["names"]
     
-    # 3. Fetch goals
+    # 2. Fetch goals
     goals_res = await db.execute(
         select(FinancialGoal)
         .where(FinancialGoal.owner_id.in_(all_user_ids))
         .order_by(FinancialGoal.created_at.desc())
     )
     goals = goals_res.scalars().all()
-    
-    response = []
-    for goal in goals:
-        # Fetch contributions
+
+    # 3. Fetch contributions for every goal in one query
+    contribs_by_goal = {}
+    if goals:
         contribs_res = await db.execute(
             select(GoalContribution)
-            .where(GoalContribution.goal_id == goal.id)
+            .where(GoalContribution.goal_id.in_([g.id for g in goals]))
             .order_by(GoalContribution.date.desc())
         )
-        contribs = contribs_res.scalars().all()
+        for c in contribs_res.scalars().all():
+            contribs_by_goal.setdefault(c.goal_id, []).append(c)
+
+    # 4. Linked asset values come from the shared household valuation
+    valuation = await get_household_valuation(db, current_user.id)
+    
+    response = []
+    for goal in goals:
+        contribs = contribs_by_goal.get(goal.id, [])
         
         # Calculate manual saved
         total_manual_saved = sum(c.amount for c in contribs)
@@ -1473,36 +1756,7 @@ async def get_goals(
             partner_breakdown[c_label] = partner_breakdown.get(c_label, 0.0) + c.amount
             
         # Calculate linked asset value
-        linked_asset_value = 0.0
-        if goal.linked_asset_type == "portfolio" and goal.linked_asset_id:
-            holdings_res = await db.execute(
-                select(PortfolioHolding)
-                .where(PortfolioHolding.portfolio_id == goal.linked_asset_id)
-            )
-            holdings = holdings_res.scalars().all()
-            portfolio_val_usd = 0.0
-            for h in holdings:
-                price = await get_live_price(h.ticker, fallback=h.avg_cost_basis)
-                ticker_currency = (await get_cache(f"currency:{h.ticker}")) or "USD"
-                price_usd = await convert_currency(price, ticker_currency, "USD")
-                portfolio_val_usd += h.shares * price_usd
-            linked_asset_value = portfolio_val_usd
-        elif goal.linked_asset_type == "manual_asset" and goal.linked_asset_id:
-            asset_res = await db.execute(
-                select(ManualAsset)
-                .where(ManualAsset.id == goal.linked_asset_id)
-            )
-            asset = asset_res.scalar_one_or_none()
-            if asset:
-                linked_asset_value = asset.value
-        elif goal.linked_asset_type == "account" and goal.linked_asset_id:
-            account_res = await db.execute(
-                select(Account)
-                .where(Account.id == goal.linked_asset_id)
-            )
-            account = account_res.scalar_one_or_none()
-            if account:
-                linked_asset_value = await convert_currency(account.balance, account.currency, "USD")
+        linked_asset_value = linked_goal_asset_value(valuation, goal.linked_asset_type, goal.linked_asset_id)
                 
         total_saved = total_manual_saved + linked_asset_value
         progress_percent = min((total_saved / goal.target_amount) * 100, 100.0) if goal.target_amount > 0 else 0.0
@@ -1609,12 +1863,11 @@ async def update_goal(
     goal_id: int,
     goal_in: FinancialGoalUpdate,
     current_user: Annotated[User, Depends(get_current_user)],
+    household: Annotated[dict, Depends(get_current_household)],
     db: AsyncSession = Depends(get_db_session)
 ):
     # Verify goal exists and belongs to user or linked partner
-    links = await db.execute(select(LinkedAccount.linked_user_id).where(LinkedAccount.user_id == current_user.id))
-    linked_ids = [r[0] for r in links.all()]
-    allowed_owner_ids = [current_user.id] + linked_ids
+    allowed_owner_ids = household["member_ids"]
     
     result = await db.execute(
         select(FinancialGoal).where(
@@ -1665,11 +1918,10 @@ async def add_goal_contribution(
     goal_id: int,
     contrib_in: GoalContributionCreate,
     current_user: Annotated[User, Depends(get_current_user)],
+    household: Annotated[dict, Depends(get_current_household)],
     db: AsyncSession = Depends(get_db_session)
 ):
-    links = await db.execute(select(LinkedAccount.linked_user_id).where(LinkedAccount.user_id == current_user.id))
-    linked_ids = [r[0] for r in links.all()]
-    allowed_owner_ids = [current_user.id] + linked_ids
+    allowed_owner_ids = household["member_ids"]
     
     result = await db.execute(
         select(FinancialGoal).where(
@@ -1703,11 +1955,10 @@ async def add_goal_contribution(
 async def delete_goal(
     goal_id: int,
     current_user: Annotated[User, Depends(get_current_user)],
+    household: Annotated[dict, Depends(get_current_household)],
     db: AsyncSession = Depends(get_db_session)
 ):
-    links = await db.execute(select(LinkedAccount.linked_user_id).where(LinkedAccount.user_id == current_user.id))
-    linked_ids = [r[0] for r in links.all()]
-    allowed_owner_ids = [current_user.id] + linked_ids
+    allowed_owner_ids = household["member_ids"]
     
     result = await db.execute(
         select(FinancialGoal).where(
@@ -1730,11 +1981,10 @@ async def delete_contribution(
     goal_id: int,
     contribution_id: int,
     current_user: Annotated[User, Depends(get_current_user)],
+    household: Annotated[dict, Depends(get_current_household)],
     db: AsyncSession = Depends(get_db_session)
 ):
-    links = await db.execute(select(LinkedAccount.linked_user_id).where(LinkedAccount.user_id == current_user.id))
-    linked_ids = [r[0] for r in links.all()]
-    allowed_owner_ids = [current_user.id] + linked_ids
+    allowed_owner_ids = household["member_ids"]
     
     result = await db.execute(
         select(GoalContribution)
@@ -0,0 +1,55 @@
+import asyncio
+import json
+from typing import AsyncGenerator
+
+from fastapi import APIRouter, HTTPException
+from sse_starlette.sse import EventSourceResponse
+
+from app.import_jobs import get_import_job
+
+router = APIRouter(prefix="/api", tags=["imports"])
+
+IMPORT_EVENTS_POLL_SECONDS = 0.5
+TERMINAL_STATUSES = {"completed", "failed"}
+
+# Job ids are random 128-bit tokens handed only to the uploader, and job state
+# holds counters and the import summary only, so these routes need no session.
+
+@router.get("/import-jobs/{job_id}")
+async def get_import_job_status(job_id: str):
+    """
+    Poll a CSV import job: status (queued/running/completed/failed), rows_parsed,
+    inserted, duplicates and failed counters, plus `result` or `error` once done.
+    """
+    job = await get_import_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
+
+@router.get("/import-jobs/{job_id}/events")
+async def stream_import_job_events(job_id: str):
+    """
+    Stream a CSV import job's progress via Server-Sent Events.
+
+    Event types:
+      - progress: the job state, whenever it changes
+      - done:     the final job state (completed or failed)
+      - error:    { message: "..." } when the job is unknown or has expired
+    """
+
+    async def event_generator() -> AsyncGenerator[dict, None]:
+        last = None
+        while True:
+            job = await get_import_job(job_id)
+            if job is None:
+                yield {"event": "error", "data": json.dumps({"message": "Import job not found"})}
+                return
+            if job["status"] in TERMINAL_STATUSES:
+                yield {"event": "done", "data": json.dumps(job)}
+                return
+            if job != last:
+                yield {"event": "progress", "data": json.dumps(job)}
+                last = job
+            await asyncio.sleep(IMPORT_EVENTS_POLL_SECONDS)
+
+    return EventSourceResponse(event_generator())
@@ -1,10 +1,11 @@
 import asyncio
 import os
+from datetime import date
 import yfinance as yf
 from fastapi import APIRouter, Query, BackgroundTasks, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from app.cache import get_cache, set_cache, cached_async
-from app.tasks import log_user_query, trigger_jit_fundamentals, _ingest_price_history
+from app.tasks import log_user_query, trigger_jit_fundamentals, ingest_price_history
 
 router = APIRouter(prefix="/api", tags=["market"])
 
@@ -17,6 +18,14 @@ class BacktestRequestAPI(BaseModel):
     days: int = 365
     stop_loss_pct: float = 0.0
 
+class PricePair(BaseModel):
+    ticker: str
+    date: date
+
+class PricesAsOfRequest(BaseModel):
+    pairs: list[PricePair] = Field(..., max_length=5000)
+    fetch_missing: bool = True
+
 @router.get("/stock/{ticker}")
 async def get_stock_data(ticker: str, background_tasks: BackgroundTasks, period: str = Query("10d", pattern="^(1d|5d|10d|1mo|3mo|6mo|1y|2y|5y|max)$")):
     """
@@ -52,7 +61,7 @@ async def get_stock_data(ticker: str, background_tasks: BackgroundTasks, period:
         if hist.empty:
             return {"error": f"No data found for ticker '{ticker}'"}
             
-        background_tasks.add_task(_ingest_price_history, ticker)
+        background_tasks.add_task(ingest_price_history, [ticker])
             
         if period == "10d" and len(hist) > 10:
             hist = hist.tail(10)
@@ -204,6 +213,28 @@ async def run_backtest(request: BacktestRequestAPI):
     except Exception as exc:
         return {"error": str(exc)}
 
+@router.post("/prices/as-of")
+async def get_prices_as_of(request: PricesAsOfRequest):
+    """
+    Closing prices for many (ticker, date) pairs at once: each pair gets the last
+    stored close on or before its date (at most a week old). With `fetch_missing`,
+    ranges the local store lacks are downloaded in bulk and stored first. Results
+    follow the request order; `close` and `price_date` are null when unresolved.
+    """
+    from app.database import async_session
+    from app.prices import get_closes_as_of
+
+    pairs = [(p.ticker.upper().strip(), p.date) for p in request.pairs]
+    async with async_session() as session:
+        found = await get_closes_as_of(session, set(pairs), fetch_missing=request.fetch_missing)
+        await session.commit()
+
+    prices = []
+    for ticker, day in pairs:
+        price_date, close = found.get((ticker, day), (None, None))
+        prices.append({"ticker": ticker, "date": day, "close": close, "price_date": price_date})
+    return {"prices": prices}
+
 @router.get("/levels/{ticker}")
 @cached_async(ttl_seconds=3600)
 async def get_key_levels(ticker: str):
@@ -1,5 +1,6 @@
 import asyncio
 import concurrent.futures
+import itertools
 from datetime import datetime, timedelta
 from typing import Annotated
 import numpy as np
@@ -7,12 +8,16 @@ import pandas as pd
 import yfinance as yf
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
 from pydantic import BaseModel
-from sqlalchemy import select, delete, func as sqlfunc
+from sqlalchemy import select, or_, tuple_, func as sqlfunc
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from app.database import async_session
-from app.models import User, Portfolio, PortfolioHolding, Account, Transaction
+from app.models import User, Portfolio, PortfolioHolding, PortfolioPosition, Account, Transaction
 from api.routes.auth import get_current_user
-from api.routes.finance import convert_currency
-from app.cache import get_cache, set_cache, get_live_price
+from app.cache import get_cache, set_cache, delete_cache, get_live_price, convert_currency
+from app.valuation import invalidate_household_valuation
+from app.pagination import encode_cursor, decode_cursor
+from app.import_jobs import IMPORT_CHUNK_ROWS, ImportProgress, spool_upload, open_spooled_text, start_import_job
+from app.exports import export_response
 
 router = APIRouter(prefix="/api", tags=["portfolio"])
 
@@ -29,6 +34,12 @@ class PortfolioCreate(BaseModel):
     name: str
     account_id: int | None = None
 
+async def _invalidate_portfolio_owner(session, portfolio_id: int):
+    """Drop cached household valuations after a holding in this portfolio changes."""
+    port = await session.get(Portfolio, portfolio_id)
+    if port and port.owner_id:
+        await invalidate_household_valuation(session, port.owner_id)
+
 @router.get("/portfolio")
 async def list_portfolios(
     current_user: Annotated[User, Depends(get_current_user)],
@@ -83,6 +94,7 @@ async def create_portfolio(
         session.add(portfolio)
         await session.commit()
         await session.refresh(portfolio)
+        await invalidate_household_valuation(session, current_user.id)
         return {
             "id": portfolio.id,
             "name": portfolio.name,
@@ -114,6 +126,7 @@ async def update_portfolio(
                 port.account_id = port_in.account_id
                 
         await session.commit()
+        await invalidate_household_valuation(session, current_user.id)
         return {"status": "success"}
 
 @router.delete("/portfolio/{portfolio_id}")
@@ -128,6 +141,7 @@ async def delete_portfolio(
             
         await session.delete(port)
         await session.commit()
+        await invalidate_household_valuation(session, current_user.id)
         return {"status": "success"}
 
 @router.get("/portfolio/{portfolio_id}")
@@ -590,6 +604,8 @@ async def add_holding(portfolio_id: int, request: HoldingRequest):
             existing.avg_cost_basis = new_avg
             await session.commit()
             await session.refresh(existing)
+            if port.owner_id:
+                await invalidate_household_valuation(session, port.owner_id)
             return {"id": existing.id, "ticker": existing.ticker, "shares": existing.shares, "avg_cost_basis": existing.avg_cost_basis}
         else:
             holding = PortfolioHolding(
@@ -601,6 +617,8 @@ async def add_holding(portfolio_id: int, request: HoldingRequest):
             session.add(holding)
             await session.commit()
             await session.refresh(holding)
+            if port.owner_id:
+                await invalidate_household_valuation(session, port.owner_id)
             return {"id": holding.id, "ticker": holding.ticker, "shares": holding.shares, "avg_cost_basis": holding.avg_cost_basis}
 
 @router.put("/portfolio/{portfolio_id}/holdings/{holding_id}")
@@ -615,6 +633,7 @@ async def update_holding(portfolio_id: int, holding_id: int, request: HoldingReq
         holding.shares = request.shares
         holding.avg_cost_basis = request.avg_cost_basis
         await session.commit()
+        await _invalidate_portfolio_owner(session, portfolio_id)
         return {"id": holding.id, "ticker": holding.ticker, "shares": holding.shares, "avg_cost_basis": holding.avg_cost_basis}
 
 @router.delete("/portfolio/{portfolio_id}/holdings/{holding_id}")
@@ -627,118 +646,163 @@ async def delete_holding(portfolio_id: int, holding_id: int):
 
         await session.delete(holding)
         await session.commit()
+        await _invalidate_portfolio_owner(session, portfolio_id)
         return {"deleted": True, "id": holding_id}
 
+# 13 bind parameters per row keeps each statement well under the driver's limit
+IMPORT_INSERT_CHUNK_SIZE = 1000
+
+async def _insert_transactions(session, portfolio_id: int, transactions: list[dict]) -> list[int]:
+    """Insert transactions in chunks; rows already imported (same external_id) are skipped."""
+    new_ids = []
+    for start in range(0, len(transactions), IMPORT_INSERT_CHUNK_SIZE):
+        stmt = pg_insert(Transaction).values([
+            {
+                "portfolio_id": portfolio_id,
+                "external_id": txn.get("external_id"),
+                "action": txn["action"],
+                "ticker": txn["ticker"],
+                "name": txn.get("name", ""),
+                "isin": txn.get("isin", ""),
+                "shares": txn["shares"],
+                "price_per_share": txn["price_per_share"],
+                "currency": txn.get("currency", ""),
+                "exchange_rate": txn.get("exchange_rate"),
+                "total_in_local": txn.get("total_in_local"),
+                "result_in_local": txn.get("result_in_local"),
+                "executed_at": txn["executed_at"],
+            }
+            for txn in transactions[start:start + IMPORT_INSERT_CHUNK_SIZE]
+        ]).on_conflict_do_nothing(
+            index_elements=[Transaction.portfolio_id, Transaction.external_id]
+        ).returning(Transaction.id)
+        new_ids.extend((await session.execute(stmt)).scalars().all())
+    return new_ids
+
+async def _run_portfolio_import(portfolio_id: int, spool, progress: ImportProgress) -> dict:
+    """
+    Import a spooled broker CSV into the portfolio, IMPORT_CHUNK_ROWS rows at a time,
+    in one transaction. Raises ValueError with a user-facing message when the file
+    or portfolio cannot be imported.
+    """
+    from app.csv_import import (
+        iter_csv_rows, missing_price_requests, fetch_historical_closes, finalize_transactions
+    )
+    from app.prices import lookup_stored_closes
+    from app.holdings import apply_new_transactions, portfolio_position_totals
+
+    async with async_session() as session:
+        # Row lock serialises concurrent imports into the same portfolio's positions
+        port = await session.get(Portfolio, portfolio_id, with_for_update=True)
+        if not port:
+            raise ValueError(f"Portfolio {portfolio_id} not found")
+
+        text = open_spooled_text(spool, "utf-8")
+        try:
+            rows = iter_csv_rows(text)
+            total = failed = 0
+            new_ids = []
+            tickers = set()
+            while chunk := await asyncio.to_thread(lambda: list(itertools.islice(rows, IMPORT_CHUNK_ROWS))):
+                parsed = [row for row in chunk if row is not None]
+                failed += len(chunk) - len(parsed)
+
+                # Prices the broker omitted: one as-of query against the local store,
+                # then one multi-ticker download for whatever it does not cover
+                requests = missing_price_requests(parsed)
+                prices = await lookup_stored_closes(session, requests)
+                remaining = requests - prices.keys()
+                if remaining:
+                    prices.update(await asyncio.to_thread(fetch_historical_closes, remaining))
+                transactions = finalize_transactions(parsed, prices)
+
+                new_ids.extend(await _insert_transactions(session, portfolio_id, transactions))
+                total += len(transactions)
+                tickers.update(txn["ticker"].upper() for txn in transactions)
+                await progress.report(
+                    rows_parsed=progress.state["rows_parsed"] + len(chunk),
+                    inserted=len(new_ids), duplicates=total - len(new_ids), failed=failed
+                )
+        finally:
+            text.detach()
+
+        if not total:
+            raise ValueError("No transactions found in the CSV file.")
+
+        # Apply only the new rows to the stored per-ticker state, unless they are back-dated
+        replayed = await apply_new_transactions(session, port, new_ids)
+        totals = await portfolio_position_totals(session, portfolio_id)
+
+        await session.commit()
+        if port.owner_id:
+            await invalidate_household_valuation(session, port.owner_id)
+        await delete_cache(
+            _txn_count_cache_key(portfolio_id, None),
+            *[_txn_count_cache_key(portfolio_id, t) for t in tickers]
+        )
+
+    return {
+        "new_transactions": len(new_ids),
+        "skipped": total - len(new_ids),
+        "total_in_csv": total,
+        "holdings_count": totals["holdings_count"],
+        "total_realized_pnl": totals["total_realized_pnl"],
+        "holdings_replayed": replayed,
+    }
+
+async def _spool_portfolio_csv(file: UploadFile):
+    """Spool the upload, returning (spool, None) or (None, error message)."""
+    if file.filename and not file.filename.lower().endswith('.csv'):
+        return None, "Please upload a CSV file"
+    spool, encoding = await spool_upload(file)
+    if encoding is None:
+        spool.close()
+        return None, "Could not decode file. Please ensure it is a UTF-8 CSV."
+    return spool, None
+
 @router.post("/portfolio/{portfolio_id}/import/csv")
 async def import_csv(portfolio_id: int, file: UploadFile = File(...)):
     """
     Import transactions from CSV export (Trading 212, Schwab, Morgan Stanley).
     Stores every transaction row (buy/sell/dividend/vest) with dedup by external_id.
-    Recomputes holdings from the full transaction log.
+    Applies the new transactions to the stored per-ticker positions, replaying the
+    full log only when the import is back-dated. Large exports should use
+    /import/csv/jobs instead, which returns at once.
     """
-    from app.csv_import import detect_and_parse_csv, compute_holdings
-
-    if file.filename and not file.filename.lower().endswith('.csv'):
-        return {"error": "Please upload a CSV file"}
-
-    try:
-        raw_bytes = await file.read()
-        file_content = raw_bytes.decode("utf-8")
-    except UnicodeDecodeError:
-        return {"error": "Could not decode file. Please ensure it is a UTF-8 CSV."}
-
+    spool, error = await _spool_portfolio_csv(file)
+    if error:
+        return {"error": error}
     try:
-        transactions = detect_and_parse_csv(file_content)
+        return await _run_portfolio_import(portfolio_id, spool, ImportProgress())
     except ValueError as exc:
         return {"error": str(exc)}
+    finally:
+        spool.close()
 
-    if not transactions:
-        return {"error": "No transactions found in the CSV file."}
-
+@router.post("/portfolio/{portfolio_id}/import/csv/jobs")
+async def start_import_csv_job(portfolio_id: int, file: UploadFile = File(...)):
+    """
+    Queue a CSV import as a background job and return its id immediately. Follow
+    progress at /api/import-jobs/{job_id} or its /events stream; the finished job's
+    result matches the response of /import/csv.
+    """
+    spool, error = await _spool_portfolio_csv(file)
+    if error:
+        return {"error": error}
     async with async_session() as session:
-        port = await session.get(Portfolio, portfolio_id)
-        if not port:
+        if not await session.get(Portfolio, portfolio_id):
+            spool.close()
             return {"error": f"Portfolio {portfolio_id} not found"}
 
-        result = await session.execute(
-            select(Transaction.external_id)
-            .where(Transaction.portfolio_id == portfolio_id)
-            .where(Transaction.external_id.isnot(None))
-        )
-        existing_ids = {row[0] for row in result.fetchall()}
+    job_id = await start_import_job(
+        "portfolio_csv", spool, lambda progress: _run_portfolio_import(portfolio_id, spool, progress)
+    )
+    return {"job_id": job_id, "status": "queued"}
 
-        new_count = 0
-        skipped_count = 0
+TXN_COUNT_CACHE_TTL = 300
 
-        for txn in transactions:
-            ext_id = txn.get("external_id")
-            if ext_id and ext_id in existing_ids:
-                skipped_count += 1
-                continue
-
-            record = Transaction(
-                portfolio_id=portfolio_id,
-                external_id=ext_id,
-                action=txn["action"],
-                ticker=txn["ticker"],
-                name=txn.get("name", ""),
-                isin=txn.get("isin", ""),
-                shares=txn["shares"],
-                price_per_share=txn["price_per_share"],
-                currency=txn.get("currency", ""),
-                exchange_rate=txn.get("exchange_rate"),
-                total_in_local=txn.get("total_in_local"),
-                result_in_local=txn.get("result_in_local"),
-                executed_at=txn["executed_at"],
-            )
-            session.add(record)
-            if ext_id:
-                existing_ids.add(ext_id)
-            new_count += 1
-
-        await session.flush()
-
-        all_txns_result = await session.execute(
-            select(Transaction)
-            .where(Transaction.portfolio_id == portfolio_id)
-            .order_by(Transaction.executed_at)
-        )
-        all_txns = [
-            {
-                "action": t.action,
-                "ticker": t.ticker,
-                "shares": t.shares,
-                "price_per_share": t.price_per_share,
-                "name": t.name,
-            }
-            for t in all_txns_result.scalars().all()
-        ]
-
-        computed = compute_holdings(all_txns)
-
-        await session.execute(
-            delete(PortfolioHolding)
-            .where(PortfolioHolding.portfolio_id == portfolio_id)
-        )
-
-        for h in computed:
-            if h["shares"] > 0:
-                session.add(PortfolioHolding(
-                    portfolio_id=portfolio_id,
-                    ticker=h["ticker"],
-                    shares=h["shares"],
-                    avg_cost_basis=h["avg_cost_basis"],
-                ))
-
-        await session.commit()
-
-    return {
-        "new_transactions": new_count,
-        "skipped": skipped_count,
-        "total_in_csv": len(transactions),
-        "holdings_count": len([h for h in computed if h["shares"] > 0]),
-        "total_realized_pnl": round(sum(h["realized_pnl"] for h in computed), 2),
-    }
+def _txn_count_cache_key(portfolio_id: int, ticker: str | None) -> str:
+    return f"txn_count:{portfolio_id}:{ticker or 'all'}"
 
 @router.get("/portfolio/{portfolio_id}/transactions")
 async def get_transactions(
@@ -746,32 +810,48 @@ async def get_transactions(
     ticker: str = Query(default=None, description="Filter by ticker"),
     limit: int = Query(default=100, ge=1, le=500),
     offset: int = Query(default=0, ge=0),
+    cursor: str = Query(default=None, description="Opaque cursor from next_cursor; takes precedence over offset"),
 ):
-    """Get paginated transaction history for a portfolio."""
+    """
+    Get paginated transaction history for a portfolio, newest first.
+    Follow `next_cursor` for constant-cost keyset pagination; `total` is cached for a few minutes.
+    """
     async with async_session() as session:
         query = (
             select(Transaction)
             .where(Transaction.portfolio_id == portfolio_id)
         )
-        count_query = (
-            select(sqlfunc.count(Transaction.id))
-            .where(Transaction.portfolio_id == portfolio_id)
-        )
-
         if ticker:
             query = query.where(Transaction.ticker == ticker.upper())
-            count_query = count_query.where(Transaction.ticker == ticker.upper())
 
-        total = (await session.execute(count_query)).scalar() or 0
-
-        query = query.order_by(Transaction.executed_at.desc()).limit(limit).offset(offset)
+        count_key = _txn_count_cache_key(portfolio_id, ticker.upper() if ticker else None)
+        total = await get_cache(count_key)
+        if total is None:
+            total = (await session.execute(select(sqlfunc.count()).select_from(query.subquery()))).scalar() or 0
+            await set_cache(count_key, total, TXN_COUNT_CACHE_TTL)
+
+        if cursor:
+            try:
+                cursor_at, cursor_id = decode_cursor(cursor)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            query = query.where(tuple_(Transaction.executed_at, Transaction.id) < tuple_(cursor_at, cursor_id))
+            offset = 0
+
+        query = query.order_by(Transaction.executed_at.desc(), Transaction.id.desc()).limit(limit + 1).offset(offset)
         result = await session.execute(query)
         txns = result.scalars().all()
 
+        next_cursor = None
+        if len(txns) > limit:
+            txns = txns[:limit]
+            next_cursor = encode_cursor(txns[-1].executed_at, txns[-1].id)
+
         return {
             "total": total,
             "limit": limit,
             "offset": offset,
+            "next_cursor": next_cursor,
             "transactions": [
                 {
                     "id": t.id,
@@ -791,122 +871,99 @@ async def get_transactions(
             ],
         }
 
+TRANSACTION_EXPORT_COLUMNS = [
+    ("id", Transaction.id),
+    ("external_id", Transaction.external_id),
+    ("executed_at", Transaction.executed_at),
+    ("action", Transaction.action),
+    ("ticker", Transaction.ticker),
+    ("name", Transaction.name),
+    ("isin", Transaction.isin),
+    ("shares", Transaction.shares),
+    ("price_per_share", Transaction.price_per_share),
+    ("currency", Transaction.currency),
+    ("exchange_rate", Transaction.exchange_rate),
+    ("total_in_local", Transaction.total_in_local),
+    ("result_in_local", Transaction.result_in_local),
+]
+
+@router.get("/portfolio/{portfolio_id}/transactions/export")
+async def export_transactions(
+    portfolio_id: int,
+    format: str = Query(default="csv", description="csv or parquet"),
+    ticker: str = Query(default=None, description="Filter by ticker"),
+):
+    """Download a portfolio's full transaction history, oldest first, streamed as CSV or Parquet."""
+    async with async_session() as session:
+        if not await session.get(Portfolio, portfolio_id):
+            raise HTTPException(status_code=404, detail="Portfolio not found")
+
+    filters = [Transaction.portfolio_id == portfolio_id]
+    if ticker:
+        filters.append(Transaction.ticker == ticker.upper())
+    return export_response(
+        TRANSACTION_EXPORT_COLUMNS,
+        filters,
+        [Transaction.executed_at, Transaction.id],
+        format,
+        f"portfolio-{portfolio_id}-transactions",
+    )
+
+async def _realized_target_currency(session, port: Portfolio) -> str:
+    if port.account_id:
+        acc = await session.get(Account, port.account_id)
+        if acc:
+            return acc.currency or "USD"
+    return "USD"
+
 @router.get("/portfolio/{portfolio_id}/realized")
 async def get_realized_summary(portfolio_id: int):
     """
     Get aggregated realized P&L from sells and dividend income.
-    Returns per-ticker breakdowns and totals.
+    Returns per-ticker totals read from the materialized positions; individual
+    trades are paged from /realized/trades.
     """
     async with async_session() as session:
         port = await session.get(Portfolio, portfolio_id)
         if not port:
             return {"error": f"Portfolio {portfolio_id} not found"}
 
-        target_currency = "USD"
-        if port.account_id:
-            acc = await session.get(Account, port.account_id)
-            if acc:
-                target_currency = acc.currency or "USD"
+        target_currency = await _realized_target_currency(session, port)
 
         result = await session.execute(
-            select(Transaction)
-            .where(Transaction.portfolio_id == portfolio_id)
-            .order_by(Transaction.executed_at)
+            select(PortfolioPosition)
+            .where(
+                PortfolioPosition.portfolio_id == portfolio_id,
+                or_(PortfolioPosition.num_sells > 0, PortfolioPosition.num_dividends > 0)
+            )
         )
-        txns = result.scalars().all()
+        positions = result.scalars().all()
 
-        sell_actions = {'market sell', 'limit sell'}
-        sells_by_ticker = {}
-
-        for t in txns:
-            if t.action.lower() not in sell_actions:
-                continue
-            ticker = t.ticker
-            if ticker not in sells_by_ticker:
-                sells_by_ticker[ticker] = {
-                    "ticker": ticker,
-                    "name": t.name or ticker,
-                    "total_proceeds": 0.0,
-                    "total_realized_pnl": 0.0,
-                    "total_shares_sold": 0.0,
-                    "num_trades": 0,
-                    "trades": [],
-                }
-            entry = sells_by_ticker[ticker]
-            proceeds_local = t.total_in_local or 0
-            result_local = t.result_in_local or 0
-
-            proceeds_target = await convert_currency(proceeds_local, "GBP", target_currency)
-            result_target = await convert_currency(result_local, "GBP", target_currency)
-
-            ticker_currency = (await get_cache(f"currency:{t.ticker}")) or "USD"
-            price_target = await convert_currency(t.price_per_share, ticker_currency, target_currency)
-
-            entry["total_proceeds"] += proceeds_target
-            entry["total_realized_pnl"] += result_target
-            entry["total_shares_sold"] += t.shares
-            entry["num_trades"] += 1
-            entry["trades"].append({
-                "date": str(t.executed_at)[:10] if t.executed_at else "",
-                "shares": round(t.shares, 4),
-                "price": round(price_target, 2),
-                "proceeds": round(proceeds_target, 2),
-                "pnl": round(result_target, 2),
-            })
+        # Aggregates are kept in the export's account currency; one rate converts them all
+        rate = await convert_currency(1.0, "GBP", target_currency)
 
-        realized_list = []
-        for data in sorted(sells_by_ticker.values(), key=lambda x: -abs(x["total_realized_pnl"])):
-            realized_list.append({
-                "ticker": data["ticker"],
-                "name": data["name"],
-                "total_proceeds": round(data["total_proceeds"], 2),
-                "total_realized_pnl": round(data["total_realized_pnl"], 2),
-                "total_shares_sold": round(data["total_shares_sold"], 4),
-                "num_trades": data["num_trades"],
-                "trades": data["trades"],
-            })
-
-        dividends_by_ticker = {}
-
-        for t in txns:
-            if not t.action.lower().startswith("dividend"):
-                continue
-            ticker = t.ticker
-            if ticker not in dividends_by_ticker:
-                dividends_by_ticker[ticker] = {
-                    "ticker": ticker,
-                    "name": t.name or ticker,
-                    "total_income": 0.0,
-                    "total_withholding_tax": 0.0,
-                    "num_payments": 0,
-                    "payments": [],
-                }
-            entry = dividends_by_ticker[ticker]
-            income_local = t.total_in_local or 0
-
-            income_target = await convert_currency(income_local, "GBP", target_currency)
-
-            ticker_currency = (await get_cache(f"currency:{t.ticker}")) or "USD"
-            price_target = await convert_currency(t.price_per_share, ticker_currency, target_currency)
-
-            entry["total_income"] += income_target
-            entry["num_payments"] += 1
-            entry["payments"].append({
-                "date": str(t.executed_at)[:10] if t.executed_at else "",
-                "shares": round(t.shares, 4),
-                "per_share": round(price_target, 6),
-                "income": round(income_target, 2),
-            })
-
-        dividend_list = []
-        for data in sorted(dividends_by_ticker.values(), key=lambda x: -x["total_income"]):
-            dividend_list.append({
-                "ticker": data["ticker"],
-                "name": data["name"],
-                "total_income": round(data["total_income"], 2),
-                "num_payments": data["num_payments"],
-                "payments": data["payments"],
-            })
+        realized_list = [
+            {
+                "ticker": p.ticker,
+                "name": p.name or p.ticker,
+                "total_proceeds": round(p.sell_proceeds * rate, 2),
+                "total_realized_pnl": round(p.sell_result * rate, 2),
+                "total_shares_sold": round(p.shares_sold, 4),
+                "num_trades": p.num_sells,
+            }
+            for p in sorted(positions, key=lambda p: -abs(p.sell_result))
+            if p.num_sells > 0
+        ]
+        dividend_list = [
+            {
+                "ticker": p.ticker,
+                "name": p.name or p.ticker,
+                "total_income": round(p.dividend_income * rate, 2),
+                "num_payments": p.num_dividends,
+            }
+            for p in sorted(positions, key=lambda p: -p.dividend_income)
+            if p.num_dividends > 0
+        ]
 
         total_realized = round(sum(s["total_realized_pnl"] for s in realized_list), 2)
         total_dividends = round(sum(d["total_income"] for d in dividend_list), 2)
@@ -919,3 +976,83 @@ async def get_realized_summary(portfolio_id: int):
             "dividends": dividend_list,
             "currency": target_currency,
         }
+
+@router.get("/portfolio/{portfolio_id}/realized/trades")
+async def get_realized_trades(
+    portfolio_id: int,
+    ticker: str = Query(..., description="Ticker to list trades for"),
+    kind: str = Query("sell", pattern="^(sell|dividend)$"),
+    limit: int = Query(default=50, ge=1, le=500),
+    cursor: str = Query(default=None, description="Opaque cursor from next_cursor"),
+):
+    """
+    Get one ticker's sells or dividend payments, newest first, in the portfolio's currency.
+    Follow `next_cursor` for the next page.
+    """
+    from app.csv_import import SELL_ACTIONS
+
+    async with async_session() as session:
+        port = await session.get(Portfolio, portfolio_id)
+        if not port:
+            return {"error": f"Portfolio {portfolio_id} not found"}
+
+        target_currency = await _realized_target_currency(session, port)
+
+        query = select(Transaction).where(
+            Transaction.portfolio_id == portfolio_id,
+            Transaction.ticker == ticker.upper()
+        )
+        if kind == "sell":
+            query = query.where(sqlfunc.lower(Transaction.action).in_(SELL_ACTIONS))
+        else:
+            query = query.where(sqlfunc.lower(Transaction.action).like("dividend%"))
+        if cursor:
+            try:
+                cursor_at, cursor_id = decode_cursor(cursor)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            query = query.where(tuple_(Transaction.executed_at, Transaction.id) < tuple_(cursor_at, cursor_id))
+
+        result = await session.execute(
+            query.order_by(Transaction.executed_at.desc(), Transaction.id.desc()).limit(limit + 1)
+        )
+        txns = result.scalars().all()
+
+        next_cursor = None
+        if len(txns) > limit:
+            txns = txns[:limit]
+            next_cursor = encode_cursor(txns[-1].executed_at, txns[-1].id)
+
+        rate = await convert_currency(1.0, "GBP", target_currency)
+        ticker_currency = (await get_cache(f"currency:{ticker.upper()}")) or "USD"
+        price_rate = await convert_currency(1.0, ticker_currency, target_currency)
+
+        if kind == "sell":
+            trades = [
+                {
+                    "date": str(t.executed_at)[:10] if t.executed_at else "",
+                    "shares": round(t.shares, 4),
+                    "price": round(t.price_per_share * price_rate, 2),
+                    "proceeds": round((t.total_in_local or 0) * rate, 2),
+                    "pnl": round((t.result_in_local or 0) * rate, 2),
+                }
+                for t in txns
+            ]
+        else:
+            trades = [
+                {
+                    "date": str(t.executed_at)[:10] if t.executed_at else "",
+                    "shares": round(t.shares, 4),
+                    "per_share": round(t.price_per_share * price_rate, 6),
+                    "income": round((t.total_in_local or 0) * rate, 2),
+                }
+                for t in txns
+            ]
+
+        return {
+            "ticker": ticker.upper(),
+            "kind": kind,
+            "currency": target_currency,
+            "next_cursor": next_cursor,
+            "trades": trades,
+        }
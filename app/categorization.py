@@ -0,0 +1,313 @@
+"""
+Expense categorization helpers.
+
+Category rules are user-supplied regexes evaluated in creation order; the first
+rule that matches a description wins. Most rules in practice are plain merchant
+names (`uber`, `.*tesco.*`), so a compiled matcher splits them into:
+
+- literal rules, matched case-insensitively with C-level substring search over
+  one lower-cased buffer holding every description in the batch, and
+- regex rules, compiled once and only run against rows no earlier rule claimed.
+
+Retroactive application to stored expenses runs inside PostgreSQL with
+`description ~* :pattern`, batched by id range, and falls back to matching in
+Python for patterns whose syntax differs between Python and Postgres regexes.
+
+Rules are applied in order and a row is only assigned by the first rule that
+hits it, preserving first-match precedence. Descriptions are de-duplicated
+before matching since bank statements repeat merchants heavily. Compiled
+matchers are cached in-process per user, keyed by the rule-set version.
+"""
+import re
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+from sqlalchemy import select, update, func, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Expense, ExpenseCategoryRule
+from app.expense_summary import month_of, invalidate_expense_summaries
+
+if TYPE_CHECKING:
+    from app.import_jobs import ImportProgress
+
+MATCHER_CACHE_SIZE = 256
+RETROACTIVE_BATCH_SIZE = 50_000
+
+_REGEX_META = set(".^$*+?{}[]\\|()")
+_ROW_SEPARATOR = "\x00"
+
+def literal_for_pattern(pattern: str) -> str | None:
+    """
+    Return the lower-cased literal a pattern is equivalent to under re.search
+    (ignoring surrounding `.*`), or None if it uses any other regex syntax.
+    """
+    core = pattern
+    if core.startswith(".*"):
+        core = core[2:]
+    if core.endswith(".*") and not core.endswith("\\.*"):
+        core = core[:-2]
+    literal = []
+    i = 0
+    while i < len(core):
+        ch = core[i]
+        if ch == "\\":
+            # Escaped punctuation is still a literal; escaped letters/digits are classes or refs
+            if i + 1 < len(core) and not core[i + 1].isalnum():
+                literal.append(core[i + 1])
+                i += 2
+                continue
+            return None
+        if ch in _REGEX_META:
+            return None
+        literal.append(ch)
+        i += 1
+    if not literal:
+        return None
+    return "".join(literal).lower()
+
+class CategoryMatcher:
+    """First-match-wins matcher over an ordered list of (regex_pattern, category_name) rules."""
+
+    def __init__(self, rules: list[tuple[str, str]]):
+        self.categories = [category for _, category in rules]
+        # One entry per rule, in order: ("literal", str) or ("regex", compiled pattern)
+        self._rules = []
+        for pattern, _ in rules:
+            literal = literal_for_pattern(pattern)
+            if literal is not None:
+                self._rules.append(("literal", literal))
+            else:
+                self._rules.append(("regex", re.compile(pattern, re.IGNORECASE)))
+
+    def match(self, description: str | None) -> str | None:
+        """Return the category of the first matching rule, or None."""
+        return self.match_many([description])[0]
+
+    def match_many(self, descriptions: list[str | None]) -> list[str | None]:
+        """Categorize a batch of descriptions; None where no rule matches."""
+        if not self._rules:
+            return [None] * len(descriptions)
+
+        unique = [d for d in dict.fromkeys(descriptions) if d]
+        if not unique:
+            return [None] * len(descriptions)
+
+        lowered = [d.lower() for d in unique]
+        offsets = []
+        position = 0
+        for d in lowered:
+            offsets.append(position)
+            position += len(d) + 1
+        buffer = _ROW_SEPARATOR.join(lowered)
+
+        assigned: list[int | None] = [None] * len(unique)
+        remaining = len(unique)
+        for rule_index, (kind, matcher) in enumerate(self._rules):
+            if kind == "literal":
+                hit = buffer.find(matcher)
+                while hit != -1:
+                    row = bisect_right(offsets, hit) - 1
+                    if assigned[row] is None:
+                        assigned[row] = rule_index
+                        remaining -= 1
+                    # Later hits in the same row cannot change its assignment
+                    next_row_start = offsets[row + 1] if row + 1 < len(offsets) else len(buffer)
+                    hit = buffer.find(matcher, max(hit + 1, next_row_start))
+            else:
+                for row, description in enumerate(unique):
+                    if assigned[row] is None and matcher.search(description):
+                        assigned[row] = rule_index
+                        remaining -= 1
+            if remaining == 0:
+                break
+
+        by_description = {
+            d: (self.categories[idx] if idx is not None else None)
+            for d, idx in zip(unique, assigned)
+        }
+        return [by_description.get(d) if d else None for d in descriptions]
+
+_matcher_cache: "OrderedDict[int, tuple[tuple, CategoryMatcher]]" = OrderedDict()
+
+async def get_category_matcher(db: AsyncSession, owner_id: int) -> CategoryMatcher:
+    """
+    Load the user's rules in creation order and return a compiled matcher.
+    The matcher is reused until the rule set (ids, patterns, categories) changes.
+    """
+    result = await db.execute(
+        select(ExpenseCategoryRule.id, ExpenseCategoryRule.regex_pattern, ExpenseCategoryRule.category_name)
+        .where(ExpenseCategoryRule.owner_id == owner_id)
+        .order_by(ExpenseCategoryRule.id)
+    )
+    version = tuple(tuple(row) for row in result.all())
+
+    cached = _matcher_cache.get(owner_id)
+    if cached is not None and cached[0] == version:
+        _matcher_cache.move_to_end(owner_id)
+        return cached[1]
+
+    matcher = CategoryMatcher([(pattern, category) for _, pattern, category in version])
+    _matcher_cache[owner_id] = (version, matcher)
+    _matcher_cache.move_to_end(owner_id)
+    while len(_matcher_cache) > MATCHER_CACHE_SIZE:
+        _matcher_cache.popitem(last=False)
+    return matcher
+
+# Escapes that mean the same thing in Python `re` and Postgres AREs. Notably `\b`
+# is a word boundary in Python but a backspace in Postgres, so it is excluded.
+_PG_SAFE_ESCAPES = set("dDsSwWnrt")
+_PG_SAFE_GROUP_PREFIXES = ("(?:", "(?=", "(?!")
+
+def is_postgres_compatible(pattern: str) -> bool:
+    """
+    True if `pattern` can be evaluated with Postgres `~*` with the same meaning as
+    Python re on single-line text. `.`, `$` and negated brackets treat newlines
+    differently, so descriptions spanning lines are left to Python.
+    """
+    in_bracket = False
+    i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == "\\":
+            if i + 1 >= len(pattern):
+                return False
+            nxt = pattern[i + 1]
+            if nxt.isalnum() and nxt not in _PG_SAFE_ESCAPES:
+                return False
+            i += 2
+            continue
+        if in_bracket:
+            if ch == "[" and pattern[i + 1:i + 2] in (":", "=", "."):
+                return False # POSIX class, equivalence class or collating element
+            if ch == "]":
+                in_bracket = False
+            i += 1
+            continue
+        if ch == "[":
+            in_bracket = True
+            i += 1
+            # A leading ^ negates and a ] right after the opening is a literal
+            if pattern[i:i + 1] == "^":
+                i += 1
+            if pattern[i:i + 1] == "]":
+                i += 1
+            continue
+        if ch == "(" and pattern.startswith("(?", i) and not pattern.startswith(_PG_SAFE_GROUP_PREFIXES, i):
+            return False
+        if ch in "*+?}" and pattern[i + 1:i + 2] == "+":
+            return False # possessive quantifier
+        if ch == "{" and pattern[i + 1:i + 2] == ",":
+            return False # Python-only {,n}
+        i += 1
+    return True
+
+async def apply_rule_retroactively(
+    db: AsyncSession, owner_id: int, pattern: str, category: str, changed_months: set[str] | None = None
+) -> int:
+    """
+    Re-categorize the user's Uncategorized expenses whose description matches `pattern`.
+    Runs as `UPDATE ... WHERE description ~* :pattern` in id-range batches, or in Python
+    when the pattern is not Postgres-compatible; multi-line descriptions are always
+    matched in Python. Does not commit. Returns rows updated and adds the YYYY-MM of
+    every updated expense to `changed_months` if given.
+    """
+    if changed_months is None:
+        changed_months = set()
+    bounds = await db.execute(
+        select(func.min(Expense.id), func.max(Expense.id)).where(
+            and_(Expense.owner_id == owner_id, Expense.category == "Uncategorized")
+        )
+    )
+    lo, hi = bounds.one()
+    if lo is None:
+        return 0
+
+    updated = 0
+    python_filter = []
+    if is_postgres_compatible(pattern):
+        try:
+            sql_updated = 0
+            months = set()
+            async with db.begin_nested():
+                for start in range(lo, hi + 1, RETROACTIVE_BATCH_SIZE):
+                    result = await db.execute(
+                        update(Expense)
+                        .where(
+                            and_(
+                                Expense.owner_id == owner_id,
+                                Expense.category == "Uncategorized",
+                                Expense.id >= start,
+                                Expense.id < start + RETROACTIVE_BATCH_SIZE,
+                                ~Expense.description.contains("\n"),
+                                Expense.description.regexp_match(pattern, flags="i")
+                            )
+                        )
+                        .values(category=category)
+                        .returning(Expense.date)
+                        .execution_options(synchronize_session=False)
+                    )
+                    dates = result.scalars().all()
+                    sql_updated += len(dates)
+                    months.update(month_of(d) for d in dates)
+            changed_months.update(months)
+            updated = sql_updated
+            python_filter = [Expense.description.contains("\n")]
+        except Exception:
+            pass # Postgres rejected the pattern; fall through to Python matching
+
+    compiled = re.compile(pattern, re.IGNORECASE)
+    last_id = lo - 1
+    while True:
+        rows = (await db.execute(
+            select(Expense.id, Expense.description, Expense.date)
+            .where(
+                and_(
+                    Expense.owner_id == owner_id,
+                    Expense.category == "Uncategorized",
+                    Expense.id > last_id,
+                    *python_filter
+                )
+            )
+            .order_by(Expense.id)
+            .limit(RETROACTIVE_BATCH_SIZE)
+        )).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        matched = [r for r in rows if r.description and compiled.search(r.description)]
+        matched_ids = [r.id for r in matched]
+        changed_months.update(month_of(r.date) for r in matched)
+        if matched_ids:
+            await db.execute(
+                update(Expense)
+                .where(Expense.id.in_(matched_ids))
+                .values(category=category)
+                .execution_options(synchronize_session=False)
+            )
+            updated += len(matched_ids)
+    return updated
+
+async def apply_all_rules(db: AsyncSession, owner_id: int, progress: "ImportProgress | None" = None) -> int:
+    """
+    Re-run every rule, in creation order, over the user's Uncategorized expenses.
+    Each rule only touches rows still Uncategorized, so earlier rules take precedence.
+    Reports rules_applied and updated_expenses to `progress` after each rule.
+    Commits, invalidates affected expense summaries and returns the number categorized.
+    """
+    rules = (await db.execute(
+        select(ExpenseCategoryRule.regex_pattern, ExpenseCategoryRule.category_name)
+        .where(ExpenseCategoryRule.owner_id == owner_id)
+        .order_by(ExpenseCategoryRule.id)
+    )).all()
+
+    updated = 0
+    changed_months = set()
+    for applied, (pattern, category) in enumerate(rules, start=1):
+        updated += await apply_rule_retroactively(db, owner_id, pattern, category, changed_months)
+        if progress:
+            await progress.report(rules_applied=applied, updated_expenses=updated)
+    await db.commit()
+    await invalidate_expense_summaries((owner_id, month) for month in changed_months)
+    return updated
@@ -0,0 +1,121 @@
+"""
+Per-file format inference for CSV imports.
+
+A broker or bank export uses one date format and one number style throughout, so
+both are sniffed once from a sample of the file. Whole columns are then parsed
+with pandas, with no format guessing per row. Values the sniffed format cannot
+read come back as None, so callers can hand those outliers to their row-level
+parser.
+"""
+import re
+from datetime import datetime
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+# Values inspected per column when sniffing
+FORMAT_SAMPLE_SIZE = 200
+
+CURRENCY_SYMBOLS = "$€£¥₹"
+_STRIP_CHARS = re.compile(f"[{re.escape(CURRENCY_SYMBOLS)}\\s]")
+# The last separator and the digits after it, e.g. ",56" in "1.234,56"
+_LAST_SEPARATOR = re.compile(r"[.,](\d+)$")
+
+def sample_values(values: Sequence[str], size: int = FORMAT_SAMPLE_SIZE) -> list[str]:
+    """Up to `size` non-empty, stripped values."""
+    sample = []
+    for value in values:
+        value = (value or "").strip()
+        if value:
+            sample.append(value)
+            if len(sample) == size:
+                break
+    return sample
+
+def sniff_date_format(samples: Sequence[str], formats: Sequence[str]) -> str | None:
+    """
+    The strptime format that reads the most samples, with ties going to the earlier
+    entry of `formats`. Returns None when no format reads any sample.
+    """
+    best, best_count = None, 0
+    for fmt in formats:
+        count = 0
+        for value in samples:
+            try:
+                datetime.strptime(value, fmt)
+                count += 1
+            except ValueError:
+                continue
+        if count > best_count:
+            best, best_count = fmt, count
+    return best
+
+def _decimal_vote(value: str) -> str | None:
+    """The decimal separator a single number implies, or None if it is ambiguous."""
+    value = _STRIP_CHARS.sub("", value)
+    m = _LAST_SEPARATOR.search(value)
+    if not m:
+        return None
+    sep = value[m.start()]
+    other = "," if sep == "." else "."
+    if other in value[:m.start()]:
+        # Both separators present: the last one is the decimal point
+        return sep
+    if len(m.group(1)) == 3:
+        # "1,234" and "1.234" read either way
+        return None
+    return sep
+
+def sniff_decimal_separator(samples: Sequence[str]) -> str:
+    """"," when the samples mostly write decimals with a comma (1.234,56), else "."."""
+    votes = {".": 0, ",": 0}
+    for value in samples:
+        sep = _decimal_vote(value)
+        if sep:
+            votes[sep] += 1
+    return "," if votes[","] > votes["."] else "."
+
+def _with_none(values: np.ndarray, missing: np.ndarray) -> list:
+    """`values` as a list of Python objects, with None where `missing` is set."""
+    out = values.astype(object)
+    out[missing] = None
+    return out.tolist()
+
+def parse_number_column(values: Sequence[str], decimal: str = ".") -> list[float | None]:
+    """
+    Parse a column of numbers written with the given decimal separator, ignoring
+    currency symbols, whitespace and thousands separators. Empty or unreadable
+    values are None.
+    """
+    if not values:
+        return []
+    raw = pd.Series(values, dtype=object).fillna("")
+    if decimal == ".":
+        # Plain numbers convert in one C-level pass; only the rest need cleaning
+        numbers = pd.to_numeric(raw, errors="coerce").to_numpy(dtype=np.float64, copy=True)
+    else:
+        numbers = np.full(len(raw), np.nan)
+    retry = np.isnan(numbers)
+    if retry.any():
+        thousands = "," if decimal == "." else "."
+        cleaned = (
+            raw[retry].astype(str)
+            .str.replace(_STRIP_CHARS, "", regex=True)
+            .str.replace(thousands, "", regex=False)
+        )
+        if decimal == ",":
+            cleaned = cleaned.str.replace(",", ".", regex=False)
+        numbers[retry] = pd.to_numeric(cleaned, errors="coerce").to_numpy(dtype=np.float64)
+    return _with_none(numbers, np.isnan(numbers))
+
+def parse_date_column(values: Sequence[str], fmt: str | None) -> list[datetime | None]:
+    """Parse a column of dates in one strptime format; empty or unreadable values are None."""
+    if not values:
+        return []
+    if fmt is None:
+        return [None] * len(values)
+    parsed = pd.to_datetime(
+        pd.Series(values, dtype=object).fillna("").astype(str).str.strip(), format=fmt, errors="coerce"
+    )
+    return _with_none(np.asarray(parsed.dt.to_pydatetime(), dtype=object), parsed.isna().to_numpy())
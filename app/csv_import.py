@@ -1,7 +1,24 @@
 import csv
+import hashlib
 import io
+import itertools
 import re
-from datetime import datetime
+from datetime import datetime, date, timedelta
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from app.csv_formats import (
+    sample_values, sniff_date_format, sniff_decimal_separator, parse_date_column, parse_number_column
+)
+
+# A missing price is taken from the first close within this many days of the trade
+PRICE_LOOKUP_WINDOW_DAYS = 3
+
+DATE_FORMATS = [
+    '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d',
+    '%m/%d/%Y %H:%M:%S', '%m/%d/%Y', '%d/%m/%Y', '%d-%b-%Y'
+]
 
 def clean_ticker(raw_ticker: str) -> str:
     if not raw_ticker:
@@ -9,21 +26,46 @@ def clean_ticker(raw_ticker: str) -> str:
     cleaned = re.sub(r'_US_EQ$|_EQ$', '', raw_ticker.strip())
     return cleaned.upper()
 
-def detect_and_parse_csv(file_content: str) -> list[dict]:
-    if not file_content or not file_content.strip():
-        return []
+def parse_timestamp(time_str: str) -> datetime:
+    """Parse a broker timestamp in any of DATE_FORMATS or ISO 8601, defaulting to now."""
+    if time_str:
+        for fmt in DATE_FORMATS:
+            try:
+                return datetime.strptime(time_str, fmt)
+            except ValueError:
+                continue
+        try:
+            return datetime.fromisoformat(time_str)
+        except ValueError:
+            pass
+    return datetime.now()
 
+# Lines scanned for the header row, past any broker preamble
+HEADER_SCAN_LINES = 20
+# Rows whose dates and numbers are parsed together as columns
+PARSE_BATCH_ROWS = 2000
+
+def iter_csv_rows(lines: Iterable[str]) -> Iterator[dict | None]:
+    """
+    Parse a broker CSV export into raw transaction rows lazily, from any iterable of
+    lines (a list, or a text file opened with newline=''). Rows with malformed numbers
+    yield None so callers can count them; other non-trade rows are skipped. Omitted
+    prices stay 0 and generated external ids are left to finalize_transactions.
+    """
+    lines = iter(lines)
     # Some brokerages like Schwab have extra info at the top. 
     # We try to find the actual header row.
-    lines = file_content.splitlines()
+    head = list(itertools.islice(lines, HEADER_SCAN_LINES))
+    if not any(line.strip() for line in head):
+        return
     start_idx = 0
-    for i, line in enumerate(lines[:20]):
+    for i, line in enumerate(head):
         lower_line = line.lower()
         if 'action' in lower_line or 'ticker' in lower_line or 'symbol' in lower_line or 'date' in lower_line or 'release date' in lower_line:
             start_idx = i
             break
             
-    reader = csv.DictReader(lines[start_idx:])
+    reader = csv.DictReader(itertools.chain(head[start_idx:], lines))
     if not reader.fieldnames:
         raise ValueError("CSV file appears to be empty or has no recognizable headers")
 
@@ -58,238 +100,302 @@ def detect_and_parse_csv(file_content: str) -> list[dict]:
         elif fl in ['id', 'transaction id', 'reference']:
             field_map['ID'] = f
 
-    transactions = []
+    date_col = field_map.get('Date', '')
+    number_fields = [f for f in ('Shares', 'Price', 'Exchange rate', 'Total', 'Result') if f in field_map]
+    date_format = decimal = None
 
-    for row in reader:
-        action_val = row.get(field_map.get('Action', ''), '').strip().lower()
-        
-        # Meta/Schwab RSU vest is often "restricted stock lapse"
-        # Google/Morgan Stanley might be "release", "vest", or "deposit"
-        is_rsu_vest = False
-        if action_val in ['restricted stock lapse', 'lapse', 'release', 'vest', 'vesting', 'deposit']:
-            action = 'market buy'
-            is_rsu_vest = True
-        elif action_val in ['sell to cover', 'taxes', 'tax withholding', 'sell to cover taxes']:
-            action = 'market sell'
-        else:
-            action = action_val
-            
-        if not action:
-            continue
+    while batch := list(itertools.islice(reader, PARSE_BATCH_ROWS)):
+        if decimal is None:
+            # One date format and number style per file, sniffed from the first batch
+            date_format = sniff_date_format(sample_values([row.get(date_col) or '' for row in batch]), DATE_FORMATS)
+            decimal = sniff_decimal_separator([
+                value for f in number_fields for value in sample_values([row.get(field_map[f]) or '' for row in batch])
+            ])
+        dates = parse_date_column([row.get(date_col) or '' for row in batch], date_format)
+        numbers = {
+            f: parse_number_column([row.get(field_map[f]) or '' for row in batch], decimal)
+            for f in number_fields
+        }
+        for i, row in enumerate(batch):
+            parsed = {f: numbers[f][i] for f in number_fields}
+            parsed['Date'] = dates[i]
+            txn = _build_transaction(row, field_map, parsed)
+            if txn is not False:
+                yield txn
+
+def _number_or_fallback(parsed: float | None, raw: str | None) -> float:
+    """The column-parsed number, else the row-level parse of the raw value (empty reads as 0)."""
+    if parsed is not None:
+        return parsed
+    return float((raw or '').strip().replace(',', '').replace('$', '') or '0')
+
+def _optional_number(parsed: float | None, raw: str | None) -> float | None:
+    """Like _number_or_fallback, but empty or unreadable values are None."""
+    try:
+        value = _number_or_fallback(parsed, raw)
+    except ValueError:
+        return None
+    return value if parsed is not None or (raw or '').strip() else None
+
+def _build_transaction(row: dict, field_map: dict, parsed: dict) -> dict | None | bool:
+    """
+    One raw transaction from a CSV row, given its column-parsed numbers and date
+    (None where the sniffed formats missed). Returns None for a malformed row and
+    False for a row that is not a trade.
+    """
+    action_val = row.get(field_map.get('Action', ''), '').strip().lower()
 
-        raw_ticker = row.get(field_map.get('Ticker', ''), '').strip()
-        ticker = clean_ticker(raw_ticker)
-        
-        # For RSU platforms, they might not provide a ticker if it's single-company stock plan.
-        # But we need one. We'll fallback to "UNKNOWN" and let the user edit it later,
-        # or if the user uploads a Meta/Google CSV we could try to guess from the file name, 
-        # but for now 'UNKNOWN' is safer if completely missing.
-        if not ticker:
-            if is_rsu_vest or action_val in ['sell to cover', 'taxes', 'tax withholding', 'sell to cover taxes']:
-                # If they are uploading Meta/Google RSU vests without ticker, try to guess from description or just set to RSU
-                desc = row.get(field_map.get('Name', ''), '').strip().lower()
-                if 'meta' in desc or 'facebook' in desc:
-                    ticker = 'META'
-                elif 'google' in desc or 'alphabet' in desc:
-                    ticker = 'GOOGL'
-                else:
-                    ticker = 'UNKNOWN'
+    # Meta/Schwab RSU vest is often "restricted stock lapse"
+    # Google/Morgan Stanley might be "release", "vest", or "deposit"
+    is_rsu_vest = False
+    if action_val in ['restricted stock lapse', 'lapse', 'release', 'vest', 'vesting', 'deposit']:
+        action = 'market buy'
+        is_rsu_vest = True
+    elif action_val in ['sell to cover', 'taxes', 'tax withholding', 'sell to cover taxes']:
+        action = 'market sell'
+    else:
+        action = action_val
+
+    if not action:
+        return False
+
+    raw_ticker = row.get(field_map.get('Ticker', ''), '').strip()
+    ticker = clean_ticker(raw_ticker)
+
+    # For RSU platforms, they might not provide a ticker if it's single-company stock plan.
+    # But we need one. We'll fallback to "UNKNOWN" and let the user edit it later,
+    # or if the user uploads a Meta/Google CSV we could try to guess from the file name, 
+    # but for now 'UNKNOWN' is safer if completely missing.
+    if not ticker:
+        if is_rsu_vest or action_val in ['sell to cover', 'taxes', 'tax withholding', 'sell to cover taxes']:
+            # If they are uploading Meta/Google RSU vests without ticker, try to guess from description or just set to RSU
+            desc = row.get(field_map.get('Name', ''), '').strip().lower()
+            if 'meta' in desc or 'facebook' in desc:
+                ticker = 'META'
+            elif 'google' in desc or 'alphabet' in desc:
+                ticker = 'GOOGL'
             else:
-                continue
+                ticker = 'UNKNOWN'
+        else:
+            return False
 
-        try:
-            shares_str = row.get(field_map.get('Shares', ''), '0').strip().replace(',', '')
-            shares = float(shares_str or '0')
-            price_str = row.get(field_map.get('Price', ''), '0').strip().replace(',', '').replace('$', '')
-            price = float(price_str or '0')
-        except (ValueError, TypeError):
-            continue  # Skip malformed rows
-
-        if shares == 0:
-            continue
+    try:
+        shares = _number_or_fallback(parsed.get('Shares'), row.get(field_map.get('Shares', ''), '0'))
+        price = _number_or_fallback(parsed.get('Price'), row.get(field_map.get('Price', ''), '0'))
+    except (ValueError, TypeError):
+        return None  # Malformed row
 
-        # If price is 0 (some brokers don't provide it), try to auto-fetch the historical price
-        if price == 0 and ticker and ticker != 'UNKNOWN':
-            try:
-                import yfinance as yf
-                from datetime import timedelta
-                # We need the executed_at date to fetch historical price
-                time_str = row.get(field_map.get('Date', ''), '').strip()
-                temp_date = None
-                if time_str:
-                    for fmt in ['%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d', '%m/%d/%Y %H:%M:%S', '%m/%d/%Y', '%d/%m/%Y', '%d-%b-%Y']:
-                        try:
-                            temp_date = datetime.strptime(time_str, fmt)
-                            break
-                        except ValueError:
-                            continue
-                if not temp_date:
-                    try:
-                        temp_date = datetime.fromisoformat(time_str)
-                    except ValueError:
-                        temp_date = datetime.now()
-                
-                # Fetch closing price for that day
-                start_d = temp_date.strftime('%Y-%m-%d')
-                end_d = (temp_date + timedelta(days=3)).strftime('%Y-%m-%d')
-                data = yf.download(ticker, start=start_d, end=end_d, progress=False)
-                if not data.empty:
-                    price = float(data['Close'].iloc[0].item())
-            except Exception:
-                pass
-
-        # Parse optional fields
-        name = row.get(field_map.get('Name', ''), '').strip()
-        external_id = row.get(field_map.get('ID', ''), '').strip()
-        currency = row.get(field_map.get('Currency', ''), '').strip()
+    if shares == 0:
+        return False
+
+    # Parse optional fields
+    name = row.get(field_map.get('Name', ''), '').strip()
+    external_id = row.get(field_map.get('ID', ''), '').strip()
+    currency = row.get(field_map.get('Currency', ''), '').strip()
+
+    # Exchange rate, total in local currency and result (for sells) are optional
+    exchange_rate = total_in_local = result_in_local = None
+    if 'Exchange rate' in field_map:
+        exchange_rate = _optional_number(parsed.get('Exchange rate'), row.get(field_map['Exchange rate']))
+    if 'Total' in field_map:
+        total_in_local = _optional_number(parsed.get('Total'), row.get(field_map['Total']))
+    if 'Result' in field_map:
+        result_in_local = _optional_number(parsed.get('Result'), row.get(field_map['Result']))
+
+    # Rows the sniffed date format missed are parsed on their own (now when missing or unparseable)
+    executed_at = parsed.get('Date') or parse_timestamp((row.get(field_map.get('Date', '')) or '').strip())
+
+    return {
+        "external_id": external_id,
+        "action": action,
+        "ticker": ticker,
+        "name": name,
+        "isin": "",
+        "shares": shares,
+        "price_per_share": price,
+        "currency": currency,
+        "exchange_rate": exchange_rate,
+        "total_in_local": total_in_local,
+        "result_in_local": result_in_local,
+        "executed_at": executed_at,
+    }
+
+def parse_csv_rows(file_content: str) -> list[dict]:
+    """Parse a whole broker CSV export held in memory; see iter_csv_rows."""
+    if not file_content or not file_content.strip():
+        return []
+    return [row for row in iter_csv_rows(file_content.splitlines()) if row is not None]
+
+def missing_price_requests(rows: list[dict]) -> set[tuple[str, date]]:
+    """(ticker, trade date) pairs for rows whose broker omitted the price."""
+    return {
+        (row["ticker"], row["executed_at"].date())
+        for row in rows
+        if row["price_per_share"] == 0 and row["ticker"] and row["ticker"] != 'UNKNOWN'
+    }
 
+def finalize_transactions(rows: list[dict], prices: dict[tuple[str, date], float]) -> list[dict]:
+    """
+    Fill omitted prices from `prices` (keyed like missing_price_requests), normalize
+    pence to pounds and assign deterministic external ids to rows without one.
+    """
+    transactions = []
+    for row in rows:
+        txn = dict(row)
+        price = txn["price_per_share"]
+        if price == 0:
+            price = prices.get((txn["ticker"], txn["executed_at"].date()), 0.0)
+
+        currency = txn["currency"]
         if currency.upper() in ["GBP", "GBX"]:
             if currency in ["GBp", "GBX", "gbp", "gbx"]:
                 price = price / 100.0
             currency = "GBP"
-
-        # Exchange rate
-        exchange_rate = None
-        if 'Exchange rate' in field_map:
-            try:
-                er_val = row.get(field_map['Exchange rate'], '').strip()
-                exchange_rate = float(er_val) if er_val else None
-            except (ValueError, TypeError):
-                pass
-
-        # Total in local currency
-        total_in_local = None
-        if 'Total' in field_map:
-            try:
-                t_val = row.get(field_map['Total'], '').strip().replace(',', '').replace('$', '')
-                total_in_local = float(t_val) if t_val else None
-            except (ValueError, TypeError):
-                pass
-
-        # Result (for sells)
-        result_in_local = None
-        if 'Result' in field_map:
-            try:
-                r_val = row.get(field_map['Result'], '').strip().replace(',', '').replace('$', '')
-                result_in_local = float(r_val) if r_val else None
-            except (ValueError, TypeError):
-                pass
-
-        # Parse timestamp
-        time_str = row.get(field_map.get('Date', ''), '').strip()
-        executed_at = None
-        if time_str:
-            # Try multiple formats
-            formats = [
-                '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d',
-                '%m/%d/%Y %H:%M:%S', '%m/%d/%Y', '%d/%m/%Y', '%d-%b-%Y'
-            ]
-            for fmt in formats:
-                try:
-                    executed_at = datetime.strptime(time_str, fmt)
-                    break
-                except ValueError:
-                    continue
-            if not executed_at:
-                try:
-                    executed_at = datetime.fromisoformat(time_str)
-                except ValueError:
-                    pass
-                    
-        # If still no date, default to now or skip
-        if not executed_at:
-            executed_at = datetime.now()
+        txn["price_per_share"] = price
+        txn["currency"] = currency
 
         # Generate deterministic external ID for deduplication if missing
-        if not external_id:
-            import hashlib
-            raw_str = f"{executed_at.isoformat()}_{action}_{ticker}_{shares}_{price}"
-            external_id = hashlib.md5(raw_str.encode()).hexdigest()
-
-        transactions.append({
-            "external_id": external_id,
-            "action": action,
-            "ticker": ticker,
-            "name": name,
-            "isin": "",
-            "shares": shares,
-            "price_per_share": price,
-            "currency": currency,
-            "exchange_rate": exchange_rate,
-            "total_in_local": total_in_local,
-            "result_in_local": result_in_local,
-            "executed_at": executed_at,
-        })
-
+        if not txn["external_id"]:
+            raw_str = f"{txn['executed_at'].isoformat()}_{txn['action']}_{txn['ticker']}_{txn['shares']}_{price}"
+            txn["external_id"] = hashlib.md5(raw_str.encode()).hexdigest()
+        transactions.append(txn)
     return transactions
 
-def compute_holdings(transactions: list[dict]) -> list[dict]:
-    buy_actions = {'market buy', 'limit buy'}
-    sell_actions = {'market sell', 'limit sell'}
+def closes_as_of(closes, requests: set[tuple[str, date]]) -> dict[tuple[str, date], float]:
+    """
+    Pick the first close on or within PRICE_LOOKUP_WINDOW_DAYS after each requested
+    day from a DataFrame of closes (one column per ticker, indexed by date).
+    """
+    window = np.timedelta64(PRICE_LOOKUP_WINDOW_DAYS, "D")
+    by_ticker: dict[str, list[date]] = {}
+    for ticker, day in requests:
+        by_ticker.setdefault(ticker, []).append(day)
 
-    agg: dict[str, dict] = {}
+    found = {}
+    for ticker, days in by_ticker.items():
+        if ticker not in closes.columns:
+            continue
+        series = closes[ticker].dropna()
+        if series.empty:
+            continue
+        index_days = series.index.values.astype("datetime64[D]")
+        values = series.to_numpy(dtype=np.float64)
+        wanted = np.array(days, dtype="datetime64[D]")
+        idx = np.searchsorted(index_days, wanted, side="left")
+        for day, want, i in zip(days, wanted, idx.tolist()):
+            if i < len(index_days) and index_days[i] < want + window:
+                found[(ticker, day)] = float(values[i])
+    return found
+
+def fetch_historical_closes(requests: set[tuple[str, date]]) -> dict[tuple[str, date], float]:
+    """
+    Resolve (ticker, day) prices with a single multi-ticker yfinance download spanning
+    every requested day. Pairs without data are left out.
+    """
+    if not requests:
+        return {}
+    import yfinance as yf
+
+    tickers = sorted({ticker for ticker, _ in requests})
+    start = min(day for _, day in requests)
+    end = max(day for _, day in requests) + timedelta(days=PRICE_LOOKUP_WINDOW_DAYS)
+    try:
+        data = yf.download(tickers, start=start.isoformat(), end=end.isoformat(), progress=False)
+    except Exception:
+        return {}
+    if data is None or data.empty:
+        return {}
+
+    closes = data["Close"]
+    if not hasattr(closes, "columns"):
+        # Older yfinance returns a Series for a single ticker
+        closes = closes.to_frame(tickers[0])
+    return closes_as_of(closes, requests)
+
+def detect_and_parse_csv(file_content: str, price_lookup=fetch_historical_closes) -> list[dict]:
+    """
+    Parse a broker CSV export into transaction dicts. Prices the broker omitted
+    (typical of RSU vest exports) are resolved in one batch by `price_lookup`,
+    which maps a set of (ticker, day) pairs to closes.
+    """
+    rows = parse_csv_rows(file_content)
+    requests = missing_price_requests(rows)
+    prices = price_lookup(requests) if requests else {}
+    return finalize_transactions(rows, prices)
+
+BUY_ACTIONS = ('market buy', 'limit buy')
+SELL_ACTIONS = ('market sell', 'limit sell')
 
+def new_position_state(name: str = "") -> dict:
+    """Replay state of one ticker before any transaction has been applied."""
+    return {"shares": 0.0, "cost_total": 0.0, "realized_pnl": 0.0, "split_cost": None, "name": name}
+
+def apply_transaction(state: dict, txn: dict) -> None:
+    """
+    Apply one transaction (action, shares, price_per_share, name) to a ticker's
+    replay state in place: buys add at cost, sells realize P&L against the average
+    cost, and a split's cost basis carries from its close leg to its open leg.
+    """
+    action = txn["action"].lower()
+    shares = txn["shares"]
+    price = txn["price_per_share"]
+
+    if action.startswith(BUY_ACTIONS):
+        state["shares"] += shares
+        state["cost_total"] += shares * price
+        if txn.get("name"):
+            state["name"] = txn["name"]
+
+    elif action.startswith(SELL_ACTIONS):
+        current_avg_cost = (
+            state["cost_total"] / state["shares"]
+            if state["shares"] > 0 else 0
+        )
+        cost_of_sold = shares * current_avg_cost
+        proceeds = shares * price
+        state["realized_pnl"] += proceeds - cost_of_sold
+
+        state["shares"] -= shares
+        state["cost_total"] -= cost_of_sold
+
+        if state["shares"] < 0.0001:
+            state["shares"] = 0.0
+            state["cost_total"] = 0.0
+
+    elif action == "stock split close":
+        saved_cost = state["cost_total"]
+        state["shares"] -= shares
+        if state["shares"] < 0.0001:
+            state["shares"] = 0.0
+        if state["shares"] == 0:
+            state["split_cost"] = saved_cost
+            state["cost_total"] = 0.0
+
+    elif action == "stock split open":
+        state["shares"] += shares
+        if state["split_cost"] is not None:
+            state["cost_total"] += state["split_cost"]
+            state["split_cost"] = None
+        else:
+            state["cost_total"] += shares * price
+
+def holding_from_state(ticker: str, state: dict) -> dict:
+    """The rounded holding summary for a ticker's replay state."""
+    avg_cost = round(state["cost_total"] / state["shares"], 2) if state["shares"] > 0 else 0
+    return {
+        "ticker": ticker,
+        "shares": round(state["shares"], 6),
+        "avg_cost_basis": avg_cost,
+        "realized_pnl": round(state["realized_pnl"], 2),
+        "name": state["name"],
+    }
+
+def compute_holdings(transactions: list[dict]) -> list[dict]:
+    agg: dict[str, dict] = {}
     for txn in transactions:
-        action = txn["action"].lower()
         ticker = txn["ticker"]
-        shares = txn["shares"]
-        price = txn["price_per_share"]
-
         if ticker not in agg:
-            agg[ticker] = {
-                "shares": 0.0,
-                "cost_total": 0.0,
-                "realized_pnl": 0.0,
-                "name": txn.get("name", ""),
-            }
-
-        if any(action.startswith(ba) for ba in buy_actions):
-            agg[ticker]["shares"] += shares
-            agg[ticker]["cost_total"] += shares * price
-            if txn.get("name"):
-                agg[ticker]["name"] = txn["name"]
-
-        elif any(action.startswith(sa) for sa in sell_actions):
-            current_avg_cost = (
-                agg[ticker]["cost_total"] / agg[ticker]["shares"]
-                if agg[ticker]["shares"] > 0 else 0
-            )
-            cost_of_sold = shares * current_avg_cost
-            proceeds = shares * price
-            agg[ticker]["realized_pnl"] += proceeds - cost_of_sold
-
-            agg[ticker]["shares"] -= shares
-            agg[ticker]["cost_total"] -= cost_of_sold
-
-            if agg[ticker]["shares"] < 0.0001:
-                agg[ticker]["shares"] = 0.0
-                agg[ticker]["cost_total"] = 0.0
-
-        elif action == "stock split close":
-            saved_cost = agg[ticker]["cost_total"]
-            agg[ticker]["shares"] -= shares
-            if agg[ticker]["shares"] < 0.0001:
-                agg[ticker]["shares"] = 0.0
-            if agg[ticker]["shares"] == 0:
-                agg[ticker]["_split_cost"] = saved_cost
-                agg[ticker]["cost_total"] = 0.0
-
-        elif action == "stock split open":
-            agg[ticker]["shares"] += shares
-            if "_split_cost" in agg[ticker]:
-                agg[ticker]["cost_total"] += agg[ticker].pop("_split_cost")
-            else:
-                agg[ticker]["cost_total"] += shares * price
-
-    result = []
-    for ticker, data in sorted(agg.items()):
-        avg_cost = round(data["cost_total"] / data["shares"], 2) if data["shares"] > 0 else 0
-        result.append({
-            "ticker": ticker,
-            "shares": round(data["shares"], 6),
-            "avg_cost_basis": avg_cost,
-            "realized_pnl": round(data["realized_pnl"], 2),
-            "name": data["name"],
-        })
-
-    return result
+            agg[ticker] = new_position_state(txn.get("name", ""))
+        apply_transaction(agg[ticker], txn)
+
+    return [holding_from_state(ticker, state) for ticker, state in sorted(agg.items())]
@@ -181,55 +181,46 @@ async def gather_monthly_summary_context(db: AsyncSession, user_id: int, month:
     """Gather monthly financial summary context for a user in INR terms."""
     import datetime
     from sqlalchemy import select, and_
-    from app.models import Expense, LinkedAccount, FinancialGoal, GoalContribution, PortfolioHolding, ManualAsset, Account, NetWorthSnapshot, User
-    from app.cache import get_live_price, get_cache
-    from api.routes.finance import convert_currency, capture_user_net_worth_snapshot
-
-    # Parse month YYYY-MM
+    from app.models import Expense, FinancialGoal, GoalContribution, NetWorthSnapshot
+    from app.cache import convert_currency
+    from app.valuation import get_household_valuation, linked_goal_asset_value
+    from api.routes.finance import capture_user_net_worth_snapshot
+    from app.expense_summary import month_range, get_expense_summary
+    from app.household import get_household
+
+    # Parse month YYYY-MM into a half-open [start_date, end_date) range
     try:
-        year, m = map(int, month.split('-'))
-        start_date = datetime.datetime(year, m, 1, tzinfo=datetime.timezone.utc)
-        if m == 12:
-            end_date = datetime.datetime(year + 1, 1, 1, tzinfo=datetime.timezone.utc)
-        else:
-            end_date = datetime.datetime(year, m + 1, 1, tzinfo=datetime.timezone.utc)
+        start_date, end_date = month_range(month)
     except ValueError:
         logger.error(f"Invalid month format: {month}. Expected YYYY-MM.")
         raise ValueError("Invalid month format, expected YYYY-MM")
 
-    # Fetch linked partner user IDs
-    links = await db.execute(select(LinkedAccount.linked_user_id).where(LinkedAccount.user_id == user_id))
-    linked_ids = [r[0] for r in links.all()]
-    all_user_ids = [user_id] + linked_ids
-
-    # User mapping for names
-    users_res = await db.execute(select(User).where(User.id.in_(all_user_ids)))
-    user_map = {u.id: (u.name or u.email.split('@')[0]) for u in users_res.scalars().all()}
-
-    # 1. Fetch Expenses
-    expense_query = select(Expense).where(
-        and_(
-            Expense.owner_id.in_(all_user_ids),
-            Expense.date >= start_date,
-            Expense.date < end_date
-        )
-    )
-    result = await db.execute(expense_query.order_by(Expense.date.desc()))
-    expenses = result.scalars().all()
+    # Household member IDs and display names
+    household = await get_household(db, user_id)
+    all_user_ids = household["member_ids"]
+    user_map = household["names"]
 
-    total_expenses = sum(e.amount for e in expenses)
-    expenses_by_category = {}
-    for e in expenses:
-        expenses_by_category[e.category] = expenses_by_category.get(e.category, 0.0) + e.amount
+    # 1. Expense totals come from the (cached) SQL rollups; only the top 5 rows are fetched
+    month_summary = (await get_expense_summary(db, all_user_ids, month, month))["months"][0]
+    total_expenses = month_summary["total"]
+    expenses_by_category = month_summary["by_category"]
 
     expenses_by_category_pct = {}
     for cat, amt in expenses_by_category.items():
         expenses_by_category_pct[cat] = (amt / total_expenses * 100) if total_expenses > 0 else 0.0
 
     # Top 5 expenses by amount
-    sorted_expenses = sorted(expenses, key=lambda x: x.amount, reverse=True)
+    top_res = await db.execute(
+        select(Expense).where(
+            and_(
+                Expense.owner_id.in_(all_user_ids),
+                Expense.date >= start_date,
+                Expense.date < end_date
+            )
+        ).order_by(Expense.amount.desc(), Expense.date.desc()).limit(5)
+    )
     top_5_expenses = []
-    for e in sorted_expenses[:5]:
+    for e in top_res.scalars().all():
         payer_name = user_map.get(e.owner_id, "Unknown")
         top_5_expenses.append({
             "date": e.date.strftime("%Y-%m-%d"),
@@ -249,55 +240,33 @@ async def gather_monthly_summary_context(db: AsyncSession, user_id: int, month:
     )
     goals = goals_res.scalars().all()
 
-    goals_summary = []
-    for goal in goals:
+    # Contributions for every goal in one query
+    contribs_by_goal: Dict[int, float] = {}
+    if goals:
         contribs_res = await db.execute(
             select(GoalContribution)
             .where(
                 and_(
-                    GoalContribution.goal_id == goal.id,
+                    GoalContribution.goal_id.in_([g.id for g in goals]),
                     GoalContribution.date < end_date
                 )
             )
         )
-        contribs = contribs_res.scalars().all()
-        total_manual_saved = sum(c.amount for c in contribs)
-
-        # Linked asset value
-        linked_asset_value = 0.0
-        if goal.linked_asset_type == "portfolio" and goal.linked_asset_id:
-            holdings_res = await db.execute(
-                select(PortfolioHolding)
-                .where(PortfolioHolding.portfolio_id == goal.linked_asset_id)
-            )
-            holdings = holdings_res.scalars().all()
-            portfolio_val_usd = 0.0
-            for h in holdings:
-                price = await get_live_price(h.ticker, fallback=h.avg_cost_basis)
-                ticker_currency = (await get_cache(f"currency:{h.ticker}")) or "USD"
-                price_usd = await convert_currency(price, ticker_currency, "USD")
-                portfolio_val_usd += h.shares * price_usd
-            linked_asset_value = portfolio_val_usd
-        elif goal.linked_asset_type == "manual_asset" and goal.linked_asset_id:
-            asset_res = await db.execute(
-                select(ManualAsset)
-                .where(ManualAsset.id == goal.linked_asset_id)
-            )
-            asset = asset_res.scalar_one_or_none()
-            if asset:
-                linked_asset_value = asset.value
-        elif goal.linked_asset_type == "account" and goal.linked_asset_id:
-            account_res = await db.execute(
-                select(Account)
-                .where(Account.id == goal.linked_asset_id)
-            )
-            account = account_res.scalar_one_or_none()
-            if account:
-                linked_asset_value = await convert_currency(account.balance, account.currency, "USD")
+        for c in contribs_res.scalars().all():
+            contribs_by_goal[c.goal_id] = contribs_by_goal.get(c.goal_id, 0.0) + c.amount
+
+    # Shared household valuation (live prices, FX) and a single USD -> INR rate
+    valuation = await get_household_valuation(db, user_id)
+    usd_to_inr = await convert_currency(1.0, "USD", "INR")
+
+    goals_summary = []
+    for goal in goals:
+        total_manual_saved = contribs_by_goal.get(goal.id, 0.0)
+        linked_asset_value = linked_goal_asset_value(valuation, goal.linked_asset_type, goal.linked_asset_id)
 
         # Convert goal targets and total_saved to INR
-        total_saved_inr = await convert_currency(total_manual_saved + linked_asset_value, "USD", "INR")
-        target_amount_inr = await convert_currency(goal.target_amount, "USD", "INR")
+        total_saved_inr = (total_manual_saved + linked_asset_value) * usd_to_inr
+        target_amount_inr = goal.target_amount * usd_to_inr
         progress_percent = min((total_saved_inr / target_amount_inr) * 100, 100.0) if target_amount_inr > 0 else 0.0
 
         goals_summary.append({
@@ -328,7 +297,7 @@ async def gather_monthly_summary_context(db: AsyncSession, user_id: int, month:
 
     # Capture live snapshot if missing and this is the current month
     today = datetime.datetime.now(datetime.timezone.utc)
-    if not curr_snapshot and year == today.year and m == today.month:
+    if not curr_snapshot and start_date.year == today.year and start_date.month == today.month:
         try:
             curr_snapshot = await capture_user_net_worth_snapshot(db, user_id, today)
         except Exception as e:
@@ -352,104 +321,61 @@ async def gather_monthly_summary_context(db: AsyncSession, user_id: int, month:
     current_assets = curr_snapshot.total_assets if curr_snapshot else 0.0
     current_liabilities = curr_snapshot.total_liabilities if curr_snapshot else 0.0
     
-    current_assets_inr = await convert_currency(current_assets, "USD", "INR")
-    current_liabilities_inr = await convert_currency(current_liabilities, "USD", "INR")
+    current_assets_inr = current_assets * usd_to_inr
+    current_liabilities_inr = current_liabilities * usd_to_inr
     current_nw_inr = current_assets_inr - current_liabilities_inr
 
     prev_assets = prev_snapshot.total_assets if prev_snapshot else 0.0
     prev_liabilities = prev_snapshot.total_liabilities if prev_snapshot else 0.0
 
-    prev_assets_inr = await convert_currency(prev_assets, "USD", "INR")
-    prev_liabilities_inr = await convert_currency(prev_liabilities, "USD", "INR")
+    prev_assets_inr = prev_assets * usd_to_inr
+    prev_liabilities_inr = prev_liabilities * usd_to_inr
     prev_nw_inr = prev_assets_inr - prev_liabilities_inr
 
     nw_change_inr = current_nw_inr - prev_nw_inr
     nw_change_pct = (nw_change_inr / prev_nw_inr * 100) if prev_nw_inr != 0 else 0.0
 
     # 4. Detailed Accounts breakdown
-    accounts_res = await db.execute(select(Account).where(Account.owner_id.in_(all_user_ids)))
-    accounts = accounts_res.scalars().all()
-    
-    accounts_summary = []
-    for a in accounts:
-        balance = a.balance
-        usd_bal = None
-        if a.account_class == "portfolio":
-            port_res_acc = await db.execute(select(Portfolio).where(Portfolio.account_id == a.id))
-            portfolios_acc = port_res_acc.scalars().all()
-            if portfolios_acc:
-                port_ids = [p.id for p in portfolios_acc]
-                holdings_res = await db.execute(select(PortfolioHolding).where(PortfolioHolding.portfolio_id.in_(port_ids)))
-                holdings = holdings_res.scalars().all()
-                portfolio_val_usd = 0.0
-                for h in holdings:
-                    price = await get_live_price(h.ticker, fallback=h.avg_cost_basis)
-                    ticker_currency = (await get_cache(f"currency:{h.ticker}")) or "USD"
-                    price_usd = await convert_currency(price, ticker_currency, "USD")
-                    portfolio_val_usd += h.shares * price_usd
-                balance = await convert_currency(portfolio_val_usd, "USD", a.currency)
-                usd_bal = portfolio_val_usd
-
-        if usd_bal is None:
-            usd_bal = await convert_currency(balance, a.currency, "USD")
-        
-        balance_inr = await convert_currency(usd_bal, "USD", "INR")
-        
-        accounts_summary.append({
-            "name": a.name,
-            "classification": a.classification,
-            "account_class": a.account_class,
-            "balance": balance,
-            "currency": a.currency,
-            "balance_inr": balance_inr
-        })
+    accounts_summary = [
+        {
+            "name": a["name"],
+            "classification": a["classification"],
+            "account_class": a["account_class"],
+            "balance": a["balance"],
+            "currency": a["currency"],
+            "balance_inr": a["balance_usd"] * usd_to_inr
+        }
+        for a in valuation["accounts"]
+    ]
 
     # 5. Detailed Portfolios breakdown
-    portfolios_res = await db.execute(select(Portfolio).where(Portfolio.owner_id.in_(all_user_ids)))
-    portfolios = portfolios_res.scalars().all()
-    
     portfolios_summary = []
-    for p in portfolios:
-        holdings_res = await db.execute(select(PortfolioHolding).where(PortfolioHolding.portfolio_id == p.id))
-        holdings = holdings_res.scalars().all()
-        
-        holdings_list = []
-        portfolio_val_usd = 0.0
-        for h in holdings:
-            price = await get_live_price(h.ticker, fallback=h.avg_cost_basis)
-            ticker_currency = (await get_cache(f"currency:{h.ticker}")) or "USD"
-            price_usd = await convert_currency(price, ticker_currency, "USD")
-            value_usd = h.shares * price_usd
-            portfolio_val_usd += value_usd
-            
-            value_inr = await convert_currency(value_usd, "USD", "INR")
-            holdings_list.append({
-                "ticker": h.ticker,
-                "shares": h.shares,
-                "avg_cost_basis": h.avg_cost_basis,
-                "current_price": price,
-                "value_inr": value_inr
-            })
-            
-        portfolio_val_inr = await convert_currency(portfolio_val_usd, "USD", "INR")
+    for p in valuation["portfolios"]:
+        holdings_list = [
+            {
+                "ticker": h["ticker"],
+                "shares": h["shares"],
+                "avg_cost_basis": h["avg_cost_basis"],
+                "current_price": h["price"],
+                "value_inr": h["value_usd"] * usd_to_inr
+            }
+            for h in p["holdings"]
+        ]
         portfolios_summary.append({
-            "name": p.name,
-            "total_value_inr": portfolio_val_inr,
+            "name": p["name"],
+            "total_value_inr": p["value_usd"] * usd_to_inr,
             "holdings": holdings_list
         })
-        
-    # 6. Fetch Manual Assets
-    manual_assets_res = await db.execute(select(ManualAsset).where(ManualAsset.owner_id.in_(all_user_ids)))
-    manual_assets = manual_assets_res.scalars().all()
-    
-    manual_assets_summary = []
-    for ma in manual_assets:
-        value_inr = await convert_currency(ma.value, "USD", "INR")
-        manual_assets_summary.append({
-            "asset_type": ma.asset_type,
-            "value_inr": value_inr,
-            "description": ma.description or ""
-        })
+
+    # 6. Manual Assets
+    manual_assets_summary = [
+        {
+            "asset_type": ma["asset_type"],
+            "value_inr": ma["value"] * usd_to_inr,
+            "description": ma["description"] or ""
+        }
+        for ma in valuation["manual_assets"]
+    ]
 
     return {
         "month": month,
@@ -0,0 +1,247 @@
+"""
+Per-user expense categorizer trained on the user's own labelled history.
+
+Descriptions are turned into hashed features (word unigrams, word bigrams and
+character trigrams of each word) and classified with multinomial naive Bayes
+in NumPy. Everything runs locally; no LLM or network access is involved.
+
+Models are trained incrementally: each user's model remembers the highest
+expense id it has seen and only learns from rows labelled after it. A count
+and checksum over the already-seen rows detects edits, deletions and
+re-categorizations of older rows, in which case the model is rebuilt from
+scratch. Trained models are cached in-process per user, least recently used
+first out once the cache holds CLASSIFIER_CACHE_BYTES of counts.
+"""
+import asyncio
+import re
+import zlib
+import weakref
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+from sqlalchemy import select, func, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Expense
+
+FEATURE_BITS = 15
+N_FEATURES = 1 << FEATURE_BITS
+SMOOTHING_ALPHA = 0.1
+MIN_TRAINING_ROWS = 20
+CONFIDENCE_THRESHOLD = 0.9
+TRAINING_BATCH_SIZE = 20_000
+PREDICT_CHUNK_ROWS = 4096
+# Budget for cached models' feature counts (each is N_FEATURES x 4 bytes per category)
+CLASSIFIER_CACHE_BYTES = 64 * 1024 * 1024
+
+# Words of two or more letters; digits in statements are mostly references and card numbers
+_WORD_RE = re.compile(r"[a-z][a-z&']+")
+
+def _hash_token(token: str) -> int:
+    return zlib.crc32(token.encode("utf-8")) & (N_FEATURES - 1)
+
+@lru_cache(maxsize=100_000)
+def _word_features(word: str) -> tuple[int, ...]:
+    # Statements repeat the same merchant words heavily, so per-word features are memoized
+    padded = f"#{word}#"
+    return (_hash_token(f"w:{word}"),) + tuple(_hash_token(f"c:{padded[i:i + 3]}") for i in range(len(padded) - 2))
+
+@lru_cache(maxsize=100_000)
+def _bigram_feature(first: str, second: str) -> int:
+    return _hash_token(f"b:{first} {second}")
+
+def _featurize(description: str | None) -> tuple[list[int], list[str]]:
+    # (all feature indices, the words they came from)
+    if not description:
+        return [], []
+    words = _WORD_RE.findall(description.lower())
+    features = []
+    for w in words:
+        features.extend(_word_features(w))
+    features.extend(_bigram_feature(a, b) for a, b in zip(words, words[1:]))
+    return features, words
+
+def description_features(description: str | None) -> list[int]:
+    """Hashed feature indices for a description (repeated indices count multiple times)."""
+    return _featurize(description)[0]
+
+class ExpenseClassifier:
+    """Multinomial naive Bayes over hashed description features, trainable in batches."""
+
+    def __init__(self):
+        self.categories: list[str] = []
+        self._category_index: dict[str, int] = {}
+        self.class_counts = np.zeros(0, dtype=np.float64)
+        # (feature, class) layout so a description's features gather as contiguous rows
+        self.feature_counts = np.zeros((N_FEATURES, 0), dtype=np.float32)
+        self.n_seen = 0
+        # Training watermark: highest expense id learned and a checksum over the rows seen
+        self.last_id = 0
+        self.checksum = 0
+        # Whole words seen in training; predictions need at least one of them
+        self.seen_words: set[str] = set()
+        self._log_totals = None
+        self._log_prior = None
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the feature counts, which dominate a model's size."""
+        return self.feature_counts.nbytes
+
+    @property
+    def ready(self) -> bool:
+        """True once there is enough labelled history to make predictions worth trusting."""
+        return self.n_seen >= MIN_TRAINING_ROWS and len(self.categories) >= 2
+
+    def partial_fit(self, descriptions: list[str | None], categories: list[str]):
+        """Learn from a batch of (description, category) pairs."""
+        new_categories = [c for c in dict.fromkeys(categories) if c not in self._category_index]
+        if new_categories:
+            for category in new_categories:
+                self._category_index[category] = len(self.categories)
+                self.categories.append(category)
+            self.class_counts = np.concatenate([self.class_counts, np.zeros(len(new_categories))])
+            self.feature_counts = np.hstack([
+                self.feature_counts,
+                np.zeros((N_FEATURES, len(new_categories)), dtype=np.float32)
+            ])
+
+        n_classes = len(self.categories)
+        labels = np.fromiter((self._category_index[c] for c in categories), dtype=np.int64, count=len(categories))
+        self.class_counts += np.bincount(labels, minlength=n_classes)
+
+        flat = []
+        for description, label in zip(descriptions, labels.tolist()):
+            features, words = _featurize(description)
+            flat.extend(f * n_classes + label for f in features)
+            self.seen_words.update(words)
+        if flat:
+            counts = np.bincount(np.asarray(flat, dtype=np.int64), minlength=N_FEATURES * n_classes)
+            self.feature_counts += counts.reshape(N_FEATURES, n_classes).astype(np.float32)
+
+        self.n_seen += len(categories)
+        self._log_totals = None
+
+    def _compile(self):
+        # Only the per-class normalizers are kept; log probabilities are computed for
+        # the features a batch actually uses, so no second (features x classes) table
+        if self._log_totals is None:
+            self._log_totals = np.log(self.feature_counts.sum(axis=0, dtype=np.float64) + SMOOTHING_ALPHA * N_FEATURES)
+            self._log_prior = np.log(self.class_counts / self.class_counts.sum())
+        return self._log_totals, self._log_prior
+
+    def _feature_log_prob(self, features: np.ndarray) -> np.ndarray:
+        """(len(features), n_classes) log P(feature | class) for the given feature indices."""
+        log_totals, _ = self._compile()
+        counts = self.feature_counts[features]
+        log_prob = np.log(counts + SMOOTHING_ALPHA, dtype=np.float64) - log_totals
+        # Features never seen in training carry no evidence; without this they favour small classes
+        log_prob[counts.sum(axis=1) == 0] = 0.0
+        return log_prob
+
+    def predict(self, descriptions: list[str | None]) -> list[tuple[str | None, float]]:
+        """
+        Return (category, confidence) per description, where confidence is the
+        posterior probability of the chosen category. (None, 0.0) where the model
+        is not trained yet or none of the description's words were seen in training,
+        since naive Bayes is overconfident on a handful of shared character n-grams.
+        """
+        if not self.categories:
+            return [(None, 0.0)] * len(descriptions)
+
+        _, log_prior = self._compile()
+        unique = [d for d in dict.fromkeys(descriptions) if d]
+        predictions: dict[str, tuple[str | None, float]] = {}
+
+        for start in range(0, len(unique), PREDICT_CHUNK_ROWS):
+            chunk = unique[start:start + PREDICT_CHUNK_ROWS]
+            featurized = [_featurize(d) for d in chunk]
+            features = [f for f, _ in featurized]
+            seen_words = self.seen_words
+            with_features = [
+                i for i, (_, words) in enumerate(featurized)
+                if any(w in seen_words for w in words)
+            ]
+            if not with_features:
+                continue
+            lengths = np.fromiter((len(features[i]) for i in with_features), dtype=np.int64, count=len(with_features))
+            indices = np.fromiter(
+                (f for i in with_features for f in features[i]), dtype=np.int64, count=int(lengths.sum())
+            )
+            row_starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+
+            used, positions = np.unique(indices, return_inverse=True)
+            scores = np.add.reduceat(self._feature_log_prob(used)[positions], row_starts, axis=0) + log_prior
+            scores -= scores.max(axis=1, keepdims=True)
+            probs = np.exp(scores)
+            probs /= probs.sum(axis=1, keepdims=True)
+            best = probs.argmax(axis=1)
+            confidence = probs[np.arange(len(best)), best]
+
+            for row, label, conf in zip(with_features, best.tolist(), confidence.tolist()):
+                predictions[chunk[row]] = (self.categories[label], conf)
+
+        return [predictions.get(d, (None, 0.0)) if d else (None, 0.0) for d in descriptions]
+
+    def categorize(self, descriptions: list[str | None], threshold: float = CONFIDENCE_THRESHOLD) -> list[str | None]:
+        """Predicted category per description, or None when not confident enough (or not ready)."""
+        if not self.ready:
+            return [None] * len(descriptions)
+        return [
+            category if category is not None and confidence >= threshold else None
+            for category, confidence in self.predict(descriptions)
+        ]
+
+_classifier_cache: "OrderedDict[int, ExpenseClassifier]" = OrderedDict()
+# A user's lock lives only while a call holds or awaits it, so evicting a model
+# never separates concurrent trainers of the same user onto different locks
+_training_locks: "weakref.WeakValueDictionary[int, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+def _labelled_filter(owner_id: int):
+    return and_(Expense.owner_id == owner_id, Expense.category != "Uncategorized")
+
+def _row_checksum():
+    # Changes when a seen row's category or description is edited
+    return func.hashtext(func.concat(Expense.category, "|", Expense.description))
+
+async def get_expense_classifier(db: AsyncSession, owner_id: int) -> ExpenseClassifier:
+    """
+    Return the user's classifier, brought up to date with their categorized expenses.
+    Only rows labelled since the last call are read, unless older rows changed.
+    """
+    lock = _training_locks.setdefault(owner_id, asyncio.Lock())
+    async with lock:
+        model = _classifier_cache.get(owner_id) or ExpenseClassifier()
+
+        if model.last_id:
+            seen_res = await db.execute(
+                select(func.count(), func.coalesce(func.sum(_row_checksum()), 0)).where(
+                    and_(_labelled_filter(owner_id), Expense.id <= model.last_id)
+                )
+            )
+            count, checksum = seen_res.one()
+            if count != model.n_seen or int(checksum) != model.checksum:
+                model = ExpenseClassifier()
+
+        while True:
+            rows = (await db.execute(
+                select(Expense.id, Expense.description, Expense.category, _row_checksum())
+                .where(and_(_labelled_filter(owner_id), Expense.id > model.last_id))
+                .order_by(Expense.id)
+                .limit(TRAINING_BATCH_SIZE)
+            )).all()
+            if not rows:
+                break
+            model.partial_fit([r[1] for r in rows], [r[2] for r in rows])
+            model.last_id = rows[-1][0]
+            model.checksum += sum(r[3] for r in rows)
+
+        _classifier_cache[owner_id] = model
+        _classifier_cache.move_to_end(owner_id)
+        # The model just returned always stays, even when it alone exceeds the budget
+        cached_bytes = sum(m.nbytes for m in _classifier_cache.values())
+        while cached_bytes > CLASSIFIER_CACHE_BYTES and len(_classifier_cache) > 1:
+            _, evicted_model = _classifier_cache.popitem(last=False)
+            cached_bytes -= evicted_model.nbytes
+        return model
@@ -0,0 +1,228 @@
+"""
+Expense rollups computed in Postgres.
+
+Each (owner, month) rollup comes from one GROUP BY over day, category, payer and
+the joint flag; household summaries merge the rollups of every member in Python.
+Closed months (before the current UTC month) are cached per owner and month
+and invalidated only when an expense in that month changes, so a year of
+history costs one MGET once warm. The current month is always computed live.
+"""
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable
+
+from sqlalchemy import select, func, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import get_cache_many, set_cache, delete_cache
+from app.models import Expense, RawExpense
+
+# Closed months only change through the invalidation hooks; the TTL is a safety net
+SUMMARY_CACHE_TTL = 7 * 24 * 3600
+MAX_SUMMARY_MONTHS = 120
+
+def month_range(month: str) -> tuple[datetime, datetime]:
+    """
+    Half-open UTC bounds [start, end) for a YYYY-MM month. Filtering with
+    `date >= start AND date < end` lets Postgres use the (owner_id, date) indexes,
+    unlike extracting the year and month from every row. Raises ValueError.
+    """
+    year, m = map(int, month.split('-'))
+    start = datetime(year, m, 1, tzinfo=timezone.utc)
+    end = datetime(year + 1, 1, 1, tzinfo=timezone.utc) if m == 12 else datetime(year, m + 1, 1, tzinfo=timezone.utc)
+    return start, end
+
+def month_of(date: datetime) -> str:
+    """YYYY-MM of a timestamp in UTC (naive timestamps are taken as UTC)."""
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return date.astimezone(timezone.utc).strftime("%Y-%m")
+
+def add_months(month: str, count: int) -> str:
+    """The YYYY-MM `count` months after (or before, if negative) `month`. Raises ValueError."""
+    start, _ = month_range(month)
+    index = start.year * 12 + start.month - 1 + count
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+def month_sequence(start_month: str, end_month: str) -> list[str]:
+    """Every YYYY-MM from start_month to end_month inclusive. Raises ValueError."""
+    start, _ = month_range(start_month)
+    end, _ = month_range(end_month)
+    first = start.year * 12 + start.month - 1
+    last = end.year * 12 + end.month - 1
+    return [f"{index // 12:04d}-{index % 12 + 1:02d}" for index in range(first, last + 1)]
+
+def _cache_key(owner_id: int, month: str) -> str:
+    # v2: rollups gained the per-day and settle-up breakdowns
+    return f"expense_summary:v2:{owner_id}:{month}"
+
+# Breakdowns keyed by category, YYYY-MM-DD day, payer id, owner id or "owner:payer"
+_BREAKDOWNS = ("by_category", "by_day", "by_payer", "joint_by_payer", "personal_by_owner", "personal_paid_by_others")
+
+def _empty_rollup() -> Dict[str, Any]:
+    return {"total": 0.0, "count": 0, "joint": 0.0, "personal": 0.0, **{field: {} for field in _BREAKDOWNS}}
+
+def _add_into(target: Dict[str, Any], rollup: Dict[str, Any]):
+    target["total"] += rollup["total"]
+    target["count"] += rollup["count"]
+    target["joint"] += rollup["joint"]
+    target["personal"] += rollup["personal"]
+    for field in _BREAKDOWNS:
+        for key, amount in rollup[field].items():
+            target[field][key] = target[field].get(key, 0.0) + amount
+
+async def _query_rollups(
+    db: AsyncSession, owner_ids: list[int], start: datetime, end: datetime
+) -> Dict[tuple[int, str], Dict[str, Any]]:
+    """Per-(owner, month) rollups for [start, end) from a single GROUP BY."""
+    # The payer is whoever recorded the expense (first raw row), falling back to the owner
+    payer = func.coalesce(
+        select(RawExpense.owner_id)
+        .where(RawExpense.expense_id == Expense.id)
+        .order_by(RawExpense.id)
+        .limit(1)
+        .scalar_subquery(),
+        Expense.owner_id
+    )
+    rows = select(
+        Expense.owner_id.label("owner_id"),
+        func.to_char(func.timezone("UTC", Expense.date), "YYYY-MM-DD").label("day"),
+        Expense.category.label("category"),
+        payer.label("payer_id"),
+        Expense.is_joint.label("is_joint"),
+        Expense.amount.label("amount")
+    ).where(
+        and_(
+            Expense.owner_id.in_(owner_ids),
+            Expense.date >= start,
+            Expense.date < end
+        )
+    ).subquery()
+
+    result = await db.execute(
+        select(
+            rows.c.owner_id, rows.c.day, rows.c.category, rows.c.payer_id, rows.c.is_joint,
+            func.sum(rows.c.amount), func.count()
+        ).group_by(rows.c.owner_id, rows.c.day, rows.c.category, rows.c.payer_id, rows.c.is_joint)
+    )
+
+    rollups: Dict[tuple[int, str], Dict[str, Any]] = {}
+    for owner_id, day, category, payer_id, is_joint, total, count in result.all():
+        rollup = rollups.setdefault((owner_id, day[:7]), _empty_rollup())
+        _add_into(rollup, {
+            "total": total,
+            "count": count,
+            "joint": total if is_joint else 0.0,
+            "personal": 0.0 if is_joint else total,
+            "by_category": {category: total},
+            "by_day": {day: total},
+            "by_payer": {str(payer_id): total},
+            # Settle-up inputs: who paid joint costs, and personal costs paid by someone else
+            "joint_by_payer": {str(payer_id): total} if is_joint else {},
+            "personal_by_owner": {} if is_joint else {str(owner_id): total},
+            "personal_paid_by_others": (
+                {f"{owner_id}:{payer_id}": total} if not is_joint and payer_id != owner_id else {}
+            ),
+        })
+    return rollups
+
+async def get_owner_month_rollups(
+    db: AsyncSession, owner_ids: list[int], months: list[str]
+) -> Dict[tuple[int, str], Dict[str, Any]]:
+    """Rollup for every (owner, month) pair, serving closed months from the cache."""
+    current_month = month_of(datetime.now(timezone.utc))
+    closed_keys = [
+        _cache_key(owner_id, month)
+        for owner_id in owner_ids for month in months if month < current_month
+    ]
+    cached = await get_cache_many(closed_keys)
+
+    rollups: Dict[tuple[int, str], Dict[str, Any]] = {}
+    missing = []
+    for owner_id in owner_ids:
+        for month in months:
+            hit = cached.get(_cache_key(owner_id, month)) if month < current_month else None
+            if hit is not None:
+                rollups[(owner_id, month)] = hit
+            else:
+                missing.append((owner_id, month))
+    if not missing:
+        return rollups
+
+    start = month_range(min(m for _, m in missing))[0]
+    end = month_range(max(m for _, m in missing))[1]
+    fresh = await _query_rollups(db, sorted({o for o, _ in missing}), start, end)
+    writes = []
+    for owner_id, month in missing:
+        rollup = fresh.get((owner_id, month)) or _empty_rollup()
+        rollups[(owner_id, month)] = rollup
+        if month < current_month:
+            writes.append(set_cache(_cache_key(owner_id, month), rollup, SUMMARY_CACHE_TTL))
+    await asyncio.gather(*writes)
+    return rollups
+
+async def get_expense_summary(
+    db: AsyncSession, owner_ids: list[int], start_month: str, end_month: str
+) -> Dict[str, Any]:
+    """
+    Household expense summary for start_month..end_month inclusive: per-month totals
+    by category, day and payer, joint vs personal with the settle-up breakdowns, and
+    month-over-month changes, plus totals over the whole range. Raises ValueError for bad or oversized ranges.
+    """
+    start, _ = month_range(start_month)
+    end, _ = month_range(end_month)
+    span = (end.year - start.year) * 12 + end.month - start.month + 1
+    if span < 1:
+        raise ValueError("start_month must not be after end_month")
+    if span > MAX_SUMMARY_MONTHS:
+        raise ValueError(f"At most {MAX_SUMMARY_MONTHS} months can be summarized at once")
+    months = month_sequence(start_month, end_month)
+
+    # One extra month so the first month in range also gets a month-over-month change
+    previous_month = add_months(months[0], -1)
+    owner_months = await get_owner_month_rollups(db, owner_ids, [previous_month] + months)
+
+    per_month = {}
+    for month in [previous_month] + months:
+        merged = _empty_rollup()
+        for owner_id in owner_ids:
+            _add_into(merged, owner_months[(owner_id, month)])
+        per_month[month] = merged
+
+    overall = _empty_rollup()
+    month_rows = []
+    previous = per_month[previous_month]
+    for month in months:
+        current = per_month[month]
+        _add_into(overall, current)
+        change = current["total"] - previous["total"]
+        categories = set(current["by_category"]) | set(previous["by_category"])
+        month_rows.append({
+            "month": month,
+            **current,
+            "change": change,
+            "change_pct": (change / previous["total"] * 100) if previous["total"] else None,
+            "category_changes": {
+                cat: current["by_category"].get(cat, 0.0) - previous["by_category"].get(cat, 0.0)
+                for cat in sorted(categories)
+            }
+        })
+        previous = current
+
+    return {
+        "start_month": months[0],
+        "end_month": months[-1],
+        "months": month_rows,
+        **overall
+    }
+
+async def invalidate_expense_summaries(changes: Iterable[tuple[int, datetime | str]]):
+    """
+    Drop cached rollups for changed expenses, given as (owner_id, expense date) or
+    (owner_id, YYYY-MM) pairs. Call after the change is committed.
+    """
+    keys = {
+        _cache_key(owner_id, when if isinstance(when, str) else month_of(when))
+        for owner_id, when in changes if when is not None
+    }
+    await delete_cache(*keys)
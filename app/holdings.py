@@ -0,0 +1,174 @@
+"""
+Portfolio holdings maintained incrementally from the transaction log.
+
+Every ticker a portfolio has traded keeps its replay state (shares, cost, realized
+P&L and split carry) in portfolio_positions, and the portfolio row records a
+watermark: the (executed_at, id) of the last transaction applied. Newly imported
+transactions that sort after the watermark are applied to the stored states of
+their tickers only. If any sorts before it (a back-dated import), or the portfolio
+has never been replayed, the whole log is replayed instead. PortfolioHolding rows
+are rewritten only for the tickers that changed.
+
+Positions also carry the broker-reported sell and dividend totals of their ticker,
+so the Realized and Dividends tabs read one row per ticker instead of the log.
+"""
+from sqlalchemy import select, delete, insert, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.csv_import import SELL_ACTIONS, new_position_state, apply_transaction, holding_from_state
+from app.models import Portfolio, PortfolioHolding, PortfolioPosition, Transaction
+
+REPLAY_BATCH_SIZE = 20_000
+# 14 bind parameters per row keeps each statement well under the driver's limit
+POSITION_UPSERT_CHUNK_SIZE = 2000
+
+_TXN_COLUMNS = (
+    Transaction.id, Transaction.executed_at, Transaction.ticker, Transaction.action,
+    Transaction.shares, Transaction.price_per_share, Transaction.name,
+    Transaction.total_in_local, Transaction.result_in_local,
+)
+
+_STATE_FIELDS = (
+    "name", "shares", "cost_total", "realized_pnl", "split_cost",
+    "sell_proceeds", "sell_result", "shares_sold", "num_sells", "dividend_income", "num_dividends",
+)
+
+def _new_state(name: str) -> dict:
+    return {
+        **new_position_state(name),
+        "sell_proceeds": 0.0, "sell_result": 0.0, "shares_sold": 0.0, "num_sells": 0,
+        "dividend_income": 0.0, "num_dividends": 0,
+    }
+
+def _apply(states: dict[str, dict], txn) -> None:
+    """Apply one transaction row to its ticker's replay state and aggregates."""
+    state = states.setdefault(txn["ticker"], _new_state(txn["name"] or ""))
+    apply_transaction(state, txn)
+    action = txn["action"].lower()
+    if action in SELL_ACTIONS:
+        state["sell_proceeds"] += txn["total_in_local"] or 0
+        state["sell_result"] += txn["result_in_local"] or 0
+        state["shares_sold"] += txn["shares"]
+        state["num_sells"] += 1
+    elif action.startswith("dividend"):
+        state["dividend_income"] += txn["total_in_local"] or 0
+        state["num_dividends"] += 1
+
+async def _write_positions(db: AsyncSession, portfolio_id: int, states: dict[str, dict]):
+    """Upsert the given ticker states and rewrite those tickers' holdings."""
+    if not states:
+        return
+    rows = [
+        {"portfolio_id": portfolio_id, "ticker": ticker, **{f: state[f] for f in _STATE_FIELDS}}
+        for ticker, state in sorted(states.items())
+    ]
+    for start in range(0, len(rows), POSITION_UPSERT_CHUNK_SIZE):
+        stmt = pg_insert(PortfolioPosition).values(rows[start:start + POSITION_UPSERT_CHUNK_SIZE])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[PortfolioPosition.portfolio_id, PortfolioPosition.ticker],
+            set_={f: stmt.excluded[f] for f in _STATE_FIELDS}
+        )
+        await db.execute(stmt)
+
+    await db.execute(
+        delete(PortfolioHolding).where(
+            PortfolioHolding.portfolio_id == portfolio_id,
+            PortfolioHolding.ticker.in_(list(states))
+        )
+    )
+    holdings = [holding_from_state(ticker, state) for ticker, state in sorted(states.items())]
+    held = [
+        {"portfolio_id": portfolio_id, "ticker": h["ticker"], "shares": h["shares"], "avg_cost_basis": h["avg_cost_basis"]}
+        for h in holdings if h["shares"] > 0
+    ]
+    if held:
+        await db.execute(insert(PortfolioHolding), held)
+
+async def replay_portfolio_positions(db: AsyncSession, portfolio: Portfolio):
+    """
+    Rebuild every position and holding of the portfolio from its full transaction
+    log and move the watermark to its last transaction. Does not commit.
+    """
+    states: dict[str, dict] = {}
+    last = None
+    while True:
+        query = select(*_TXN_COLUMNS).where(Transaction.portfolio_id == portfolio.id)
+        if last is not None:
+            query = query.where(tuple_(Transaction.executed_at, Transaction.id) > tuple_(*last))
+        rows = (await db.execute(
+            query.order_by(Transaction.executed_at, Transaction.id).limit(REPLAY_BATCH_SIZE)
+        )).all()
+        if not rows:
+            break
+        for row in rows:
+            _apply(states, row._mapping)
+        last = (rows[-1].executed_at, rows[-1].id)
+
+    await db.execute(delete(PortfolioPosition).where(PortfolioPosition.portfolio_id == portfolio.id))
+    await db.execute(delete(PortfolioHolding).where(PortfolioHolding.portfolio_id == portfolio.id))
+    await _write_positions(db, portfolio.id, states)
+    portfolio.holdings_applied_at, portfolio.holdings_applied_id = last if last else (None, None)
+
+async def apply_new_transactions(db: AsyncSession, portfolio: Portfolio, new_ids: list[int]) -> bool:
+    """
+    Bring positions and holdings up to date after the transactions `new_ids` were
+    inserted. Only those transactions are applied when they all sort after the
+    watermark; otherwise the full log is replayed. Returns True if it replayed.
+    Expects the portfolio row to be locked (SELECT ... FOR UPDATE). Does not commit.
+    """
+    if portfolio.holdings_applied_at is None:
+        await replay_portfolio_positions(db, portfolio)
+        return True
+    if not new_ids:
+        return False
+
+    # The portfolio row is locked by the caller, so nothing else in this portfolio
+    # was inserted after the first of our ids; a range scan avoids a huge IN list
+    rows = (await db.execute(
+        select(*_TXN_COLUMNS)
+        .where(Transaction.portfolio_id == portfolio.id, Transaction.id >= min(new_ids))
+        .order_by(Transaction.executed_at, Transaction.id)
+    )).all()
+    if not rows:
+        return False
+    if (rows[0].executed_at, rows[0].id) < (portfolio.holdings_applied_at, portfolio.holdings_applied_id):
+        # Back-dated: average costs after the inserted trades change, so replay everything
+        await replay_portfolio_positions(db, portfolio)
+        return True
+
+    tickers = sorted({row.ticker for row in rows})
+    stored = (await db.execute(
+        select(PortfolioPosition).where(
+            PortfolioPosition.portfolio_id == portfolio.id,
+            PortfolioPosition.ticker.in_(tickers)
+        )
+    )).scalars().all()
+    states = {p.ticker: {f: getattr(p, f) for f in _STATE_FIELDS} for p in stored}
+    for state in states.values():
+        state["name"] = state["name"] or ""
+    for row in rows:
+        _apply(states, row._mapping)
+
+    await _write_positions(db, portfolio.id, states)
+    portfolio.holdings_applied_at, portfolio.holdings_applied_id = rows[-1].executed_at, rows[-1].id
+    return False
+
+async def portfolio_position_totals(db: AsyncSession, portfolio_id: int) -> dict:
+    """Number of open holdings and total realized P&L across the portfolio's positions."""
+    rows = (await db.execute(
+        select(PortfolioPosition.ticker, PortfolioPosition.shares, PortfolioPosition.cost_total,
+               PortfolioPosition.realized_pnl, PortfolioPosition.split_cost, PortfolioPosition.name)
+        .where(PortfolioPosition.portfolio_id == portfolio_id)
+    )).all()
+    holdings = [
+        holding_from_state(r.ticker, {
+            "shares": r.shares, "cost_total": r.cost_total, "realized_pnl": r.realized_pnl,
+            "split_cost": r.split_cost, "name": r.name or "",
+        })
+        for r in rows
+    ]
+    return {
+        "holdings_count": len([h for h in holdings if h["shares"] > 0]),
+        "total_realized_pnl": round(sum(h["realized_pnl"] for h in holdings), 2),
+    }
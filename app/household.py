@@ -0,0 +1,62 @@
+"""
+Household membership resolution.
+
+A user's household is the user plus every user linked to them (links are stored
+in both directions). Member ids and display names are resolved with a single
+query and cached per user, so request handlers no longer pay for a LinkedAccount
+and a User round trip each.
+
+Every write to users or links in the app calls invalidate_household: registering
+a user and linking accounts today, and renaming a user or removing a link when
+those exist. Writes from outside the app (scripts, manual SQL, cascading user
+deletes) are not seen: households and names stay stale for up to
+HOUSEHOLD_CACHE_TTL seconds.
+"""
+from sqlalchemy import select, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import get_cache, set_cache, delete_cache
+from app.models import User, LinkedAccount
+
+HOUSEHOLD_CACHE_TTL = 300
+
+def _household_cache_key(user_id: int) -> str:
+    return f"household:{user_id}"
+
+def display_name(name: str | None, email: str) -> str:
+    """The user's name, or the local part of their email when they have none."""
+    return name or email.split('@')[0]
+
+async def get_household(db: AsyncSession, user_id: int) -> dict:
+    """
+    Return {"user_id", "member_ids", "names"} for the user's household. `member_ids`
+    starts with the user, followed by linked users in id order; `names` maps each
+    member id to a display name.
+    """
+    cached = await get_cache(_household_cache_key(user_id))
+    if cached is not None:
+        # JSON round-trips turn the int keys into strings
+        return {**cached, "names": {int(k): v for k, v in cached["names"].items()}}
+
+    linked = select(LinkedAccount.linked_user_id).where(LinkedAccount.user_id == user_id)
+    result = await db.execute(
+        select(User.id, User.name, User.email)
+        .where(or_(User.id == user_id, User.id.in_(linked)))
+        .order_by(User.id)
+    )
+    names = {row.id: display_name(row.name, row.email) for row in result.all()}
+    household = {
+        "user_id": user_id,
+        "member_ids": [user_id] + [uid for uid in names if uid != user_id],
+        "names": names,
+    }
+    await set_cache(_household_cache_key(user_id), household, HOUSEHOLD_CACHE_TTL)
+    return household
+
+async def invalidate_household(*user_ids: int) -> None:
+    """
+    Drop cached households for the given users. Call after creating a user, after
+    renaming one (for every member of their household, whose cached names include
+    it) and after adding or removing a link (for both linked users).
+    """
+    await delete_cache(*[_household_cache_key(uid) for uid in user_ids])
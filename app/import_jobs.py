@@ -0,0 +1,158 @@
+"""
+Background CSV import jobs.
+
+Uploads are copied into a spooled temporary file (memory up to a threshold, then
+disk) and parsed from there in chunks, so no request holds a whole export in memory
+or runs the import to completion. A job runs as an asyncio task in the process
+that accepted it; its counters are mirrored to the cache under `import_job:{id}`,
+where the polling and SSE endpoints read them from any worker. Long jobs without
+an upload, such as re-applying every category rule, run the same way.
+
+A running job refreshes its `updated_at` on a heartbeat. If the process running
+it dies, the heartbeat stops, and readers see the job as failed once it is
+IMPORT_JOB_STALE_SECONDS old rather than polling a "running" job until the TTL.
+"""
+import asyncio
+import codecs
+import io
+import tempfile
+import uuid
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, IO
+
+from fastapi import UploadFile
+
+from app.cache import get_cache, set_cache
+
+IMPORT_JOB_TTL = 3600
+IMPORT_SPOOL_MAX_BYTES = 8 * 1024 * 1024
+IMPORT_READ_CHUNK_BYTES = 1024 * 1024
+# Rows parsed, priced/categorized and inserted per round trip
+IMPORT_CHUNK_ROWS = 5000
+IMPORT_JOB_HEARTBEAT_SECONDS = 15
+# A queued or running job not heard from for this long is reported as failed
+IMPORT_JOB_STALE_SECONDS = 4 * IMPORT_JOB_HEARTBEAT_SECONDS
+# Counters of rows written in the job's own transaction, which a failure rolls back
+UNCOMMITTED_COUNTERS = ("inserted", "updated_expenses")
+
+# Strong references keep running jobs from being garbage collected mid-flight
+_running_jobs: set[asyncio.Task] = set()
+
+def _job_cache_key(job_id: str) -> str:
+    return f"import_job:{job_id}"
+
+async def spool_upload(file: UploadFile, encodings: tuple[str, ...] = ("utf-8",)) -> tuple[IO[bytes], str | None]:
+    """
+    Copy an upload into a spooled temporary file, validating it against each
+    candidate encoding incrementally on the way. Returns the rewound file and the
+    first encoding that decodes all of it, or None when none does.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_MAX_BYTES)
+    decoders = {enc: codecs.getincrementaldecoder(enc)() for enc in encodings}
+    while chunk := await file.read(IMPORT_READ_CHUNK_BYTES):
+        spool.write(chunk)
+        for enc, decoder in list(decoders.items()):
+            try:
+                decoder.decode(chunk)
+            except UnicodeDecodeError:
+                del decoders[enc]
+    for enc, decoder in list(decoders.items()):
+        try:
+            decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            del decoders[enc]
+    spool.seek(0)
+    return spool, next((enc for enc in encodings if enc in decoders), None)
+
+def open_spooled_text(spool: IO[bytes], encoding: str) -> io.TextIOWrapper:
+    """
+    Rewind the spooled upload and open it as CSV-ready text (newline=''). Detach the
+    wrapper when done, or closing it closes the spooled file too.
+    """
+    spool.seek(0)
+    return io.TextIOWrapper(spool, encoding=encoding, newline="")
+
+class ImportProgress:
+    """
+    Running counters of one import. Imports run inline keep them in memory only;
+    job imports mirror every report to the cache for pollers.
+    """
+
+    def __init__(self, job_id: str | None = None, kind: str = ""):
+        self.job_id = job_id
+        self.state = {
+            "job_id": job_id,
+            "kind": kind,
+            "status": "queued",
+            "rows_parsed": 0,
+            "inserted": 0,
+            "duplicates": 0,
+            "failed": 0,
+            "result": None,
+            "error": None,
+            "updated_at": None,
+        }
+
+    async def report(self, status: str = "running", **fields):
+        self.state.update(status=status, updated_at=datetime.now(timezone.utc).isoformat(), **fields)
+        if self.job_id:
+            await set_cache(_job_cache_key(self.job_id), self.state, IMPORT_JOB_TTL)
+
+async def get_import_job(job_id: str) -> dict | None:
+    """
+    Latest reported state of a job, or None once it is unknown or expired. A queued
+    or running job whose heartbeat stopped comes back failed.
+    """
+    job = await get_cache(_job_cache_key(job_id))
+    if job and job["status"] in ("queued", "running") and job.get("updated_at"):
+        age = datetime.now(timezone.utc) - datetime.fromisoformat(job["updated_at"])
+        if age.total_seconds() > IMPORT_JOB_STALE_SECONDS:
+            job.update(
+                status="failed",
+                error="The import stopped responding; its server may have restarted. Please try again.",
+                **{name: 0 for name in UNCOMMITTED_COUNTERS if name in job},
+            )
+    return job
+
+async def _heartbeat(progress: ImportProgress):
+    while True:
+        await asyncio.sleep(IMPORT_JOB_HEARTBEAT_SECONDS)
+        await progress.report(progress.state["status"])
+
+async def start_import_job(
+    kind: str, spool: IO[bytes] | None, work: Callable[[ImportProgress], Awaitable[dict]]
+) -> str:
+    """
+    Run `work` over the spooled upload (None for jobs without one) as a background
+    task and return the job id at once. The job completes with the dict `work`
+    returns, or fails with the message of the exception it raises and its
+    UNCOMMITTED_COUNTERS zeroed. The spooled file is closed afterwards.
+    """
+    progress = ImportProgress(uuid.uuid4().hex, kind)
+    await progress.report("queued")
+
+    async def run():
+        heartbeat = asyncio.create_task(_heartbeat(progress))
+        try:
+            await progress.report("running")
+            result = await work(progress)
+        except Exception as exc:
+            final = {
+                "status": "failed",
+                "error": str(exc) or exc.__class__.__name__,
+                **{name: 0 for name in UNCOMMITTED_COUNTERS if name in progress.state},
+            }
+        else:
+            final = {"status": "completed", "result": result}
+        finally:
+            # A beat still in flight must not land after the final status
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+            if spool is not None:
+                spool.close()
+        await progress.report(**final)
+
+    task = asyncio.create_task(run())
+    _running_jobs.add(task)
+    task.add_done_callback(_running_jobs.discard)
+    return progress.job_id
@@ -0,0 +1,104 @@
+"""
+Exchange trading calendars for scheduling price refreshes.
+
+Regular sessions and full-day holidays for the exchanges our tickers trade on,
+computed from the published holiday rules. Early closes and one-off closures
+are not modelled; a refresh on such a day just finds no new bar.
+"""
+from datetime import date, datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+EXCHANGES = {
+    "NYSE": {"tz": ZoneInfo("America/New_York"), "open": time(9, 30), "close": time(16, 0)},
+    "LSE": {"tz": ZoneInfo("Europe/London"), "open": time(8, 0), "close": time(16, 30)},
+}
+
+# Yahoo symbol suffixes of non-US listings; anything else is treated as a NYSE/Nasdaq ticker
+EXCHANGE_SUFFIXES = {".L": "LSE", ".IL": "LSE"}
+
+def exchange_for(ticker: str) -> str:
+    """The exchange whose calendar a Yahoo ticker follows."""
+    ticker = ticker.upper()
+    for suffix, exchange in EXCHANGE_SUFFIXES.items():
+        if ticker.endswith(suffix):
+            return exchange
+    return "NYSE"
+
+def _easter(year: int) -> date:
+    # Anonymous Gregorian algorithm
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = divmod(b, 4)
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """The n-th `weekday` (Mon=0) of the month; n=-1 for the last one."""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+def _us_observed(day: date) -> date:
+    # Saturday holidays close the Friday before, Sunday ones the Monday after
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+def _nyse_holidays(year: int) -> set[date]:
+    holidays = {
+        _nth_weekday(year, 1, 0, 3),    # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),    # Washington's Birthday
+        _easter(year) - timedelta(days=2),  # Good Friday
+        _nth_weekday(year, 5, 0, -1),   # Memorial Day
+        _us_observed(date(year, 7, 4)),
+        _nth_weekday(year, 9, 0, 1),    # Labor Day
+        _nth_weekday(year, 11, 3, 4),   # Thanksgiving
+        _us_observed(date(year, 12, 25)),
+    }
+    # A Saturday New Year's Day is not moved back into the previous year
+    if date(year, 1, 1).weekday() != 5:
+        holidays.add(_us_observed(date(year, 1, 1)))
+    if year >= 2022:
+        holidays.add(_us_observed(date(year, 6, 19)))  # Juneteenth
+    return holidays
+
+def _lse_holidays(year: int) -> set[date]:
+    new_year = date(year, 1, 1)
+    while new_year.weekday() >= 5:
+        new_year += timedelta(days=1)
+    easter = _easter(year)
+    # Christmas and Boxing Day falling on a weekend move to the next free weekdays
+    christmas_days = []
+    day = date(year, 12, 25)
+    while len(christmas_days) < 2:
+        if day.weekday() < 5:
+            christmas_days.append(day)
+        day += timedelta(days=1)
+    return {
+        new_year,
+        easter - timedelta(days=2),     # Good Friday
+        easter + timedelta(days=1),     # Easter Monday
+        _nth_weekday(year, 5, 0, 1),    # Early May bank holiday
+        _nth_weekday(year, 5, 0, -1),   # Spring bank holiday
+        _nth_weekday(year, 8, 0, -1),   # Summer bank holiday
+        *christmas_days,
+    }
+
+_HOLIDAY_RULES = {"NYSE": _nyse_holidays, "LSE": _lse_holidays}
+
+def is_trading_day(exchange: str, day: date) -> bool:
+    return day.weekday() < 5 and day not in _HOLIDAY_RULES[exchange](day.year)
+
+def is_session_open(exchange: str, now: datetime) -> bool:
+    """Whether the exchange's regular session is in progress at the (aware) instant `now`."""
+    calendar = EXCHANGES[exchange]
+    local = now.astimezone(calendar["tz"])
+    return is_trading_day(exchange, local.date()) and calendar["open"] <= local.time() < calendar["close"]
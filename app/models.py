@@ -93,6 +93,9 @@ class Portfolio(Base):
     owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True, index=True)
     account_id = Column(Integer, ForeignKey("accounts.id", ondelete="CASCADE"), nullable=True, index=True)
     name = Column(String(255), nullable=False, default="My Portfolio")
+    # (executed_at, id) of the last transaction applied to portfolio_positions
+    holdings_applied_at = Column(DateTime(timezone=True), nullable=True)
+    holdings_applied_id = Column(Integer, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
@@ -111,6 +114,35 @@ class PortfolioHolding(Base):
     added_at = Column(DateTime(timezone=True), server_default=func.now())
 
 
+class PortfolioPosition(Base):
+    """
+    Running replay state of one ticker in a portfolio's transaction log, plus its
+    realized and dividend aggregates. Holdings are derived from it, so imports only
+    apply their new transactions.
+    """
+    __tablename__ = "portfolio_positions"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    portfolio_id = Column(Integer, ForeignKey("portfolios.id", ondelete="CASCADE"), nullable=False)
+    ticker = Column(String(10), nullable=False)
+    name = Column(String(255))
+    shares = Column(Float, nullable=False, default=0.0)
+    cost_total = Column(Float, nullable=False, default=0.0)
+    realized_pnl = Column(Float, nullable=False, default=0.0)
+    split_cost = Column(Float, nullable=True) # Cost basis carried from a split's close leg to its open leg
+    # Broker-reported sell and dividend totals, in the account currency of the export
+    sell_proceeds = Column(Float, nullable=False, default=0.0)
+    sell_result = Column(Float, nullable=False, default=0.0)
+    shares_sold = Column(Float, nullable=False, default=0.0)
+    num_sells = Column(Integer, nullable=False, default=0)
+    dividend_income = Column(Float, nullable=False, default=0.0)
+    num_dividends = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("portfolio_id", "ticker", name="uq_position_portfolio_ticker"),
+    )
+
+
 class Transaction(Base):
     """
     Individual transaction record imported from Trading 212.
@@ -138,6 +170,7 @@ class Transaction(Base):
     __table_args__ = (
         UniqueConstraint("portfolio_id", "external_id", name="uq_portfolio_external_id"),
         Index("idx_txn_portfolio_ticker", "portfolio_id", "ticker"),
+        Index("idx_txn_portfolio_executed_id", "portfolio_id", "executed_at", "id"),
     )
 
 
@@ -177,8 +210,14 @@ class Expense(Base):
     amount = Column(Float, nullable=False)
     description = Column(String(255))
     is_joint = Column(Integer, default=0) # 0 for false, 1 for true (SQLite compat boolean)
+    content_hash = Column(String(64), nullable=True) # sha256 of (date, amount, description) for duplicate detection
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index("idx_expense_owner_date_id", "owner_id", "date", "id"),
+        Index("idx_expense_owner_hash", "owner_id", "content_hash"),
+    )
+
 class Income(Base):
     """
     Individual income transaction.
@@ -192,6 +231,10 @@ class Income(Base):
     amount = Column(Float, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index("idx_income_owner_date", "owner_id", "date"),
+    )
+
 class ManualAsset(Base):
     """
     Manual assets like Real Estate, Cash, Vehicles.
@@ -217,6 +260,7 @@ class Account(Base):
     classification = Column(String(50), nullable=False) # "asset" or "liability"
     account_class = Column(String(100), nullable=False) # "cash", "portfolio", "real_estate", "gold", "pension", "loan", "credit_card", "other"
     balance = Column(Float, nullable=False, default=0.0)
+    opening_balance = Column(Float, nullable=True) # Balance before any ledger transactions; balance = opening_balance + SUM(ledger)
     currency = Column(String(10), nullable=False, default="USD") # e.g. USD, GBP, INR, EUR
     description = Column(String(255))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -235,6 +279,11 @@ class NetWorthSnapshot(Base):
     total_liabilities = Column(Float, nullable=False, default=0.0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        # One snapshot per user per day (dates are stored as UTC midnight)
+        Index("uq_snapshot_owner_date", "owner_id", "date", unique=True),
+    )
+
 class ExpenseCategoryRule(Base):
     """
     User-defined regex rules to automatically categorize expenses.
@@ -310,4 +359,8 @@ class AccountTransaction(Base):
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index("idx_account_txn_account_date_id", "account_id", "date", "id"),
+    )
+
 
@@ -0,0 +1,24 @@
+"""
+Opaque keyset cursors for paginated list endpoints.
+
+A cursor encodes the sort key of the last row on a page (a timestamp and the
+row id as tie-breaker) so the next page can be fetched with a
+`(date, id) < (:date, :id)` predicate instead of an OFFSET scan.
+"""
+import base64
+from datetime import datetime
+
+def encode_cursor(date: datetime, row_id: int) -> str:
+    """Encode a (date, id) sort key into an opaque URL-safe cursor string."""
+    raw = f"{date.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Decode a cursor produced by encode_cursor. Raises ValueError if it is malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        date_str, id_str = raw.rsplit("|", 1)
+        return datetime.fromisoformat(date_str), int(id_str)
+    except Exception:
+        raise ValueError("Invalid pagination cursor")
@@ -0,0 +1,257 @@
+"""
+Historical price lookups against the local stock_daily_prices store.
+
+Many (ticker, day) lookups are answered by one statement: the requests are
+unnested from two array parameters and each is matched to its close through a
+LATERAL subquery that walks the (ticker, time) index. Pairs the store cannot
+answer are downloaded in shared windows, one multi-ticker call per window and
+a few at a time, and stored so the next lookup is local. Bars are written by
+COPY into a staging table and merged in one statement.
+"""
+import asyncio
+from datetime import date, datetime, timezone, timedelta
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text, bindparam, String, DateTime
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.csv_import import PRICE_LOOKUP_WINDOW_DAYS
+
+# A close older than this does not answer "price as of" a day (covers long weekends and holidays)
+PRICE_AS_OF_MAX_AGE_DAYS = 7
+# Requested days of one ticker further apart than this are downloaded as separate ranges
+PRICE_RANGE_SPLIT_DAYS = 31
+# Longest window that tickers with nearby requests share in one download
+PRICE_DOWNLOAD_WINDOW_DAYS = 92
+BAR_COLUMNS = ("time", "ticker", "open", "high", "low", "close", "volume")
+
+_FIRST_CLOSE_IN_WINDOW = text("""
+    SELECT r.n, p.close
+    FROM unnest(CAST(:tickers AS text[]), CAST(:days AS timestamptz[])) WITH ORDINALITY AS r(ticker, day, n)
+    CROSS JOIN LATERAL (
+        SELECT close
+        FROM stock_daily_prices
+        WHERE ticker = r.ticker
+          AND time >= r.day
+          AND time < r.day + make_interval(days => :window_days)
+          AND close IS NOT NULL
+        ORDER BY time
+        LIMIT 1
+    ) p
+""").bindparams(
+    bindparam("tickers", type_=ARRAY(String)),
+    bindparam("days", type_=ARRAY(DateTime(timezone=True))),
+)
+
+async def lookup_stored_closes(
+    db: AsyncSession, requests: set[tuple[str, date]]
+) -> dict[tuple[str, date], float]:
+    """
+    Resolve (ticker, day) pairs to the first stored close within
+    PRICE_LOOKUP_WINDOW_DAYS of the day, in one query. Pairs without a stored
+    close are left out.
+    """
+    if not requests:
+        return {}
+    ordered = sorted(requests)
+    result = await db.execute(_FIRST_CLOSE_IN_WINDOW, {
+        "tickers": [ticker for ticker, _ in ordered],
+        "days": [datetime(d.year, d.month, d.day, tzinfo=timezone.utc) for _, d in ordered],
+        "window_days": PRICE_LOOKUP_WINDOW_DAYS,
+    })
+    return {ordered[n - 1]: float(close) for n, close in result.all()}
+
+_LAST_CLOSE_AS_OF = text("""
+    SELECT r.n, p.time, p.close
+    FROM unnest(CAST(:tickers AS text[]), CAST(:days AS timestamptz[])) WITH ORDINALITY AS r(ticker, day, n)
+    CROSS JOIN LATERAL (
+        SELECT time, close
+        FROM stock_daily_prices
+        WHERE ticker = r.ticker
+          AND time < r.day + interval '1 day'
+          AND time >= r.day - make_interval(days => :max_age_days)
+          AND close IS NOT NULL
+        ORDER BY time DESC
+        LIMIT 1
+    ) p
+""").bindparams(
+    bindparam("tickers", type_=ARRAY(String)),
+    bindparam("days", type_=ARRAY(DateTime(timezone=True))),
+)
+
+def _utc_day(day: date) -> datetime:
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+
+async def lookup_stored_closes_as_of(
+    db: AsyncSession, requests: set[tuple[str, date]]
+) -> dict[tuple[str, date], tuple[date, float]]:
+    """
+    Resolve (ticker, day) pairs to the last stored close on or before the day, at
+    most PRICE_AS_OF_MAX_AGE_DAYS old, in one query. Values are (bar day, close);
+    pairs without such a close are left out.
+    """
+    if not requests:
+        return {}
+    ordered = sorted(requests)
+    result = await db.execute(_LAST_CLOSE_AS_OF, {
+        "tickers": [ticker for ticker, _ in ordered],
+        "days": [_utc_day(d) for _, d in ordered],
+        "max_age_days": PRICE_AS_OF_MAX_AGE_DAYS,
+    })
+    return {ordered[n - 1]: (bar_time.date(), float(close)) for n, bar_time, close in result.all()}
+
+def missing_ranges(
+    requests: set[tuple[str, date]], group_size: int
+) -> list[tuple[date, date, list[str]]]:
+    """
+    Group unresolved pairs into (start, exclusive end, tickers) downloads. Each
+    ticker's days are split wherever two are more than PRICE_RANGE_SPLIT_DAYS apart,
+    and each run needs the span from PRICE_AS_OF_MAX_AGE_DAYS before its first day
+    to its last. Runs are then packed, in start order, into shared windows of at
+    most PRICE_DOWNLOAD_WINDOW_DAYS and `group_size` tickers; a longer run keeps a
+    window of its own.
+    """
+    days_by_ticker: dict[str, list[date]] = {}
+    for ticker, day in requests:
+        days_by_ticker.setdefault(ticker, []).append(day)
+
+    runs = []
+    for ticker, days in days_by_ticker.items():
+        days.sort()
+        first = days[0]
+        for previous, day in zip(days, days[1:]):
+            if (day - previous).days > PRICE_RANGE_SPLIT_DAYS:
+                runs.append((first - timedelta(days=PRICE_AS_OF_MAX_AGE_DAYS), previous + timedelta(days=1), ticker))
+                first = day
+        runs.append((first - timedelta(days=PRICE_AS_OF_MAX_AGE_DAYS), days[-1] + timedelta(days=1), ticker))
+
+    ranges: list[tuple[date, date, list[str]]] = []
+    for start, end, ticker in sorted(runs):
+        if ranges:
+            window_start, window_end, tickers = ranges[-1]
+            merged_end = max(window_end, end)
+            if (merged_end - window_start).days <= PRICE_DOWNLOAD_WINDOW_DAYS and (
+                ticker in tickers or len(tickers) < group_size
+            ):
+                ranges[-1] = (window_start, merged_end, tickers if ticker in tickers else tickers + [ticker])
+                continue
+        ranges.append((start, end, [ticker]))
+    return ranges
+
+def bars_from_download(data: pd.DataFrame, tickers: list[str]) -> list[dict]:
+    """
+    Daily bars as stock_daily_prices rows from a yf.download frame, whose columns
+    are (field, ticker) pairs, or plain fields for a single ticker on older yfinance.
+    Bars without a close are dropped.
+    """
+    if data is None or data.empty:
+        return []
+    if not isinstance(data.columns, pd.MultiIndex):
+        data = pd.concat({tickers[0]: data}, axis=1).swaplevel(axis=1)
+    # Bars are keyed by UTC midnight of the trading day, whatever zone the index is in
+    index = pd.DatetimeIndex(data.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    index = index.normalize().tz_localize("UTC")
+    times = index.to_pydatetime()
+    available = set(data.columns.get_level_values(1))
+
+    bars = []
+    for ticker in tickers:
+        if ticker not in available:
+            continue
+        frame = data.xs(ticker, axis=1, level=1)
+        columns = {
+            field: frame[field].to_numpy(dtype=np.float64) if field in frame else np.full(len(frame), np.nan)
+            for field in ("Open", "High", "Low", "Close", "Volume")
+        }
+        for i in np.flatnonzero(~np.isnan(columns["Close"])).tolist():
+            volume = columns["Volume"][i]
+            bars.append({
+                "time": times[i],
+                "ticker": ticker.upper(),
+                "open": None if np.isnan(columns["Open"][i]) else float(columns["Open"][i]),
+                "high": None if np.isnan(columns["High"][i]) else float(columns["High"][i]),
+                "low": None if np.isnan(columns["Low"][i]) else float(columns["Low"][i]),
+                "close": float(columns["Close"][i]),
+                "volume": None if np.isnan(volume) else int(volume),
+            })
+    return bars
+
+def download_daily_bars(tickers: list[str], start: date, end: date) -> list[dict]:
+    """Daily bars for many tickers over [start, end) from one yf.download call (empty on failure)."""
+    import yfinance as yf
+
+    try:
+        data = yf.download(tickers, start=start.isoformat(), end=end.isoformat(), progress=False, auto_adjust=True)
+    except Exception:
+        return []
+    return bars_from_download(data, tickers)
+
+_STAGE_BARS = text(
+    "CREATE TEMP TABLE IF NOT EXISTS stock_daily_prices_staging "
+    "(LIKE stock_daily_prices) ON COMMIT DELETE ROWS"
+)
+_MERGE_STAGED_BARS = text("""
+    INSERT INTO stock_daily_prices (time, ticker, open, high, low, close, volume)
+    SELECT DISTINCT ON (time, ticker) time, ticker, open, high, low, close, volume
+    FROM stock_daily_prices_staging
+    ORDER BY time, ticker
+    ON CONFLICT (time, ticker) DO UPDATE SET
+        open = EXCLUDED.open,
+        high = EXCLUDED.high,
+        low = EXCLUDED.low,
+        close = EXCLUDED.close,
+        volume = EXCLUDED.volume
+""")
+
+async def store_daily_bars(db: AsyncSession, bars: list[dict]) -> None:
+    """
+    Upsert bars into stock_daily_prices: COPY them into a session-local staging
+    table, then merge it with one INSERT ... SELECT ... ON CONFLICT. The caller commits.
+    """
+    if not bars:
+        return
+    await db.execute(_STAGE_BARS)
+    await db.execute(text("TRUNCATE stock_daily_prices_staging"))
+    raw = await (await db.connection()).get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        "stock_daily_prices_staging",
+        records=[tuple(bar[col] for col in BAR_COLUMNS) for bar in bars],
+        columns=list(BAR_COLUMNS),
+    )
+    await db.execute(_MERGE_STAGED_BARS)
+
+async def get_closes_as_of(
+    db: AsyncSession, requests: set[tuple[str, date]], fetch_missing: bool = True
+) -> dict[tuple[str, date], tuple[date, float]]:
+    """
+    Price many (ticker, day) pairs as of their day: answered from the local store in
+    one query, then, when `fetch_missing`, the missing ranges are downloaded, stored
+    and looked up again. Pairs still without a close are left out. Downloaded bars
+    are written in the caller's transaction; the caller commits.
+    """
+    requests = {(ticker.upper().strip(), day) for ticker, day in requests if ticker}
+    found = await lookup_stored_closes_as_of(db, requests)
+    remaining = requests - found.keys()
+    if not remaining or not fetch_missing:
+        return found
+
+    from app.tasks import INGEST_GROUP_SIZE, INGEST_CONCURRENCY
+
+    semaphore = asyncio.Semaphore(INGEST_CONCURRENCY)
+
+    async def _download(start: date, end: date, tickers: list[str]) -> list[dict]:
+        async with semaphore:
+            return await asyncio.to_thread(download_daily_bars, tickers, start, end)
+
+    downloads = await asyncio.gather(*(
+        _download(start, end, tickers) for start, end, tickers in missing_ranges(remaining, INGEST_GROUP_SIZE)
+    ))
+    bars = [bar for batch in downloads for bar in batch]
+    if bars:
+        await store_daily_bars(db, bars)
+        found.update(await lookup_stored_closes_as_of(db, remaining))
+    return found
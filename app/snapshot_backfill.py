@@ -0,0 +1,429 @@
+"""
+Net-worth history reconstructed from the ledgers.
+
+Each user's portfolio transactions and account ledger are replayed into daily
+positions and balances, valued against the closes stored in stock_daily_prices
+and upserted as one snapshot per user per day. Historical FX rates come from
+the same table under their Yahoo pair symbols (`GBPUSD=X`); days without a
+stored rate use the current one. The rules match the live figure
+(user_net_worth_totals), so the reconstructed series joins today's value:
+
+- ledger accounts are worth their current balance minus the entries dated after each day,
+- portfolio-class accounts are worth the market value of their linked portfolios,
+- standalone portfolios count at cost basis,
+- manual assets keep no history, so their current value applies from their last update.
+
+Snapshots dated before a user's data begins are deleted in the same transaction,
+which clears the random history the previous backfill script generated.
+
+Positions are replayed once per transaction; everything per-day is a NumPy
+array over the user's date range. Users are spread over a pool of workers,
+each with its own session, and every finished user is recorded in a JSON
+checkpoint so an interrupted run picks up where it stopped, over the same
+range even when it is resumed on a later day.
+"""
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict
+
+import numpy as np
+from sqlalchemy import select, func, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import get_fx_rates
+from app.csv_import import BUY_ACTIONS, SELL_ACTIONS, new_position_state, apply_transaction
+from app.models import (
+    User, Account, AccountTransaction, Portfolio, PortfolioHolding, Transaction,
+    ManualAsset, StockDailyPrice, NetWorthSnapshot
+)
+from app.snapshots import upsert_net_worth_snapshots
+
+BACKFILL_WORKERS = 8
+
+_EMPTY_DAYS = np.array([], dtype="datetime64[D]")
+_EMPTY_VALUES = np.array([], dtype=np.float64)
+
+def to_day(value: datetime) -> np.datetime64:
+    """The UTC calendar day of a timestamp (naive timestamps are taken as UTC)."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return np.datetime64(value.astimezone(timezone.utc).date(), "D")
+
+def fx_symbol(currency: str) -> str:
+    """Symbol under which the daily `currency`->USD rate is stored in stock_daily_prices."""
+    return f"{currency}USD=X"
+
+def as_of(step_days: np.ndarray, values: np.ndarray, days: np.ndarray, default: float = np.nan) -> np.ndarray:
+    """
+    Sample a step series on each of `days`: the last value dated on or before the
+    day, or `default` before the first step. `step_days` must be sorted.
+    """
+    if len(step_days) == 0:
+        return np.full(len(days), default, dtype=np.float64)
+    idx = np.searchsorted(step_days, days, side="right") - 1
+    return np.where(idx >= 0, values[np.maximum(idx, 0)], default)
+
+def replay_positions(transactions: list[dict]) -> Dict[tuple[int, str], tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Replay transactions (dicts with portfolio_id, ticker, action, shares,
+    price_per_share and executed_at), in execution order, into step series per
+    (portfolio_id, ticker): (days, shares, cost_total) after each transaction.
+    Buys, sells at average cost and splits follow compute_holdings.
+    """
+    states: Dict[tuple[int, str], dict] = {}
+    steps: Dict[tuple[int, str], list[tuple]] = {}
+    for t in transactions:
+        action = (t["action"] or "").lower()
+        if not action.startswith(BUY_ACTIONS + SELL_ACTIONS) and action not in ("stock split close", "stock split open"):
+            continue # Dividends and other cash events do not move the position
+        key = (t["portfolio_id"], t["ticker"].upper().strip())
+        state = states.setdefault(key, new_position_state())
+        apply_transaction(state, {
+            "action": action,
+            "shares": t["shares"] or 0.0,
+            "price_per_share": t["price_per_share"] or 0.0,
+        })
+        steps.setdefault(key, []).append((to_day(t["executed_at"]), state["shares"], state["cost_total"]))
+
+    return {
+        key: (
+            np.array([s[0] for s in series], dtype="datetime64[D]"),
+            np.array([s[1] for s in series], dtype=np.float64),
+            np.array([s[2] for s in series], dtype=np.float64),
+        )
+        for key, series in steps.items()
+    }
+
+def history_start(data: dict) -> np.datetime64 | None:
+    """The first day anything in the user's data existed, or None if they own nothing."""
+    stamps = [a["created_at"] for a in data["accounts"] if a.get("created_at")]
+    stamps += [entry["date"] for entry in data["ledger"]]
+    stamps += [t["executed_at"] for t in data["transactions"]]
+    stamps += [h["added_at"] for h in data["holdings"] if h.get("added_at")]
+    stamps += [ma["updated_at"] for ma in data["manual_assets"] if ma.get("updated_at")]
+    if not stamps:
+        return None
+    return min(to_day(s) for s in stamps)
+
+def reconstruct_user_history(
+    data: dict,
+    days: np.ndarray,
+    prices: Dict[str, tuple[np.ndarray, np.ndarray]],
+    current_rates: Dict[str, float],
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Daily (total_assets, total_liabilities) in USD for one user over `days`.
+
+    `data` holds the user's accounts, ledger, portfolios, transactions, holdings and
+    manual_assets as dicts (see load_user_history_data). `prices` maps ticker and FX
+    pair symbols to sorted (days, closes) arrays; `current_rates` maps currencies to
+    today's rate to USD, used where no stored rate covers a day.
+    """
+    n = len(days)
+    assets = np.zeros(n)
+    liabilities = np.zeros(n)
+    fx_cache: Dict[str, np.ndarray] = {}
+
+    def fx_to_usd(currency: str | None) -> np.ndarray:
+        code = (currency or "USD").upper().strip()
+        if code not in fx_cache:
+            if code == "USD":
+                fx_cache[code] = np.ones(n)
+            else:
+                fallback = current_rates.get(code, 1.0)
+                rate_days, rates = prices.get(fx_symbol(code), (_EMPTY_DAYS, _EMPTY_VALUES))
+                # Before the first stored rate there is nothing to carry forward, so use today's
+                series = as_of(rate_days, rates, days, np.nan)
+                fx_cache[code] = np.where(np.isnan(series), fallback, series)
+        return fx_cache[code]
+
+    # 1. Positions: transactions, or the holdings of portfolios that were never imported
+    imported = {t["portfolio_id"] for t in data["transactions"]}
+    manual_buys = sorted(
+        (
+            {
+                "portfolio_id": h["portfolio_id"],
+                "ticker": h["ticker"],
+                "action": "market buy",
+                "shares": h["shares"],
+                "price_per_share": h["avg_cost_basis"],
+                "executed_at": h["added_at"] or datetime.now(timezone.utc),
+            }
+            for h in data["holdings"] if h["portfolio_id"] not in imported
+        ),
+        key=lambda t: t["executed_at"]
+    )
+    positions = replay_positions(list(data["transactions"]) + manual_buys)
+
+    ticker_currency: Dict[str, str] = {}
+    for t in data["transactions"]:
+        if t.get("currency"):
+            ticker_currency[t["ticker"].upper().strip()] = t["currency"]
+
+    account_by_portfolio = {p["id"]: p["account_id"] for p in data["portfolios"]}
+    market_by_account: Dict[int, np.ndarray] = {}
+    for (portfolio_id, ticker), (step_days, shares, cost) in positions.items():
+        held = as_of(step_days, shares, days, 0.0)
+        cost_total = as_of(step_days, cost, days, 0.0)
+        account_id = account_by_portfolio.get(portfolio_id)
+        if account_id is None:
+            assets += cost_total
+            continue
+        # Days without a stored close fall back to the average cost, as the live valuation does
+        avg_cost = np.divide(cost_total, held, out=np.zeros(n), where=held > 0)
+        close_days, closes = prices.get(ticker, (_EMPTY_DAYS, _EMPTY_VALUES))
+        close = as_of(close_days, closes, days, np.nan)
+        price = np.where(np.isnan(close) | (close == 0), avg_cost, close)
+        value = held * price * fx_to_usd(ticker_currency.get(ticker))
+        market_by_account[account_id] = market_by_account.get(account_id, 0.0) + value
+
+    # 2. Accounts
+    ledger_by_account: Dict[int, list[dict]] = {}
+    for entry in data["ledger"]:
+        ledger_by_account.setdefault(entry["account_id"], []).append(entry)
+    portfolio_account_ids = {p["account_id"] for p in data["portfolios"] if p["account_id"]}
+
+    for a in data["accounts"]:
+        if a["account_class"] == "portfolio" and a["id"] in portfolio_account_ids:
+            series = market_by_account.get(a["id"], np.zeros(n))
+        else:
+            entries = sorted(ledger_by_account.get(a["id"], []), key=lambda e: e["date"])
+            entry_days = np.array([to_day(e["date"]) for e in entries], dtype="datetime64[D]")
+            amounts = np.array([e["amount"] for e in entries], dtype=np.float64)
+            applied = as_of(entry_days, np.cumsum(amounts), days, 0.0)
+            balance = a["balance"] - (amounts.sum() - applied)
+            opened = [to_day(a["created_at"])] if a.get("created_at") else [days[0]]
+            if len(entry_days):
+                opened.append(entry_days[0])
+            series = np.where(days >= min(opened), balance * fx_to_usd(a["currency"]), 0.0)
+
+        if a["classification"] == "liability":
+            liabilities += series
+        else:
+            assets += series
+
+    # 3. Manual assets
+    for ma in data["manual_assets"]:
+        since = to_day(ma["updated_at"]) if ma.get("updated_at") else days[0]
+        assets += np.where(days >= since, ma["value"], 0.0)
+
+    return assets, liabilities
+
+async def load_user_history_data(db: AsyncSession, user_id: int) -> dict:
+    """Everything reconstruct_user_history needs for one user, in six queries."""
+    accounts = (await db.execute(
+        select(Account.id, Account.classification, Account.account_class, Account.balance,
+               Account.currency, Account.created_at)
+        .where(Account.owner_id == user_id)
+    )).mappings().all()
+    account_ids = [a["id"] for a in accounts]
+
+    ledger = []
+    if account_ids:
+        ledger = (await db.execute(
+            select(AccountTransaction.account_id, AccountTransaction.date, AccountTransaction.amount)
+            .where(AccountTransaction.account_id.in_(account_ids))
+        )).mappings().all()
+
+    portfolios = (await db.execute(
+        select(Portfolio.id, Portfolio.account_id).where(Portfolio.owner_id == user_id)
+    )).mappings().all()
+    portfolio_ids = [p["id"] for p in portfolios]
+
+    transactions, holdings = [], []
+    if portfolio_ids:
+        transactions = (await db.execute(
+            select(Transaction.portfolio_id, Transaction.ticker, Transaction.action, Transaction.shares,
+                   Transaction.price_per_share, Transaction.currency, Transaction.executed_at)
+            .where(Transaction.portfolio_id.in_(portfolio_ids))
+            .order_by(Transaction.executed_at, Transaction.id)
+        )).mappings().all()
+        holdings = (await db.execute(
+            select(PortfolioHolding.portfolio_id, PortfolioHolding.ticker, PortfolioHolding.shares,
+                   PortfolioHolding.avg_cost_basis, PortfolioHolding.added_at)
+            .where(PortfolioHolding.portfolio_id.in_(portfolio_ids))
+        )).mappings().all()
+
+    manual_assets = (await db.execute(
+        select(ManualAsset.value, ManualAsset.updated_at).where(ManualAsset.owner_id == user_id)
+    )).mappings().all()
+
+    return {
+        "accounts": [dict(a) for a in accounts],
+        "ledger": [dict(e) for e in ledger],
+        "portfolios": [dict(p) for p in portfolios],
+        "transactions": [dict(t) for t in transactions],
+        "holdings": [dict(h) for h in holdings],
+        "manual_assets": [dict(ma) for ma in manual_assets],
+    }
+
+async def load_price_history(
+    db: AsyncSession, symbols: list[str], until: datetime
+) -> Dict[str, tuple[np.ndarray, np.ndarray]]:
+    """
+    Sorted (days, closes) arrays per symbol from stock_daily_prices, up to `until`.
+    Every day of every user's range is valued, with closes carried forward without
+    an age limit (see as_of), so whole series are read in one range scan instead of
+    pricing (ticker, day) pairs through get_closes_as_of. Missing bars are filled
+    beforehand by scripts/backfill_prices.py, not downloaded here.
+    """
+    if not symbols:
+        return {}
+    rows = (await db.execute(
+        select(StockDailyPrice.ticker, StockDailyPrice.time, StockDailyPrice.close)
+        .where(StockDailyPrice.ticker.in_(symbols), StockDailyPrice.time <= until, StockDailyPrice.close.isnot(None))
+        .order_by(StockDailyPrice.ticker, StockDailyPrice.time)
+    )).all()
+    grouped: Dict[str, list] = {}
+    for ticker, when, close in rows:
+        grouped.setdefault(ticker.upper(), []).append((to_day(when), close))
+    return {
+        symbol: (
+            np.array([d for d, _ in series], dtype="datetime64[D]"),
+            np.array([c for _, c in series], dtype=np.float64),
+        )
+        for symbol, series in grouped.items()
+    }
+
+def load_checkpoint(path: str, run_key: str) -> set[int]:
+    """User ids an earlier run over the same range already finished (empty if none)."""
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return set()
+    if state.get("run") != run_key:
+        return set()
+    return set(state.get("completed", []))
+
+def save_checkpoint(path: str, run_key: str, completed: set[int], finished: bool = False):
+    """Atomically record the finished user ids for `run_key`, and whether the run completed."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"run": run_key, "completed": sorted(completed), "finished": finished}, f)
+    os.replace(tmp_path, path)
+
+def unfinished_run_end(path: str, start_key: str) -> np.datetime64 | None:
+    """The end day of an unfinished run from `start_key` recorded at `path` (None if there is none)."""
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    run_start, _, run_end = str(state.get("run", "")).partition("..")
+    if state.get("finished") or run_start != start_key or not run_end:
+        return None
+    return np.datetime64(run_end, "D")
+
+async def backfill_net_worth_history(
+    session_factory,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    workers: int = BACKFILL_WORKERS,
+    checkpoint_path: str | None = None,
+) -> Dict[str, Any]:
+    """
+    Reconstruct and upsert daily snapshots for every user from `start` (default: when
+    each user's data begins) through `end` (default: yesterday; today belongs to the
+    nightly job). With `checkpoint_path`, users finished by an earlier run over the
+    same range are skipped, and without `end` an unfinished run resumes over the
+    range it started with. Returns a report of users, snapshots written, failures
+    per user id and the run duration.
+    """
+    started = time.perf_counter()
+    now = datetime.now(timezone.utc)
+    start_day = to_day(start) if start else None
+    start_key = str(start_day) if start_day is not None else "earliest"
+    if end:
+        end_day = to_day(end)
+    else:
+        # "Yesterday" moves on, so an interrupted run keeps the end it started with
+        resumed_end = unfinished_run_end(checkpoint_path, start_key) if checkpoint_path else None
+        end_day = resumed_end if resumed_end is not None else to_day(now) - np.timedelta64(1, "D")
+    run_key = f"{start_key}..{end_day}"
+    end_ts = datetime.fromisoformat(str(end_day)).replace(tzinfo=timezone.utc) + timedelta(days=1)
+
+    completed = load_checkpoint(checkpoint_path, run_key) if checkpoint_path else set()
+
+    async with session_factory() as db:
+        user_ids = (await db.execute(select(User.id).order_by(User.id))).scalars().all()
+        tickers = set((await db.execute(select(func.upper(Transaction.ticker)).distinct())).scalars().all())
+        tickers |= set((await db.execute(select(func.upper(PortfolioHolding.ticker)).distinct())).scalars().all())
+        currencies = set((await db.execute(select(Transaction.currency).distinct())).scalars().all())
+        currencies |= set((await db.execute(select(Account.currency).distinct())).scalars().all())
+        currencies = {c.upper().strip() for c in currencies if c and c.upper().strip() != "USD"}
+        # Every user shares one load of the price store
+        prices = await load_price_history(
+            db, sorted(tickers | {fx_symbol(c) for c in currencies}), end_ts
+        )
+
+    current = await get_fx_rates([(c, "USD") for c in currencies])
+    current_rates = {f: rate for (f, _), rate in current.items()}
+
+    pending = [uid for uid in user_ids if uid not in completed]
+    semaphore = asyncio.Semaphore(workers)
+    failures: Dict[int, str] = {}
+    written = 0
+
+    async def _backfill_user(user_id: int):
+        nonlocal written
+        async with semaphore:
+            try:
+                async with session_factory() as db:
+                    data = await load_user_history_data(db, user_id)
+                    history_first = history_start(data)
+                    # Snapshots from before the user's data existed were invented by the old
+                    # backfill script; for a user with no data, none through end_day are real
+                    cutoff = history_first if history_first is not None else end_day + np.timedelta64(1, "D")
+                    await db.execute(
+                        delete(NetWorthSnapshot).where(
+                            NetWorthSnapshot.owner_id == user_id,
+                            NetWorthSnapshot.date < datetime.fromisoformat(str(cutoff)).replace(tzinfo=timezone.utc),
+                        )
+                    )
+                    first = history_first
+                    rows = []
+                    if first is not None:
+                        first = max(first, start_day) if start_day is not None else first
+                    if first is not None and first <= end_day:
+                        days = np.arange(first, end_day + np.timedelta64(1, "D"), dtype="datetime64[D]")
+                        assets, liabilities = await asyncio.to_thread(
+                            reconstruct_user_history, data, days, prices, current_rates
+                        )
+                        rows = [
+                            {
+                                "owner_id": user_id,
+                                "date": datetime.fromisoformat(str(day)).replace(tzinfo=timezone.utc),
+                                "total_assets": total_assets,
+                                "total_liabilities": total_liabilities,
+                            }
+                            for day, total_assets, total_liabilities in zip(
+                                days, np.round(assets, 2).tolist(), np.round(liabilities, 2).tolist()
+                            )
+                        ]
+                        await upsert_net_worth_snapshots(db, rows)
+                    await db.commit()
+                    written += len(rows)
+            except Exception as e:
+                failures[user_id] = str(e)
+                return
+            completed.add(user_id)
+            if checkpoint_path:
+                save_checkpoint(checkpoint_path, run_key, completed)
+
+    await asyncio.gather(*(_backfill_user(uid) for uid in pending))
+    if checkpoint_path:
+        save_checkpoint(checkpoint_path, run_key, completed, finished=not failures)
+
+    return {
+        "start": str(start_day) if start_day is not None else None,
+        "end": str(end_day),
+        "users": len(user_ids),
+        "skipped": len(user_ids) - len(pending),
+        "snapshots": written,
+        "failed": failures,
+        "duration_seconds": round(time.perf_counter() - started, 3),
+    }
@@ -0,0 +1,116 @@
+"""
+Nightly net-worth snapshots for every user.
+
+The distinct ticker set across all holdings, and the FX pairs every account and
+quote needs, are priced once up front so per-household valuations run from a
+warm cache instead of pricing tickers user by user. Households are valued with
+bounded concurrency, each in its own session; linked partners share one
+valuation. All of the day's snapshots are written with batched
+INSERT ... ON CONFLICT DO UPDATE statements.
+"""
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import get_live_quotes, get_fx_rates
+from app.models import User, LinkedAccount, Account, PortfolioHolding, NetWorthSnapshot
+from app.valuation import get_household_valuation, user_net_worth_totals
+
+SNAPSHOT_CONCURRENCY = 8
+# Four bind parameters per row keeps each statement well under the driver's limit
+SNAPSHOT_UPSERT_CHUNK_SIZE = 5000
+
+async def upsert_net_worth_snapshots(db: AsyncSession, rows: list[dict]):
+    """
+    Insert or overwrite snapshots given as {owner_id, date, total_assets, total_liabilities}
+    dicts, one (owner_id, date) per row, in batched statements. Does not commit.
+    """
+    for start in range(0, len(rows), SNAPSHOT_UPSERT_CHUNK_SIZE):
+        stmt = pg_insert(NetWorthSnapshot).values(rows[start:start + SNAPSHOT_UPSERT_CHUNK_SIZE])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[NetWorthSnapshot.owner_id, NetWorthSnapshot.date],
+            set_={
+                "total_assets": stmt.excluded.total_assets,
+                "total_liabilities": stmt.excluded.total_liabilities,
+            }
+        )
+        await db.execute(stmt)
+
+async def take_net_worth_snapshots(session_factory, target_date: datetime, concurrency: int = SNAPSHOT_CONCURRENCY) -> Dict[str, Any]:
+    """
+    Upsert one snapshot per user for target_date's day and return a run report:
+    counts of users, households, tickers and snapshots written, the failures per
+    user id, and the run duration.
+    """
+    started = time.perf_counter()
+    day = datetime(target_date.year, target_date.month, target_date.day, tzinfo=timezone.utc)
+
+    async with session_factory() as db:
+        user_ids = (await db.execute(select(User.id).order_by(User.id))).scalars().all()
+        links = (await db.execute(select(LinkedAccount.user_id, LinkedAccount.linked_user_id))).all()
+        tickers = (await db.execute(select(PortfolioHolding.ticker).distinct())).scalars().all()
+        currencies = (await db.execute(select(Account.currency).distinct())).scalars().all()
+
+    # 1. Price every ticker and FX pair once so household valuations hit the cache
+    quotes = await get_live_quotes(list(tickers))
+    pairs = [(q["currency"], "USD") for q in quotes.values()]
+    for currency in currencies:
+        pairs += [(currency, "USD"), ("USD", currency)]
+    await get_fx_rates(pairs)
+
+    # 2. A household valuation covers the user and their linked partners, so value each
+    # user once, through the first household (in id order) that includes them
+    linked: Dict[int, list[int]] = {}
+    for user_id, linked_user_id in links:
+        linked.setdefault(user_id, []).append(linked_user_id)
+    covered = set()
+    households = []
+    for user_id in user_ids:
+        if user_id in covered:
+            continue
+        members = [m for m in [user_id] + linked.get(user_id, []) if m not in covered]
+        covered.update(members)
+        households.append((user_id, members))
+
+    semaphore = asyncio.Semaphore(concurrency)
+    rows = []
+    failures: Dict[int, str] = {}
+
+    async def _value(household_user_id: int, members: list[int]):
+        async with semaphore:
+            try:
+                async with session_factory() as db:
+                    valuation = await get_household_valuation(db, household_user_id)
+            except Exception as e:
+                for member in members:
+                    failures[member] = str(e)
+                return
+        for member in members:
+            totals = user_net_worth_totals(valuation, member)
+            rows.append({"owner_id": member, "date": day, **totals})
+
+    await asyncio.gather(*(_value(uid, members) for uid, members in households))
+
+    # 3. Upsert the day's snapshots in batches
+    written = 0
+    if rows:
+        rows.sort(key=lambda r: r["owner_id"])
+        async with session_factory() as db:
+            await upsert_net_worth_snapshots(db, rows)
+            await db.commit()
+        written = len(rows)
+
+    return {
+        "date": day.strftime("%Y-%m-%d"),
+        "users": len(user_ids),
+        "households": len(households),
+        "tickers": len(quotes),
+        "snapshots": written,
+        "failed": failures,
+        "duration_seconds": round(time.perf_counter() - started, 3),
+    }
@@ -3,120 +3,130 @@ import os
 import json
 import logging
 import datetime
-from sqlalchemy import select, func, text
-import pandas as pd
-import yfinance as yf
+from sqlalchemy import select, func, union
 
 from app.database import async_session
-from app.models import UserQueryLog, StockDailyPrice, CompanyProfile
+from app.models import UserQueryLog, StockDailyPrice, CompanyProfile, PortfolioHolding
 from app.cache import get_cache, set_cache
+from app.market_hours import EXCHANGES, exchange_for, is_session_open, is_trading_day
 
 logger = logging.getLogger(__name__)
 
-async def _get_top_tickers(limit: int = 10, days: int = 7) -> list[str]:
-    """Dynamically get the top queried tickers from TimescaleDB."""
-    try:
-        async with async_session() as session:
-            # Query the logs for the most frequent tickers in the last N days
-            time_threshold = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=days)
-            stmt = (
-                select(UserQueryLog.ticker, func.count(UserQueryLog.id).label('count'))
-                .where(UserQueryLog.timestamp >= time_threshold)
-                .group_by(UserQueryLog.ticker)
-                .order_by(func.count(UserQueryLog.id).desc())
-                .limit(limit)
-            )
-            result = await session.execute(stmt)
-            top_tickers = [row.ticker for row in result.all()]
-            
-            # If we don't have enough data, fall back to some defaults
-            defaults = ["AAPL", "MSFT", "NVDA", "GOOGL", "AMZN", "META", "TSLA", "BRK-B", "JPM", "V"]
-            for default in defaults:
-                if len(top_tickers) >= limit:
-                    break
-                if default not in top_tickers:
-                    top_tickers.append(default)
-                    
-            return top_tickers
-            
-    except Exception as e:
-        logger.error(f"Error fetching top tickers: {e}")
-        return ["AAPL", "MSFT", "NVDA"]
+# Tickers per yf.download call, and download/merge groups in flight at once
+INGEST_GROUP_SIZE = 50
+INGEST_CONCURRENCY = 4
+# History fetched for tickers with no stored bars yet
+INGEST_INITIAL_DAYS = 30
 
-async def update_active_tickers_prices():
-    """Lightweight background task to silently update TimescaleDB prices for active tickers."""
-    top_tickers = await _get_top_tickers(limit=10, days=1) # Only care about recent activity
-    logger.info(f"Background refresh: Updating prices for active tickers: {top_tickers}")
+# Tickers queried within this many days are kept fresh alongside every held ticker
+TRACKED_QUERY_DAYS = 7
+# Refresh cadence while an exchange is in session, and the delay of the one refresh after its close
+SESSION_REFRESH_MINUTES = 15
+AFTER_CLOSE_DELAY_MINUTES = 20
 
-    # Process sequentially in background to minimize DB/Network contention
-    for ticker in top_tickers:
-        await _ingest_price_history(ticker)
+async def get_tracked_tickers() -> list[str]:
+    """Every ticker held in any portfolio or queried in the last TRACKED_QUERY_DAYS."""
+    time_threshold = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=TRACKED_QUERY_DAYS)
+    async with async_session() as session:
+        result = await session.execute(union(
+            select(func.upper(PortfolioHolding.ticker)),
+            select(func.upper(UserQueryLog.ticker)).where(UserQueryLog.timestamp >= time_threshold),
+        ))
+        return sorted(ticker for (ticker,) in result.all() if ticker and ticker != "UNKNOWN")
 
-async def _ingest_price_history(ticker: str):
-    """Fetches yfinance data incrementally and upserts into TimescaleDB hypertable."""
-    try:
-        async with async_session() as session:
-            # 1. Find the latest data point we already have for this ticker
-            stmt = select(func.max(StockDailyPrice.time)).where(StockDailyPrice.ticker == ticker.upper())
-            result = await session.execute(stmt)
-            max_date = result.scalar()
-            
-        loop = asyncio.get_running_loop()
-        
-        # 2. Fetch only what we need from yfinance
-        if max_date:
-            # yfinance expects YYYY-MM-DD strings for start/end
-            # We add 1 day to the max_date to avoid re-fetching the same day if market is closed
-            # However, if it's intraday, we might want the same day to get the updated close. 
-            # For simplicity & safety, we'll fetch from the max_date itself and let ON CONFLICT handle the 1-day overlap.
-            start_str = max_date.strftime('%Y-%m-%d')
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
-                hist = await loop.run_in_executor(executor, lambda: yf.Ticker(ticker).history(start=start_str))
+async def refresh_tracked_prices(exchanges: set[str] | None = None) -> int:
+    """Bring stored bars up to date for tracked tickers, optionally only those listed on `exchanges`."""
+    tickers = await get_tracked_tickers()
+    if exchanges is not None:
+        tickers = [t for t in tickers if exchange_for(t) in exchanges]
+    if not tickers:
+        return 0
+    logger.info(f"Price refresh: updating {len(tickers)} tracked tickers")
+    return await ingest_price_history(tickers)
+
+async def refresh_open_markets(now: datetime.datetime | None = None) -> int:
+    """Scheduled every SESSION_REFRESH_MINUTES: refresh tickers whose exchange is in session."""
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    open_exchanges = {exchange for exchange in EXCHANGES if is_session_open(exchange, now)}
+    if not open_exchanges:
+        return 0
+    return await refresh_tracked_prices(open_exchanges)
+
+async def refresh_after_close(exchange: str, now: datetime.datetime | None = None) -> int:
+    """Scheduled shortly after each weekday close: settle the day's bars for the exchange's tickers."""
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    if not is_trading_day(exchange, now.astimezone(EXCHANGES[exchange]["tz"]).date()):
+        return 0
+    return await refresh_tracked_prices({exchange})
+
+async def _latest_bar_times(tickers: list[str]) -> dict[str, datetime.datetime]:
+    """Time of the newest stored bar per ticker, in one query."""
+    async with async_session() as session:
+        result = await session.execute(
+            select(StockDailyPrice.ticker, func.max(StockDailyPrice.time))
+            .where(StockDailyPrice.ticker.in_(tickers))
+            .group_by(StockDailyPrice.ticker)
+        )
+        return dict(result.all())
+
+async def ingest_price_history(tickers: list[str], start: datetime.date | None = None) -> int:
+    """
+    Fetch daily bars incrementally for many tickers and upsert them into the
+    TimescaleDB hypertable. Each ticker resumes from its newest stored bar
+    (re-fetching that day, so an intraday close gets updated), or from `start`
+    when given, e.g. for a backfill. Tickers resuming from the same day are
+    downloaded together, INGEST_GROUP_SIZE per yf.download call, and each group is
+    COPY-loaded and merged in its own transaction, INGEST_CONCURRENCY at a time.
+    Returns the number of bars loaded.
+    """
+    from app.prices import download_daily_bars, store_daily_bars
+
+    symbols = sorted({t.upper().strip() for t in tickers if t})
+    if not symbols:
+        return 0
+    today = datetime.datetime.now(datetime.timezone.utc).date()
+    end = today + datetime.timedelta(days=1)
+    latest = {} if start else await _latest_bar_times(symbols)
+
+    by_start: dict[datetime.date, list[str]] = {}
+    for ticker in symbols:
+        if start:
+            ticker_start = start
+        elif ticker in latest:
+            ticker_start = latest[ticker].astimezone(datetime.timezone.utc).date()
         else:
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
-                hist = await loop.run_in_executor(executor, lambda: yf.Ticker(ticker).history(period="1mo"))
-        
-        if hist.empty:
-            return
+            ticker_start = today - datetime.timedelta(days=INGEST_INITIAL_DAYS)
+        by_start.setdefault(ticker_start, []).append(ticker)
 
-        async with async_session() as session:
-            for date, row in hist.iterrows():
-                # Convert pandas timestamp to standard python datetime with strict UTC
-                dt = date.to_pydatetime()
-                if dt.tzinfo is None:
-                    dt = dt.replace(tzinfo=datetime.timezone.utc)
-                
-                # TimescaleDB Upsert logic
-                stmt = text("""
-                    INSERT INTO stock_daily_prices (time, ticker, open, high, low, close, volume)
-                    VALUES (:time, :ticker, :open, :high, :low, :close, :volume)
-                    ON CONFLICT (time, ticker) DO UPDATE SET
-                    open = EXCLUDED.open,
-                    high = EXCLUDED.high,
-                    low = EXCLUDED.low,
-                    close = EXCLUDED.close,
-                    volume = EXCLUDED.volume;
-                """)
-                await session.execute(stmt, {
-                    "time": dt,
-                    "ticker": ticker,
-                    "open": float(row["Open"]),
-                    "high": float(row["High"]),
-                    "low": float(row["Low"]),
-                    "close": float(row["Close"]),
-                    "volume": int(row["Volume"])
-                })
-            await session.commit()
-    except Exception as e:
-        logger.error(f"Error ingesting price history for {ticker}: {e}")
+    groups = [
+        (group_start, group_tickers[i:i + INGEST_GROUP_SIZE])
+        for group_start, group_tickers in sorted(by_start.items())
+        for i in range(0, len(group_tickers), INGEST_GROUP_SIZE)
+    ]
+    semaphore = asyncio.Semaphore(INGEST_CONCURRENCY)
+
+    async def _ingest_group(group_start: datetime.date, group_tickers: list[str]) -> int:
+        async with semaphore:
+            try:
+                bars = await asyncio.to_thread(download_daily_bars, group_tickers, group_start, end)
+                if not bars:
+                    return 0
+                async with async_session() as session:
+                    await store_daily_bars(session, bars)
+                    await session.commit()
+                return len(bars)
+            except Exception as e:
+                logger.error(f"Error ingesting price history for {group_tickers}: {e}")
+                return 0
+
+    written = await asyncio.gather(*(_ingest_group(s, t) for s, t in groups))
+    return sum(written)
 
 # _prefetch_fundamentals removed intentionally to avoid rate limits
 # Fundamentals are now strictly generated JIT (Just-In-Time) when requested
 
 async def log_user_query(ticker: str, query_type: str = "general"):
-    """Fire-and-forget task to log user interest so the Top 10 script picks it up."""
+    """Fire-and-forget task to log user interest so the price refresher tracks the ticker."""
     try:
         async with async_session() as session:
             log = UserQueryLog(
@@ -0,0 +1,278 @@
+"""
+Household valuation engine.
+
+Resolves everything a user and their linked partners own (accounts, portfolios,
+holdings and manual assets) in a fixed number of queries, prices every distinct
+ticker in one batch and converts currencies from a single FX lookup. The result
+is cached per household for a short TTL and shared by the accounts, net worth,
+goals and monthly summary code paths. The unified portfolio view is built and
+cached the same way from holdings aggregated per ticker.
+"""
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import get_cache, set_cache, delete_cache, get_cache_many, get_live_quotes, get_fx_rates
+from app.models import Account, Portfolio, PortfolioHolding, ManualAsset
+from app.household import get_household
+
+VALUATION_CACHE_TTL = 60
+UNIFIED_PORTFOLIO_CACHE_TTL = 60
+
+def _valuation_cache_key(user_id: int) -> str:
+    return f"valuation:{user_id}"
+
+def _unified_portfolio_cache_key(user_id: int) -> str:
+    return f"unified_portfolio:{user_id}"
+
+async def _household_member_ids(db: AsyncSession, user_id: int) -> list[int]:
+    return (await get_household(db, user_id))["member_ids"]
+
+async def compute_household_valuation(db: AsyncSession, user_id: int) -> dict:
+    """
+    Value every account, portfolio, holding and manual asset in the user's household.
+    Issues five queries regardless of household size and one batched price/FX lookup.
+    All monetary `*_usd` fields are in USD; `balance` and `price` stay in native currency.
+    """
+    member_ids = await _household_member_ids(db, user_id)
+
+    accounts_res = await db.execute(select(Account).where(Account.owner_id.in_(member_ids)).order_by(Account.id))
+    accounts = accounts_res.scalars().all()
+
+    portfolios_res = await db.execute(select(Portfolio).where(Portfolio.owner_id.in_(member_ids)).order_by(Portfolio.id))
+    portfolios = portfolios_res.scalars().all()
+
+    holdings = []
+    if portfolios:
+        holdings_res = await db.execute(
+            select(PortfolioHolding)
+            .where(PortfolioHolding.portfolio_id.in_([p.id for p in portfolios]))
+            .order_by(PortfolioHolding.added_at)
+        )
+        holdings = holdings_res.scalars().all()
+
+    assets_res = await db.execute(select(ManualAsset).where(ManualAsset.owner_id.in_(member_ids)).order_by(ManualAsset.id))
+    manual_assets = assets_res.scalars().all()
+
+    # 1. Price every distinct ticker once
+    quotes = await get_live_quotes([h.ticker for h in holdings])
+
+    # 2. Resolve every FX pair needed for holdings and accounts in one batch
+    portfolio_account_ids = {p.account_id for p in portfolios if p.account_id}
+    pairs = [(q["currency"], "USD") for q in quotes.values()]
+    for a in accounts:
+        if a.account_class == "portfolio" and a.id in portfolio_account_ids:
+            pairs.append(("USD", a.currency))
+        else:
+            pairs.append((a.currency, "USD"))
+    rates = await get_fx_rates(pairs)
+
+    def rate(from_curr: str, to_curr: str) -> float:
+        return rates.get((from_curr.upper().strip(), to_curr.upper().strip()), 1.0)
+
+    # 3. Holdings and portfolios
+    holdings_by_portfolio: dict[int, list[dict]] = {}
+    for h in holdings:
+        quote = quotes.get(h.ticker.upper().strip(), {"price": 0.0, "currency": "USD"})
+        price = quote["price"] or h.avg_cost_basis
+        price_usd = price * rate(quote["currency"], "USD")
+        holdings_by_portfolio.setdefault(h.portfolio_id, []).append({
+            "id": h.id,
+            "ticker": h.ticker,
+            "shares": h.shares,
+            "avg_cost_basis": h.avg_cost_basis,
+            "price": price,
+            "currency": quote["currency"],
+            "price_usd": price_usd,
+            "value_usd": h.shares * price_usd,
+        })
+
+    portfolios_out = []
+    value_by_account: dict[int, float] = {}
+    for p in portfolios:
+        p_holdings = holdings_by_portfolio.get(p.id, [])
+        value_usd = sum(h["value_usd"] for h in p_holdings)
+        if p.account_id:
+            value_by_account[p.account_id] = value_by_account.get(p.account_id, 0.0) + value_usd
+        portfolios_out.append({
+            "id": p.id,
+            "owner_id": p.owner_id,
+            "account_id": p.account_id,
+            "name": p.name,
+            "value_usd": value_usd,
+            "cost_total": sum(h["shares"] * h["avg_cost_basis"] for h in p_holdings),
+            "holdings": p_holdings,
+        })
+
+    # 4. Accounts (portfolio-class accounts are valued from their linked portfolios)
+    accounts_out = []
+    for a in accounts:
+        if a.account_class == "portfolio" and a.id in portfolio_account_ids:
+            balance_usd = value_by_account.get(a.id, 0.0)
+            balance = balance_usd * rate("USD", a.currency)
+        else:
+            balance = a.balance
+            balance_usd = balance * rate(a.currency, "USD")
+        accounts_out.append({
+            "id": a.id,
+            "owner_id": a.owner_id,
+            "name": a.name,
+            "classification": a.classification,
+            "account_class": a.account_class,
+            "balance": balance,
+            "currency": a.currency,
+            "description": a.description,
+            "balance_usd": balance_usd,
+            "created_at": a.created_at.isoformat() if a.created_at else None,
+            "updated_at": a.updated_at.isoformat() if a.updated_at else None,
+        })
+
+    return {
+        "user_id": user_id,
+        "member_ids": member_ids,
+        "accounts": accounts_out,
+        "portfolios": portfolios_out,
+        "manual_assets": [
+            {
+                "id": ma.id,
+                "owner_id": ma.owner_id,
+                "asset_type": ma.asset_type,
+                "value": ma.value,
+                "description": ma.description,
+            }
+            for ma in manual_assets
+        ],
+    }
+
+async def get_household_valuation(db: AsyncSession, user_id: int) -> dict:
+    """Return the cached household valuation for a user, computing it on a cache miss."""
+    cache_key = _valuation_cache_key(user_id)
+    cached = await get_cache(cache_key)
+    if cached is not None:
+        return cached
+
+    valuation = await compute_household_valuation(db, user_id)
+    await set_cache(cache_key, valuation, VALUATION_CACHE_TTL)
+    return valuation
+
+async def compute_unified_portfolio(db: AsyncSession, member_ids: list[int]) -> dict:
+    """
+    Every holding in the household's portfolios combined per ticker, live priced.
+    Holdings are summed in SQL, the distinct tickers are priced in one batch and
+    prices and cost bases are converted to USD from a single FX lookup. Tickers
+    without a live price are valued at cost.
+    """
+    shares = func.sum(PortfolioHolding.shares)
+    cost = func.sum(PortfolioHolding.shares * PortfolioHolding.avg_cost_basis)
+    rows = (await db.execute(
+        select(PortfolioHolding.ticker, shares, cost)
+        .join(Portfolio, Portfolio.id == PortfolioHolding.portfolio_id)
+        .where(Portfolio.owner_id.in_(member_ids))
+        .group_by(PortfolioHolding.ticker)
+        .having(shares > 0)
+        .order_by(PortfolioHolding.ticker)
+    )).all()
+
+    tickers = [ticker for ticker, _, _ in rows]
+    quotes = await get_live_quotes(tickers)
+    rates = await get_fx_rates([(q["currency"], "USD") for q in quotes.values()])
+    details = await get_cache_many([f"{kind}:{t}" for t in tickers for kind in ("name", "sector")])
+
+    holdings = []
+    total_value = 0.0
+    total_cost = 0.0
+    for ticker, ticker_shares, ticker_cost in rows:
+        quote = quotes.get(ticker.upper().strip(), {"price": 0.0, "currency": "USD"})
+        rate = rates.get((quote["currency"].upper().strip(), "USD"), 1.0)
+        avg_cost = ticker_cost / ticker_shares * rate
+        current_price = quote["price"] * rate if quote["price"] else avg_cost
+        current_value = ticker_shares * current_price
+        cost_basis_total = ticker_cost * rate
+        unrealized_pnl = current_value - cost_basis_total
+        total_value += current_value
+        total_cost += cost_basis_total
+        holdings.append({
+            "ticker": ticker,
+            "name": details.get(f"name:{ticker}") or ticker,
+            "sector": details.get(f"sector:{ticker}") or "Unknown",
+            "shares": ticker_shares,
+            "avg_cost_basis": round(avg_cost, 2),
+            "current_price": round(current_price, 2),
+            "current_value": round(current_value, 2),
+            "cost_basis_total": round(cost_basis_total, 2),
+            "unrealized_pnl": round(unrealized_pnl, 2),
+            "unrealized_pnl_pct": round(unrealized_pnl / cost_basis_total * 100, 2) if cost_basis_total > 0 else 0,
+        })
+
+    for h in holdings:
+        h["weight_pct"] = round(h["current_value"] / total_value * 100, 2) if total_value > 0 else 0
+
+    return {
+        "currency": "USD",
+        "holdings": holdings,
+        "total_value": round(total_value, 2),
+        "total_cost": round(total_cost, 2),
+        "total_pnl": round(total_value - total_cost, 2),
+    }
+
+async def get_household_unified_portfolio(db: AsyncSession, user_id: int, member_ids: list[int]) -> dict:
+    """Return the cached unified portfolio of a user's household, computing it on a cache miss."""
+    cache_key = _unified_portfolio_cache_key(user_id)
+    cached = await get_cache(cache_key)
+    if cached is not None:
+        return cached
+
+    unified = await compute_unified_portfolio(db, member_ids)
+    await set_cache(cache_key, unified, UNIFIED_PORTFOLIO_CACHE_TTL)
+    return unified
+
+async def invalidate_household_valuation(db: AsyncSession, owner_id: int) -> None:
+    """
+    Drop cached valuations that include anything owned by `owner_id`.
+    Links are symmetrical, so those are the owner's own household and each linked partner's.
+    """
+    member_ids = await _household_member_ids(db, owner_id)
+    await delete_cache(
+        *[_valuation_cache_key(uid) for uid in member_ids],
+        *[_unified_portfolio_cache_key(uid) for uid in member_ids],
+    )
+
+def linked_goal_asset_value(valuation: dict, asset_type: str | None, asset_id: int | None) -> float:
+    """USD value of the portfolio, manual asset or account a goal is linked to (0.0 if unlinked or not found)."""
+    if not asset_type or not asset_id:
+        return 0.0
+    collection = {
+        "portfolio": ("portfolios", "value_usd"),
+        "manual_asset": ("manual_assets", "value"),
+        "account": ("accounts", "balance_usd"),
+    }.get(asset_type)
+    if not collection:
+        return 0.0
+    key, field = collection
+    return next((item[field] for item in valuation[key] if item["id"] == asset_id), 0.0)
+
+def user_net_worth_totals(valuation: dict, user_id: int) -> dict:
+    """Total assets and liabilities (USD) owned by `user_id`, from a household valuation."""
+    # 1. Manual Assets
+    manual_total = sum(ma["value"] for ma in valuation["manual_assets"] if ma["owner_id"] == user_id)
+
+    # 2. Portfolio Value (only non-account portfolios)
+    portfolio_total = sum(
+        p["cost_total"] for p in valuation["portfolios"]
+        if p["owner_id"] == user_id and p["account_id"] is None
+    )
+
+    # 3. Account Balances (asset vs liability)
+    accounts_assets = 0.0
+    accounts_liabilities = 0.0
+    for a in valuation["accounts"]:
+        if a["owner_id"] != user_id:
+            continue
+        if a["classification"] == "liability":
+            accounts_liabilities += a["balance_usd"]
+        else:
+            accounts_assets += a["balance_usd"]
+
+    return {
+        "total_assets": manual_total + portfolio_total + accounts_assets,
+        "total_liabilities": accounts_liabilities
+    }
@@ -0,0 +1,47 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+# Ensure root project dir is on sys.path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from sqlalchemy import select
+
+from app.database import async_session
+from app.models import PortfolioHolding
+import app.tasks as tasks
+
+def _parse_day(value: str) -> date:
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+async def _held_tickers() -> list[str]:
+    async with async_session() as session:
+        result = await session.execute(select(PortfolioHolding.ticker).distinct())
+        return [ticker for (ticker,) in result.all()]
+
+async def backfill(args):
+    tickers = args.tickers or await _held_tickers()
+    if not tickers:
+        print("No tickers to backfill.")
+        return
+    tasks.INGEST_GROUP_SIZE = args.group_size
+    tasks.INGEST_CONCURRENCY = args.concurrency
+
+    print(f"Backfilling daily prices for {len(tickers)} tickers from {args.start}...")
+    started = time.monotonic()
+    bars = await tasks.ingest_price_history(tickers, start=args.start)
+    print(f"Loaded {bars} bars in {time.monotonic() - started:.1f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-load daily price history into stock_daily_prices.")
+    parser.add_argument("tickers", nargs="*", help="Tickers to load; defaults to every ticker held in a portfolio")
+    parser.add_argument("--start", type=_parse_day, default=date.today() - timedelta(days=365 * 10),
+                        help="First day (YYYY-MM-DD); defaults to ten years ago")
+    parser.add_argument("--group-size", type=int, default=tasks.INGEST_GROUP_SIZE, help="Tickers per download")
+    parser.add_argument("--concurrency", type=int, default=tasks.INGEST_CONCURRENCY, help="Download groups in flight")
+    asyncio.run(backfill(parser.parse_args()))
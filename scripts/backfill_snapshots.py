@@ -1,8 +1,8 @@
+import argparse
 import asyncio
 import os
 import sys
-from datetime import datetime, timezone, timedelta
-import random
+from datetime import datetime, timezone
 
 # Ensure root project dir is on sys.path
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -10,59 +10,40 @@ if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
 from app.database import async_session
-from app.models import User, NetWorthSnapshot
-from sqlalchemy import select, delete
+from app.snapshot_backfill import backfill_net_worth_history, BACKFILL_WORKERS
 
-async def backfill():
-    print("Starting net worth snapshots backfill script...")
-    async with async_session() as db:
-        # Fetch all users
-        res = await db.execute(select(User))
-        users = res.scalars().all()
-        if not users:
-            print("No users found in database. Please register a user first.")
-            return
+DEFAULT_CHECKPOINT = os.path.join(PROJECT_ROOT, "backfill_snapshots.checkpoint.json")
 
-        for u in users:
-            print(f"Backfilling snapshots for user: {u.email} (ID: {u.id})")
-            
-            # Clear existing snapshots to avoid duplicate key errors during backfill
-            await db.execute(delete(NetWorthSnapshot).where(NetWorthSnapshot.owner_id == u.id))
-            await db.commit()
-            
-            # Base net worth approximation
-            base_assets = 15000.0
-            base_liabilities = 3000.0
-            
-            # We generate monthly snapshots going back 6 months
-            now = datetime.now(timezone.utc)
-            for months_back in range(6, -1, -1): # From 6 months ago to today
-                if months_back == 0:
-                    snap_date = datetime(now.year, now.month, now.day, tzinfo=timezone.utc)
-                else:
-                    # Calculate date approximately
-                    snap_date = now - timedelta(days=30 * months_back)
-                    snap_date = datetime(snap_date.year, snap_date.month, snap_date.day, tzinfo=timezone.utc)
+def _parse_day(value: str) -> datetime:
+    return datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc)
 
-                # Growth factor: net worth grows over time, so backwards it is lower
-                factor = 1.0 - (0.04 * months_back) + (random.uniform(-0.02, 0.02))
-                factor = max(0.5, factor) # don't go below 50%
-                
-                assets = base_assets * factor
-                liabilities = base_liabilities * (1.1 - (0.02 * months_back))
-                liabilities = max(0.0, liabilities)
-                
-                snapshot = NetWorthSnapshot(
-                    owner_id=u.id,
-                    date=snap_date,
-                    total_assets=round(assets, 2),
-                    total_liabilities=round(liabilities, 2)
-                )
-                db.add(snapshot)
-                print(f"  Created snapshot for {snap_date.strftime('%Y-%m-%d')}: Assets=${assets:.2f}, Liabilities=${liabilities:.2f}, Net Worth=${(assets - liabilities):.2f}")
-            
-            await db.commit()
-            print(f"Successfully backfilled snapshots for user {u.email}.\n")
+async def backfill(args):
+    print("Reconstructing net worth history from transactions and ledgers...")
+    if args.fresh and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+    report = await backfill_net_worth_history(
+        async_session,
+        start=args.start,
+        end=args.end,
+        workers=args.workers,
+        checkpoint_path=args.checkpoint,
+    )
+    print(
+        f"Backfilled {report['snapshots']} snapshots for {report['users'] - report['skipped']} users "
+        f"({report['start'] or 'earliest'}..{report['end']}, {report['skipped']} already done) "
+        f"in {report['duration_seconds']}s"
+    )
+    for user_id, error in report["failed"].items():
+        print(f"  Failed for user {user_id}: {error}")
+    if report["failed"]:
+        print("Re-run the script to retry the failed users; finished users are skipped.")
 
 if __name__ == "__main__":
-    asyncio.run(backfill())
+    parser = argparse.ArgumentParser(description="Rebuild daily net worth snapshots from stored history.")
+    parser.add_argument("--start", type=_parse_day, help="First day (YYYY-MM-DD); defaults to each user's first record")
+    parser.add_argument("--end", type=_parse_day, help="Last day (YYYY-MM-DD); defaults to yesterday, or to the end of the interrupted run being resumed")
+    parser.add_argument("--workers", type=int, default=BACKFILL_WORKERS, help="Users reconstructed concurrently")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="Progress file used to resume interrupted runs")
+    parser.add_argument("--fresh", action="store_true", help="Ignore any existing checkpoint")
+    asyncio.run(backfill(parser.parse_args()))
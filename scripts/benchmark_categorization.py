@@ -0,0 +1,53 @@
+import argparse
+import os
+import sys
+import time
+
+# Ensure root project dir is on sys.path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app.categorization import CategoryMatcher
+from app.expense_classifier import ExpenseClassifier
+
+def _time(label: str, fn) -> float:
+    began = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - began
+    print(f"  {label:<42} {elapsed:8.3f}s")
+    return elapsed
+
+def benchmark_matcher(rows: int, rules: int):
+    matcher = CategoryMatcher([(f"merchant{i} ", f"Category {i}") for i in range(rules)])
+    # A third of the statement matches no rule
+    descriptions = [f"CARD PAYMENT merchant{i % (rules * 3 // 2)} LONDON GB" for i in range(rows)]
+
+    print(f"Category rules ({rules} literal rules, {rows} descriptions):")
+    slow = _time("one match() per description", lambda: [matcher.match(d) for d in descriptions])
+    fast = _time("match_many()", lambda: matcher.match_many(descriptions))
+    print(f"  speedup: {slow / fast:.1f}x")
+
+def benchmark_classifier(rows: int, categories: int):
+    # Digits are not features, so merchant names are distinguished by letters
+    merchants = [f"shop{chr(97 + m % 26)}{chr(97 + m // 26)}" for m in range(200)]
+    model = ExpenseClassifier()
+    print(f"Expense classifier ({categories} categories, {rows} descriptions):")
+    _time("train on 2000 labelled rows", lambda: model.partial_fit(
+        [f"CARD PAYMENT {merchants[i % 200]} LONDON" for i in range(2000)],
+        [f"Category {i % categories}" for i in range(2000)]
+    ))
+    descriptions = [f"CARD PAYMENT {merchants[i % 200]} REF{i} GB" for i in range(rows)]
+    _time("categorize()", lambda: model.categorize(descriptions))
+    print(f"  model size: {model.nbytes / 1024 / 1024:.1f} MB")
+
+def benchmark(args):
+    benchmark_matcher(args.rows, args.rules)
+    benchmark_classifier(args.rows, args.categories)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time expense categorization on statement-sized batches.")
+    parser.add_argument("--rows", type=int, default=100_000, help="Descriptions to categorize")
+    parser.add_argument("--rules", type=int, default=200, help="Category rules for the matcher")
+    parser.add_argument("--categories", type=int, default=30, help="Categories the classifier is trained on")
+    benchmark(parser.parse_args())
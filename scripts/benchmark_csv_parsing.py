@@ -0,0 +1,105 @@
+import argparse
+import csv
+import io
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from dateutil import parser as date_parser
+
+# Ensure root project dir is on sys.path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app.csv_formats import sample_values, sniff_date_format, sniff_decimal_separator, parse_date_column, parse_number_column
+from app.csv_import import iter_csv_rows, _build_transaction
+from api.routes.finance import EXPENSE_DATE_FORMATS
+
+TICKERS = ["AAPL", "MSFT", "NVDA", "VUSA", "TSLA", "AMZN", "GOOGL", "META"]
+# The importer's column mapping for the synthetic layout below
+BROKER_FIELD_MAP = {
+    "Action": "Action", "Date": "Time", "Ticker": "Ticker", "Name": "Name", "Shares": "No. of shares",
+    "Price": "Price / share", "Currency": "Currency (Price / share)", "Exchange rate": "Exchange rate",
+    "Total": "Total", "Result": "Result", "ID": "ID",
+}
+
+def _broker_statement(rows: int, rng: random.Random, date_format: str) -> str:
+    """A Trading 212 style export of market buys and sells, one every 37 minutes."""
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(["Action", "Time", "Ticker", "Name", "No. of shares", "Price / share",
+                     "Currency (Price / share)", "Exchange rate", "Total", "Result", "ID"])
+    start = datetime(2015, 1, 1, 9, 30)
+    for i in range(rows):
+        shares = round(rng.uniform(0.1, 50), 4)
+        price = round(rng.uniform(5, 900), 2)
+        writer.writerow([
+            "Market buy" if i % 3 else "Market sell",
+            (start + timedelta(minutes=37 * i)).strftime(date_format),
+            rng.choice(TICKERS), "Synthetic Corp", shares, price, "USD", "1.27",
+            f"{shares * price / 1.27:,.2f}", f"{rng.uniform(-50, 50):.2f}" if i % 3 == 0 else "", f"EOF{i}",
+        ])
+    return out.getvalue()
+
+def _expense_statement(rows: int, rng: random.Random) -> list[tuple[str, str]]:
+    """(date, amount) pairs as a UK bank statement writes them."""
+    start = datetime(2015, 1, 1)
+    return [
+        ((start + timedelta(hours=9 * i)).strftime("%d/%m/%Y"), f"£{rng.uniform(-2500, 2500):,.2f}")
+        for i in range(rows)
+    ]
+
+def _time(label: str, fn) -> float:
+    began = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - began
+    print(f"  {label:<42} {elapsed:8.3f}s")
+    return elapsed
+
+def _row_level_broker(content: str):
+    # With nothing column-parsed, every row guesses its own date format and cleans its own numbers
+    for row in csv.DictReader(io.StringIO(content)):
+        _build_transaction(row, BROKER_FIELD_MAP, {})
+
+def _column_broker(content: str):
+    for _ in iter_csv_rows(io.StringIO(content)):
+        pass
+
+def _row_level_expenses(pairs: list[tuple[str, str]]):
+    for date_str, amount_str in pairs:
+        date_parser.parse(date_str, dayfirst=True)
+        float(amount_str.replace("£", "").replace(",", ""))
+
+def _column_expenses(pairs: list[tuple[str, str]]):
+    dates = [d for d, _ in pairs]
+    amounts = [a for _, a in pairs]
+    fmt = sniff_date_format(sample_values(dates), EXPENSE_DATE_FORMATS)
+    decimal = sniff_decimal_separator(sample_values(amounts))
+    parse_date_column(dates, fmt)
+    parse_number_column(amounts, decimal)
+
+def benchmark(args):
+    rng = random.Random(args.seed)
+    print(f"Generating {args.rows} synthetic rows per statement...")
+    expenses = _expense_statement(args.rows, rng)
+
+    for date_format in ("%Y-%m-%d %H:%M:%S", "%m/%d/%Y"):
+        broker = _broker_statement(args.rows, rng, date_format)
+        print(f"Broker statement (Trading 212 layout, {date_format} dates):")
+        slow = _time("row-level format guessing", lambda: _row_level_broker(broker))
+        fast = _time("sniffed formats, column parsing", lambda: _column_broker(broker))
+        print(f"  speedup: {slow / fast:.1f}x")
+
+    print("Bank statement (dd/mm/yyyy, £ amounts):")
+    slow = _time("dateutil per row", lambda: _row_level_expenses(expenses))
+    fast = _time("sniffed formats, column parsing", lambda: _column_expenses(expenses))
+    print(f"  speedup: {slow / fast:.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare row-level and column-level CSV date/number parsing.")
+    parser.add_argument("--rows", type=int, default=100_000, help="Rows in each synthetic statement")
+    parser.add_argument("--seed", type=int, default=7, help="Random seed for the synthetic data")
+    benchmark(parser.parse_args())
@@ -36,3 +36,23 @@ async def clean_database_connections():
     except Exception:
         pass
 
+
+
+# Caches derived from per-user/per-portfolio rows. Every module recreates the schema,
+# so ids are reused between tests and stale entries would leak across them.
+DERIVED_CACHE_PREFIXES = ["valuation:", "expense_count:", "txn_count:", "expense_summary:", "household:", "unified_portfolio:"]
+
+
+@pytest.fixture(autouse=True, scope="function")
+async def clear_derived_caches():
+    """Drop id-keyed derived cache entries before each test."""
+    try:
+        from app.cache import get_valkey_client
+        client = get_valkey_client()
+        for prefix in DERIVED_CACHE_PREFIXES:
+            keys = [key async for key in client.scan_iter(match=f"{prefix}*")]
+            if keys:
+                await client.delete(*keys)
+    except Exception:
+        pass
+    yield
@@ -0,0 +1,113 @@
+"""
+Unit tests for the compiled expense category matcher.
+Covers literal detection, first-match precedence between literal and regex
+rules, statement-sized batches, and which patterns can be applied
+retroactively inside Postgres.
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.categorization import CategoryMatcher, literal_for_pattern, is_postgres_compatible
+
+# ── Literal detection ───────────────────────────────────────
+
+class TestLiteralForPattern:
+    def test_plain_word(self):
+        assert literal_for_pattern("uber") == "uber"
+
+    def test_wildcard_wrapped(self):
+        assert literal_for_pattern(".*Uber.*") == "uber"
+
+    def test_escaped_punctuation(self):
+        assert literal_for_pattern("amazon\\.co\\.uk") == "amazon.co.uk"
+
+    def test_spaces_kept(self):
+        assert literal_for_pattern("UBER EATS") == "uber eats"
+
+    def test_anchor_is_regex(self):
+        assert literal_for_pattern("^tesco") is None
+
+    def test_class_escape_is_regex(self):
+        assert literal_for_pattern("\\d+") is None
+
+    def test_alternation_is_regex(self):
+        assert literal_for_pattern("uber|lyft") is None
+
+# ── Matching ────────────────────────────────────────────────
+
+class TestCategoryMatcher:
+    def test_no_rules(self):
+        assert CategoryMatcher([]).match_many(["UBER", None]) == [None, None]
+
+    def test_case_insensitive(self):
+        matcher = CategoryMatcher([("uber", "Transport")])
+        assert matcher.match("UBER TRIP 123") == "Transport"
+        assert matcher.match("Lyft") is None
+
+    def test_first_rule_wins_regardless_of_position(self):
+        # "lyft" is the first rule, even though "uber" appears earlier in the text
+        matcher = CategoryMatcher([("lyft", "Rideshare"), (".*uber.*", "Transport")])
+        assert matcher.match("UBER THEN LYFT") == "Rideshare"
+        assert matcher.match("UBER ONLY") == "Transport"
+
+    def test_regex_rule_precedes_later_literal(self):
+        matcher = CategoryMatcher([("^tesco", "Groceries"), ("tesco", "Fuel")])
+        assert matcher.match("TESCO STORES 123") == "Groceries"
+        assert matcher.match("PFS TESCO PETROL") == "Fuel"
+
+    def test_anchored_end(self):
+        matcher = CategoryMatcher([("coffee$", "Cafe")])
+        assert matcher.match("Nice coffee") == "Cafe"
+        assert matcher.match("coffee beans") is None
+
+    def test_literal_does_not_span_rows(self):
+        matcher = CategoryMatcher([("ab", "X")])
+        assert matcher.match_many(["a", "b", "cab"]) == [None, None, "X"]
+
+    def test_batch_preserves_order_and_duplicates(self):
+        matcher = CategoryMatcher([("netflix", "Subscriptions"), ("uber", "Transport")])
+        descriptions = ["UBER", "Netflix", "", None, "UBER", "other"]
+        assert matcher.match_many(descriptions) == ["Transport", "Subscriptions", None, None, "Transport", None]
+
+    def test_large_batch_matches_row_by_row(self):
+        rules = [(f"merchant{i} ", f"Category {i}") for i in range(200)] + [(r"^refund\b", "Refunds")]
+        matcher = CategoryMatcher(rules)
+        descriptions = [f"CARD PAYMENT merchant{i % 300} LONDON GB" for i in range(20_000)] + ["REFUND merchant7 "]
+
+        categories = matcher.match_many(descriptions)
+        assert categories[5] == "Category 5"
+        assert categories[250] is None
+        assert categories[-1] == "Category 7"
+        assert categories == [matcher.match(d) for d in descriptions]
+
+# ── Postgres compatibility ──────────────────────────────────
+
+class TestIsPostgresCompatible:
+    def test_plain_and_wildcards(self):
+        assert is_postgres_compatible(".*uber.*")
+        assert is_postgres_compatible("^tesco (stores|express)$")
+
+    def test_shared_class_escapes(self):
+        assert is_postgres_compatible("card \\d{4}\\s+\\w+")
+        assert is_postgres_compatible("amazon\\.co\\.uk")
+
+    def test_word_boundary_falls_back(self):
+        assert not is_postgres_compatible("\\bcafe\\b")
+
+    def test_python_only_groups_fall_back(self):
+        assert not is_postgres_compatible("(?P<shop>tesco)")
+        assert not is_postgres_compatible("(?<=pos )tesco")
+        assert is_postgres_compatible("(?:uber|lyft)(?! eats)")
+
+    def test_python_only_quantifiers_fall_back(self):
+        assert not is_postgres_compatible("a++")
+        assert not is_postgres_compatible("x{,3}")
+
+    def test_posix_bracket_classes_fall_back(self):
+        assert not is_postgres_compatible("[[:alpha:]]+ store")
+        assert not is_postgres_compatible("caf[[=e=]]")
+        assert not is_postgres_compatible("[^[.hyphen.]]")
+        assert is_postgres_compatible("[]a-z[]+")
+        assert is_postgres_compatible("[.:]co")
@@ -189,3 +189,73 @@ async def test_category_rules_lifecycle(unique_user_credentials):
         # Send invalid format
         bad_format_res = await client.get("/api/finance/expenses?month=2023-10-05", headers=headers)
         assert bad_format_res.status_code == 400
+
+@pytest.mark.anyio
+async def test_retroactive_rules_and_apply_all(unique_user_credentials):
+    """
+    Rules using Python-only syntax (\\b word boundaries) fall back to Python matching,
+    multi-line descriptions keep Python's meaning of `.`, and re-applying all rules
+    picks up expenses added without auto-categorization.
+    """
+    import asyncio
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        headers = await get_auth_headers(client, unique_user_credentials)
+
+        for i, description in enumerate(["CAFE NERO 12", "CAFETERIA LUNCH", "TESCO STORES 3", "UBER EATS", "UBER\nEATS"]):
+            res = await client.post("/api/finance/expenses", json={
+                "date": f"2024-02-0{i + 1}T12:00:00Z",
+                "category": "Uncategorized",
+                "amount": 5.0 + i,
+                "description": description,
+                "is_joint": False
+            }, headers=headers)
+            assert res.status_code == 200
+
+        # \b is a word boundary in Python but a backspace in Postgres
+        res = await client.post("/api/finance/category-rules", json={
+            "regex_pattern": r"\bcafe\b",
+            "category_name": "Coffee"
+        }, headers=headers)
+        assert res.status_code == 200
+        assert res.json()["updated_expenses"] == 1
+
+        res = await client.post("/api/finance/category-rules", json={
+            "regex_pattern": "^tesco",
+            "category_name": "Groceries"
+        }, headers=headers)
+        assert res.status_code == 200
+        assert res.json()["updated_expenses"] == 1
+
+        # `.` matches any character but a newline in Python, and in Postgres a newline too
+        res = await client.post("/api/finance/category-rules", json={
+            "regex_pattern": "uber.eats",
+            "category_name": "Takeaway"
+        }, headers=headers)
+        assert res.status_code == 200
+        assert res.json()["updated_expenses"] == 1
+
+        # Manually added expenses are not auto-categorized; apply-all catches them up
+        res = await client.post("/api/finance/expenses", json={
+            "date": "2024-02-10T12:00:00Z",
+            "category": "Uncategorized",
+            "amount": 3.0,
+            "description": "Cafe Central",
+            "is_joint": False
+        }, headers=headers)
+        assert res.status_code == 200
+
+        apply_res = await client.post("/api/finance/category-rules/apply", headers=headers)
+        assert apply_res.status_code == 200
+        job_id = apply_res.json()["job_id"]
+        for _ in range(200):
+            job = (await client.get(f"/api/import-jobs/{job_id}")).json()
+            if job["status"] in ("completed", "failed"):
+                break
+            await asyncio.sleep(0.05)
+        assert job["status"] == "completed"
+        assert job["result"]["updated_expenses"] == 1
+        assert job["rules_applied"] == 3
+
+        uncat = (await client.get("/api/finance/expenses/uncategorized", headers=headers)).json()
+        assert sorted(e["description"] for e in uncat) == ["CAFETERIA LUNCH", "UBER\nEATS"]
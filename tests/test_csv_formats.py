@@ -0,0 +1,68 @@
+"""
+Unit tests for per-file CSV format inference.
+Covers date format and decimal separator sniffing, and the column parsers.
+"""
+import sys
+import os
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.csv_formats import (
+    sample_values, sniff_date_format, sniff_decimal_separator, parse_date_column, parse_number_column
+)
+
+# ── Sniffing ─────────────────────────────────────────────────
+
+class TestSniffDateFormat:
+    FORMATS = ['%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y']
+
+    def test_picks_format_reading_most_samples(self):
+        samples = ['04/13/2025', '05/20/2025', '01/02/2025']
+        assert sniff_date_format(samples, self.FORMATS) == '%m/%d/%Y'
+
+    def test_ambiguous_samples_prefer_earlier_format(self):
+        assert sniff_date_format(['01/02/2025', '03/04/2025'], self.FORMATS) == '%d/%m/%Y'
+
+    def test_no_match(self):
+        assert sniff_date_format(['yesterday', ''], self.FORMATS) is None
+
+    def test_sample_skips_blanks(self):
+        assert sample_values(['', ' 2025-01-01 ', None, 'x'], size=1) == ['2025-01-01']
+
+
+class TestSniffDecimalSeparator:
+    def test_point_decimals(self):
+        assert sniff_decimal_separator(['1,234.50', '12.5', '£3.99']) == '.'
+
+    def test_comma_decimals(self):
+        assert sniff_decimal_separator(['1.234,50', '12,5', '€3,99']) == ','
+
+    def test_thousands_only_is_ambiguous(self):
+        assert sniff_decimal_separator(['1,234', '5,000', '7']) == '.'
+        assert sniff_decimal_separator(['1.234', '12,5']) == ','
+
+
+# ── Column parsing ───────────────────────────────────────────
+
+class TestParseNumberColumn:
+    def test_point_decimals(self):
+        values = ['1,234.50', '£12', ' -7.25 ', '', None, 'n/a']
+        assert parse_number_column(values) == [1234.5, 12.0, -7.25, None, None, None]
+
+    def test_comma_decimals(self):
+        assert parse_number_column(['1.234,50', '€12,5', '7'], ',') == [1234.5, 12.5, 7.0]
+
+    def test_empty(self):
+        assert parse_number_column([]) == []
+
+
+class TestParseDateColumn:
+    def test_outliers_are_none(self):
+        values = ['28/04/2025', ' 13/05/2025 ', '2025-06-02', '']
+        assert parse_date_column(values, '%d/%m/%Y') == [
+            datetime(2025, 4, 28), datetime(2025, 5, 13), None, None
+        ]
+
+    def test_no_format(self):
+        assert parse_date_column(['2025-01-01'], None) == [None]
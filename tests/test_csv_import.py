@@ -6,6 +6,7 @@ using realistic CSV formats (T212, Schwab/Meta, Morgan Stanley/Google).
 import pytest
 import sys
 import os
+from datetime import date
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
@@ -101,6 +102,51 @@ class TestDetectAndParseCsv:
         with pytest.raises(ValueError):
             detect_and_parse_csv("Foo,Bar\n1,2")
 
+    def test_missing_prices_resolved_in_one_batch(self):
+        csv = "\n".join([
+            HEADER_SCHWAB,
+            '"05/15/2025","Restricted Stock Lapse","META","META PLATFORMS INC","10","","0.00",""',
+            '"08/15/2025","Restricted Stock Lapse","META","META PLATFORMS INC","5","","0.00",""',
+            '"08/15/2025","Restricted Stock Lapse","GOOGL","ALPHABET INC","2","","0.00",""',
+            '"08/20/2025","Restricted Stock Lapse","META","META PLATFORMS INC","1","700.00","0.00","700.00"',
+        ])
+        calls = []
+
+        def lookup(requests):
+            calls.append(set(requests))
+            return {("META", date(2025, 5, 15)): 600.0, ("META", date(2025, 8, 15)): 750.0}
+
+        result = detect_and_parse_csv(csv, price_lookup=lookup)
+        assert calls == [{("META", date(2025, 5, 15)), ("META", date(2025, 8, 15)), ("GOOGL", date(2025, 8, 15))}]
+        assert [r["price_per_share"] for r in result] == [600.0, 750.0, 0.0, 700.0]
+        # Generated ids depend on the resolved price and stay stable across imports
+        again = detect_and_parse_csv(csv, price_lookup=lookup)
+        assert [r["external_id"] for r in result] == [r["external_id"] for r in again]
+        assert len({r["external_id"] for r in result}) == 4
+
+    def test_no_lookup_when_prices_present(self):
+        csv = make_t212_csv(
+            'Market buy,2025-04-28 14:33:00,,AAPL,"Apple",EOF001,10,150.00,USD,1.0,,,,,,,,',
+        )
+
+        def lookup(requests):
+            raise AssertionError("no prices should be looked up")
+
+        assert detect_and_parse_csv(csv, price_lookup=lookup)[0]["price_per_share"] == 150.0
+
+    def test_comma_decimals_and_date_outliers(self):
+        csv = make_t212_csv(
+            'Market buy,28/04/2025,,SAP,"SAP",EOF001,"1,5","120,40",EUR,"0,86",,,"155,30",EUR,,,,',
+            'Market buy,13/05/2025,,SAP,"SAP",EOF002,2,"1.210,00",EUR,"0,85",,,"2.420,00",EUR,,,,',
+            'Market sell,2025-06-02T09:15:00,,SAP,"SAP",EOF003,"0,5","130,00",EUR,"0,85","4,80",EUR,"65,00",EUR,,,,',
+        )
+        result = detect_and_parse_csv(csv)
+        assert [r["shares"] for r in result] == [1.5, 2.0, 0.5]
+        assert [r["price_per_share"] for r in result] == [120.4, 1210.0, 130.0]
+        assert result[2]["result_in_local"] == 4.8
+        # Day-first dates come from the sniffed column format; the ISO outlier falls back per row
+        assert [r["executed_at"].date() for r in result] == [date(2025, 4, 28), date(2025, 5, 13), date(2025, 6, 2)]
+
 
 # ── compute_holdings ─────────────────────────────────────────
 
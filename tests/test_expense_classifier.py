@@ -0,0 +1,104 @@
+"""
+Unit tests for the per-user expense classifier.
+Covers feature hashing, incremental training, confidence gating of
+predictions, and statement-sized batches.
+"""
+import sys
+import os
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.expense_classifier import ExpenseClassifier, description_features, N_FEATURES
+
+def _history(n_per_category: int = 12):
+    descriptions = []
+    categories = []
+    for i in range(n_per_category):
+        descriptions += [f"TESCO STORES {1000 + i} LONDON", f"UBER *TRIP {i} HELP.UBER.COM"]
+        categories += ["Groceries", "Transport"]
+    return descriptions, categories
+
+# ── Features ────────────────────────────────────────────────
+
+class TestDescriptionFeatures:
+    def test_empty(self):
+        assert description_features(None) == []
+        assert description_features("1234 5678") == []
+
+    def test_deterministic_and_in_range(self):
+        features = description_features("Tesco Stores")
+        assert features == description_features("TESCO STORES")
+        assert all(0 <= f < N_FEATURES for f in features)
+
+    def test_digits_ignored(self):
+        assert description_features("TESCO 1234") == description_features("TESCO 9876")
+
+# ── Training and prediction ─────────────────────────────────
+
+class TestExpenseClassifier:
+    def test_not_ready_without_history(self):
+        model = ExpenseClassifier()
+        assert model.categorize(["TESCO"]) == [None]
+        model.partial_fit(["TESCO STORES"], ["Groceries"])
+        assert not model.ready
+        assert model.categorize(["TESCO"]) == [None]
+
+    def test_predicts_known_merchants(self):
+        model = ExpenseClassifier()
+        model.partial_fit(*_history())
+        assert model.ready
+        assert model.categorize(["TESCO EXPRESS 99", "UBER *EATS PENDING"]) == ["Groceries", "Transport"]
+
+    def test_unseen_words_are_not_guessed(self):
+        model = ExpenseClassifier()
+        model.partial_fit(*_history())
+        category, confidence = model.predict(["Random Gift Shop"])[0]
+        assert category is None and confidence == 0.0
+
+    def test_threshold(self):
+        model = ExpenseClassifier()
+        model.partial_fit(*_history())
+        # A description mixing both merchants is ambiguous
+        assert model.categorize(["TESCO UBER"], threshold=1.1) == [None]
+
+    def test_incremental_matches_full_fit(self):
+        descriptions, categories = _history()
+        full = ExpenseClassifier()
+        full.partial_fit(descriptions, categories)
+
+        incremental = ExpenseClassifier()
+        incremental.partial_fit(descriptions[:5], categories[:5])
+        incremental.partial_fit(descriptions[5:], categories[5:])
+
+        assert incremental.categories == full.categories
+        assert np.array_equal(incremental.feature_counts, full.feature_counts)
+        assert incremental.predict(["TESCO"]) == full.predict(["TESCO"])
+
+    def test_new_category_added_later(self):
+        model = ExpenseClassifier()
+        model.partial_fit(*_history())
+        model.partial_fit([f"NETFLIX.COM {i}" for i in range(12)], ["Subscriptions"] * 12)
+        assert model.categorize(["NETFLIX.COM 55"]) == ["Subscriptions"]
+        assert model.categorize(["TESCO STORES 1"]) == ["Groceries"]
+
+    def test_large_batch_across_chunks(self):
+        # Digits are not features, so merchant names are distinguished by letters
+        merchants = [f"shop{chr(97 + m % 26)}{chr(97 + m // 26)}" for m in range(200)]
+        model = ExpenseClassifier()
+        model.partial_fit(
+            [f"CARD PAYMENT {merchants[i % 200]} LONDON" for i in range(2000)],
+            [f"Category {i % 20}" for i in range(2000)]
+        )
+        # More unique descriptions than one prediction chunk holds
+        descriptions = [f"CARD PAYMENT {merchants[i % 200]} REF {chr(97 + i % 26)}{i} GB" for i in range(10_000)]
+
+        categories = model.categorize(descriptions)
+        assert categories == [f"Category {i % 20}" for i in range(10_000)]
+
+        # Class normalizers are computed once and reused until the next training batch
+        normalizers = model._log_totals
+        model.categorize(descriptions[:10])
+        assert model._log_totals is normalizers
+        assert model.nbytes == N_FEATURES * 20 * 4
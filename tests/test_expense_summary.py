@@ -0,0 +1,135 @@
+import uuid
+import pytest
+from httpx import ASGITransport, AsyncClient
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.main import app
+from app.expense_summary import add_months, month_sequence
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture(autouse=True, scope="module")
+async def init_test_db():
+    from app.models import Base
+    from app.database import engine
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    await engine.dispose()
+
+@pytest.fixture
+def unique_user():
+    run_id = str(uuid.uuid4())[:8]
+    return {
+        "email": f"test_summary_{run_id}@example.com",
+        "password": "SecurePassword123!",
+        "name": "Summary Tester"
+    }
+
+async def get_auth_headers(client: AsyncClient, credentials: dict) -> dict:
+    reg_res = await client.post("/api/auth/register", json=credentials)
+    assert reg_res.status_code == 200
+
+    log_res = await client.post("/api/auth/login", data={
+        "username": credentials["email"],
+        "password": credentials["password"]
+    })
+    assert log_res.status_code == 200
+    token = log_res.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+class TestMonthHelpers:
+    def test_add_months(self):
+        assert add_months("2024-01", -1) == "2023-12"
+        assert add_months("2023-11", 14) == "2025-01"
+
+    def test_month_sequence(self):
+        assert month_sequence("2023-11", "2024-02") == ["2023-11", "2023-12", "2024-01", "2024-02"]
+        assert month_sequence("2024-02", "2024-01") == []
+
+@pytest.mark.anyio
+async def test_expense_summary_rollups_and_invalidation(unique_user):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        headers = await get_auth_headers(client, unique_user)
+        me = (await client.get("/api/auth/me", headers=headers)).json()
+
+        seeded = [
+            ("2023-01-15T10:00:00Z", "Groceries", 100.0, False),
+            ("2023-02-03T10:00:00Z", "Groceries", 80.0, False),
+            ("2023-02-10T10:00:00Z", "Rent", 1000.0, True),
+            ("2023-02-28T23:30:00Z", "Dining", 20.0, False),
+            ("2023-03-01T00:30:00Z", "Dining", 50.0, False),
+        ]
+        ids = []
+        for date, category, amount, is_joint in seeded:
+            res = await client.post("/api/finance/expenses", json={
+                "date": date, "category": category, "amount": amount,
+                "description": f"{category} {amount}", "is_joint": is_joint
+            }, headers=headers)
+            assert res.status_code == 200
+            ids.append(res.json()["id"])
+
+        res = await client.get(
+            "/api/finance/expenses/summary", params={"start_month": "2023-02", "end_month": "2023-03"}, headers=headers
+        )
+        assert res.status_code == 200
+        data = res.json()
+        assert [m["month"] for m in data["months"]] == ["2023-02", "2023-03"]
+
+        feb, mar = data["months"]
+        assert feb["total"] == 1100.0
+        assert feb["count"] == 3
+        assert feb["by_category"] == {"Groceries": 80.0, "Rent": 1000.0, "Dining": 20.0}
+        assert feb["joint"] == 1000.0
+        assert feb["personal"] == 100.0
+        assert feb["by_payer"] == {str(me["id"]): 1100.0}
+        assert feb["by_day"] == {"2023-02-03": 80.0, "2023-02-10": 1000.0, "2023-02-28": 20.0}
+        assert feb["joint_by_payer"] == {str(me["id"]): 1000.0}
+        assert feb["personal_by_owner"] == {str(me["id"]): 100.0}
+        assert feb["personal_paid_by_others"] == {}
+        # January (outside the range) is still used for February's month-over-month change
+        assert feb["change"] == 1000.0
+        assert feb["change_pct"] == 1000.0
+        assert feb["category_changes"]["Groceries"] == -20.0
+        assert mar["total"] == 50.0
+        assert mar["change"] == -1050.0
+
+        assert data["total"] == 1150.0
+        assert data["by_category"] == {"Groceries": 80.0, "Rent": 1000.0, "Dining": 70.0}
+
+        # Moving a cached closed-month expense into another month invalidates both months
+        res = await client.patch(f"/api/finance/expenses/{ids[2]}", json={
+            "date": "2023-03-10T10:00:00Z"
+        }, headers=headers)
+        assert res.status_code == 200
+
+        data = (await client.get(
+            "/api/finance/expenses/summary", params={"start_month": "2023-02", "end_month": "2023-03"}, headers=headers
+        )).json()
+        feb, mar = data["months"]
+        assert feb["total"] == 100.0
+        assert mar["total"] == 1050.0
+        assert mar["joint"] == 1000.0
+
+        res = await client.delete(f"/api/finance/expenses/{ids[1]}", headers=headers)
+        assert res.status_code == 200
+        feb = (await client.get(
+            "/api/finance/expenses/summary", params={"start_month": "2023-02", "end_month": "2023-02"}, headers=headers
+        )).json()["months"][0]
+        assert feb["by_category"] == {"Dining": 20.0}
+
+        # Defaults to the trailing twelve months
+        default = (await client.get("/api/finance/expenses/summary", headers=headers)).json()
+        assert len(default["months"]) == 12
+
+        bad = await client.get("/api/finance/expenses/summary", params={"start_month": "2023-1"}, headers=headers)
+        assert bad.status_code == 400
+        reversed_range = await client.get(
+            "/api/finance/expenses/summary", params={"start_month": "2023-05", "end_month": "2023-01"}, headers=headers
+        )
+        assert reversed_range.status_code == 400
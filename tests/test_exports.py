@@ -0,0 +1,164 @@
+import csv
+import io
+import uuid
+import pytest
+import pyarrow.parquet as pq
+from httpx import ASGITransport, AsyncClient
+import sys
+import os
+from datetime import datetime, timezone, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.main import app
+from app.database import async_session
+from app.models import Portfolio, Transaction
+import app.exports as exports
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture(autouse=True, scope="module")
+async def init_test_db():
+    from app.models import Base
+    from app.database import engine
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    await engine.dispose()
+
+@pytest.fixture
+def unique_user():
+    run_id = str(uuid.uuid4())[:8]
+    return {
+        "email": f"test_export_{run_id}@example.com",
+        "password": "SecurePassword123!",
+        "name": "Export Tester"
+    }
+
+async def get_auth_headers(client: AsyncClient, credentials: dict) -> dict:
+    reg_res = await client.post("/api/auth/register", json=credentials)
+    assert reg_res.status_code == 200
+
+    log_res = await client.post("/api/auth/login", data={
+        "username": credentials["email"],
+        "password": credentials["password"]
+    })
+    assert log_res.status_code == 200
+    token = log_res.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+def read_csv(res) -> list[dict]:
+    return list(csv.DictReader(io.StringIO(res.text)))
+
+@pytest.mark.anyio
+async def test_portfolio_transactions_export(monkeypatch):
+    # Small batches so the export spans several cursor fetches and row groups
+    monkeypatch.setattr(exports, "EXPORT_BATCH_ROWS", 5)
+    async with async_session() as session:
+        port = Portfolio(name="Export Portfolio")
+        session.add(port)
+        await session.flush()
+        base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        for i in range(12):
+            session.add(Transaction(
+                portfolio_id=port.id,
+                external_id=f"EXP{i}",
+                action="Market buy",
+                ticker="AAPL" if i % 2 == 0 else "MSFT",
+                shares=1.0,
+                price_per_share=100.0 + i,
+                currency="USD",
+                executed_at=base + timedelta(days=i // 2),
+            ))
+        await session.commit()
+        port_id = port.id
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        res = await client.get(f"/api/portfolio/{port_id}/transactions/export")
+        assert res.status_code == 200
+        assert res.headers["content-type"].startswith("text/csv")
+        assert f"portfolio-{port_id}-transactions.csv" in res.headers["content-disposition"]
+        rows = read_csv(res)
+        assert [r["external_id"] for r in rows] == [f"EXP{i}" for i in range(12)]
+        assert float(rows[-1]["price_per_share"]) == 111.0
+        assert rows[0]["executed_at"].startswith("2024-01-01")
+
+        res = await client.get(f"/api/portfolio/{port_id}/transactions/export", params={"format": "parquet"})
+        assert res.status_code == 200
+        parquet = pq.ParquetFile(io.BytesIO(res.content))
+        assert parquet.metadata.num_row_groups == 3
+        table = parquet.read()
+        assert table.column("external_id").to_pylist() == [f"EXP{i}" for i in range(12)]
+        assert table.column("shares").to_pylist() == [1.0] * 12
+
+        res = await client.get(f"/api/portfolio/{port_id}/transactions/export", params={"ticker": "msft"})
+        assert {r["ticker"] for r in read_csv(res)} == {"MSFT"}
+        assert len(read_csv(res)) == 6
+
+        res = await client.get(f"/api/portfolio/{port_id}/transactions/export", params={"format": "xlsx"})
+        assert res.status_code == 400
+        res = await client.get("/api/portfolio/999999/transactions/export")
+        assert res.status_code == 404
+
+@pytest.mark.anyio
+async def test_expenses_export(unique_user):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        headers = await get_auth_headers(client, unique_user)
+        for i, day in enumerate(["2024-02-28", "2024-03-01", "2024-03-15"]):
+            res = await client.post("/api/finance/expenses", json={
+                "date": f"{day}T12:00:00+00:00",
+                "category": "Food",
+                "amount": 10.0 + i,
+                "description": f"Lunch, day {i}",
+                "is_joint": False
+            }, headers=headers)
+            assert res.status_code == 200
+
+        rows = read_csv(await client.get("/api/finance/expenses/export", headers=headers))
+        assert [r["description"] for r in rows] == ["Lunch, day 0", "Lunch, day 1", "Lunch, day 2"]
+
+        res = await client.get(
+            "/api/finance/expenses/export", params={"month": "2024-03", "format": "parquet"}, headers=headers
+        )
+        assert res.status_code == 200
+        table = pq.read_table(io.BytesIO(res.content))
+        assert table.column("amount").to_pylist() == [11.0, 12.0]
+
+        res = await client.get("/api/finance/expenses/export", params={"month": "March"}, headers=headers)
+        assert res.status_code == 400
+
+@pytest.mark.anyio
+async def test_account_ledger_export(unique_user):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        headers = await get_auth_headers(client, unique_user)
+        res = await client.post("/api/finance/accounts", json={
+            "name": "Current", "classification": "asset", "account_class": "cash", "currency": "GBP"
+        }, headers=headers)
+        assert res.status_code == 200
+        account_id = res.json()["id"]
+
+        for i, amount in enumerate([500.0, -20.0, -35.5]):
+            res = await client.post(f"/api/finance/accounts/{account_id}/transactions", json={
+                "amount": amount,
+                "transaction_type": "income" if amount > 0 else "expense",
+                "description": f"Entry {i}",
+                "date": f"2024-04-0{i + 1}T09:00:00+00:00",
+            }, headers=headers)
+            assert res.status_code == 200
+
+        rows = read_csv(await client.get(f"/api/finance/accounts/{account_id}/transactions/export", headers=headers))
+        assert [float(r["amount"]) for r in rows] == [500.0, -20.0, -35.5]
+
+        res = await client.get(
+            f"/api/finance/accounts/{account_id}/transactions/export",
+            params={"start_date": "2024-04-02T00:00:00+00:00"},
+            headers=headers,
+        )
+        assert [r["description"] for r in read_csv(res)] == ["Entry 1", "Entry 2"]
+
+        other = {**unique_user, "email": f"other_{unique_user['email']}"}
+        other_headers = await get_auth_headers(client, other)
+        res = await client.get(f"/api/finance/accounts/{account_id}/transactions/export", headers=other_headers)
+        assert res.status_code == 404
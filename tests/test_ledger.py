@@ -1,9 +1,10 @@
 import uuid
+import asyncio
 import pytest
 from httpx import ASGITransport, AsyncClient
 import sys
 import os
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -153,3 +154,166 @@ async def test_ledger_transactions_and_transfers(unique_user):
         # Verify transfer_in transaction is gone
         res_txs_chase = await client.get(f"/api/finance/accounts/{chase_id}/transactions", headers=headers)
         assert len(res_txs_chase.json()) == 0
+
+@pytest.mark.anyio
+async def test_ledger_pagination_and_running_balance(unique_user):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        headers = await get_auth_headers(client, unique_user)
+
+        res_acc = await client.post("/api/finance/accounts", json={
+            "name": "Monzo Current",
+            "classification": "asset",
+            "account_class": "cash",
+            "balance": 1000.0,
+            "currency": "GBP"
+        }, headers=headers)
+        assert res_acc.status_code == 200
+        acc_id = res_acc.json()["id"]
+
+        # Five transactions on consecutive days: -10, -20, -30, -40, +100
+        base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        for i, amount in enumerate([-10.0, -20.0, -30.0, -40.0, 100.0]):
+            res_tx = await client.post(f"/api/finance/accounts/{acc_id}/transactions", json={
+                "amount": amount,
+                "transaction_type": "income" if amount > 0 else "expense",
+                "description": f"Tx {i}",
+                "date": (base + timedelta(days=i)).isoformat()
+            }, headers=headers)
+            assert res_tx.status_code == 200
+
+        # Unpaginated: newest first, running balance ends at the current balance (1000)
+        res_all = await client.get(f"/api/finance/accounts/{acc_id}/transactions", headers=headers)
+        assert res_all.status_code == 200
+        assert "X-Next-Cursor" not in res_all.headers
+        all_txs = res_all.json()
+        assert [t["description"] for t in all_txs] == ["Tx 4", "Tx 3", "Tx 2", "Tx 1", "Tx 0"]
+        assert [t["running_balance"] for t in all_txs] == [1000.0, 900.0, 940.0, 970.0, 990.0]
+
+        # Paginated with limit=2 walks the same ledger via cursors
+        pages = []
+        cursor = None
+        while True:
+            params = {"limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            res_page = await client.get(f"/api/finance/accounts/{acc_id}/transactions", params=params, headers=headers)
+            assert res_page.status_code == 200
+            pages.append(res_page.json())
+            cursor = res_page.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+        assert [len(p) for p in pages] == [2, 2, 1]
+        flattened = [t for p in pages for t in p]
+        assert [t["id"] for t in flattened] == [t["id"] for t in all_txs]
+        assert [t["running_balance"] for t in flattened] == [t["running_balance"] for t in all_txs]
+
+        # Date range: [Jan 2, Jan 4) -> Tx 2 and Tx 1, balances still reflect later rows
+        res_range = await client.get(
+            f"/api/finance/accounts/{acc_id}/transactions",
+            params={"start_date": "2024-01-02T00:00:00Z", "end_date": "2024-01-04T00:00:00Z"},
+            headers=headers
+        )
+        assert res_range.status_code == 200
+        range_txs = res_range.json()
+        assert [t["description"] for t in range_txs] == ["Tx 2", "Tx 1"]
+        assert [t["running_balance"] for t in range_txs] == [940.0, 970.0]
+
+        res_bad = await client.get(f"/api/finance/accounts/{acc_id}/transactions", params={"cursor": "not-a-cursor"}, headers=headers)
+        assert res_bad.status_code == 400
+
+@pytest.mark.anyio
+async def test_reconcile_account_balances(unique_user):
+    from api.routes.finance import reconcile_account_balances
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        headers = await get_auth_headers(client, unique_user)
+
+        res_acc = await client.post("/api/finance/accounts", json={
+            "name": "Drifting Account",
+            "classification": "asset",
+            "account_class": "cash",
+            "balance": 500.0,
+            "currency": "USD"
+        }, headers=headers)
+        acc_id = res_acc.json()["id"]
+
+        res_tx = await client.post(f"/api/finance/accounts/{acc_id}/transactions", json={
+            "amount": -125.0,
+            "transaction_type": "expense",
+            "date": datetime.now(timezone.utc).isoformat()
+        }, headers=headers)
+        assert res_tx.status_code == 200
+
+        # A manual balance edit re-bases the opening balance, so reconciliation keeps it
+        res_patch = await client.patch(f"/api/finance/accounts/{acc_id}", json={"balance": 400.0}, headers=headers)
+        assert res_patch.status_code == 200
+
+        async with async_session() as db:
+            assert acc_id not in await reconcile_account_balances(db)
+
+            # Simulate a lost update drifting the stored balance away from the ledger
+            account = await db.get(Account, acc_id)
+            account.balance = 12345.0
+            await db.commit()
+
+            corrected = await reconcile_account_balances(db)
+            assert acc_id in corrected
+
+            await db.refresh(account)
+            assert account.balance == 400.0
+            assert account.opening_balance == 525.0
+
+@pytest.mark.anyio
+async def test_concurrent_transfers_preserve_balances(unique_user):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        headers = await get_auth_headers(client, unique_user)
+
+        acc_ids = []
+        for name in ("Pot A", "Pot B", "Pot C"):
+            res = await client.post("/api/finance/accounts", json={
+                "name": name,
+                "classification": "asset",
+                "account_class": "cash",
+                "balance": 1000.0,
+                "currency": "USD"
+            }, headers=headers)
+            assert res.status_code == 200
+            acc_ids.append(res.json()["id"])
+
+        # 300 transfers fired at once, cycling through every direction between the three pots
+        routes = [(a, b) for a in acc_ids for b in acc_ids if a != b]
+        transfers = [(routes[i % len(routes)], float(i % 7 + 1)) for i in range(300)]
+
+        async def transfer(route, amount):
+            return await client.post("/api/finance/accounts/transfer", json={
+                "from_account_id": route[0],
+                "to_account_id": route[1],
+                "amount": amount,
+                "date": datetime.now(timezone.utc).isoformat()
+            }, headers=headers)
+
+        responses = await asyncio.gather(*(transfer(route, amount) for route, amount in transfers))
+        assert all(r.status_code == 200 for r in responses)
+
+        expected = {acc_id: 1000.0 for acc_id in acc_ids}
+        for (src, dst), amount in transfers:
+            expected[src] -= amount
+            expected[dst] += amount
+
+        async with async_session() as db:
+            accounts = (await db.execute(select(Account).where(Account.id.in_(acc_ids)))).scalars().all()
+            # No lost updates: each balance matches the sequential result and money is conserved
+            assert {a.id: a.balance for a in accounts} == pytest.approx(expected)
+            assert sum(a.balance for a in accounts) == pytest.approx(3000.0)
+
+            # Every balance agrees with its ledger
+            for a in accounts:
+                ledger = (await db.execute(
+                    select(AccountTransaction.amount).where(AccountTransaction.account_id == a.id)
+                )).scalars().all()
+                assert a.balance == pytest.approx(a.opening_balance + sum(ledger))
+
+            tx_count = (await db.execute(
+                select(AccountTransaction.id).where(AccountTransaction.account_id.in_(acc_ids))
+            )).scalars().all()
+            assert len(tx_count) == 600
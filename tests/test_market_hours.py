@@ -0,0 +1,95 @@
+"""
+Unit tests for exchange calendars and the market-hours-aware price refresher.
+"""
+import pytest
+import sys
+import os
+from datetime import date, datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.market_hours import exchange_for, is_session_open, is_trading_day
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+# ── Calendars ────────────────────────────────────────────────
+
+class TestTradingDays:
+    def test_nyse_holidays(self):
+        for day in (date(2025, 1, 20), date(2025, 4, 18), date(2025, 6, 19), date(2025, 11, 27), date(2025, 12, 25)):
+            assert not is_trading_day("NYSE", day), day
+
+    def test_nyse_observed_holidays(self):
+        # July 4th 2026 is a Saturday, so the market closes on Friday the 3rd
+        assert not is_trading_day("NYSE", date(2026, 7, 3))
+        # A Saturday New Year's Day leaves the previous Friday open
+        assert is_trading_day("NYSE", date(2021, 12, 31))
+
+    def test_lse_holidays(self):
+        for day in (date(2025, 4, 21), date(2025, 5, 5), date(2025, 8, 25), date(2025, 12, 26)):
+            assert not is_trading_day("LSE", day), day
+        # Weekend Christmas and Boxing Day move to the following Monday and Tuesday
+        assert not is_trading_day("LSE", date(2021, 12, 27))
+        assert not is_trading_day("LSE", date(2021, 12, 28))
+
+    def test_weekends_and_ordinary_days(self):
+        assert not is_trading_day("NYSE", date(2025, 3, 15))
+        assert is_trading_day("NYSE", date(2025, 3, 14))
+        assert is_trading_day("LSE", date(2025, 6, 19))
+
+
+class TestSessions:
+    def test_nyse_session_in_new_york_time(self):
+        assert is_session_open("NYSE", datetime(2025, 3, 14, 13, 30, tzinfo=timezone.utc))  # 09:30 EDT
+        assert not is_session_open("NYSE", datetime(2025, 3, 14, 20, 0, tzinfo=timezone.utc))  # 16:00 EDT
+
+    def test_lse_session_follows_british_summer_time(self):
+        assert is_session_open("LSE", datetime(2025, 7, 1, 7, 0, tzinfo=timezone.utc))  # 08:00 BST
+        assert not is_session_open("LSE", datetime(2025, 1, 6, 7, 0, tzinfo=timezone.utc))  # 07:00 GMT
+
+    def test_exchange_for(self):
+        assert exchange_for("VUSA.L") == "LSE"
+        assert exchange_for("aapl") == "NYSE"
+
+
+# ── Refresher ────────────────────────────────────────────────
+
+@pytest.fixture
+def refreshed(monkeypatch):
+    import app.tasks as tasks
+
+    calls = []
+
+    async def tracked():
+        return ["AAPL", "MSFT", "VUSA.L"]
+
+    async def ingest(tickers, start=None):
+        calls.append(tickers)
+        return len(tickers)
+
+    monkeypatch.setattr(tasks, "get_tracked_tickers", tracked)
+    monkeypatch.setattr(tasks, "ingest_price_history", ingest)
+    return calls
+
+@pytest.mark.anyio
+async def test_refresh_open_markets_only_refreshes_exchanges_in_session(refreshed):
+    from app.tasks import refresh_open_markets
+
+    # 10:00 in London, before New York opens
+    assert await refresh_open_markets(datetime(2025, 3, 14, 10, 0, tzinfo=timezone.utc)) == 1
+    # 15:00 in London, both in session
+    assert await refresh_open_markets(datetime(2025, 3, 14, 15, 0, tzinfo=timezone.utc)) == 3
+    # Saturday
+    assert await refresh_open_markets(datetime(2025, 3, 15, 15, 0, tzinfo=timezone.utc)) == 0
+    assert refreshed == [["VUSA.L"], ["AAPL", "MSFT", "VUSA.L"]]
+
+@pytest.mark.anyio
+async def test_refresh_after_close_skips_holidays(refreshed):
+    from app.tasks import refresh_after_close
+
+    assert await refresh_after_close("NYSE", datetime(2025, 3, 14, 20, 20, tzinfo=timezone.utc)) == 2
+    # Good Friday
+    assert await refresh_after_close("LSE", datetime(2025, 4, 18, 15, 50, tzinfo=timezone.utc)) == 0
+    assert refreshed == [["AAPL", "MSFT"]]
@@ -0,0 +1,153 @@
+import uuid
+import pytest
+from httpx import ASGITransport, AsyncClient
+import sys
+import os
+from datetime import datetime, timezone, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.main import app
+from app.database import async_session
+from app.models import Portfolio, Transaction
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture(autouse=True, scope="module")
+async def init_test_db():
+    from app.models import Base
+    from app.database import engine
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    await engine.dispose()
+
+@pytest.fixture
+def unique_user():
+    run_id = str(uuid.uuid4())[:8]
+    return {
+        "email": f"test_paging_{run_id}@example.com",
+        "password": "SecurePassword123!",
+        "name": "Paging Tester"
+    }
+
+async def get_auth_headers(client: AsyncClient, credentials: dict) -> dict:
+    reg_res = await client.post("/api/auth/register", json=credentials)
+    assert reg_res.status_code == 200
+
+    log_res = await client.post("/api/auth/login", data={
+        "username": credentials["email"],
+        "password": credentials["password"]
+    })
+    assert log_res.status_code == 200
+    token = log_res.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+@pytest.mark.anyio
+async def test_expenses_keyset_pagination(unique_user):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        headers = await get_auth_headers(client, unique_user)
+
+        # Seven expenses, two of them sharing a timestamp to exercise the id tie-breaker
+        base = datetime(2024, 3, 1, 12, 0, tzinfo=timezone.utc)
+        dates = [base + timedelta(days=i) for i in range(6)] + [base + timedelta(days=5)]
+        for i, d in enumerate(dates):
+            res = await client.post("/api/finance/expenses", json={
+                "date": d.isoformat(),
+                "category": "Food",
+                "amount": 10.0 + i,
+                "description": f"Expense {i}",
+                "is_joint": False
+            }, headers=headers)
+            assert res.status_code == 200
+
+        res_all = await client.get("/api/finance/expenses", headers=headers)
+        assert res_all.status_code == 200
+        assert "X-Next-Cursor" not in res_all.headers
+        all_ids = [e["id"] for e in res_all.json()]
+        assert len(all_ids) == 7
+
+        seen = []
+        cursor = None
+        page_sizes = []
+        while True:
+            params = {"limit": 3}
+            if cursor:
+                params["cursor"] = cursor
+            res = await client.get("/api/finance/expenses", params=params, headers=headers)
+            assert res.status_code == 200
+            assert res.headers["X-Total-Count"] == "7"
+            page_sizes.append(len(res.json()))
+            seen.extend(e["id"] for e in res.json())
+            cursor = res.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+
+        assert page_sizes == [3, 3, 1]
+        assert seen == all_ids
+
+        # Month filter combines with pagination
+        res_month = await client.get("/api/finance/expenses", params={"month": "2024-03", "limit": 10}, headers=headers)
+        assert res_month.status_code == 200
+        assert len(res_month.json()) == 7
+        assert "X-Next-Cursor" not in res_month.headers
+
+        res_bad = await client.get("/api/finance/expenses", params={"limit": 3, "cursor": "%%%"}, headers=headers)
+        assert res_bad.status_code == 400
+
+@pytest.mark.anyio
+async def test_portfolio_transactions_keyset_pagination(unique_user):
+    async with async_session() as session:
+        port = Portfolio(name="Paging Portfolio")
+        session.add(port)
+        await session.flush()
+        base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        for i in range(12):
+            session.add(Transaction(
+                portfolio_id=port.id,
+                external_id=f"EXT{i}",
+                action="Market buy",
+                ticker="AAPL" if i % 2 == 0 else "MSFT",
+                shares=1.0,
+                price_per_share=100.0 + i,
+                currency="USD",
+                executed_at=base + timedelta(days=i // 2),
+            ))
+        await session.commit()
+        port_id = port.id
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        first = await client.get(f"/api/portfolio/{port_id}/transactions", params={"limit": 5})
+        assert first.status_code == 200
+        data = first.json()
+        assert data["total"] == 12
+        assert len(data["transactions"]) == 5
+        assert data["next_cursor"]
+
+        ids = [t["id"] for t in data["transactions"]]
+        cursor = data["next_cursor"]
+        while cursor:
+            page = (await client.get(
+                f"/api/portfolio/{port_id}/transactions",
+                params={"limit": 5, "cursor": cursor}
+            )).json()
+            ids.extend(t["id"] for t in page["transactions"])
+            cursor = page["next_cursor"]
+
+        # Offset pagination still works and agrees with the keyset walk
+        offset_ids = []
+        for offset in (0, 5, 10):
+            page = (await client.get(
+                f"/api/portfolio/{port_id}/transactions",
+                params={"limit": 5, "offset": offset}
+            )).json()
+            offset_ids.extend(t["id"] for t in page["transactions"])
+
+        assert len(ids) == 12
+        assert ids == offset_ids
+
+        filtered = (await client.get(f"/api/portfolio/{port_id}/transactions", params={"ticker": "msft"})).json()
+        assert filtered["total"] == 6
+        assert all(t["ticker"] == "MSFT" for t in filtered["transactions"])
@@ -0,0 +1,274 @@
+import asyncio
+import pytest
+from httpx import ASGITransport, AsyncClient
+import sys
+import os
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.main import app
+from app.database import async_session
+from app.models import Portfolio, PortfolioHolding, Transaction, StockDailyPrice
+from sqlalchemy import select
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture(autouse=True, scope="module")
+async def init_test_db():
+    from app.models import Base
+    from app.database import engine
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    await engine.dispose()
+
+SCHWAB_HEADER = 'Date,Action,Symbol,Description,Quantity,Price,Fees & Comm,Amount'
+
+async def create_portfolio(name: str) -> int:
+    async with async_session() as session:
+        port = Portfolio(name=name)
+        session.add(port)
+        await session.commit()
+        return port.id
+
+async def upload(client: AsyncClient, portfolio_id: int, content: str) -> dict:
+    res = await client.post(
+        f"/api/portfolio/{portfolio_id}/import/csv",
+        files={"file": ("export.csv", content.encode("utf-8"), "text/csv")}
+    )
+    assert res.status_code == 200
+    return res.json()
+
+@pytest.mark.anyio
+async def test_import_prices_vests_from_local_store_and_dedups(monkeypatch):
+    import app.csv_import as csv_import
+
+    def no_download(requests):
+        raise AssertionError(f"stored closes should cover {requests}")
+    monkeypatch.setattr(csv_import, "fetch_historical_closes", no_download)
+
+    # Vest days fall on a Saturday and a Monday; the Saturday vest takes the next close
+    async with async_session() as session:
+        session.add_all([
+            StockDailyPrice(time=datetime(2025, 3, 17, tzinfo=timezone.utc), ticker="VSTQ", close=410.0),
+            StockDailyPrice(time=datetime(2025, 6, 16, tzinfo=timezone.utc), ticker="VSTQ", close=480.0),
+        ])
+        await session.commit()
+    portfolio_id = await create_portfolio("Vests")
+
+    content = "\n".join([
+        SCHWAB_HEADER,
+        '"03/15/2025","Restricted Stock Lapse","VSTQ","VEST CO","10","","0.00",""',
+        '"06/16/2025","Restricted Stock Lapse","VSTQ","VEST CO","5","","0.00",""',
+        '"06/20/2025","Sell","VSTQ","VEST CO","3","500.00","0.00","1500.00"',
+    ])
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        first = await upload(client, portfolio_id, content)
+        assert first["new_transactions"] == 3
+        assert first["skipped"] == 0
+        assert first["holdings_count"] == 1
+
+        async with async_session() as session:
+            prices = (await session.execute(
+                select(Transaction.price_per_share)
+                .where(Transaction.portfolio_id == portfolio_id)
+                .order_by(Transaction.executed_at)
+            )).scalars().all()
+        assert prices == [410.0, 480.0, 500.0]
+
+        # Re-importing the same export inserts nothing
+        again = await upload(client, portfolio_id, content)
+        assert again["new_transactions"] == 0
+        assert again["skipped"] == 3
+        assert again["total_in_csv"] == 3
+
+def trade_line(day: str, action: str, ticker: str, shares: str, price: str) -> str:
+    return f'"{day}","{action}","{ticker}","{ticker} INC","{shares}","{price}","0.00",""'
+
+async def stored_holdings(portfolio_id: int) -> dict:
+    async with async_session() as session:
+        rows = (await session.execute(
+            select(PortfolioHolding).where(PortfolioHolding.portfolio_id == portfolio_id)
+        )).scalars().all()
+    return {h.ticker: (round(h.shares, 6), round(h.avg_cost_basis, 4)) for h in rows}
+
+@pytest.mark.anyio
+async def test_incremental_import_matches_full_replay():
+    incremental_id = await create_portfolio("Incremental")
+    full_id = await create_portfolio("Full")
+    first = [
+        trade_line("01/06/2025", "Market buy", "INCA", "10", "100.00"),
+        trade_line("01/07/2025", "Market buy", "INCB", "4", "50.00"),
+    ]
+    second = [
+        trade_line("02/03/2025", "Market buy", "INCA", "10", "120.00"),
+        trade_line("02/04/2025", "Market sell", "INCA", "5", "130.00"),
+        trade_line("02/05/2025", "Market sell", "INCB", "4", "60.00"),
+    ]
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        await upload(client, incremental_id, "\n".join([SCHWAB_HEADER, *first]))
+        res = await upload(client, incremental_id, "\n".join([SCHWAB_HEADER, *first, *second]))
+        assert res["new_transactions"] == 3
+        assert res["holdings_replayed"] is False
+
+        whole = await upload(client, full_id, "\n".join([SCHWAB_HEADER, *first, *second]))
+        assert whole["holdings_replayed"] is True
+
+    assert res["holdings_count"] == whole["holdings_count"] == 1
+    assert res["total_realized_pnl"] == whole["total_realized_pnl"] == 140.0
+    assert await stored_holdings(incremental_id) == await stored_holdings(full_id) == {"INCA": (15.0, 110.0)}
+
+@pytest.mark.anyio
+async def test_backdated_import_replays_positions():
+    portfolio_id = await create_portfolio("Backdated")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        await upload(client, portfolio_id, "\n".join([
+            SCHWAB_HEADER,
+            trade_line("03/03/2025", "Market buy", "BKDT", "10", "200.00"),
+        ]))
+        # A buy dated before the last applied trade changes the average cost from scratch
+        res = await upload(client, portfolio_id, "\n".join([
+            SCHWAB_HEADER,
+            trade_line("01/02/2025", "Market buy", "BKDT", "10", "100.00"),
+        ]))
+        assert res["new_transactions"] == 1
+        assert res["holdings_replayed"] is True
+
+    assert await stored_holdings(portfolio_id) == {"BKDT": (20.0, 150.0)}
+
+T212_HEADER = "Action,Time,ISIN,Ticker,Name,ID,No. of shares,Price / share,Currency (Price / share),Exchange rate,Result,Currency (Result),Total,Currency (Total),Withholding tax,Currency (Withholding tax),Currency conversion fee,Currency (Currency conversion fee)"
+
+def t212_line(action: str, time: str, ticker: str, txn_id: str, shares: str, price: str, result: str, total: str) -> str:
+    return f'{action},{time},US0000000000,{ticker},"{ticker} Corp",{txn_id},{shares},{price},USD,1.0,{result},"GBP",{total},"GBP",,,,'
+
+@pytest.mark.anyio
+async def test_realized_summary_reads_aggregates_and_pages_trades():
+    from app.models import User, Account
+
+    async with async_session() as session:
+        user = User(email="realized_aggregates@example.com", hashed_password="x")
+        session.add(user)
+        await session.flush()
+        # A GBP account keeps the account-currency figures unconverted
+        acc = Account(owner_id=user.id, name="ISA", classification="asset", account_class="portfolio", currency="GBP")
+        session.add(acc)
+        await session.flush()
+        port = Portfolio(name="Realized", owner_id=user.id, account_id=acc.id)
+        session.add(port)
+        await session.commit()
+        portfolio_id = port.id
+
+    first = [
+        t212_line("Market buy", "2025-01-06 10:00:00", "AGGA", "R1", "10", "100.00", "", "1000.00"),
+        t212_line("Market buy", "2025-01-07 10:00:00", "AGGB", "R2", "5", "40.00", "", "200.00"),
+        t212_line("Market sell", "2025-02-03 10:00:00", "AGGA", "R3", "2", "110.00", "20.00", "220.00"),
+    ]
+    second = [
+        t212_line("Dividend (Dividend)", "2025-03-03 10:00:00", "AGGA", "R4", "8", "0.6875", "", "5.50"),
+        t212_line("Market sell", "2025-03-10 10:00:00", "AGGA", "R5", "2", "112.50", "25.00", "225.00"),
+        t212_line("Dividend (Dividend)", "2025-03-12 10:00:00", "AGGB", "R6", "5", "0.60", "", "3.00"),
+    ]
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        await upload(client, portfolio_id, "\n".join([T212_HEADER, *first]))
+        res = await upload(client, portfolio_id, "\n".join([T212_HEADER, *second]))
+        assert res["holdings_replayed"] is False
+
+        summary = (await client.get(f"/api/portfolio/{portfolio_id}/realized")).json()
+        assert summary["currency"] == "GBP"
+        assert summary["realized"] == [{
+            "ticker": "AGGA", "name": "AGGA Corp", "total_proceeds": 445.0,
+            "total_realized_pnl": 45.0, "total_shares_sold": 4.0, "num_trades": 2,
+        }]
+        assert [(d["ticker"], d["total_income"], d["num_payments"]) for d in summary["dividends"]] == [
+            ("AGGA", 5.5, 1), ("AGGB", 3.0, 1)
+        ]
+        assert summary["total_income"] == 53.5
+
+        page = (await client.get(
+            f"/api/portfolio/{portfolio_id}/realized/trades", params={"ticker": "agga", "limit": 1}
+        )).json()
+        assert [t["pnl"] for t in page["trades"]] == [25.0]
+        assert page["next_cursor"]
+        rest = (await client.get(
+            f"/api/portfolio/{portfolio_id}/realized/trades",
+            params={"ticker": "AGGA", "limit": 1, "cursor": page["next_cursor"]}
+        )).json()
+        assert [t["pnl"] for t in rest["trades"]] == [20.0]
+        assert rest["next_cursor"] is None
+
+        payments = (await client.get(
+            f"/api/portfolio/{portfolio_id}/realized/trades", params={"ticker": "AGGB", "kind": "dividend"}
+        )).json()
+        assert [(p["date"], p["shares"], p["income"]) for p in payments["trades"]] == [("2025-03-12", 5.0, 3.0)]
+
+async def wait_for_job(client: AsyncClient, job_id: str) -> dict:
+    for _ in range(200):
+        res = await client.get(f"/api/import-jobs/{job_id}")
+        assert res.status_code == 200
+        job = res.json()
+        if job["status"] in ("completed", "failed"):
+            return job
+        await asyncio.sleep(0.05)
+    raise AssertionError(f"import job {job_id} did not finish")
+
+@pytest.mark.anyio
+async def test_import_job_reports_progress_and_result():
+    portfolio_id = await create_portfolio("Job")
+    lines = [trade_line(f"01/{day:02d}/2025", "Market buy", "JOBQ", "1", "10.00") for day in range(2, 12)]
+    lines.append('"01/13/2025","Market buy","JOBQ","JOBQ INC","many","10.00","0.00",""')
+    content = "\n".join([SCHWAB_HEADER, *lines])
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        res = await client.post(
+            f"/api/portfolio/{portfolio_id}/import/csv/jobs",
+            files={"file": ("export.csv", content.encode("utf-8"), "text/csv")}
+        )
+        assert res.status_code == 200
+        job_id = res.json()["job_id"]
+
+        job = await wait_for_job(client, job_id)
+        assert job["status"] == "completed"
+        assert (job["rows_parsed"], job["inserted"], job["duplicates"], job["failed"]) == (11, 10, 0, 1)
+        assert job["result"]["new_transactions"] == 10
+        assert job["result"]["holdings_count"] == 1
+
+        # The same file again: every row is a duplicate
+        res = await client.post(
+            f"/api/portfolio/{portfolio_id}/import/csv/jobs",
+            files={"file": ("export.csv", content.encode("utf-8"), "text/csv")}
+        )
+        again = await wait_for_job(client, res.json()["job_id"])
+        assert (again["inserted"], again["duplicates"]) == (0, 10)
+
+        missing = await client.get("/api/import-jobs/not-a-job")
+        assert missing.status_code == 404
+
+@pytest.mark.anyio
+async def test_import_job_failure_is_reported():
+    portfolio_id = await create_portfolio("Empty job")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        res = await client.post(
+            f"/api/portfolio/{portfolio_id}/import/csv/jobs",
+            files={"file": ("export.csv", SCHWAB_HEADER.encode("utf-8"), "text/csv")}
+        )
+        job = await wait_for_job(client, res.json()["job_id"])
+    assert job["status"] == "failed"
+    assert job["error"] == "No transactions found in the CSV file."
+    assert job["inserted"] == 0
+
+@pytest.mark.anyio
+async def test_import_job_without_heartbeat_is_reported_failed():
+    from app.cache import set_cache
+    from app.import_jobs import ImportProgress, IMPORT_JOB_TTL
+
+    # As left behind by a worker that died mid-import
+    progress = ImportProgress("stalledjob", "portfolio_csv")
+    progress.state.update(status="running", inserted=40, updated_at="2025-01-01T00:00:00+00:00")
+    await set_cache("import_job:stalledjob", progress.state, IMPORT_JOB_TTL)
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        job = (await client.get("/api/import-jobs/stalledjob")).json()
+    assert job["status"] == "failed"
+    assert job["inserted"] == 0
@@ -0,0 +1,223 @@
+import pytest
+import numpy as np
+import pandas as pd
+from httpx import ASGITransport, AsyncClient
+import sys
+import os
+from datetime import date, datetime, timezone, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.prices import bars_from_download, missing_ranges
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture(scope="module")
+async def init_test_db():
+    from app.models import Base
+    from app.database import engine
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    await engine.dispose()
+
+# ── Download ranges and bars ─────────────────────────────────
+
+class TestMissingRanges:
+    def test_nearby_tickers_share_a_window(self):
+        ranges = missing_ranges({("AAA", date(2025, 3, 14)), ("BBB", date(2025, 3, 14)), ("CCC", date(2025, 1, 2))}, 50)
+        assert ranges == [(date(2024, 12, 26), date(2025, 3, 15), ["CCC", "AAA", "BBB"])]
+
+    def test_windows_are_capped_by_length_and_tickers(self):
+        ranges = missing_ranges({("AAA", date(2025, 1, 2)), ("BBB", date(2025, 1, 2)), ("CCC", date(2025, 6, 2))}, 1)
+        assert ranges == [
+            (date(2024, 12, 26), date(2025, 1, 3), ["AAA"]),
+            (date(2024, 12, 26), date(2025, 1, 3), ["BBB"]),
+            (date(2025, 5, 26), date(2025, 6, 3), ["CCC"]),
+        ]
+
+    def test_far_apart_days_of_a_ticker_are_split(self):
+        ranges = missing_ranges({("AAA", date(2020, 3, 2)), ("AAA", date(2020, 3, 20)), ("AAA", date(2025, 5, 1))}, 50)
+        assert ranges == [
+            (date(2020, 2, 24), date(2020, 3, 21), ["AAA"]),
+            (date(2025, 4, 24), date(2025, 5, 2), ["AAA"]),
+        ]
+
+
+class TestBarsFromDownload:
+    def test_multi_ticker_frame(self):
+        index = pd.DatetimeIndex(["2025-03-13", "2025-03-14"])
+        columns = pd.MultiIndex.from_product([["Open", "High", "Low", "Close", "Volume"], ["AAA", "BBB"]])
+        data = pd.DataFrame(np.arange(20, dtype=float).reshape(2, 10), index=index, columns=columns)
+        data.loc[index[0], ("Close", "BBB")] = np.nan
+
+        bars = bars_from_download(data, ["AAA", "BBB", "MISSING"])
+        assert [(b["ticker"], b["time"]) for b in bars] == [
+            ("AAA", datetime(2025, 3, 13, tzinfo=timezone.utc)),
+            ("AAA", datetime(2025, 3, 14, tzinfo=timezone.utc)),
+            ("BBB", datetime(2025, 3, 14, tzinfo=timezone.utc)),
+        ]
+        assert bars[0]["close"] == 6.0 and bars[0]["volume"] == 8
+        assert bars[2]["open"] == 11.0
+
+    def test_single_ticker_flat_frame(self):
+        data = pd.DataFrame(
+            {"Open": [1.0], "High": [2.0], "Low": [0.5], "Close": [1.5], "Volume": [100.0]},
+            index=pd.DatetimeIndex(["2025-03-14"]),
+        )
+        assert bars_from_download(data, ["AAA"])[0]["close"] == 1.5
+
+    def test_exchange_local_index_keeps_the_trading_day(self):
+        data = pd.DataFrame(
+            {"Open": [1.0], "High": [2.0], "Low": [0.5], "Close": [1.5], "Volume": [100.0]},
+            index=pd.DatetimeIndex(["2025-03-14"]).tz_localize("Asia/Tokyo"),
+        )
+        assert bars_from_download(data, ["AAA"])[0]["time"] == datetime(2025, 3, 14, tzinfo=timezone.utc)
+
+    def test_empty(self):
+        assert bars_from_download(pd.DataFrame(), ["AAA"]) == []
+
+
+# ── As-of lookups against the store ──────────────────────────
+
+@pytest.mark.anyio
+async def test_prices_as_of_fetches_only_missing_ranges(init_test_db, monkeypatch):
+    import app.prices as prices
+    from api.main import app
+    from app.database import async_session
+    from app.models import StockDailyPrice
+
+    async with async_session() as session:
+        session.add_all([
+            StockDailyPrice(time=datetime(2025, 3, 13, tzinfo=timezone.utc), ticker="ASOF", close=100.0),
+            StockDailyPrice(time=datetime(2025, 3, 14, tzinfo=timezone.utc), ticker="ASOF", close=101.0),
+            StockDailyPrice(time=datetime(2025, 1, 2, tzinfo=timezone.utc), ticker="ASOF", close=90.0),
+        ])
+        await session.commit()
+
+    downloads = []
+
+    def fake_download(tickers, start, end):
+        downloads.append((tickers, start, end))
+        return [
+            {"time": datetime(2025, 3, 12, tzinfo=timezone.utc), "ticker": t, "open": None, "high": None,
+             "low": None, "close": 50.0, "volume": None}
+            for t in tickers if t == "NEWQ"
+        ]
+
+    monkeypatch.setattr(prices, "download_daily_bars", fake_download)
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        res = await client.post("/api/prices/as-of", json={"pairs": [
+            {"ticker": "asof", "date": "2025-03-16"},   # Sunday: Friday's close
+            {"ticker": "ASOF", "date": "2025-03-13"},
+            {"ticker": "ASOF", "date": "2025-02-20"},   # Nothing within a week, and upstream has nothing either
+            {"ticker": "NEWQ", "date": "2025-03-14"},
+        ]})
+        assert res.status_code == 200
+        assert res.json()["prices"] == [
+            {"ticker": "ASOF", "date": "2025-03-16", "close": 101.0, "price_date": "2025-03-14"},
+            {"ticker": "ASOF", "date": "2025-03-13", "close": 100.0, "price_date": "2025-03-13"},
+            {"ticker": "ASOF", "date": "2025-02-20", "close": None, "price_date": None},
+            {"ticker": "NEWQ", "date": "2025-03-14", "close": 50.0, "price_date": "2025-03-12"},
+        ]
+        # The unresolved pairs are close enough to share one download
+        assert downloads == [(["ASOF", "NEWQ"], date(2025, 2, 13), date(2025, 3, 15))]
+
+        # Downloaded bars were stored, so the next lookup stays local
+        downloads.clear()
+        res = await client.post("/api/prices/as-of", json={
+            "pairs": [{"ticker": "NEWQ", "date": "2025-03-13"}], "fetch_missing": False
+        })
+        assert res.json()["prices"][0]["close"] == 50.0
+        assert downloads == []
+
+@pytest.mark.anyio
+async def test_ingest_groups_downloads_and_resumes_from_stored_bars(init_test_db, monkeypatch):
+    import app.prices as prices
+    import app.tasks as tasks
+    from sqlalchemy import select, func
+    from app.database import async_session
+    from app.models import StockDailyPrice
+
+    monkeypatch.setattr(tasks, "INGEST_GROUP_SIZE", 2)
+    downloads = []
+
+    def fake_download(tickers, start, end):
+        downloads.append((tickers, start))
+        # The last bar comes twice, as overlapping upstream pages can
+        return [
+            {"time": datetime(2025, 3, day, tzinfo=timezone.utc), "ticker": t, "open": 1.0, "high": 2.0,
+             "low": 0.5, "close": float(day), "volume": 1000}
+            for t in tickers for day in (13, 14, 14)
+        ]
+
+    monkeypatch.setattr(prices, "download_daily_bars", fake_download)
+
+    written = await tasks.ingest_price_history(["inga", "INGB", "INGC"], start=date(2025, 3, 10))
+    assert written == 9
+    assert sorted(downloads) == [(["INGA", "INGB"], date(2025, 3, 10)), (["INGC"], date(2025, 3, 10))]
+
+    # Without a start, stored tickers resume from their newest bar and new ones get recent history
+    downloads.clear()
+    await tasks.ingest_price_history(["INGA", "INGB", "INGC", "INGD"])
+    initial_start = datetime.now(timezone.utc).date() - timedelta(days=tasks.INGEST_INITIAL_DAYS)
+    assert sorted(downloads) == [
+        (["INGA", "INGB"], date(2025, 3, 14)),
+        (["INGC"], date(2025, 3, 14)),
+        (["INGD"], initial_start),
+    ]
+
+    async with async_session() as session:
+        counts = dict((await session.execute(
+            select(StockDailyPrice.ticker, func.count())
+            .where(StockDailyPrice.ticker.in_(["INGA", "INGB", "INGC", "INGD"]))
+            .group_by(StockDailyPrice.ticker)
+        )).all())
+    assert counts == {"INGA": 2, "INGB": 2, "INGC": 2, "INGD": 2}
+
+@pytest.mark.anyio
+async def test_bars_stored_at_exchange_midnight_move_to_utc_midnight(init_test_db, monkeypatch):
+    import app.prices as prices
+    import app.tasks as tasks
+    from sqlalchemy import select
+    from scripts.migrate_daily_bars_utc import rekey_daily_bars
+    from app.database import async_session, engine
+    from app.models import StockDailyPrice
+
+    # As the per-ticker history() ingestion stored them: New York and Tokyo midnights
+    async with async_session() as session:
+        session.add_all([
+            StockDailyPrice(time=datetime(2025, 3, 13, 4, tzinfo=timezone.utc), ticker="OLDT", close=10.0),
+            StockDailyPrice(time=datetime(2025, 3, 14, 4, tzinfo=timezone.utc), ticker="OLDT", close=11.0),
+            StockDailyPrice(time=datetime(2025, 3, 13, 15, tzinfo=timezone.utc), ticker="OLDT.T", close=500.0),
+        ])
+        await session.commit()
+
+    async with engine.begin() as conn:
+        await rekey_daily_bars(conn)
+
+    def fake_download(tickers, start, end):
+        return [
+            {"time": datetime(2025, 3, day, tzinfo=timezone.utc), "ticker": "OLDT", "open": None, "high": None,
+             "low": None, "close": float(day), "volume": None}
+            for day in (14, 17)
+        ]
+
+    monkeypatch.setattr(prices, "download_daily_bars", fake_download)
+    await tasks.ingest_price_history(["OLDT"])
+
+    async with async_session() as session:
+        rows = (await session.execute(
+            select(StockDailyPrice.ticker, StockDailyPrice.time, StockDailyPrice.close)
+            .where(StockDailyPrice.ticker.in_(["OLDT", "OLDT.T"]))
+            .order_by(StockDailyPrice.ticker, StockDailyPrice.time)
+        )).all()
+    assert [(t, when.astimezone(timezone.utc), close) for t, when, close in rows] == [
+        ("OLDT", datetime(2025, 3, 13, tzinfo=timezone.utc), 10.0),
+        ("OLDT", datetime(2025, 3, 14, tzinfo=timezone.utc), 14.0),
+        ("OLDT", datetime(2025, 3, 17, tzinfo=timezone.utc), 17.0),
+        ("OLDT.T", datetime(2025, 3, 14, tzinfo=timezone.utc), 500.0),
+    ]
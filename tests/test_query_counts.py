@@ -0,0 +1,289 @@
+import uuid
+import pytest
+from contextlib import contextmanager
+from httpx import ASGITransport, AsyncClient
+import sys
+import os
+from datetime import datetime, timezone, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from api.main import app
+from app.cache import delete_cache
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture(autouse=True, scope="module")
+async def init_test_db():
+    from app.models import Base
+    from app.database import engine
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    await engine.dispose()
+
+@pytest.fixture
+def unique_user():
+    run_id = str(uuid.uuid4())[:8]
+    return {
+        "email": f"test_qcount_{run_id}@example.com",
+        "password": "SecurePassword123!",
+        "name": "Query Count Tester"
+    }
+
+async def get_auth_headers(client: AsyncClient, credentials: dict) -> dict:
+    reg_res = await client.post("/api/auth/register", json=credentials)
+    assert reg_res.status_code == 200
+
+    log_res = await client.post("/api/auth/login", data={
+        "username": credentials["email"],
+        "password": credentials["password"]
+    })
+    assert log_res.status_code == 200
+    token = log_res.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+@contextmanager
+def count_queries():
+    """Count SQL statements sent to the database while the block runs."""
+    from app.database import engine
+    statements = []
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+
+async def measure_get(client: AsyncClient, url: str, headers: dict, user_id: int):
+    # Drop the cached household and its valuations so every measurement does the full load
+    await delete_cache(f"valuation:{user_id}", f"unified_portfolio:{user_id}", f"household:{user_id}")
+    with count_queries() as statements:
+        res = await client.get(url, headers=headers)
+    assert res.status_code == 200
+    return res.json(), len(statements)
+
+@pytest.mark.anyio
+async def test_get_goals_query_count_is_constant(unique_user):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        headers = await get_auth_headers(client, unique_user)
+        user_id = (await client.get("/api/auth/me", headers=headers)).json()["id"]
+        target_date = (datetime.now(timezone.utc) + timedelta(days=365)).isoformat()
+
+        async def add_goals(count: int):
+            for i in range(count):
+                res = await client.post("/api/finance/goals", json={
+                    "title": f"Goal {i}",
+                    "category": "Other",
+                    "target_amount": 1000.0,
+                    "target_date": target_date
+                }, headers=headers)
+                assert res.status_code == 200
+                goal_id = res.json()["id"]
+                for amount in (100.0, 50.0):
+                    contrib = await client.post(
+                        f"/api/finance/goals/{goal_id}/contributions",
+                        json={"amount": amount},
+                        headers=headers
+                    )
+                    assert contrib.status_code == 200
+
+        await add_goals(2)
+        goals, small_count = await measure_get(client, "/api/finance/goals", headers, user_id)
+        assert len(goals) == 2
+        assert all(g["total_manual_saved"] == 150.0 for g in goals)
+
+        await add_goals(8)
+        goals, large_count = await measure_get(client, "/api/finance/goals", headers, user_id)
+        assert len(goals) == 10
+        assert all(len(g["contributions"]) == 2 for g in goals)
+
+        assert large_count == small_count
+
+@pytest.mark.anyio
+async def test_get_accounts_query_count_is_constant(unique_user):
+    from app.database import async_session
+    from app.models import Portfolio, PortfolioHolding
+    from sqlalchemy import select
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        headers = await get_auth_headers(client, unique_user)
+        user_id = (await client.get("/api/auth/me", headers=headers)).json()["id"]
+
+        async def add_accounts(count: int):
+            for i in range(count):
+                res = await client.post("/api/finance/accounts", json={
+                    "name": f"Brokerage {i}",
+                    "classification": "asset",
+                    "account_class": "portfolio",
+                    "balance": 0.0,
+                    "currency": "USD"
+                }, headers=headers)
+                assert res.status_code == 200
+                cash = await client.post("/api/finance/accounts", json={
+                    "name": f"Checking {i}",
+                    "classification": "asset",
+                    "account_class": "cash",
+                    "balance": 100.0,
+                    "currency": "USD"
+                }, headers=headers)
+                assert cash.status_code == 200
+
+                # Each portfolio-class account gets an auto-created portfolio; give it a holding
+                async with async_session() as session:
+                    port_res = await session.execute(
+                        select(Portfolio).where(Portfolio.account_id == res.json()["id"])
+                    )
+                    port = port_res.scalar_one()
+                    session.add(PortfolioHolding(portfolio_id=port.id, ticker=f"QC{i}", shares=2.0, avg_cost_basis=10.0))
+                    await session.commit()
+
+        await add_accounts(1)
+        accounts, small_count = await measure_get(client, "/api/finance/accounts", headers, user_id)
+        assert len(accounts) == 2
+
+        await add_accounts(5)
+        accounts, large_count = await measure_get(client, "/api/finance/accounts", headers, user_id)
+        assert len(accounts) == 12
+        brokerage = [a for a in accounts if a["account_class"] == "portfolio"]
+        assert all(a["balance_usd"] == 20.0 for a in brokerage)
+
+        assert large_count == small_count
+
+@pytest.mark.anyio
+async def test_unified_portfolio_aggregates_and_prices_in_one_batch(unique_user, monkeypatch):
+    import app.valuation as valuation
+    from app.database import async_session
+    from app.models import Portfolio, PortfolioHolding
+
+    quote_calls = []
+
+    async def fake_quotes(tickers):
+        quote_calls.append(sorted(set(tickers)))
+        return {t: {"price": 15.0, "currency": "USD"} for t in tickers}
+
+    monkeypatch.setattr(valuation, "get_live_quotes", fake_quotes)
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        headers = await get_auth_headers(client, unique_user)
+        user_id = (await client.get("/api/auth/me", headers=headers)).json()["id"]
+
+        async with async_session() as session:
+            ports = [Portfolio(name=f"Unified {i}", owner_id=user_id) for i in range(2)]
+            session.add_all(ports)
+            await session.flush()
+            port_ids = [p.id for p in ports]
+            await session.commit()
+
+        async def add_tickers(start: int, count: int):
+            # Every ticker is held in both portfolios, at different cost bases
+            async with async_session() as session:
+                for i in range(start, start + count):
+                    session.add(PortfolioHolding(portfolio_id=port_ids[0], ticker=f"UQ{i}", shares=2.0, avg_cost_basis=10.0))
+                    session.add(PortfolioHolding(portfolio_id=port_ids[1], ticker=f"UQ{i}", shares=3.0, avg_cost_basis=20.0))
+                await session.commit()
+
+        await add_tickers(0, 2)
+        unified, small_count = await measure_get(client, "/api/finance/unified-portfolio", headers, user_id)
+        assert [h["ticker"] for h in unified["holdings"]] == ["UQ0", "UQ1"]
+        assert unified["holdings"][0]["shares"] == 5.0
+        assert unified["holdings"][0]["avg_cost_basis"] == 16.0
+        assert unified["holdings"][0]["current_value"] == 75.0
+        assert unified["total_cost"] == 160.0
+        assert unified["total_pnl"] == -10.0
+
+        await add_tickers(2, 6)
+        unified, large_count = await measure_get(client, "/api/finance/unified-portfolio", headers, user_id)
+        assert len(unified["holdings"]) == 8
+        assert large_count == small_count
+        assert quote_calls[-1] == [f"UQ{i}" for i in range(8)]
+
+        # Served from the household cache until a holding changes
+        calls_before = len(quote_calls)
+        with count_queries() as warm:
+            res = await client.get("/api/finance/unified-portfolio", headers=headers)
+        assert res.json() == unified
+        assert len(warm) < large_count
+        assert len(quote_calls) == calls_before
+
+@pytest.mark.anyio
+async def test_household_resolved_from_cache_until_linked(unique_user):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        headers = await get_auth_headers(client, unique_user)
+        user_id = (await client.get("/api/auth/me", headers=headers)).json()["id"]
+        partner = {**unique_user, "email": f"partner_{unique_user['email']}", "name": "Pat"}
+        partner_headers = await get_auth_headers(client, partner)
+        res = await client.post("/api/finance/expenses", json={
+            "date": datetime.now(timezone.utc).isoformat(), "category": "Food", "amount": 12.0,
+            "description": "Partner lunch", "is_joint": False
+        }, headers=partner_headers)
+        assert res.status_code == 200
+
+        await delete_cache(f"household:{user_id}")
+        with count_queries() as cold:
+            res = await client.get("/api/finance/expenses", headers=headers)
+        assert res.json() == []
+        with count_queries() as warm:
+            res = await client.get("/api/finance/expenses", headers=headers)
+        assert res.json() == []
+        # The household lookup is skipped once cached
+        assert len(warm) == len(cold) - 1
+
+        # Linking drops the cached membership, so the partner's expenses show up at once
+        res = await client.post("/api/auth/link-account", json={"target_email": partner["email"]}, headers=headers)
+        assert res.status_code == 200
+        res = await client.get("/api/finance/expenses", headers=headers)
+        assert [e["description"] for e in res.json()] == ["Partner lunch"]
+
+        goals_res = await client.post("/api/finance/goals", json={
+            "title": "Trip", "category": "Vacation", "target_amount": 500.0,
+            "target_date": (datetime.now(timezone.utc) + timedelta(days=90)).isoformat()
+        }, headers=partner_headers)
+        assert goals_res.status_code == 200
+        goals = (await client.get("/api/finance/goals", headers=headers)).json()
+        assert goals[0]["owner_name"] == "Pat"
+
+@pytest.mark.anyio
+async def test_live_quotes_price_cache_misses_in_one_download(monkeypatch):
+    import app.cache as cache
+
+    run_id = str(uuid.uuid4())[:6].upper()
+    usd, pence, unseen = f"LQA{run_id}", f"LQB{run_id}.L", f"LQC{run_id}"
+    # Seen before: their quote units are cached, their prices have expired
+    await cache.set_cache(f"quote_currency:{usd}", "USD", 60)
+    await cache.set_cache(f"quote_currency:{pence}", "GBp", 60)
+    await cache.set_cache(f"currency:{pence}", "GBP", 60)
+
+    downloads, single_lookups = [], []
+
+    def fake_download(tickers):
+        downloads.append(sorted(tickers))
+        return {usd: 10.0, pence: 250.0}
+
+    async def fake_live_price(ticker, fallback=0.0):
+        single_lookups.append(ticker)
+        return 7.0
+
+    monkeypatch.setattr(cache, "_download_last_prices", fake_download)
+    monkeypatch.setattr(cache, "get_live_price", fake_live_price)
+
+    quotes = await cache.get_live_quotes([usd, pence, unseen])
+    assert quotes[usd] == {"price": 10.0, "currency": "USD"}
+    assert quotes[pence] == {"price": 2.5, "currency": "GBP"}
+    assert quotes[unseen]["price"] == 7.0
+    assert downloads == [sorted([usd, pence])]
+    assert single_lookups == [unseen]
+
+    # The batch filled the price cache
+    downloads.clear()
+    quotes = await cache.get_live_quotes([usd, pence])
+    assert quotes[pence]["price"] == 2.5
+    assert downloads == []
+
+    await delete_cache(*[f"{prefix}:{t}" for prefix in ("live_price", "quote_currency", "currency") for t in (usd, pence)])
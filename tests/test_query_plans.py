@@ -0,0 +1,134 @@
+"""
+Checks that month/period filters are sargable: on seeded data, EXPLAIN must show
+the date predicate as an index condition on the composite (owner, date) indexes
+rather than a filter applied after scanning every row an owner has.
+"""
+import pytest
+import sys
+import os
+from datetime import datetime, timezone, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text, insert, select
+from app.database import async_session
+from app.models import User, Expense, Income, Account, AccountTransaction
+from app.expense_summary import month_range
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture(autouse=True, scope="module")
+async def init_test_db():
+    from app.models import Base
+    from app.database import engine
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    await engine.dispose()
+
+async def _plan(db, sql: str, params: dict) -> str:
+    rows = (await db.execute(text("EXPLAIN " + sql), params)).all()
+    return "\n".join(r[0] for r in rows)
+
+def _index_conditions(plan: str) -> list[str]:
+    return [line.strip() for line in plan.splitlines() if "Index Cond" in line]
+
+class TestMonthRange:
+    def test_half_open_bounds(self):
+        assert month_range("2024-02") == (
+            datetime(2024, 2, 1, tzinfo=timezone.utc),
+            datetime(2024, 3, 1, tzinfo=timezone.utc),
+        )
+
+    def test_december_rolls_over(self):
+        assert month_range("2023-12")[1] == datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    def test_invalid(self):
+        for bad in ("2023-13", "2023-10-05", "October"):
+            with pytest.raises(ValueError):
+                month_range(bad)
+
+@pytest.mark.anyio
+async def test_month_filters_use_date_indexes():
+    async with async_session() as db:
+        owners = []
+        for i in range(4):
+            user = User(email=f"plans_{i}@example.com", hashed_password="x", name=f"Plans {i}")
+            db.add(user)
+            await db.flush()
+            owners.append(user.id)
+        account = Account(
+            owner_id=owners[0], name="Current", classification="asset", account_class="cash",
+            balance=0.0, opening_balance=0.0
+        )
+        db.add(account)
+        await db.flush()
+
+        base = datetime(2022, 1, 1, tzinfo=timezone.utc)
+        expenses, incomes, ledger = [], [], []
+        for i in range(8000):
+            when = base + timedelta(hours=6 * i)
+            expenses.append({
+                "owner_id": owners[i % 4], "date": when, "category": "Food",
+                "amount": 1.0, "description": f"Row {i}", "is_joint": 0
+            })
+            incomes.append({"owner_id": owners[i % 4], "date": when, "source": "Salary", "amount": 1.0})
+            ledger.append({"account_id": account.id, "amount": 1.0, "transaction_type": "income", "date": when})
+        await db.execute(insert(Expense), expenses)
+        await db.execute(insert(Income), incomes)
+        await db.execute(insert(AccountTransaction), ledger)
+        await db.commit()
+
+        index_names = set((await db.execute(text("SELECT indexname FROM pg_indexes"))).scalars().all())
+        assert {"idx_expense_owner_date_id", "idx_income_owner_date", "idx_account_txn_account_date_id"} <= index_names
+
+        for table in ("expenses", "income", "account_transactions"):
+            await db.execute(text(f"ANALYZE {table}"))
+        # Keep the check independent of table size: only index access paths are of interest
+        await db.execute(text("SET enable_seqscan = off"))
+
+        start, end = month_range("2023-03")
+        params = {"owner_ids": owners[:2], "account_id": account.id, "start": start, "end": end}
+
+        plan = await _plan(
+            db,
+            "SELECT * FROM expenses WHERE owner_id = ANY(:owner_ids) AND date >= :start AND date < :end "
+            "ORDER BY date DESC, id DESC",
+            params
+        )
+        assert any("date" in cond for cond in _index_conditions(plan)), plan
+
+        plan = await _plan(
+            db,
+            "SELECT * FROM income WHERE owner_id = ANY(:owner_ids) AND date >= :start AND date < :end",
+            params
+        )
+        assert any("date" in cond for cond in _index_conditions(plan)), plan
+
+        plan = await _plan(
+            db,
+            "SELECT * FROM account_transactions WHERE account_id = :account_id AND date >= :start AND date < :end "
+            "ORDER BY date DESC, id DESC",
+            params
+        )
+        assert any("date" in cond for cond in _index_conditions(plan)), plan
+
+        # The old extract() form cannot use the date column in an index condition
+        plan = await _plan(
+            db,
+            "SELECT * FROM expenses WHERE owner_id = ANY(:owner_ids) "
+            "AND EXTRACT(year FROM date) = 2023 AND EXTRACT(month FROM date) = 3",
+            params
+        )
+        assert not any("date" in cond for cond in _index_conditions(plan)), plan
+        await db.execute(text("RESET enable_seqscan"))
+
+        rows = (await db.execute(
+            select(Expense.id).where(
+                Expense.owner_id.in_(owners[:2]), Expense.date >= start, Expense.date < end
+            )
+        )).all()
+        # 31 days * 4 rows/day, half of them owned by the two selected owners
+        assert len(rows) == 62
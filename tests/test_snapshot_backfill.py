@@ -0,0 +1,201 @@
+"""
+Unit tests for net-worth history reconstruction.
+Covers as-of sampling of step series, position replay, per-day valuation of
+accounts, portfolios and manual assets, checkpoints, and throughput over a
+long history.
+"""
+import time
+import sys
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.snapshot_backfill import (
+    as_of, replay_positions, reconstruct_user_history, history_start,
+    load_checkpoint, save_checkpoint, unfinished_run_end, fx_symbol
+)
+
+def _at(day: str) -> datetime:
+    return datetime.fromisoformat(day).replace(hour=12, tzinfo=timezone.utc)
+
+def _days(first: str, last: str) -> np.ndarray:
+    return np.arange(np.datetime64(first), np.datetime64(last) + 1, dtype="datetime64[D]")
+
+def _series(pairs: list[tuple[str, float]]) -> tuple[np.ndarray, np.ndarray]:
+    return (
+        np.array([d for d, _ in pairs], dtype="datetime64[D]"),
+        np.array([v for _, v in pairs], dtype=np.float64),
+    )
+
+def _empty_data(**overrides) -> dict:
+    data = {"accounts": [], "ledger": [], "portfolios": [], "transactions": [], "holdings": [], "manual_assets": []}
+    data.update(overrides)
+    return data
+
+def _txn(portfolio_id, ticker, action, shares, price, day, currency="USD"):
+    return {
+        "portfolio_id": portfolio_id, "ticker": ticker, "action": action, "shares": shares,
+        "price_per_share": price, "currency": currency, "executed_at": _at(day),
+    }
+
+# ── As-of sampling ──────────────────────────────────────────
+
+class TestAsOf:
+    def test_carries_forward_and_defaults_before_first(self):
+        step_days, values = _series([("2024-01-02", 10.0), ("2024-01-04", 12.0)])
+        sampled = as_of(step_days, values, _days("2024-01-01", "2024-01-05"), 0.0)
+        assert sampled.tolist() == [0.0, 10.0, 10.0, 12.0, 12.0]
+
+    def test_last_step_of_a_day_wins(self):
+        step_days, values = _series([("2024-01-02", 1.0), ("2024-01-02", 3.0)])
+        assert as_of(step_days, values, _days("2024-01-02", "2024-01-02")).tolist() == [3.0]
+
+    def test_empty_series(self):
+        assert np.isnan(as_of(np.array([], dtype="datetime64[D]"), np.array([]), _days("2024-01-01", "2024-01-02"))).all()
+
+# ── Position replay ─────────────────────────────────────────
+
+class TestReplayPositions:
+    def test_buys_and_sells_at_average_cost(self):
+        positions = replay_positions([
+            _txn(1, "AAPL", "Market buy", 10, 100.0, "2024-01-01"),
+            _txn(1, "AAPL", "Limit buy", 10, 200.0, "2024-01-02"),
+            _txn(1, "AAPL", "Dividend (Dividend)", 0, 0.0, "2024-01-03"),
+            _txn(1, "AAPL", "Market sell", 5, 300.0, "2024-01-04"),
+        ])
+        step_days, shares, cost = positions[(1, "AAPL")]
+        assert len(step_days) == 3
+        assert shares.tolist() == [10.0, 20.0, 15.0]
+        assert cost.tolist() == [1000.0, 3000.0, 2250.0]
+
+    def test_split_keeps_cost(self):
+        positions = replay_positions([
+            _txn(1, "NVDA", "Market buy", 2, 500.0, "2024-01-01"),
+            _txn(1, "NVDA", "Stock split close", 2, 500.0, "2024-06-10"),
+            _txn(1, "NVDA", "Stock split open", 20, 50.0, "2024-06-10"),
+        ])
+        _, shares, cost = positions[(1, "NVDA")]
+        assert shares[-1] == 20.0
+        assert cost[-1] == 1000.0
+
+    def test_portfolios_are_separate(self):
+        positions = replay_positions([
+            _txn(1, "msft", "Market buy", 1, 10.0, "2024-01-01"),
+            _txn(2, "MSFT", "Market buy", 2, 10.0, "2024-01-01"),
+        ])
+        assert set(positions) == {(1, "MSFT"), (2, "MSFT")}
+
+# ── Reconstruction ──────────────────────────────────────────
+
+class TestReconstructUserHistory:
+    def test_ledger_account_rewinds_from_current_balance(self):
+        data = _empty_data(
+            accounts=[{"id": 7, "classification": "asset", "account_class": "cash", "balance": 1500.0,
+                       "currency": "USD", "created_at": _at("2024-01-01")}],
+            ledger=[
+                {"account_id": 7, "date": _at("2024-01-03"), "amount": 1000.0},
+                {"account_id": 7, "date": _at("2024-01-05"), "amount": -500.0},
+            ],
+        )
+        assets, liabilities = reconstruct_user_history(data, _days("2024-01-01", "2024-01-06"), {}, {})
+        assert assets.tolist() == [1000.0, 1000.0, 2000.0, 2000.0, 1500.0, 1500.0]
+        assert liabilities.tolist() == [0.0] * 6
+
+    def test_nothing_before_the_account_existed(self):
+        data = _empty_data(accounts=[{"id": 1, "classification": "liability", "account_class": "loan",
+                                      "balance": 300.0, "currency": "USD", "created_at": _at("2024-01-03")}])
+        _, liabilities = reconstruct_user_history(data, _days("2024-01-01", "2024-01-04"), {}, {})
+        assert liabilities.tolist() == [0.0, 0.0, 300.0, 300.0]
+
+    def test_foreign_balance_uses_stored_then_current_rate(self):
+        data = _empty_data(accounts=[{"id": 1, "classification": "asset", "account_class": "cash",
+                                      "balance": 100.0, "currency": "GBP", "created_at": _at("2024-01-01")}])
+        prices = {fx_symbol("GBP"): _series([("2024-01-02", 1.25)])}
+        assets, _ = reconstruct_user_history(data, _days("2024-01-01", "2024-01-03"), prices, {"GBP": 1.3})
+        assert np.allclose(assets, [130.0, 125.0, 125.0])
+
+    def test_portfolio_account_valued_at_as_of_close(self):
+        data = _empty_data(
+            accounts=[{"id": 3, "classification": "asset", "account_class": "portfolio", "balance": 0.0,
+                       "currency": "USD", "created_at": _at("2024-01-01")}],
+            portfolios=[{"id": 9, "account_id": 3}],
+            transactions=[_txn(9, "AAPL", "Market buy", 10, 100.0, "2024-01-02")],
+        )
+        # No close stored on the 2nd (falls back to cost), a weekend gap on the 4th carries the 3rd forward
+        prices = {"AAPL": _series([("2024-01-03", 110.0), ("2024-01-05", 120.0)])}
+        assets, _ = reconstruct_user_history(data, _days("2024-01-01", "2024-01-05"), prices, {})
+        assert assets.tolist() == [0.0, 1000.0, 1100.0, 1100.0, 1200.0]
+
+    def test_standalone_portfolio_counts_at_cost(self):
+        data = _empty_data(
+            portfolios=[{"id": 4, "account_id": None}],
+            transactions=[_txn(4, "AAPL", "Market buy", 10, 100.0, "2024-01-02")],
+        )
+        prices = {"AAPL": _series([("2024-01-02", 150.0)])}
+        assets, _ = reconstruct_user_history(data, _days("2024-01-01", "2024-01-02"), prices, {})
+        assert assets.tolist() == [0.0, 1000.0]
+
+    def test_manual_holdings_and_assets(self):
+        data = _empty_data(
+            portfolios=[{"id": 5, "account_id": None}],
+            holdings=[{"portfolio_id": 5, "ticker": "VOO", "shares": 2.0, "avg_cost_basis": 400.0,
+                       "added_at": _at("2024-01-02")}],
+            manual_assets=[{"value": 250.0, "updated_at": _at("2024-01-03")}],
+        )
+        assets, _ = reconstruct_user_history(data, _days("2024-01-01", "2024-01-03"), {}, {})
+        assert assets.tolist() == [0.0, 800.0, 1050.0]
+
+    def test_history_start(self):
+        assert history_start(_empty_data()) is None
+        data = _empty_data(
+            accounts=[{"id": 1, "created_at": _at("2024-03-01")}],
+            ledger=[{"account_id": 1, "date": _at("2023-12-31"), "amount": 1.0}],
+        )
+        assert history_start(data) == np.datetime64("2023-12-31")
+
+    def test_throughput_over_years_of_history(self):
+        days = _days("2015-01-01", "2024-12-31")
+        accounts = [{"id": i, "classification": "asset", "account_class": "cash", "balance": 0.0,
+                     "currency": "USD", "created_at": _at("2015-01-01")} for i in range(5)]
+        ledger = [
+            {"account_id": i % 5, "date": _at(str(days[i % len(days)])), "amount": 1.0}
+            for i in range(20_000)
+        ]
+        transactions = [
+            _txn(1, f"T{i % 50}", "Market buy", 1, 10.0, str(days[(i * 7) % len(days)]))
+            for i in range(5_000)
+        ]
+        transactions.sort(key=lambda t: t["executed_at"])
+        data = _empty_data(accounts=accounts, ledger=ledger, portfolios=[{"id": 1, "account_id": None}],
+                           transactions=transactions)
+
+        start = time.perf_counter()
+        assets, _ = reconstruct_user_history(data, days, {}, {})
+        elapsed = time.perf_counter() - start
+
+        assert assets[-1] == 5_000 * 10.0
+        assert elapsed < 1.0
+
+# ── Checkpoints ─────────────────────────────────────────────
+
+class TestCheckpoint:
+    def test_round_trip_and_run_key(self, tmp_path):
+        path = str(tmp_path / "checkpoint.json")
+        assert load_checkpoint(path, "run") == set()
+        save_checkpoint(path, "run", {3, 1})
+        assert load_checkpoint(path, "run") == {1, 3}
+        # A different range starts over
+        assert load_checkpoint(path, "other") == set()
+
+    def test_unfinished_run_keeps_its_end(self, tmp_path):
+        path = str(tmp_path / "checkpoint.json")
+        assert unfinished_run_end(path, "earliest") is None
+        save_checkpoint(path, "earliest..2025-03-13", {1})
+        assert unfinished_run_end(path, "earliest") == np.datetime64("2025-03-13")
+        assert unfinished_run_end(path, "2025-01-01") is None
+        # A completed run leaves nothing to resume
+        save_checkpoint(path, "earliest..2025-03-13", {1, 2}, finished=True)
+        assert unfinished_run_end(path, "earliest") is None
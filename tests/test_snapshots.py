@@ -10,6 +10,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from api.main import app
 from app.database import async_session
 from app.models import NetWorthSnapshot
+from api.routes.finance import capture_user_net_worth_snapshot
 from sqlalchemy import select
 
 @pytest.fixture
@@ -70,7 +71,7 @@ async def test_snapshots_and_resolution(unique_user):
         res_acc = await client.post("/api/finance/accounts", json=acc_payload, headers=headers)
         assert res_acc.status_code == 200
 
-        # 3. Fetch history - this should lazy-trigger today's snapshot creation
+        # 3. Fetch history - today's entry is the live figure, computed without writing a snapshot
         res_hist_1 = await client.get("/api/finance/net-worth-history?resolution=daily", headers=headers)
         assert res_hist_1.status_code == 200
         history_1 = res_hist_1.json()
@@ -78,13 +79,14 @@ async def test_snapshots_and_resolution(unique_user):
         assert history_1[0]["net_worth"] == 5000.0
         assert history_1[0]["is_live"] is True
 
-        # Verify today's snapshot was written to DB
+        # Snapshots are only persisted by the scheduled job
         async with async_session() as db:
             db_res = await db.execute(select(NetWorthSnapshot).where(NetWorthSnapshot.owner_id == user_id))
-            snapshots = db_res.scalars().all()
-            assert len(snapshots) == 1
-            assert snapshots[0].total_assets == 5000.0
-            assert snapshots[0].total_liabilities == 0.0
+            assert db_res.scalars().all() == []
+
+            snapshot = await capture_user_net_worth_snapshot(db, user_id, datetime.now(timezone.utc))
+            assert snapshot.total_assets == 5000.0
+            assert snapshot.total_liabilities == 0.0
 
         # 4. Insert historical snapshots to test monthly resolution aggregation
         two_months_ago = datetime.now(timezone.utc) - timedelta(days=60)
@@ -134,3 +136,121 @@ async def test_snapshots_and_resolution(unique_user):
         assert monthly_data[0]["net_worth"] == 2500.0
         assert monthly_data[1]["net_worth"] == 4000.0
         assert monthly_data[2]["net_worth"] == 5000.0
+        assert [m["is_live"] for m in monthly_data] == [False, False, True]
+
+        # 7. The live figure follows mutations immediately rather than the stored snapshot
+        res_acc2 = await client.post("/api/finance/accounts", json={**acc_payload, "name": "Second", "balance": 1000.0}, headers=headers)
+        assert res_acc2.status_code == 200
+        live = (await client.get("/api/finance/net-worth-history?resolution=daily", headers=headers)).json()
+        assert len(live) == 4
+        assert live[-1]["net_worth"] == 6000.0
+        assert live[-1]["is_live"] is True
+
+@pytest.mark.anyio
+async def test_nightly_snapshot_job_batches_and_upserts():
+    from app.models import User
+    from app.snapshots import take_net_worth_snapshots
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        balances = {}
+        for balance in (1200.0, 3400.0):
+            run_id = str(uuid.uuid4())[:8]
+            credentials = {"email": f"test_job_{run_id}@example.com", "password": "SecurePassword123!", "name": "Job"}
+            headers = await get_auth_headers(client, credentials)
+            res = await client.post("/api/finance/accounts", json={
+                "name": "Cash", "classification": "asset", "account_class": "cash",
+                "balance": balance, "currency": "USD", "description": "Cash"
+            }, headers=headers)
+            assert res.status_code == 200
+            async with async_session() as db:
+                user_id = (await db.execute(select(User.id).where(User.email == credentials["email"]))).scalar()
+            balances[user_id] = balance
+
+    now = datetime.now(timezone.utc)
+    report = await take_net_worth_snapshots(async_session, now, concurrency=4)
+    assert report["failed"] == {}
+    assert report["snapshots"] == report["users"] >= 2
+    assert report["duration_seconds"] >= 0
+
+    # Re-running the same day updates the rows in place
+    report_again = await take_net_worth_snapshots(async_session, now, concurrency=4)
+    assert report_again["snapshots"] == report["snapshots"]
+
+    async with async_session() as db:
+        for user_id, balance in balances.items():
+            rows = (await db.execute(
+                select(NetWorthSnapshot).where(NetWorthSnapshot.owner_id == user_id)
+            )).scalars().all()
+            assert len(rows) == 1
+            assert rows[0].date == datetime(now.year, now.month, now.day, tzinfo=timezone.utc)
+            assert rows[0].total_assets == balance
+            assert rows[0].total_liabilities == 0.0
+
+@pytest.mark.anyio
+async def test_backfill_reconstructs_history_from_ledger(unique_user, tmp_path):
+    from app.models import User
+    from app.snapshot_backfill import backfill_net_worth_history
+
+    now = datetime.now(timezone.utc)
+    today = datetime(now.year, now.month, now.day, tzinfo=timezone.utc)
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        headers = await get_auth_headers(client, unique_user)
+        res = await client.post("/api/finance/accounts", json={
+            "name": "Current", "classification": "asset", "account_class": "cash",
+            "balance": 1000.0, "currency": "USD", "description": "Current"
+        }, headers=headers)
+        assert res.status_code == 200
+        account_id = res.json()["id"]
+
+        # Back-dated ledger entries: +500 ten days ago, -200 five days ago (balance ends at 1300)
+        for days_ago, amount in ((10, 500.0), (5, -200.0)):
+            res = await client.post(f"/api/finance/accounts/{account_id}/transactions", json={
+                "amount": amount, "transaction_type": "income" if amount > 0 else "expense",
+                "description": "Back-dated", "date": (today - timedelta(days=days_ago, hours=-12)).isoformat()
+            }, headers=headers)
+            assert res.status_code == 200
+
+        async with async_session() as db:
+            user_id = (await db.execute(select(User.id).where(User.email == unique_user["email"]))).scalar()
+            # A random pre-history row, as the old backfill script wrote them
+            db.add(NetWorthSnapshot(
+                owner_id=user_id, date=today - timedelta(days=30), total_assets=123456.0, total_liabilities=0.0
+            ))
+            await db.commit()
+
+    checkpoint = str(tmp_path / "backfill.json")
+    report = await backfill_net_worth_history(
+        async_session, start=today - timedelta(days=12), workers=4, checkpoint_path=checkpoint
+    )
+    assert report["failed"] == {}
+    assert report["skipped"] == 0
+
+    async with async_session() as db:
+        rows = (await db.execute(
+            select(NetWorthSnapshot)
+            .where(NetWorthSnapshot.owner_id == user_id)
+            .order_by(NetWorthSnapshot.date)
+        )).scalars().all()
+    # One row per day from the first ledger entry through yesterday; the pre-history row is gone
+    assert [r.date for r in rows] == [today - timedelta(days=d) for d in range(10, 0, -1)]
+    assert [r.total_assets for r in rows] == [1500.0] * 5 + [1300.0] * 5
+    assert all(r.total_liabilities == 0.0 for r in rows)
+
+    # A re-run over the same range resumes from the checkpoint and skips finished users
+    resumed = await backfill_net_worth_history(
+        async_session, start=today - timedelta(days=12), workers=4, checkpoint_path=checkpoint
+    )
+    assert resumed["skipped"] == resumed["users"]
+    assert resumed["snapshots"] == 0
+
+    # An interrupted default-range run resumed on a later day keeps its original end
+    from app.snapshot_backfill import save_checkpoint
+    start_day = (today - timedelta(days=12)).date()
+    earlier_end = (today - timedelta(days=3)).date()
+    save_checkpoint(checkpoint, f"{start_day}..{earlier_end}", set())
+    resumed = await backfill_net_worth_history(
+        async_session, start=today - timedelta(days=12), workers=4, checkpoint_path=checkpoint
+    )
+    assert resumed["end"] == str(earlier_end)
+    assert resumed["skipped"] == 0
@@ -540,3 +540,253 @@ async def test_linked_personal_ownership_switch(unique_user_credentials):
         assert patched_back["is_joint"] == 0
         assert patched_back["owner_id"] == user1.id
         assert patched_back["payer_id"] == user1.id
+
+@pytest.mark.anyio
+async def test_linked_personal_without_partner_is_rejected(unique_user_credentials):
+    """
+    Assigning an expense to a linked partner fails cleanly when the user has none.
+    """
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        headers = await get_auth_headers(client, unique_user_credentials)
+
+        create_res = await client.post("/api/finance/expenses", json={
+            "date": "2023-10-01T00:00:00Z",
+            "category": "Groceries",
+            "amount": 12.0,
+            "description": "Solo coffee",
+            "is_joint": False
+        }, headers=headers)
+        assert create_res.status_code == 200
+        expense_id = create_res.json()["id"]
+
+        patch_res = await client.patch(f"/api/finance/expenses/{expense_id}", json={
+            "ownership_type": "linked-personal"
+        }, headers=headers)
+        assert patch_res.status_code == 400
+        assert patch_res.json()["detail"] == "No linked partner found to assign this expense to"
+
+@pytest.mark.anyio
+async def test_bulk_upload_round_trips_and_hash_dedup(unique_user_credentials):
+    """
+    A large statement is inserted in a handful of statements, repeated rows inside the
+    file are kept, re-uploading is fully deduplicated, and rows created before
+    content hashes existed are still recognised as duplicates.
+    """
+    from datetime import datetime, timezone
+    from sqlalchemy import event, select, func
+    from app.database import engine, async_session
+    from app.models import Expense, RawExpense, User
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        headers = await get_auth_headers(client, unique_user_credentials)
+
+        # Legacy row without a content hash, as written before the column existed
+        async with async_session() as db:
+            user = (await db.execute(select(User).where(User.email == unique_user_credentials["email"]))).scalar_one()
+            db.add(Expense(
+                owner_id=user.id,
+                date=datetime(2023, 1, 1, tzinfo=timezone.utc),
+                category="Groceries",
+                amount=12.5,
+                description="Legacy Row",
+                is_joint=0
+            ))
+            await db.commit()
+
+        lines = ["Date,Category,Amount,Description,IsJoint", "2023-01-01,Groceries,12.50,Legacy Row,false"]
+        for i in range(2500):
+            lines.append(f"2023-02-{i % 28 + 1:02d},Shopping,{i % 50 + 1}.00,Bulk Item {i},false")
+        # The same purchase twice on the same day is two real expenses, not a duplicate
+        lines.append("2023-03-01,Dining,9.99,Twin Coffee,false")
+        lines.append("2023-03-01,Dining,9.99,Twin Coffee,false")
+        csv_content = "\n".join(lines) + "\n"
+
+        statements = []
+        def _count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        event.listen(engine.sync_engine, "before_cursor_execute", _count)
+        try:
+            res = await client.post(
+                "/api/finance/expenses/upload",
+                files={"file": ("bulk.csv", io.BytesIO(csv_content.encode("utf-8")), "text/csv")},
+                headers=headers
+            )
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", _count)
+
+        assert res.status_code == 200
+        data = res.json()
+        assert data["added"] == 2502
+        assert data["duplicates"] == 1
+        assert data["failed"] == 0
+        # Auth, rules, one duplicate lookup and a few chunked INSERTs rather than thousands of round trips
+        assert len(statements) < 30
+
+        res2 = await client.post(
+            "/api/finance/expenses/upload",
+            files={"file": ("bulk.csv", io.BytesIO(csv_content.encode("utf-8")), "text/csv")},
+            headers=headers
+        )
+        assert res2.status_code == 200
+        assert res2.json()["added"] == 0
+        assert res2.json()["duplicates"] == 2503
+
+        async with async_session() as db:
+            expense_count = (await db.execute(
+                select(func.count(Expense.id)).where(Expense.owner_id == user.id)
+            )).scalar()
+            raw_count = (await db.execute(
+                select(func.count(RawExpense.id)).where(RawExpense.owner_id == user.id)
+            )).scalar()
+            assert expense_count == 2503
+            assert raw_count == 2502
+
+@pytest.mark.anyio
+async def test_month_first_upload_matches_rows_stored_day_first(unique_user_credentials):
+    """
+    A file sniffed as month-first reads "03/04/2023" as 4 March, while earlier
+    imports read it day-first as 3 April. Rows stored under that day-first date
+    are recognised as duplicates instead of being imported again.
+    """
+    from datetime import datetime, timezone
+    from sqlalchemy import select
+    from app.database import async_session
+    from app.models import Expense, User
+    from api.routes.finance import expense_content_hash
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        headers = await get_auth_headers(client, unique_user_credentials)
+
+        async with async_session() as db:
+            user = (await db.execute(select(User).where(User.email == unique_user_credentials["email"]))).scalar_one()
+            stored_date = datetime(2023, 4, 3, tzinfo=timezone.utc)
+            db.add(Expense(
+                owner_id=user.id,
+                date=stored_date,
+                category="Dining",
+                amount=20.0,
+                description="Ambiguous Coffee",
+                is_joint=0,
+                content_hash=expense_content_hash(stored_date, 20.0, "Ambiguous Coffee")
+            ))
+            await db.commit()
+
+        csv_content = (
+            "Date,Category,Amount,Description,IsJoint\n"
+            "03/04/2023,Dining,20.00,Ambiguous Coffee,false\n"
+            "03/05/2023,Dining,7.00,Fresh Ambiguous,false\n"
+            "03/15/2023,Dining,12.00,Clear Lunch,false\n"
+        )
+        res = await client.post(
+            "/api/finance/expenses/upload",
+            files={"file": ("us.csv", io.BytesIO(csv_content.encode("utf-8")), "text/csv")},
+            headers=headers
+        )
+        assert res.status_code == 200
+        assert res.json()["added"] == 2
+        assert res.json()["duplicates"] == 1
+
+        async with async_session() as db:
+            rows = (await db.execute(
+                select(Expense.description, Expense.date).where(Expense.owner_id == user.id).order_by(Expense.date)
+            )).all()
+        assert [(d, when.astimezone(timezone.utc).date().isoformat()) for d, when in rows] == [
+            ("Fresh Ambiguous", "2023-03-05"),
+            ("Clear Lunch", "2023-03-15"),
+            ("Ambiguous Coffee", "2023-04-03"),
+        ]
+
+@pytest.mark.anyio
+async def test_upload_predicts_categories_from_history(unique_user_credentials):
+    """
+    Once a user has labelled history, rows no rule matches are categorized by the
+    user's classifier when it is confident, and left Uncategorized otherwise.
+    """
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        headers = await get_auth_headers(client, unique_user_credentials)
+
+        lines = ["Date,Category,Amount,Description,IsJoint"]
+        for i in range(12):
+            lines.append(f"2024-01-{i + 1:02d},Groceries,{20 + i}.00,TESCO STORES {1000 + i} LONDON,false")
+            lines.append(f"2024-01-{i + 1:02d},Transport,{5 + i}.00,UBER *TRIP {i} HELP.UBER.COM,false")
+        res = await client.post(
+            "/api/finance/expenses/upload",
+            files={"file": ("history.csv", io.BytesIO(("\n".join(lines) + "\n").encode("utf-8")), "text/csv")},
+            headers=headers
+        )
+        assert res.status_code == 200
+        assert res.json()["added"] == 24
+        assert res.json()["predicted"] == 0
+
+        csv_content = (
+            "Date,Category,Amount,Description,IsJoint\n"
+            "2024-02-01,Uncategorized,31.00,TESCO EXPRESS 99,false\n"
+            "2024-02-02,Uncategorized,12.00,UBER *EATS PENDING,false\n"
+            "2024-02-03,Uncategorized,40.00,Random Gift Shop,false\n"
+        )
+        res = await client.post(
+            "/api/finance/expenses/upload",
+            files={"file": ("new.csv", io.BytesIO(csv_content.encode("utf-8")), "text/csv")},
+            headers=headers
+        )
+        assert res.status_code == 200
+        data = res.json()
+        assert data["added"] == 3
+        assert data["predicted"] == 2
+        assert data["uncategorized"] == 1
+
+        expenses = (await client.get("/api/finance/expenses", params={"month": "2024-02"}, headers=headers)).json()
+        by_description = {e["description"]: e["category"] for e in expenses}
+        assert by_description == {
+            "TESCO EXPRESS 99": "Groceries",
+            "UBER *EATS PENDING": "Transport",
+            "Random Gift Shop": "Uncategorized",
+        }
+
+@pytest.mark.anyio
+async def test_upload_job_dedups_across_chunks(unique_user_credentials, monkeypatch):
+    """
+    Test a background upload parsed in small chunks: repeated rows split across
+    chunks are all kept, and re-uploading the file adds nothing.
+    """
+    import asyncio
+    import api.routes.finance as finance
+    monkeypatch.setattr(finance, "IMPORT_CHUNK_ROWS", 2)
+
+    csv_content = (
+        "Date,Category,Amount,Description\n"
+        "2023-11-01,Dining,4.50,Coffee\n"
+        "2023-11-02,Groceries,20.00,Market\n"
+        "2023-11-01,Dining,4.50,Coffee\n"
+        "not-a-date,Dining,1.00,Broken\n"
+        "2023-11-03,Transport,12.00,Train\n"
+    )
+
+    async def run_job(client, headers):
+        res = await client.post(
+            "/api/finance/expenses/upload/jobs",
+            files={"file": ("job.csv", io.BytesIO(csv_content.encode('utf-8')), "text/csv")},
+            headers=headers
+        )
+        assert res.status_code == 200
+        job_id = res.json()["job_id"]
+        for _ in range(200):
+            job = (await client.get(f"/api/import-jobs/{job_id}")).json()
+            if job["status"] in ("completed", "failed"):
+                return job
+            await asyncio.sleep(0.05)
+        raise AssertionError("upload job did not finish")
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        headers = await get_auth_headers(client, unique_user_credentials)
+
+        first = await run_job(client, headers)
+        assert first["status"] == "completed"
+        assert (first["rows_parsed"], first["inserted"], first["duplicates"], first["failed"]) == (5, 4, 0, 1)
+        assert first["result"]["added"] == 4
+
+        second = await run_job(client, headers)
+        assert (second["inserted"], second["duplicates"]) == (0, 4)
+
+        expenses = (await client.get("/api/finance/expenses", headers=headers)).json()
+        assert sorted(e["description"] for e in expenses) == ["Coffee", "Coffee", "Market", "Train"]
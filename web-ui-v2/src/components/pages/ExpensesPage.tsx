@@ -1,5 +1,5 @@
 import React, { useState, useEffect, useRef } from 'react';
-import { apiFetch } from '../../utils/api';
+import { apiFetch, waitForImportJob } from '../../utils/api';
 import { storage } from '../../utils/storage';
 import { Upload, Plus, AlertCircle, CheckCircle, Search, Filter, Edit2, Check, X, Trash2, ArrowLeftRight } from 'lucide-react';
 import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer, AreaChart, Area, PieChart, Pie, Cell } from 'recharts';
@@ -16,9 +16,21 @@ const COLORS = [
     '#ff3b30'  // red
 ];
 
+// The summary endpoint covers at most 120 months, so "all months" means the last ten years
+const ALL_MONTHS_SPAN = 120;
+
+function summaryRange(month: string): { start: string, end: string } {
+    if (month) return { start: month, end: month };
+    const now = new Date();
+    const toMonth = (d: Date) => `${d.getUTCFullYear()}-${String(d.getUTCMonth() + 1).padStart(2, '0')}`;
+    const first = new Date(Date.UTC(now.getUTCFullYear(), now.getUTCMonth() - (ALL_MONTHS_SPAN - 1), 1));
+    return { start: toMonth(first), end: toMonth(now) };
+}
+
 export function ExpensesPage() {
     const { user } = useAuth();
     const [expenses, setExpenses] = useState<any[]>([]);
+    const [summary, setSummary] = useState<any>(null);
     const [hoveredPieIndex, setHoveredPieIndex] = useState<number | null>(null);
     const [isLoading, setIsLoading] = useState(true);
     const [selectedMonth, setSelectedMonth] = useState('');
@@ -97,9 +109,15 @@ export function ExpensesPage() {
 
     const loadExpenses = async () => {
         try {
+            // Totals and charts come from the server-side rollups; rows are only needed for the table
             const queryParams = selectedMonth ? `?month=${selectedMonth}` : '';
-            const data = await apiFetch(`/api/finance/expenses${queryParams}`);
-            setExpenses(data);
+            const { start, end } = summaryRange(selectedMonth);
+            const [rows, summaryData] = await Promise.all([
+                apiFetch(`/api/finance/expenses${queryParams}`),
+                apiFetch(`/api/finance/expenses/summary?start_month=${start}&end_month=${end}`)
+            ]);
+            setExpenses(rows);
+            setSummary(summaryData);
         } catch (error) {
             console.error("Failed to load expenses", error);
         } finally {
@@ -156,10 +174,14 @@ export function ExpensesPage() {
             }
 
             const queryString = params.toString() ? `?${params.toString()}` : '';
-            const res = await apiFetch(`/api/finance/expenses/upload${queryString}`, {
+            const job = await apiFetch(`/api/finance/expenses/upload/jobs${queryString}`, {
                 method: 'POST',
                 body: formData,
             });
+            const res = await waitForImportJob(job.job_id, progress => setUploadStatus({
+                type: 'uploading',
+                msg: `Importing CSV... ${progress.rows_parsed} rows processed`,
+            }));
             setUploadStatus({ 
                 type: 'success', 
                 msg: 'Upload completed successfully',
@@ -257,20 +279,20 @@ export function ExpensesPage() {
         return true;
     });
 
-    // Compute dynamic metrics
-    const totalAmount = filteredExpenses.reduce((sum, e) => sum + e.amount, 0);
-    const myPersonalTotal = filteredExpenses.filter(e => !e.is_joint && e.owner_id === user?.id).reduce((sum, e) => sum + e.amount, 0);
-    const linkedPersonalTotal = filteredExpenses.filter(e => !e.is_joint && e.owner_id !== user?.id).reduce((sum, e) => sum + e.amount, 0);
-    const jointTotal = filteredExpenses.filter(e => e.is_joint).reduce((sum, e) => sum + e.amount, 0);
+    // Table total, following the search and filters
+    const filteredTotal = filteredExpenses.reduce((sum, e) => sum + e.amount, 0);
 
-    // Split & Settle Up Calculations (computed over the complete month's loaded expenses, not impacted by search filters)
-    const myJointPaid = expenses
-        .filter(e => e.is_joint && e.payer_id === user?.id)
-        .reduce((sum, e) => sum + e.amount, 0);
+    // Summary metrics for the whole month (or range), from the server-side rollups
+    const me = String(user?.id);
+    const totalAmount = summary?.total ?? 0;
+    const personalByOwner: Record<string, number> = summary?.personal_by_owner ?? {};
+    const myPersonalTotal = personalByOwner[me] ?? 0;
+    const linkedPersonalTotal = (summary?.personal ?? 0) - myPersonalTotal;
+    const jointTotal = summary?.joint ?? 0;
 
-    const partnerJointPaid = expenses
-        .filter(e => e.is_joint && e.payer_id !== user?.id)
-        .reduce((sum, e) => sum + e.amount, 0);
+    // Split & Settle Up Calculations (not impacted by search filters)
+    const myJointPaid = summary?.joint_by_payer?.[me] ?? 0;
+    const partnerJointPaid = jointTotal - myJointPaid;
 
     const totalJointPaid = myJointPaid + partnerJointPaid + myPreExisting + partnerPreExisting;
     
@@ -297,21 +319,18 @@ export function ExpensesPage() {
     const myJointGap = Math.max(0, myExpectedShare - (myJointPaid + myPreExisting));
     const partnerJointGap = Math.max(0, partnerExpectedShare - (partnerJointPaid + partnerPreExisting));
 
-    const partnerPersonalPaidByMe = expenses
-        .filter(e => !e.is_joint && e.owner_id !== user?.id && e.payer_id === user?.id)
-        .reduce((sum, e) => sum + e.amount, 0);
-
-    const myPersonalPaidByPartner = expenses
-        .filter(e => !e.is_joint && e.owner_id === user?.id && e.payer_id !== user?.id)
-        .reduce((sum, e) => sum + e.amount, 0);
+    // Personal expenses paid by someone other than their owner, keyed "owner:payer"
+    const paidByOthers = Object.entries((summary?.personal_paid_by_others ?? {}) as Record<string, number>);
+    const partnerPersonalPaidByMe = paidByOthers
+        .filter(([key]) => key.split(':')[1] === me)
+        .reduce((sum, [, amount]) => sum + amount, 0);
 
-    const myPersonalTotalAll = expenses
-        .filter(e => !e.is_joint && e.owner_id === user?.id)
-        .reduce((sum, e) => sum + e.amount, 0);
+    const myPersonalPaidByPartner = paidByOthers
+        .filter(([key]) => key.split(':')[0] === me)
+        .reduce((sum, [, amount]) => sum + amount, 0);
 
-    const partnerPersonalTotalAll = expenses
-        .filter(e => !e.is_joint && e.owner_id !== user?.id)
-        .reduce((sum, e) => sum + e.amount, 0);
+    const myPersonalTotalAll = myPersonalTotal;
+    const partnerPersonalTotalAll = linkedPersonalTotal;
 
     const jointAdjustment = (myJointPaid + myPreExisting) - myExpectedShare;
     const personalAdjustment = partnerPersonalPaidByMe - myPersonalPaidByPartner;
@@ -324,10 +343,7 @@ export function ExpensesPage() {
     const uniqueCategories = Array.from(new Set(expenses.map(e => e.category))).sort();
 
     // Grouping for chart
-    const categoryTotals = filteredExpenses.reduce((acc, curr) => {
-        acc[curr.category] = (acc[curr.category] || 0) + curr.amount;
-        return acc;
-    }, {} as Record<string, number>);
+    const categoryTotals: Record<string, number> = summary?.by_category ?? {};
 
     const chartData = Object.keys(categoryTotals).map(cat => ({
         category: cat,
@@ -335,11 +351,7 @@ export function ExpensesPage() {
     })).sort((a, b) => b.amount - a.amount);
 
     // Grouping for line/area chart (daily totals)
-    const dateTotals = filteredExpenses.reduce((acc, curr) => {
-        const dateStr = new Date(curr.date).toISOString().split('T')[0];
-        acc[dateStr] = (acc[dateStr] || 0) + curr.amount;
-        return acc;
-    }, {} as Record<string, number>);
+    const dateTotals: Record<string, number> = summary?.by_day ?? {};
 
     const lineChartData = Object.keys(dateTotals).map(date => ({
         date,
@@ -417,7 +429,7 @@ export function ExpensesPage() {
             {/* Stat Summary Cards */}
             <div className="expenses-kpi-grid">
                 <div className="glass-panel" style={{ padding: '1.5rem', display: 'flex', flexDirection: 'column', gap: '0.5rem' }}>
-                    <span style={{ fontSize: '0.85rem', color: 'var(--text-secondary)' }}>Total Expenses (Filtered)</span>
+                    <span style={{ fontSize: '0.85rem', color: 'var(--text-secondary)' }}>Total Expenses</span>
                     <span style={{ fontSize: '1.8rem', fontWeight: 'bold', color: 'var(--text-primary)' }}>
                         ${totalAmount.toLocaleString(undefined, {minimumFractionDigits: 2, maximumFractionDigits: 2})}
                     </span>
@@ -917,7 +929,7 @@ export function ExpensesPage() {
                                             <td style={{ padding: '1rem 0.5rem' }}></td>
                                             <td style={{ padding: '1rem 0.5rem' }}></td>
                                             <td style={{ padding: '1rem 0.5rem', textAlign: 'right', fontWeight: 'bold', color: 'var(--text-primary)', fontSize: '1rem' }}>
-                                                ${totalAmount.toLocaleString(undefined, {minimumFractionDigits: 2, maximumFractionDigits: 2})}
+                                                ${filteredTotal.toLocaleString(undefined, {minimumFractionDigits: 2, maximumFractionDigits: 2})}
                                             </td>
                                             <td style={{ padding: '1rem 0.5rem' }}></td>
                                         </tr>
@@ -41,7 +41,21 @@ interface RealizedTicker {
     total_realized_pnl: number
     total_shares_sold: number
     num_trades: number
-    trades: { date: string; shares: number; price: number; proceeds: number; pnl: number }[]
+}
+
+interface RealizedTrade {
+    date: string
+    shares: number
+    price: number
+    proceeds: number
+    pnl: number
+}
+
+interface DividendPayment {
+    date: string
+    shares: number
+    per_share: number
+    income: number
 }
 
 interface DividendTicker {
@@ -49,7 +63,6 @@ interface DividendTicker {
     name: string
     total_income: number
     num_payments: number
-    payments: { date: string; shares: number; per_share: number; income: number }[]
 }
 
 interface RealizedData {
@@ -150,6 +163,7 @@ export function PortfolioPage() {
         accounts,
         realizedData,
         realizedLoading,
+        realizedTrades,
         benchmarkData,
         benchmarkLoading,
         addHolding,
@@ -162,6 +176,7 @@ export function PortfolioPage() {
         linkPortfolioToAccount,
         unlinkPortfolioFromAccount,
         fetchRealized,
+        loadRealizedTrades,
         fetchBenchmarks,
         refresh
     } = usePortfolio();
@@ -271,6 +286,12 @@ export function PortfolioPage() {
     }, [activeTab, benchmarkData, fetchBenchmarks])
 
     const toggleExpand = (ticker: string) => {
+        // Rows are keyed 'r_TICKER' (sells) or 'd_TICKER' (dividends); trades load on first expand
+        const kind = ticker.startsWith('r_') ? 'sell' : 'dividend'
+        const symbol = ticker.slice(2)
+        if (!expandedTickers.has(ticker) && !realizedTrades[`${kind}:${symbol}`]) {
+            loadRealizedTrades(symbol, kind)
+        }
         setExpandedTickers(prev => {
             const next = new Set(prev)
             if (next.has(ticker)) {
@@ -783,7 +804,7 @@ export function PortfolioPage() {
                                                             {r.total_realized_pnl >= 0 ? '+' : ''}{realizedCurrencySymbol}{r.total_realized_pnl.toFixed(2)}
                                                         </td>
                                                     </tr>
-                                                    {expandedTickers.has('r_' + r.ticker) && r.trades.map((t, i) => (
+                                                    {expandedTickers.has('r_' + r.ticker) && ((realizedTrades[`sell:${r.ticker}`]?.trades || []) as RealizedTrade[]).map((t, i) => (
                                                         <tr key={i} className="detail-row">
                                                             <td></td>
                                                             <td className="detail-date" data-label="Date">{t.date}</td>
@@ -796,6 +817,14 @@ export function PortfolioPage() {
                                                             </td>
                                                         </tr>
                                                     ))}
+                                                    {expandedTickers.has('r_' + r.ticker) && realizedTrades[`sell:${r.ticker}`]?.next_cursor && (
+                                                        <tr className="detail-row">
+                                                            <td></td>
+                                                            <td colSpan={6}>
+                                                                <button className="btn btn--secondary" onClick={() => loadRealizedTrades(r.ticker, 'sell')}>Load more</button>
+                                                            </td>
+                                                        </tr>
+                                                    )}
                                                 </React.Fragment>
                                             ))}
                                         </tbody>
@@ -843,7 +872,7 @@ export function PortfolioPage() {
                                                         <td className="num" data-label="Payments">{d.num_payments}</td>
                                                         <td className="num positive" data-label="Total Income">{realizedCurrencySymbol}{d.total_income.toFixed(2)}</td>
                                                     </tr>
-                                                    {expandedTickers.has('d_' + d.ticker) && d.payments.map((p, i) => (
+                                                    {expandedTickers.has('d_' + d.ticker) && ((realizedTrades[`dividend:${d.ticker}`]?.trades || []) as DividendPayment[]).map((p, i) => (
                                                         <tr key={i} className="detail-row">
                                                             <td></td>
                                                             <td className="detail-date" data-label="Date">{p.date}</td>
@@ -852,6 +881,14 @@ export function PortfolioPage() {
                                                             <td className="num detail-num positive" data-label="Income">{realizedCurrencySymbol}{p.income.toFixed(2)}</td>
                                                         </tr>
                                                     ))}
+                                                    {expandedTickers.has('d_' + d.ticker) && realizedTrades[`dividend:${d.ticker}`]?.next_cursor && (
+                                                        <tr className="detail-row">
+                                                            <td></td>
+                                                            <td colSpan={4}>
+                                                                <button className="btn btn--secondary" onClick={() => loadRealizedTrades(d.ticker, 'dividend')}>Load more</button>
+                                                            </td>
+                                                        </tr>
+                                                    )}
                                                 </React.Fragment>
                                             ))}
                                         </tbody>
@@ -1,5 +1,5 @@
 import { useState, useEffect, useCallback } from 'react'
-import { apiFetch } from '../utils/api'
+import { apiFetch, waitForImportJob } from '../utils/api'
 
 export interface Holding {
     id: number
@@ -42,6 +42,8 @@ export function usePortfolio() {
 
     const [realizedData, setRealizedData] = useState<any>(null)
     const [realizedLoading, setRealizedLoading] = useState(false)
+    // Pages of sells/dividend payments per expanded row, keyed 'sell:TICKER' / 'dividend:TICKER'
+    const [realizedTrades, setRealizedTrades] = useState<Record<string, { trades: any[]; next_cursor: string | null }>>({})
     const [benchmarkData, setBenchmarkData] = useState<any>(null)
     const [benchmarkLoading, setBenchmarkLoading] = useState(false)
 
@@ -83,6 +85,7 @@ export function usePortfolio() {
                 setPortfolio({
                     id: 'unified',
                     name: 'Unified Portfolio',
+                    currency: data.currency,
                     total_value: data.total_value,
                     total_cost: data.total_cost,
                     total_pnl: data.total_pnl,
@@ -128,6 +131,7 @@ export function usePortfolio() {
         try {
             const data = await apiFetch(`/api/portfolio/${pid}/realized`)
             setRealizedData(data)
+            setRealizedTrades({})
         } catch (e: any) {
             console.error(e)
         } finally {
@@ -135,6 +139,27 @@ export function usePortfolio() {
         }
     }, [portfolio?.id])
 
+    // Fetch the next page of one ticker's sells or dividend payments
+    const loadRealizedTrades = useCallback(async (ticker: string, kind: 'sell' | 'dividend') => {
+        const pid = portfolio?.id
+        if (!pid || pid === 'unified') return
+        const key = `${kind}:${ticker}`
+        const current = realizedTrades[key]
+        if (current && !current.next_cursor) return
+        const params = new URLSearchParams({ ticker, kind })
+        if (current?.next_cursor) params.set('cursor', current.next_cursor)
+        try {
+            const data = await apiFetch(`/api/portfolio/${pid}/realized/trades?${params}`)
+            if (data.error) return
+            setRealizedTrades(prev => ({
+                ...prev,
+                [key]: { trades: [...(prev[key]?.trades || []), ...data.trades], next_cursor: data.next_cursor },
+            }))
+        } catch (e: any) {
+            console.error(e)
+        }
+    }, [portfolio?.id, realizedTrades])
+
     // Fetch benchmark data
     const fetchBenchmarks = useCallback(async () => {
         const pid = portfolio?.id
@@ -236,10 +261,12 @@ export function usePortfolio() {
         const formData = new FormData()
         formData.append('file', file)
         try {
-            const data = await apiFetch(`/api/portfolio/${selectedPortfolioId}/import/csv`, {
+            const job = await apiFetch(`/api/portfolio/${selectedPortfolioId}/import/csv/jobs`, {
                 method: 'POST',
                 body: formData,
             })
+            if (job.error) return job
+            const data = await waitForImportJob(job.job_id)
             if (!data.error) refresh()
             return data
         } catch (e: any) {
@@ -265,6 +292,7 @@ export function usePortfolio() {
         accounts,
         realizedData,
         realizedLoading,
+        realizedTrades,
         benchmarkData,
         benchmarkLoading,
         addHolding,
@@ -277,6 +305,7 @@ export function usePortfolio() {
         linkPortfolioToAccount,
         unlinkPortfolioFromAccount,
         fetchRealized,
+        loadRealizedTrades,
         fetchBenchmarks,
         refresh
     }
@@ -44,3 +44,32 @@ export async function apiFetch(endpoint: string, options: RequestInit = {}) {
     
     return response.json();
 }
+
+export interface ImportJob {
+    job_id: string
+    kind: string
+    status: 'queued' | 'running' | 'completed' | 'failed'
+    rows_parsed: number
+    inserted: number
+    duplicates: number
+    failed: number
+    result: any
+    error: string | null
+    updated_at: string | null
+}
+
+// Poll a background CSV import until it finishes; resolves with the job's result.
+// The server fails jobs whose heartbeat stops; timeoutMs bounds the wait regardless.
+export async function waitForImportJob(
+    jobId: string, onProgress?: (job: ImportJob) => void, intervalMs = 1000, timeoutMs = 30 * 60 * 1000
+) {
+    const deadline = Date.now() + timeoutMs
+    for (;;) {
+        const job: ImportJob = await apiFetch(`/api/import-jobs/${jobId}`)
+        if (job.status === 'completed') return job.result
+        if (job.status === 'failed') throw new Error(job.error || 'Import failed')
+        if (Date.now() > deadline) throw new Error('Import is taking too long; check back later')
+        onProgress?.(job)
+        await new Promise(resolve => setTimeout(resolve, intervalMs))
+    }
+}